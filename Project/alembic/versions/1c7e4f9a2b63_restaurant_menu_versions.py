@@ -0,0 +1,66 @@
+"""restaurant_menu_versions
+
+Revision ID: 1c7e4f9a2b63
+Revises: f0b6d2a8c431
+Create Date: 2026-10-19 19:12:07.503918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '1c7e4f9a2b63'
+down_revision: Union[str, Sequence[str], None] = 'f0b6d2a8c431'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Any meal insert, update (stock included) or delete restamps the menu it
+# belongs to, and the one it left when a meal moves restaurants. Stamps
+# come from catalog_version_seq, so the snapshot can follow them with the
+# same watermark as meals.
+BUMP_MENU_VERSION = """
+CREATE OR REPLACE FUNCTION bump_menu_version()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        INSERT INTO restaurant_menu_versions (restaurant_id) VALUES (OLD.restaurant_id)
+        ON CONFLICT (restaurant_id) DO UPDATE SET version = nextval('catalog_version_seq');
+    END IF;
+    IF TG_OP = 'INSERT' OR (TG_OP = 'UPDATE' AND NEW.restaurant_id IS DISTINCT FROM OLD.restaurant_id) THEN
+        INSERT INTO restaurant_menu_versions (restaurant_id) VALUES (NEW.restaurant_id)
+        ON CONFLICT (restaurant_id) DO UPDATE SET version = nextval('catalog_version_seq');
+    END IF;
+    RETURN NULL;
+END;
+$$;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'restaurant_menu_versions',
+        sa.Column('restaurant_id', sa.UUID(), nullable=False),
+        sa.Column('version', sa.BigInteger(), server_default=sa.text("nextval('catalog_version_seq')"), nullable=False),
+        sa.PrimaryKeyConstraint('restaurant_id'),
+    )
+    op.create_index('ix_restaurant_menu_versions_version', 'restaurant_menu_versions', ['version'])
+    op.execute("INSERT INTO restaurant_menu_versions (restaurant_id) SELECT id FROM restaurants")
+    op.execute(BUMP_MENU_VERSION)
+    op.execute(
+        "CREATE TRIGGER meals_menu_version AFTER INSERT OR UPDATE OR DELETE ON meals "
+        "FOR EACH ROW EXECUTE FUNCTION bump_menu_version()"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS meals_menu_version ON meals")
+    op.execute("DROP FUNCTION IF EXISTS bump_menu_version()")
+    op.drop_index('ix_restaurant_menu_versions_version', table_name='restaurant_menu_versions')
+    op.drop_table('restaurant_menu_versions')
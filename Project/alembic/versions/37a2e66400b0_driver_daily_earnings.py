@@ -0,0 +1,114 @@
+"""driver_daily_earnings
+
+Revision ID: 37a2e66400b0
+Revises: 6662d3fb9254
+Create Date: 2026-10-19 13:05:27.118930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '37a2e66400b0'
+down_revision: Union[str, Sequence[str], None] = '6662d3fb9254'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+RECORD_DRIVER_DELIVERY = """
+CREATE OR REPLACE FUNCTION record_driver_delivery(p_order_id uuid)
+RETURNS boolean
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    o record;
+BEGIN
+    -- Claim the order exactly once; a second call for the same order is a no-op.
+    UPDATE orders
+       SET driver_rolled_up_at = now()
+     WHERE id = p_order_id
+       AND driver_rolled_up_at IS NULL
+       AND status = 'delivered'
+       AND delivery_user_id IS NOT NULL
+    RETURNING delivery_user_id, restaurant_id, created_at, delivery_fee, tip_amount
+      INTO o;
+
+    IF NOT FOUND THEN
+        RETURN false;
+    END IF;
+
+    INSERT INTO driver_daily_earnings (driver_id, day, restaurant_id, deliveries, delivery_fees, tips)
+    VALUES (
+        o.delivery_user_id,
+        o.created_at::date,
+        o.restaurant_id,
+        1,
+        COALESCE(o.delivery_fee, 0),
+        COALESCE(o.tip_amount, 0)
+    )
+    ON CONFLICT (driver_id, day, restaurant_id) DO UPDATE
+       SET deliveries = driver_daily_earnings.deliveries + EXCLUDED.deliveries,
+           delivery_fees = driver_daily_earnings.delivery_fees + EXCLUDED.delivery_fees,
+           tips = driver_daily_earnings.tips + EXCLUDED.tips;
+
+    RETURN true;
+END;
+$$;
+"""
+
+BACKFILL_DRIVER_EARNINGS = """
+CREATE OR REPLACE FUNCTION backfill_driver_earnings(p_driver_id uuid DEFAULT NULL, p_limit integer DEFAULT 1000)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    processed integer := 0;
+    v_order_id uuid;
+BEGIN
+    FOR v_order_id IN
+        SELECT id
+          FROM orders
+         WHERE driver_rolled_up_at IS NULL
+           AND status = 'delivered'
+           AND delivery_user_id IS NOT NULL
+           AND (p_driver_id IS NULL OR delivery_user_id = p_driver_id)
+         ORDER BY created_at
+         LIMIT p_limit
+    LOOP
+        IF record_driver_delivery(v_order_id) THEN
+            processed := processed + 1;
+        END IF;
+    END LOOP;
+    RETURN processed;
+END;
+$$;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('orders', sa.Column('driver_rolled_up_at', sa.TIMESTAMP(), nullable=True))
+
+    op.create_table(
+        'driver_daily_earnings',
+        sa.Column('driver_id', sa.UUID(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('restaurant_id', sa.UUID(), sa.ForeignKey('restaurants.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('deliveries', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('delivery_fees', sa.Numeric(), server_default=sa.text('0'), nullable=False),
+        sa.Column('tips', sa.Numeric(), server_default=sa.text('0'), nullable=False),
+        sa.PrimaryKeyConstraint('driver_id', 'day', 'restaurant_id'),
+    )
+
+    op.execute(RECORD_DRIVER_DELIVERY)
+    op.execute(BACKFILL_DRIVER_EARNINGS)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP FUNCTION IF EXISTS backfill_driver_earnings(uuid, integer)")
+    op.execute("DROP FUNCTION IF EXISTS record_driver_delivery(uuid)")
+    op.drop_table('driver_daily_earnings')
+    op.drop_column('orders', 'driver_rolled_up_at')
@@ -0,0 +1,156 @@
+"""keyset_pagination
+
+Revision ID: 5d2b8e0c7f14
+Revises: 1c7e4f9a2b63
+Create Date: 2026-10-19 19:48:31.902245
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2b8e0c7f14'
+down_revision: Union[str, Sequence[str], None] = '1c7e4f9a2b63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+OLD_SIGNATURE = "list_restaurant_meals(uuid, text[], text[], boolean, text, text, boolean, integer, integer)"
+NEW_SIGNATURE = "list_restaurant_meals(uuid, text[], text[], boolean, text, text, boolean, integer, integer, text, uuid)"
+
+# Same filters and order as before, but a page can resume after the
+# (sort value, id) of the previous one instead of skipping OFFSET rows;
+# p_offset stays for callers that have no cursor yet.
+# Prices sort NULLS LAST in both directions; ties go by id ascending.
+LIST_RESTAURANT_MEALS = """
+CREATE OR REPLACE FUNCTION list_restaurant_meals(
+    p_restaurant_id uuid,
+    p_tags text[] DEFAULT '{}',
+    p_exclude_allergens text[] DEFAULT '{}',
+    p_surplus_only boolean DEFAULT false,
+    p_search text DEFAULT NULL,
+    p_sort_column text DEFAULT 'name',
+    p_descending boolean DEFAULT false,
+    p_limit integer DEFAULT 20,
+    p_offset integer DEFAULT 0,
+    p_after_value text DEFAULT NULL,
+    p_after_id uuid DEFAULT NULL
+)
+RETURNS SETOF meals
+LANGUAGE sql STABLE
+AS $$
+    WITH f AS (
+        -- an allergen no meal has ever listed excludes nothing
+        SELECT dietary_lookup('tag', p_tags) AS required,
+               coalesce(
+                   (SELECT bit_or(1::bigint << d.bit) FROM dietary_labels d
+                     WHERE d.kind = 'allergen' AND d.label IN (SELECT lower(btrim(x)) FROM unnest(p_exclude_allergens) x)),
+                   0
+               ) AS excluded
+    )
+    SELECT m.*
+      FROM meals m, f
+     WHERE m.restaurant_id = p_restaurant_id
+       AND f.required IS NOT NULL
+       AND m.tag_mask & f.required = f.required
+       AND m.allergen_mask & f.excluded = 0
+       AND (NOT p_surplus_only OR m.quantity > 0)
+       AND (p_search IS NULL OR m.name ILIKE '%' || p_search || '%')
+       AND (p_after_id IS NULL OR CASE
+            WHEN p_sort_column = 'name' THEN
+                (CASE WHEN p_descending THEN m.name < p_after_value ELSE m.name > p_after_value END)
+                OR (m.name = p_after_value AND m.id > p_after_id)
+            WHEN p_after_value IS NULL THEN
+                m.surplus_price IS NULL AND m.id > p_after_id
+            ELSE
+                m.surplus_price IS NULL
+                OR (CASE WHEN p_descending THEN m.surplus_price < p_after_value::numeric
+                         ELSE m.surplus_price > p_after_value::numeric END)
+                OR (m.surplus_price = p_after_value::numeric AND m.id > p_after_id)
+            END)
+     ORDER BY
+        CASE WHEN p_sort_column = 'name' AND NOT p_descending THEN m.name END ASC,
+        CASE WHEN p_sort_column = 'name' AND p_descending THEN m.name END DESC,
+        CASE WHEN p_sort_column = 'surplus_price' AND NOT p_descending THEN m.surplus_price END ASC NULLS LAST,
+        CASE WHEN p_sort_column = 'surplus_price' AND p_descending THEN m.surplus_price END DESC NULLS LAST,
+        m.id
+     LIMIT p_limit OFFSET p_offset;
+$$;
+"""
+
+# dietary_bitmasks' offset version, restored on downgrade
+LIST_RESTAURANT_MEALS_OFFSET = """
+CREATE OR REPLACE FUNCTION list_restaurant_meals(
+    p_restaurant_id uuid,
+    p_tags text[] DEFAULT '{}',
+    p_exclude_allergens text[] DEFAULT '{}',
+    p_surplus_only boolean DEFAULT false,
+    p_search text DEFAULT NULL,
+    p_sort_column text DEFAULT 'name',
+    p_descending boolean DEFAULT false,
+    p_limit integer DEFAULT 20,
+    p_offset integer DEFAULT 0
+)
+RETURNS SETOF meals
+LANGUAGE sql STABLE
+AS $$
+    WITH f AS (
+        SELECT dietary_lookup('tag', p_tags) AS required,
+               coalesce(
+                   (SELECT bit_or(1::bigint << d.bit) FROM dietary_labels d
+                     WHERE d.kind = 'allergen' AND d.label IN (SELECT lower(btrim(x)) FROM unnest(p_exclude_allergens) x)),
+                   0
+               ) AS excluded
+    )
+    SELECT m.*
+      FROM meals m, f
+     WHERE m.restaurant_id = p_restaurant_id
+       AND f.required IS NOT NULL
+       AND m.tag_mask & f.required = f.required
+       AND m.allergen_mask & f.excluded = 0
+       AND (NOT p_surplus_only OR m.quantity > 0)
+       AND (p_search IS NULL OR m.name ILIKE '%' || p_search || '%')
+     ORDER BY
+        CASE WHEN p_sort_column = 'name' AND NOT p_descending THEN m.name END ASC,
+        CASE WHEN p_sort_column = 'name' AND p_descending THEN m.name END DESC,
+        CASE WHEN p_sort_column = 'surplus_price' AND NOT p_descending THEN m.surplus_price END ASC NULLS LAST,
+        CASE WHEN p_sort_column = 'surplus_price' AND p_descending THEN m.surplus_price END DESC NULLS LAST,
+        m.id
+     LIMIT p_limit OFFSET p_offset;
+$$;
+"""
+
+# chat_sessions is created by the Supabase project, not by these migrations
+CHAT_SESSIONS_INDEX = """
+DO $$
+BEGIN
+    IF to_regclass('chat_sessions') IS NOT NULL THEN
+        CREATE INDEX IF NOT EXISTS ix_chat_sessions_user_created_id ON chat_sessions (user_id, created_at DESC, id);
+    END IF;
+END;
+$$;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_restaurants_name_id', 'restaurants', ['name', 'id'])
+    op.create_index('ix_meals_restaurant_name_id', 'meals', ['restaurant_id', 'name', 'id'])
+    op.create_index('ix_meals_restaurant_price_id', 'meals', ['restaurant_id', 'surplus_price', 'id'])
+    op.create_index('ix_orders_user_created_id', 'orders', ['user_id', sa.literal_column('created_at DESC'), 'id'])
+    op.execute(CHAT_SESSIONS_INDEX)
+    op.execute(f"DROP FUNCTION IF EXISTS {OLD_SIGNATURE}")
+    op.execute(LIST_RESTAURANT_MEALS)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(f"DROP FUNCTION IF EXISTS {NEW_SIGNATURE}")
+    op.execute(LIST_RESTAURANT_MEALS_OFFSET)
+    op.execute("DROP INDEX IF EXISTS ix_chat_sessions_user_created_id")
+    op.drop_index('ix_orders_user_created_id', table_name='orders')
+    op.drop_index('ix_meals_restaurant_price_id', table_name='meals')
+    op.drop_index('ix_meals_restaurant_name_id', table_name='meals')
+    op.drop_index('ix_restaurants_name_id', table_name='restaurants')
@@ -0,0 +1,118 @@
+"""windowed_analytics_functions
+
+Revision ID: 6662d3fb9254
+Revises: 8a9c01c23c54
+Create Date: 2026-10-19 11:40:03.552917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '6662d3fb9254'
+down_revision: Union[str, Sequence[str], None] = '8a9c01c23c54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+RESTAURANT_ANALYTICS_SERIES = """
+CREATE OR REPLACE FUNCTION restaurant_analytics_series(
+    p_restaurant_id uuid,
+    p_from date DEFAULT NULL,
+    p_to date DEFAULT NULL,
+    p_granularity text DEFAULT 'day'
+)
+RETURNS TABLE (
+    bucket date,
+    orders bigint,
+    revenue numeric,
+    rating_sum bigint,
+    rating_count bigint,
+    new_customers bigint,
+    new_repeat_customers bigint
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT date_trunc(p_granularity, s.day)::date AS bucket,
+           sum(s.orders),
+           sum(s.revenue),
+           sum(s.rating_sum),
+           sum(s.rating_count),
+           sum(s.new_customers),
+           sum(s.new_repeat_customers)
+      FROM restaurant_daily_stats s
+     WHERE s.restaurant_id = p_restaurant_id
+       AND (p_from IS NULL OR s.day >= p_from)
+       AND (p_to IS NULL OR s.day < p_to)
+     GROUP BY 1
+     ORDER BY 1;
+$$;
+"""
+
+RESTAURANT_WINDOW_CUSTOMERS = """
+CREATE OR REPLACE FUNCTION restaurant_window_customers(
+    p_restaurant_id uuid,
+    p_from timestamp DEFAULT NULL,
+    p_to timestamp DEFAULT NULL
+)
+RETURNS TABLE (unique_customers bigint, repeat_customers bigint)
+LANGUAGE sql STABLE
+AS $$
+    SELECT count(*), count(*) FILTER (WHERE t.n > 1)
+      FROM (
+            SELECT o.user_id, count(*) AS n
+              FROM orders o
+             WHERE o.restaurant_id = p_restaurant_id
+               AND o.status IN ('delivered', 'completed')
+               AND (p_from IS NULL OR o.created_at >= p_from)
+               AND (p_to IS NULL OR o.created_at < p_to)
+             GROUP BY o.user_id
+           ) t;
+$$;
+"""
+
+RESTAURANT_WINDOW_DISHES = """
+CREATE OR REPLACE FUNCTION restaurant_window_dishes(
+    p_restaurant_id uuid,
+    p_from timestamp DEFAULT NULL,
+    p_to timestamp DEFAULT NULL,
+    p_limit integer DEFAULT 5
+)
+RETURNS TABLE (meal_id uuid, name text, image_link text, orders bigint, revenue numeric)
+LANGUAGE sql STABLE
+AS $$
+    SELECT oi.meal_id, m.name, m.image_link, count(*), COALESCE(sum(oi.price), 0)
+      FROM orders o
+      JOIN order_items oi ON oi.order_id = o.id
+      JOIN meals m ON m.id = oi.meal_id
+     WHERE o.restaurant_id = p_restaurant_id
+       AND o.status IN ('delivered', 'completed')
+       AND (p_from IS NULL OR o.created_at >= p_from)
+       AND (p_to IS NULL OR o.created_at < p_to)
+     GROUP BY oi.meal_id, m.name, m.image_link
+     ORDER BY count(*) DESC
+     LIMIT p_limit;
+$$;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Window scans for both restaurant and driver analytics seek on these.
+    op.create_index('ix_orders_restaurant_created', 'orders', ['restaurant_id', 'created_at'])
+    op.create_index('ix_orders_driver_status_created', 'orders', ['delivery_user_id', 'status', 'created_at'])
+
+    op.execute(RESTAURANT_ANALYTICS_SERIES)
+    op.execute(RESTAURANT_WINDOW_CUSTOMERS)
+    op.execute(RESTAURANT_WINDOW_DISHES)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP FUNCTION IF EXISTS restaurant_window_dishes(uuid, timestamp, timestamp, integer)")
+    op.execute("DROP FUNCTION IF EXISTS restaurant_window_customers(uuid, timestamp, timestamp)")
+    op.execute("DROP FUNCTION IF EXISTS restaurant_analytics_series(uuid, date, date, text)")
+    op.drop_index('ix_orders_driver_status_created', table_name='orders')
+    op.drop_index('ix_orders_restaurant_created', table_name='orders')
@@ -0,0 +1,211 @@
+"""restaurant_analytics_rollups
+
+Revision ID: 8a9c01c23c54
+Revises: 8f5993c1e378
+Create Date: 2026-10-19 09:12:41.308214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '8a9c01c23c54'
+down_revision: Union[str, Sequence[str], None] = '8f5993c1e378'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+RECORD_ORDER_ROLLUP = """
+CREATE OR REPLACE FUNCTION record_order_rollup(p_order_id uuid)
+RETURNS boolean
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    o record;
+    prev_orders integer;
+BEGIN
+    -- Claim the order exactly once; a second call for the same order is a no-op.
+    UPDATE orders
+       SET rolled_up_at = now(),
+           rating_rolled_up = (restaurant_rating IS NOT NULL)
+     WHERE id = p_order_id
+       AND rolled_up_at IS NULL
+       AND status IN ('delivered', 'completed')
+    RETURNING restaurant_id, user_id, created_at, total, delivery_fee,
+              tip_amount, tax, restaurant_rating
+      INTO o;
+
+    IF NOT FOUND THEN
+        RETURN false;
+    END IF;
+
+    SELECT orders INTO prev_orders
+      FROM restaurant_customer_stats
+     WHERE restaurant_id = o.restaurant_id AND user_id = o.user_id
+       FOR UPDATE;
+
+    INSERT INTO restaurant_customer_stats (restaurant_id, user_id, orders, first_order_at, last_order_at)
+    VALUES (o.restaurant_id, o.user_id, 1, o.created_at, o.created_at)
+    ON CONFLICT (restaurant_id, user_id) DO UPDATE
+       SET orders = restaurant_customer_stats.orders + 1,
+           first_order_at = LEAST(restaurant_customer_stats.first_order_at, EXCLUDED.first_order_at),
+           last_order_at = GREATEST(restaurant_customer_stats.last_order_at, EXCLUDED.last_order_at);
+
+    INSERT INTO restaurant_daily_stats (
+        restaurant_id, day, orders, revenue, rating_sum, rating_count,
+        new_customers, new_repeat_customers
+    )
+    VALUES (
+        o.restaurant_id,
+        o.created_at::date,
+        1,
+        COALESCE(o.total, 0) - COALESCE(o.delivery_fee, 0) - COALESCE(o.tip_amount, 0) - COALESCE(o.tax, 0),
+        COALESCE(o.restaurant_rating, 0),
+        CASE WHEN o.restaurant_rating IS NULL THEN 0 ELSE 1 END,
+        CASE WHEN prev_orders IS NULL THEN 1 ELSE 0 END,
+        CASE WHEN prev_orders = 1 THEN 1 ELSE 0 END
+    )
+    ON CONFLICT (restaurant_id, day) DO UPDATE
+       SET orders = restaurant_daily_stats.orders + EXCLUDED.orders,
+           revenue = restaurant_daily_stats.revenue + EXCLUDED.revenue,
+           rating_sum = restaurant_daily_stats.rating_sum + EXCLUDED.rating_sum,
+           rating_count = restaurant_daily_stats.rating_count + EXCLUDED.rating_count,
+           new_customers = restaurant_daily_stats.new_customers + EXCLUDED.new_customers,
+           new_repeat_customers = restaurant_daily_stats.new_repeat_customers + EXCLUDED.new_repeat_customers;
+
+    INSERT INTO restaurant_meal_stats (restaurant_id, meal_id, orders, qty, revenue)
+    SELECT o.restaurant_id, oi.meal_id, count(*), COALESCE(sum(oi.qty), 0), COALESCE(sum(oi.price), 0)
+      FROM order_items oi
+     WHERE oi.order_id = p_order_id
+     GROUP BY oi.meal_id
+    ON CONFLICT (restaurant_id, meal_id) DO UPDATE
+       SET orders = restaurant_meal_stats.orders + EXCLUDED.orders,
+           qty = restaurant_meal_stats.qty + EXCLUDED.qty,
+           revenue = restaurant_meal_stats.revenue + EXCLUDED.revenue;
+
+    RETURN true;
+END;
+$$;
+"""
+
+RECORD_RESTAURANT_RATING = """
+CREATE OR REPLACE FUNCTION record_restaurant_rating(p_order_id uuid)
+RETURNS boolean
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    o record;
+BEGIN
+    -- Only orders already folded into the rollups need their rating added
+    -- here; record_order_rollup picks up ratings that arrive first.
+    UPDATE orders
+       SET rating_rolled_up = true
+     WHERE id = p_order_id
+       AND rolled_up_at IS NOT NULL
+       AND NOT rating_rolled_up
+       AND restaurant_rating IS NOT NULL
+    RETURNING restaurant_id, created_at, restaurant_rating
+      INTO o;
+
+    IF NOT FOUND THEN
+        RETURN false;
+    END IF;
+
+    UPDATE restaurant_daily_stats
+       SET rating_sum = rating_sum + o.restaurant_rating,
+           rating_count = rating_count + 1
+     WHERE restaurant_id = o.restaurant_id
+       AND day = o.created_at::date;
+
+    RETURN true;
+END;
+$$;
+"""
+
+BACKFILL_ORDER_ROLLUPS = """
+CREATE OR REPLACE FUNCTION backfill_order_rollups(p_restaurant_id uuid DEFAULT NULL, p_limit integer DEFAULT 1000)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    processed integer := 0;
+    v_order_id uuid;
+BEGIN
+    FOR v_order_id IN
+        SELECT id
+          FROM orders
+         WHERE rolled_up_at IS NULL
+           AND status IN ('delivered', 'completed')
+           AND (p_restaurant_id IS NULL OR restaurant_id = p_restaurant_id)
+         ORDER BY created_at
+         LIMIT p_limit
+    LOOP
+        IF record_order_rollup(v_order_id) THEN
+            processed := processed + 1;
+        END IF;
+    END LOOP;
+    RETURN processed;
+END;
+$$;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('orders', sa.Column('rolled_up_at', sa.TIMESTAMP(), nullable=True))
+    op.add_column('orders', sa.Column('rating_rolled_up', sa.Boolean(), server_default=sa.text('false'), nullable=False))
+    op.create_index('ix_orders_pending_rollup', 'orders', ['restaurant_id', 'created_at'],
+                    postgresql_where=sa.text("rolled_up_at IS NULL AND status IN ('delivered', 'completed')"))
+
+    op.create_table(
+        'restaurant_daily_stats',
+        sa.Column('restaurant_id', sa.UUID(), sa.ForeignKey('restaurants.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('orders', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('revenue', sa.Numeric(), server_default=sa.text('0'), nullable=False),
+        sa.Column('rating_sum', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('rating_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('new_customers', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('new_repeat_customers', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.PrimaryKeyConstraint('restaurant_id', 'day'),
+    )
+    op.create_table(
+        'restaurant_meal_stats',
+        sa.Column('restaurant_id', sa.UUID(), sa.ForeignKey('restaurants.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('meal_id', sa.UUID(), sa.ForeignKey('meals.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('orders', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('qty', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('revenue', sa.Numeric(), server_default=sa.text('0'), nullable=False),
+        sa.PrimaryKeyConstraint('restaurant_id', 'meal_id'),
+    )
+    op.create_index('ix_restaurant_meal_stats_popular', 'restaurant_meal_stats',
+                    ['restaurant_id', sa.literal_column('orders DESC')])
+    op.create_table(
+        'restaurant_customer_stats',
+        sa.Column('restaurant_id', sa.UUID(), sa.ForeignKey('restaurants.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('user_id', sa.UUID(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('orders', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('first_order_at', sa.TIMESTAMP(), nullable=True),
+        sa.Column('last_order_at', sa.TIMESTAMP(), nullable=True),
+        sa.PrimaryKeyConstraint('restaurant_id', 'user_id'),
+    )
+
+    op.execute(RECORD_ORDER_ROLLUP)
+    op.execute(RECORD_RESTAURANT_RATING)
+    op.execute(BACKFILL_ORDER_ROLLUPS)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP FUNCTION IF EXISTS backfill_order_rollups(uuid, integer)")
+    op.execute("DROP FUNCTION IF EXISTS record_restaurant_rating(uuid)")
+    op.execute("DROP FUNCTION IF EXISTS record_order_rollup(uuid)")
+    op.drop_table('restaurant_customer_stats')
+    op.drop_index('ix_restaurant_meal_stats_popular', table_name='restaurant_meal_stats')
+    op.drop_table('restaurant_meal_stats')
+    op.drop_table('restaurant_daily_stats')
+    op.drop_index('ix_orders_pending_rollup', table_name='orders')
+    op.drop_column('orders', 'rating_rolled_up')
+    op.drop_column('orders', 'rolled_up_at')
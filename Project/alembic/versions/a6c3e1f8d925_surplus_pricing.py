@@ -0,0 +1,64 @@
+"""surplus_pricing
+
+Revision ID: a6c3e1f8d925
+Revises: 5d2b8e0c7f14
+Create Date: 2026-10-19 20:31:54.118420
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c3e1f8d925'
+down_revision: Union[str, Sequence[str], None] = '5d2b8e0c7f14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# One statement per restaurant for a whole repricing round. Rows whose
+# price is already right are not touched, so they keep their version and
+# menu stamp.
+APPLY_SURPLUS_PRICES = """
+CREATE OR REPLACE FUNCTION apply_surplus_prices(
+    p_restaurant_id uuid,
+    p_meal_ids uuid[],
+    p_prices numeric[]
+)
+RETURNS integer
+LANGUAGE sql
+AS $$
+    WITH changed AS (
+        UPDATE meals m
+           SET surplus_price = u.price
+          FROM unnest(p_meal_ids, p_prices) AS u(id, price)
+         WHERE m.id = u.id
+           AND m.restaurant_id = p_restaurant_id
+           AND m.surplus_price IS DISTINCT FROM u.price
+        RETURNING 1
+    )
+    SELECT count(*)::integer FROM changed;
+$$;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('restaurants', sa.Column('dynamic_pricing', sa.Boolean(), server_default='false', nullable=False))
+    op.add_column('restaurants', sa.Column('closes_at', sa.Time(), nullable=True))
+    op.add_column('restaurants', sa.Column('surplus_floor_ratio', sa.Numeric(), nullable=True))
+    op.create_check_constraint(
+        'ck_restaurants_surplus_floor_ratio', 'restaurants',
+        'surplus_floor_ratio IS NULL OR (surplus_floor_ratio > 0 AND surplus_floor_ratio <= 1)',
+    )
+    op.execute(APPLY_SURPLUS_PRICES)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP FUNCTION IF EXISTS apply_surplus_prices(uuid, uuid[], numeric[])")
+    op.drop_constraint('ck_restaurants_surplus_floor_ratio', 'restaurants', type_='check')
+    op.drop_column('restaurants', 'surplus_floor_ratio')
+    op.drop_column('restaurants', 'closes_at')
+    op.drop_column('restaurants', 'dynamic_pricing')
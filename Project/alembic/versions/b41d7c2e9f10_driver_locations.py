@@ -0,0 +1,35 @@
+"""driver_locations
+
+Revision ID: b41d7c2e9f10
+Revises: 37a2e66400b0
+Create Date: 2026-10-19 15:12:40.381204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41d7c2e9f10'
+down_revision: Union[str, Sequence[str], None] = '37a2e66400b0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Last known driver positions, snapshotted from the in-memory index.
+    op.create_table(
+        'driver_locations',
+        sa.Column('driver_id', sa.UUID(), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('latitude', sa.Float(), nullable=False),
+        sa.Column('longitude', sa.Float(), nullable=False),
+        sa.Column('available', sa.Boolean(), server_default=sa.text('true'), nullable=False),
+        sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('driver_locations')
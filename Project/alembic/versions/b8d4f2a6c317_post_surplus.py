@@ -0,0 +1,49 @@
+"""post_surplus
+
+Revision ID: b8d4f2a6c317
+Revises: a6c3e1f8d925
+Create Date: 2026-10-19 21:06:12.774031
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d4f2a6c317'
+down_revision: Union[str, Sequence[str], None] = 'a6c3e1f8d925'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# End-of-day surplus for many meals in one statement. p_updates maps meal
+# id to {"quantity": int, "surplus_price": numeric}; a missing or null key
+# leaves that column as it is. Meals of other restaurants are never
+# touched, and only rows that actually changed are returned.
+POST_SURPLUS = """
+CREATE OR REPLACE FUNCTION post_surplus(p_restaurant_id uuid, p_updates jsonb)
+RETURNS SETOF meals
+LANGUAGE sql
+AS $$
+    UPDATE meals m
+       SET quantity = coalesce((u.value->>'quantity')::integer, m.quantity),
+           surplus_price = coalesce((u.value->>'surplus_price')::numeric, m.surplus_price)
+      FROM jsonb_each(p_updates) AS u(key, value)
+     WHERE m.id = u.key::uuid
+       AND m.restaurant_id = p_restaurant_id
+       AND (m.quantity IS DISTINCT FROM coalesce((u.value->>'quantity')::integer, m.quantity)
+            OR m.surplus_price IS DISTINCT FROM coalesce((u.value->>'surplus_price')::numeric, m.surplus_price))
+    RETURNING m.*;
+$$;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(POST_SURPLUS)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP FUNCTION IF EXISTS post_surplus(uuid, jsonb)")
@@ -0,0 +1,40 @@
+"""restaurant_delivery_zones
+
+Revision ID: c5e2a9d17b34
+Revises: b41d7c2e9f10
+Create Date: 2026-10-19 16:40:02.517318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e2a9d17b34'
+down_revision: Union[str, Sequence[str], None] = 'b41d7c2e9f10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A restaurant delivers inside delivery_zone (a GeoJSON Polygon or
+    # MultiPolygon, [lng, lat] positions) when set, otherwise within
+    # delivery_radius_miles of its location. Both null means the
+    # application default radius.
+    op.add_column('restaurants', sa.Column('delivery_radius_miles', sa.Float(), nullable=True))
+    op.add_column('restaurants', sa.Column('delivery_zone', postgresql.JSONB(), nullable=True))
+    op.create_check_constraint(
+        'ck_restaurants_delivery_radius_positive',
+        'restaurants',
+        'delivery_radius_miles IS NULL OR delivery_radius_miles > 0',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('ck_restaurants_delivery_radius_positive', 'restaurants', type_='check')
+    op.drop_column('restaurants', 'delivery_zone')
+    op.drop_column('restaurants', 'delivery_radius_miles')
@@ -0,0 +1,101 @@
+"""catalog_search
+
+Revision ID: d7f3b8e21c05
+Revises: c5e2a9d17b34
+Create Date: 2026-10-19 17:25:48.904117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7f3b8e21c05'
+down_revision: Union[str, Sequence[str], None] = 'c5e2a9d17b34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# array_to_string is only STABLE, so generated columns go through this
+# IMMUTABLE wrapper. Names weigh more than tags.
+MEAL_SEARCH_DOCUMENT = """
+CREATE OR REPLACE FUNCTION meal_search_document(p_name text, p_tags text[])
+RETURNS tsvector
+LANGUAGE sql IMMUTABLE
+AS $$
+    SELECT setweight(to_tsvector('simple', coalesce(p_name, '')), 'A')
+        || setweight(to_tsvector('simple', coalesce(array_to_string(p_tags, ' '), '')), 'B');
+$$;
+"""
+
+# One ranked list across restaurants and meals. Full-text matches rank by
+# ts_rank; trigram similarity on the name catches typos and partial words
+# that the tsquery misses.
+SEARCH_CATALOG = """
+CREATE OR REPLACE FUNCTION search_catalog(
+    p_query text,
+    p_limit integer DEFAULT 20,
+    p_kind text DEFAULT NULL
+)
+RETURNS TABLE (type text, id uuid, restaurant_id uuid, name text, score real)
+LANGUAGE sql STABLE
+AS $$
+    WITH q AS (SELECT websearch_to_tsquery('simple', p_query) AS tsq)
+    SELECT * FROM (
+        SELECT 'restaurant'::text, r.id, r.id, r.name,
+               (ts_rank(r.search_vector, q.tsq) + similarity(r.name, p_query))::real
+          FROM restaurants r, q
+         WHERE (p_kind IS NULL OR p_kind = 'restaurant')
+           AND (r.search_vector @@ q.tsq OR r.name % p_query)
+        UNION ALL
+        SELECT 'meal'::text, m.id, m.restaurant_id, m.name,
+               (ts_rank(m.search_vector, q.tsq) + similarity(m.name, p_query))::real
+          FROM meals m, q
+         WHERE (p_kind IS NULL OR p_kind = 'meal')
+           AND (m.search_vector @@ q.tsq OR m.name % p_query)
+    ) hits
+     ORDER BY 5 DESC, 4, 2
+     LIMIT p_limit;
+$$;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(MEAL_SEARCH_DOCUMENT)
+
+    op.execute(
+        "ALTER TABLE restaurants ADD COLUMN search_vector tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('simple', coalesce(name, ''))) STORED"
+    )
+    op.execute(
+        "ALTER TABLE meals ADD COLUMN search_vector tsvector "
+        "GENERATED ALWAYS AS (meal_search_document(name, tags)) STORED"
+    )
+    op.create_index('ix_restaurants_search_vector', 'restaurants', ['search_vector'], postgresql_using='gin')
+    op.create_index('ix_meals_search_vector', 'meals', ['search_vector'], postgresql_using='gin')
+    # replaces the btree name indexes dropped in the initial schema; serves
+    # both ILIKE '%term%' and the % similarity operator
+    op.create_index(
+        'ix_restaurants_name_trgm', 'restaurants', ['name'],
+        postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'},
+    )
+    op.create_index(
+        'ix_meals_name_trgm', 'meals', ['name'],
+        postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'},
+    )
+    op.execute(SEARCH_CATALOG)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP FUNCTION IF EXISTS search_catalog(text, integer, text)")
+    op.drop_index('ix_meals_name_trgm', table_name='meals')
+    op.drop_index('ix_restaurants_name_trgm', table_name='restaurants')
+    op.drop_index('ix_meals_search_vector', table_name='meals')
+    op.drop_index('ix_restaurants_search_vector', table_name='restaurants')
+    op.drop_column('meals', 'search_vector')
+    op.drop_column('restaurants', 'search_vector')
+    op.execute("DROP FUNCTION IF EXISTS meal_search_document(text, text[])")
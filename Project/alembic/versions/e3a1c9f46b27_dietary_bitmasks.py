@@ -0,0 +1,167 @@
+"""dietary_bitmasks
+
+Revision ID: e3a1c9f46b27
+Revises: d7f3b8e21c05
+Create Date: 2026-10-19 18:02:13.640522
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a1c9f46b27'
+down_revision: Union[str, Sequence[str], None] = 'd7f3b8e21c05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Labels are lowercased and trimmed. A label seen for the first time takes
+# the lowest free bit of its kind; with all 63 bits taken the write fails
+# rather than storing a mask that silently drops an allergen.
+DIETARY_MASK = """
+CREATE OR REPLACE FUNCTION dietary_mask(p_kind text, p_labels text[])
+RETURNS bigint
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_label text;
+    v_bit smallint;
+    v_mask bigint := 0;
+BEGIN
+    FOREACH v_label IN ARRAY coalesce(p_labels, '{}'::text[]) LOOP
+        v_label := lower(btrim(v_label));
+        CONTINUE WHEN v_label = '';
+        SELECT bit INTO v_bit FROM dietary_labels WHERE kind = p_kind AND label = v_label;
+        IF v_bit IS NULL THEN
+            PERFORM pg_advisory_xact_lock(hashtext('dietary_labels:' || p_kind));
+            SELECT bit INTO v_bit FROM dietary_labels WHERE kind = p_kind AND label = v_label;
+        END IF;
+        IF v_bit IS NULL THEN
+            SELECT min(b) INTO v_bit
+              FROM generate_series(0, 62) b
+             WHERE NOT EXISTS (SELECT 1 FROM dietary_labels d WHERE d.kind = p_kind AND d.bit = b);
+            IF v_bit IS NULL THEN
+                RAISE EXCEPTION 'no free % bit for label %', p_kind, v_label;
+            END IF;
+            INSERT INTO dietary_labels (kind, label, bit) VALUES (p_kind, v_label, v_bit);
+        END IF;
+        v_mask := v_mask | (1::bigint << v_bit);
+    END LOOP;
+    RETURN v_mask;
+END;
+$$;
+"""
+
+# Read-only lookup for query parameters. NULL when any label has never
+# been stored: no meal can carry all of them.
+DIETARY_LOOKUP = """
+CREATE OR REPLACE FUNCTION dietary_lookup(p_kind text, p_labels text[])
+RETURNS bigint
+LANGUAGE sql STABLE
+AS $$
+    SELECT CASE WHEN count(DISTINCT l.label) = count(DISTINCT d.label)
+                THEN coalesce(bit_or(1::bigint << d.bit), 0) END
+      FROM (SELECT DISTINCT lower(btrim(x)) AS label FROM unnest(p_labels) x) l
+      LEFT JOIN dietary_labels d ON d.kind = p_kind AND d.label = l.label
+     WHERE l.label <> '';
+$$;
+"""
+
+MEALS_DIETARY_MASKS = """
+CREATE OR REPLACE FUNCTION meals_dietary_masks()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.tag_mask := dietary_mask('tag', NEW.tags);
+    NEW.allergen_mask := dietary_mask('allergen', NEW.allergens);
+    RETURN NEW;
+END;
+$$;
+"""
+
+# One page of a restaurant's menu with dietary filters applied before
+# LIMIT/OFFSET, so a page is only short when the menu runs out.
+LIST_RESTAURANT_MEALS = """
+CREATE OR REPLACE FUNCTION list_restaurant_meals(
+    p_restaurant_id uuid,
+    p_tags text[] DEFAULT '{}',
+    p_exclude_allergens text[] DEFAULT '{}',
+    p_surplus_only boolean DEFAULT false,
+    p_search text DEFAULT NULL,
+    p_sort_column text DEFAULT 'name',
+    p_descending boolean DEFAULT false,
+    p_limit integer DEFAULT 20,
+    p_offset integer DEFAULT 0
+)
+RETURNS SETOF meals
+LANGUAGE sql STABLE
+AS $$
+    WITH f AS (
+        -- an allergen no meal has ever listed excludes nothing
+        SELECT dietary_lookup('tag', p_tags) AS required,
+               coalesce(
+                   (SELECT bit_or(1::bigint << d.bit) FROM dietary_labels d
+                     WHERE d.kind = 'allergen' AND d.label IN (SELECT lower(btrim(x)) FROM unnest(p_exclude_allergens) x)),
+                   0
+               ) AS excluded
+    )
+    SELECT m.*
+      FROM meals m, f
+     WHERE m.restaurant_id = p_restaurant_id
+       AND f.required IS NOT NULL
+       AND m.tag_mask & f.required = f.required
+       AND m.allergen_mask & f.excluded = 0
+       AND (NOT p_surplus_only OR m.quantity > 0)
+       AND (p_search IS NULL OR m.name ILIKE '%' || p_search || '%')
+     ORDER BY
+        CASE WHEN p_sort_column = 'name' AND NOT p_descending THEN m.name END ASC,
+        CASE WHEN p_sort_column = 'name' AND p_descending THEN m.name END DESC,
+        CASE WHEN p_sort_column = 'surplus_price' AND NOT p_descending THEN m.surplus_price END ASC NULLS LAST,
+        CASE WHEN p_sort_column = 'surplus_price' AND p_descending THEN m.surplus_price END DESC NULLS LAST,
+        m.id
+     LIMIT p_limit OFFSET p_offset;
+$$;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'dietary_labels',
+        sa.Column('kind', sa.Text(), nullable=False),
+        sa.Column('label', sa.Text(), nullable=False),
+        sa.Column('bit', sa.SmallInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('kind', 'label'),
+        sa.UniqueConstraint('kind', 'bit', name='uq_dietary_labels_kind_bit'),
+        sa.CheckConstraint("kind IN ('tag', 'allergen')", name='ck_dietary_labels_kind'),
+        sa.CheckConstraint('bit BETWEEN 0 AND 62', name='ck_dietary_labels_bit'),
+    )
+    op.add_column('meals', sa.Column('tag_mask', sa.BigInteger(), server_default=sa.text('0'), nullable=False))
+    op.add_column('meals', sa.Column('allergen_mask', sa.BigInteger(), server_default=sa.text('0'), nullable=False))
+
+    op.execute(DIETARY_MASK)
+    op.execute(DIETARY_LOOKUP)
+    op.execute(MEALS_DIETARY_MASKS)
+    op.execute(
+        "CREATE TRIGGER meals_dietary_masks BEFORE INSERT OR UPDATE OF tags, allergens ON meals "
+        "FOR EACH ROW EXECUTE FUNCTION meals_dietary_masks()"
+    )
+    op.execute("UPDATE meals SET tag_mask = dietary_mask('tag', tags), allergen_mask = dietary_mask('allergen', allergens)")
+    op.execute(LIST_RESTAURANT_MEALS)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        "DROP FUNCTION IF EXISTS list_restaurant_meals(uuid, text[], text[], boolean, text, text, boolean, integer, integer)"
+    )
+    op.execute("DROP TRIGGER IF EXISTS meals_dietary_masks ON meals")
+    op.execute("DROP FUNCTION IF EXISTS meals_dietary_masks()")
+    op.execute("DROP FUNCTION IF EXISTS dietary_lookup(text, text[])")
+    op.execute("DROP FUNCTION IF EXISTS dietary_mask(text, text[])")
+    op.drop_column('meals', 'allergen_mask')
+    op.drop_column('meals', 'tag_mask')
+    op.drop_table('dietary_labels')
@@ -0,0 +1,89 @@
+"""catalog_versions
+
+Revision ID: f0b6d2a8c431
+Revises: e3a1c9f46b27
+Create Date: 2026-10-19 18:40:52.217406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'f0b6d2a8c431'
+down_revision: Union[str, Sequence[str], None] = 'e3a1c9f46b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Restaurants, meals and tombstones share one sequence, so "everything
+# after version N" is a single watermark for the catalog snapshot.
+BUMP_CATALOG_VERSION = """
+CREATE OR REPLACE FUNCTION bump_catalog_version()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.version := nextval('catalog_version_seq');
+    RETURN NEW;
+END;
+$$;
+"""
+
+RECORD_CATALOG_TOMBSTONE = """
+CREATE OR REPLACE FUNCTION record_catalog_tombstone()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO catalog_tombstones (kind, id) VALUES (TG_ARGV[0], OLD.id);
+    RETURN OLD;
+END;
+$$;
+"""
+
+TABLES = (('restaurants', 'restaurant'), ('meals', 'meal'))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE SEQUENCE catalog_version_seq")
+    op.create_table(
+        'catalog_tombstones',
+        sa.Column('version', sa.BigInteger(), server_default=sa.text("nextval('catalog_version_seq')"), nullable=False),
+        sa.Column('kind', sa.Text(), nullable=False),
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('deleted_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('version'),
+        sa.CheckConstraint("kind IN ('restaurant', 'meal')", name='ck_catalog_tombstones_kind'),
+    )
+    op.execute(BUMP_CATALOG_VERSION)
+    op.execute(RECORD_CATALOG_TOMBSTONE)
+    for table, kind in TABLES:
+        # the volatile default numbers existing rows as the column is added
+        op.add_column(table, sa.Column(
+            'version', sa.BigInteger(), server_default=sa.text("nextval('catalog_version_seq')"), nullable=False
+        ))
+        op.create_index(f'ix_{table}_version', table, ['version'])
+        op.execute(
+            f"CREATE TRIGGER {table}_catalog_version BEFORE UPDATE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION bump_catalog_version()"
+        )
+        op.execute(
+            f"CREATE TRIGGER {table}_catalog_tombstone AFTER DELETE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION record_catalog_tombstone('{kind}')"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, _ in TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_catalog_tombstone ON {table}")
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_catalog_version ON {table}")
+        op.drop_index(f'ix_{table}_version', table_name=table)
+        op.drop_column(table, 'version')
+    op.execute("DROP FUNCTION IF EXISTS record_catalog_tombstone()")
+    op.execute("DROP FUNCTION IF EXISTS bump_catalog_version()")
+    op.drop_table('catalog_tombstones')
+    op.execute("DROP SEQUENCE IF EXISTS catalog_version_seq")
@@ -1,10 +1,43 @@
+from typing import Any, Callable, Iterator, Optional
+
 from supabase import create_client, Client
 from .config import settings
+from .services.keyset import seek
 
 if not settings.SUPABASE_URL or not settings.SUPABASE_KEY:
     raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set")
 print(settings.SUPABASE_URL)
 supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
 
+# Rows fetched per round trip by stream_rows.
+STREAM_CHUNK_SIZE = 1000
+
 def get_db():
     return supabase
+
+
+def stream_rows(
+    build_query: Callable[[], Any],
+    column: str = "id",
+    tiebreak: str = "id",
+    chunk_size: Optional[int] = None,
+) -> Iterator[dict]:
+    """Yield rows from a PostgREST query in fixed-size chunks, ordered by
+    (column, tiebreak).
+
+    `build_query` must return a fresh, filtered query without ordering each
+    time it is called. The key must be unique and never NULL, and both
+    columns selected: each chunk seeks past the last row of the one before
+    instead of skipping an offset, so a deep chunk costs the same as the
+    first and rows written meanwhile are neither skipped nor repeated.
+    Only one chunk is held in memory at once.
+    """
+    chunk_size = chunk_size or STREAM_CHUNK_SIZE
+    after = None
+    while True:
+        response = seek(build_query(), column, after, tiebreak=tiebreak).limit(chunk_size).execute()
+        rows = response.data or []
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        after = (rows[-1][column], rows[-1][tiebreak])
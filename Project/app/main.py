@@ -1,9 +1,13 @@
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from .config import settings
-from .routers import meals, catalog, orders, debug_auth, auth_routes, me, address, cart, s3, delivery_routes, owner_orders, chat, feedback, driver_analytics
+from .routers import meals, catalog, orders, debug_auth, auth_routes, me, address, cart, s3, delivery_routes, owner_orders, chat, feedback, driver_analytics, driver_location, dispatch
 from .owner_meals import router as owner_meals_router
 from .owner_meals import restaurant
+from .services.catalog_snapshot import ENABLED as CATALOG_SNAPSHOT_ENABLED, catalog_snapshot
+from .services.dispatch import DISPATCH_ENABLED, dispatch_engine
+from .services.surplus_pricing import SURPLUS_PRICING_ENABLED, surplus_pricing_engine
 import sys
 from Mood2FoodRecSys.Spotify_Auth import router as spotify_router
 from Mood2FoodRecSys.RecSys import router as recsys_router
@@ -20,6 +24,29 @@ app = FastAPI(title="VibeDish API", version="0.1.0")
 # async def shutdown():
 #     await database.disconnect()
 
+@app.on_event("startup")
+async def start_dispatch():
+    if DISPATCH_ENABLED:
+        dispatch_engine.start()
+
+@app.on_event("startup")
+async def start_surplus_pricing():
+    if SURPLUS_PRICING_ENABLED:
+        surplus_pricing_engine.start()
+
+@app.on_event("startup")
+async def load_catalog_snapshot():
+    if CATALOG_SNAPSHOT_ENABLED:
+        await run_in_threadpool(catalog_snapshot.refresh)
+
+@app.on_event("shutdown")
+async def stop_dispatch():
+    dispatch_engine.stop()
+
+@app.on_event("shutdown")
+async def stop_surplus_pricing():
+    surplus_pricing_engine.stop()
+
 app.add_middleware(
     CORSMiddleware,
     # allow_origins=settings.ALLOWED_ORIGINS,
@@ -27,6 +54,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 @app.get("/health")
@@ -48,6 +76,8 @@ app.include_router(owner_orders.router, prefix="/owner/orders", tags=["owner-ord
 app.include_router(s3.router)
 app.include_router(delivery_routes.router)
 app.include_router(driver_analytics.router, prefix="/driver", tags=["driver"])
+app.include_router(driver_location.router, prefix="/driver", tags=["driver"])
+app.include_router(dispatch.router, prefix="/driver", tags=["driver"])
 app.include_router(chat.router, prefix="/chat", tags=["chat"])
 app.include_router(spotify_router)
 app.include_router(recsys_router)
\ No newline at end of file
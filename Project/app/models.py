@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Numeric, Boolean, Text, ForeignKey, Enum, TIMESTAMP, JSON, Float
+from sqlalchemy import Column, String, Integer, BigInteger, SmallInteger, Numeric, Boolean, Text, ForeignKey, Enum, TIMESTAMP, JSON, Float, Date, Time
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
@@ -36,6 +36,15 @@ class Restaurant(Base):
     created_at = Column(TIMESTAMP, server_default=func.now())
     latitude = Column(Float, name="latitudes")
     longitude = Column(Float, name="longitudes")
+    delivery_radius_miles = Column(Float)
+    delivery_zone = Column(JSON)
+    # opt-in surplus repricing towards closing time; closes_at is local
+    # time in SURPLUS_PRICING_TIMEZONE, the floor a fraction of base_price
+    dynamic_pricing = Column(Boolean, nullable=False, server_default="false")
+    closes_at = Column(Time)
+    surplus_floor_ratio = Column(Numeric)
+    # next value of catalog_version_seq on every insert/update
+    version = Column(BigInteger, nullable=False)
 
 class Meal(Base):
     __tablename__ = "meals"
@@ -50,6 +59,31 @@ class Meal(Base):
     calories = Column(Integer)
     created_at = Column(TIMESTAMP, server_default=func.now())
     image_link = Column(String)
+    # bit i set when the meal carries the label with dietary_labels.bit = i;
+    # maintained by the meals_dietary_masks trigger
+    tag_mask = Column(BigInteger, nullable=False, server_default="0")
+    allergen_mask = Column(BigInteger, nullable=False, server_default="0")
+    # next value of catalog_version_seq on every insert/update
+    version = Column(BigInteger, nullable=False)
+
+class DietaryLabel(Base):
+    __tablename__ = "dietary_labels"
+    kind = Column(Text, primary_key=True)  # 'tag' or 'allergen'
+    label = Column(Text, primary_key=True)
+    bit = Column(SmallInteger, nullable=False)
+
+class CatalogTombstone(Base):
+    __tablename__ = "catalog_tombstones"
+    version = Column(BigInteger, primary_key=True)
+    kind = Column(Text, nullable=False)  # 'restaurant' or 'meal'
+    id = Column(UUID(as_uuid=True), nullable=False)
+    deleted_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+
+class RestaurantMenuVersion(Base):
+    __tablename__ = "restaurant_menu_versions"
+    restaurant_id = Column(UUID(as_uuid=True), primary_key=True)
+    # restamped from catalog_version_seq on any change to the restaurant's meals
+    version = Column(BigInteger, nullable=False)
 
 class Address(Base):
     __tablename__ = "addresses"
@@ -86,6 +120,9 @@ class Order(Base):
     status = Column(Enum(OrderStatus, name="order_status"), default=OrderStatus.pending)
     total = Column(Numeric, nullable=False)
     created_at = Column(TIMESTAMP, server_default=func.now())
+    rolled_up_at = Column(TIMESTAMP)
+    rating_rolled_up = Column(Boolean, nullable=False, server_default="false")
+    driver_rolled_up_at = Column(TIMESTAMP)
 
 class OrderItem(Base):
     __tablename__ = "order_items"
@@ -141,3 +178,47 @@ class SustainabilityMetric(Base):
     food_saved_kg = Column(Numeric)
     co2_saved_kg = Column(Numeric)
     money_saved = Column(Numeric)
+
+class RestaurantDailyStat(Base):
+    __tablename__ = "restaurant_daily_stats"
+    restaurant_id = Column(UUID(as_uuid=True), ForeignKey("restaurants.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    orders = Column(Integer, nullable=False, server_default="0")
+    revenue = Column(Numeric, nullable=False, server_default="0")
+    rating_sum = Column(Integer, nullable=False, server_default="0")
+    rating_count = Column(Integer, nullable=False, server_default="0")
+    new_customers = Column(Integer, nullable=False, server_default="0")
+    new_repeat_customers = Column(Integer, nullable=False, server_default="0")
+
+class RestaurantMealStat(Base):
+    __tablename__ = "restaurant_meal_stats"
+    restaurant_id = Column(UUID(as_uuid=True), ForeignKey("restaurants.id"), primary_key=True)
+    meal_id = Column(UUID(as_uuid=True), ForeignKey("meals.id"), primary_key=True)
+    orders = Column(Integer, nullable=False, server_default="0")
+    qty = Column(Integer, nullable=False, server_default="0")
+    revenue = Column(Numeric, nullable=False, server_default="0")
+
+class RestaurantCustomerStat(Base):
+    __tablename__ = "restaurant_customer_stats"
+    restaurant_id = Column(UUID(as_uuid=True), ForeignKey("restaurants.id"), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    orders = Column(Integer, nullable=False, server_default="0")
+    first_order_at = Column(TIMESTAMP)
+    last_order_at = Column(TIMESTAMP)
+
+class DriverDailyEarning(Base):
+    __tablename__ = "driver_daily_earnings"
+    driver_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    restaurant_id = Column(UUID(as_uuid=True), ForeignKey("restaurants.id"), primary_key=True)
+    deliveries = Column(Integer, nullable=False, server_default="0")
+    delivery_fees = Column(Numeric, nullable=False, server_default="0")
+    tips = Column(Numeric, nullable=False, server_default="0")
+
+class DriverLocation(Base):
+    __tablename__ = "driver_locations"
+    driver_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    available = Column(Boolean, nullable=False, server_default="true")
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
@@ -3,8 +3,13 @@ from ..auth import current_user
 from ..db import get_db
 
 async def require_owner(user: dict = Depends(current_user), db = Depends(get_db)):
-    result = db.table("users").select("role").eq("id", user["id"]).execute()
+    # The owner's restaurant comes back with the role, so routes need no
+    # second lookup; see owned_restaurant.
+    result = db.table("users").select("role, restaurants!owner_id(id)").eq("id", user["id"]).execute()
     
     if not result.data or result.data[0]["role"] != "owner":
         raise HTTPException(status_code=403, detail="Owner role required")
+    restaurants = result.data[0].get("restaurants")
+    if restaurants:
+        user = {**user, "restaurant_id": str(restaurants[0]["id"])}
     return user
@@ -0,0 +1,197 @@
+import codecs
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+
+from ..db import get_db, stream_rows
+from . import service
+from .schemas import MealCreate
+
+# Meals per insert request.
+CHUNK_SIZE = 100
+MAX_ROWS = 5000
+MAX_BYTES = 5 * 1024 * 1024
+# CSV columns, in export order; tags and allergens are ';'-separated.
+FIELDS = ("name", "tags", "base_price", "quantity", "surplus_price", "allergens", "calories", "image_link")
+LIST_FIELDS = ("tags", "allergens")
+FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
+
+
+def import_format(content_type: Optional[str], requested: Optional[str] = None) -> str:
+    if requested:
+        if requested not in FORMATS:
+            raise HTTPException(status_code=400, detail=f"format must be one of: {','.join(FORMATS)}")
+        return requested
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in ("text/csv", "application/csv"):
+        return "csv"
+    if content_type in ("application/x-ndjson", "application/jsonl", "application/json-lines", "application/x-jsonlines"):
+        return "jsonl"
+    raise HTTPException(status_code=415, detail="send text/csv or application/x-ndjson, or pass format")
+
+
+async def body_lines(chunks: AsyncIterator[bytes], max_bytes: int = MAX_BYTES) -> AsyncIterator[str]:
+    """Lines of a UTF-8 request body as it arrives, without line endings."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending, size = "", 0
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail=f"import is limited to {max_bytes} bytes")
+        try:
+            pending += decoder.decode(chunk)
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="body must be UTF-8")
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+def _labels(value: Any) -> Optional[List[str]]:
+    if value is None or isinstance(value, list):
+        return value
+    labels = [l.strip() for l in str(value).replace(";", ",").split(",") if l.strip()]
+    return labels or None
+
+
+def _errors(e: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(p) for p in err['loc']) or 'row'}: {err['msg']}" for err in e.errors()]
+
+
+def validate(data: Any) -> Tuple[Optional[MealCreate], List[str]]:
+    if not isinstance(data, dict):
+        return None, ["row: expected an object"]
+    unknown = sorted(set(data) - set(FIELDS))
+    if unknown:
+        return None, [f"{k}: unknown field" for k in unknown]
+    data = {k: (None if v == "" else v) for k, v in data.items()}
+    for field in LIST_FIELDS:
+        data[field] = _labels(data.get(field))
+    data = {k: v for k, v in data.items() if v is not None}
+    try:
+        return MealCreate(**data), []
+    except ValidationError as e:
+        return None, _errors(e)
+
+
+async def records(lines: AsyncIterator[str], fmt: str) -> AsyncIterator[Tuple[int, Any]]:
+    """(row number, raw record) pairs; rows count from 1 after any header."""
+    row = 0
+    if fmt == "jsonl":
+        async for line in lines:
+            if not line.strip():
+                continue
+            row += 1
+            try:
+                yield row, json.loads(line)
+            except ValueError as e:
+                yield row, e
+        return
+
+    header: Optional[List[str]] = None
+    record = ""
+    async for line in lines:
+        # a quoted field may span lines: wait until quotes balance
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            continue
+        text, record = record, ""
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [h.strip().lower() for h in values]
+            if "name" not in header or "base_price" not in header:
+                raise HTTPException(status_code=400, detail="CSV header must include name and base_price")
+            unknown = sorted(set(header) - set(FIELDS))
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"unknown CSV columns: {','.join(unknown)}")
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, ValueError(f"expected {len(header)} columns, got {len(values)}")
+        else:
+            yield row, dict(zip(header, values))
+    if record:
+        yield row + 1, ValueError("unterminated quoted field")
+
+
+async def import_meals(
+    restaurant_id: str, lines: AsyncIterator[str], fmt: str, dry_run: bool = False
+) -> Dict[str, Any]:
+    """Validate every row, inserting valid ones CHUNK_SIZE at a time as
+    they arrive. Invalid rows are reported and skipped; they never stop
+    the rest of the import."""
+    created, valid, rows = 0, 0, 0
+    errors: List[Dict[str, Any]] = []
+    batch: List[Tuple[int, MealCreate]] = []
+
+    async def flush():
+        nonlocal created
+        if dry_run or not batch:
+            batch.clear()
+            return
+        try:
+            # the Supabase client is synchronous; keep it off the event loop
+            created += len(await run_in_threadpool(service.create_meals, restaurant_id, [m for _, m in batch]))
+        except Exception as e:
+            print(f"Bulk meal insert failed for restaurant {restaurant_id}: {e}")
+            errors.extend({"row": row, "errors": ["insert failed"]} for row, _ in batch)
+        batch.clear()
+
+    async for row, data in records(lines, fmt):
+        rows = row
+        if row > MAX_ROWS:
+            raise HTTPException(status_code=413, detail=f"import is limited to {MAX_ROWS} rows; {created} were created")
+        if isinstance(data, Exception):
+            errors.append({"row": row, "errors": [f"row: {data}"]})
+            continue
+        meal, problems = validate(data)
+        if problems:
+            errors.append({"row": row, "errors": problems})
+            continue
+        valid += 1
+        batch.append((row, meal))
+        if len(batch) >= CHUNK_SIZE:
+            await flush()
+    await flush()
+    errors.sort(key=lambda e: e["row"])
+    return {"rows": rows, "valid": valid, "created": created, "dry_run": dry_run, "errors": errors}
+
+
+def _csv_line(values: List[Any]) -> str:
+    out = io.StringIO()
+    csv.writer(out, lineterminator="\n").writerow(values)
+    return out.getvalue()
+
+
+def _cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    return ";".join(map(str, value)) if isinstance(value, list) else value
+
+
+def export_meals(restaurant_id: str, fmt: str) -> Iterator[str]:
+    """The restaurant's menu in import format, read and written a page at a time."""
+    supabase = get_db()
+    meals = stream_rows(
+        lambda: supabase.table("meals").select("id," + ",".join(FIELDS)).eq("restaurant_id", restaurant_id)
+    )
+    if fmt == "csv":
+        yield _csv_line(list(FIELDS))
+    for meal in meals:
+        if fmt == "csv":
+            yield _csv_line([_cell(meal.get(f)) for f in FIELDS])
+        else:
+            yield json.dumps({f: meal.get(f) for f in FIELDS}) + "\n"
@@ -1,26 +1,75 @@
-from fastapi import APIRouter, Depends
-from .schemas import MealCreate, MealUpdate, MealResponse
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from .schemas import MealCreate, MealUpdate, MealResponse, SurplusPostResponse, SurplusUpdate
 from .auth import require_owner
-from . import service
-from typing import List
+from . import bulk, service
+from ..services.menu_versions import menu_versions, not_modified
+from typing import Dict, List, Optional
+from uuid import UUID
 
 router = APIRouter()
 
+MAX_SURPLUS_UPDATES = 500
+
 @router.post("", response_model=MealResponse, status_code=201)
 async def add_meal(
     meal: MealCreate,
     user: dict = Depends(require_owner)
 ):
-    restaurant_id = service.get_restaurant_by_owner(user["id"])
+    restaurant_id = service.owned_restaurant(user)
     return service.create_meal(restaurant_id, meal)
 
+@router.post("/bulk")
+async def import_meals(
+    request: Request,
+    format: Optional[str] = Query(default=None, description="csv or jsonl; defaults to the Content-Type"),
+    dry_run: bool = Query(default=False, description="Validate only, create nothing"),
+    user: dict = Depends(require_owner),
+):
+    """Create many meals from a CSV (with a header row) or JSON-lines body.
+
+    Rows are validated as they arrive and valid ones inserted in batches;
+    each invalid row is reported by number and skipped.
+    """
+    fmt = bulk.import_format(request.headers.get("content-type"), format)
+    restaurant_id = service.owned_restaurant(user)
+    return await bulk.import_meals(restaurant_id, bulk.body_lines(request.stream()), fmt, dry_run)
+
+@router.get("/export")
+async def export_meals(
+    format: str = Query(default="csv", description="csv or jsonl"),
+    user: dict = Depends(require_owner),
+):
+    """The whole menu in the format POST /owner/meals/bulk accepts."""
+    fmt = bulk.import_format(None, format)
+    restaurant_id = service.owned_restaurant(user)
+    return StreamingResponse(
+        bulk.export_meals(restaurant_id, fmt),
+        media_type=bulk.FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="menu.{fmt}"'},
+    )
+
+@router.patch("/surplus", response_model=SurplusPostResponse)
+async def post_surplus(
+    updates: Dict[UUID, SurplusUpdate] = Body(..., description="meal id -> new quantity and/or surplus_price"),
+    user: dict = Depends(require_owner),
+):
+    """End-of-day surplus for many meals at once. `unchanged` lists the ids
+    that were not updated: not this restaurant's, or already at those values."""
+    if len(updates) > MAX_SURPLUS_UPDATES:
+        raise HTTPException(status_code=413, detail=f"at most {MAX_SURPLUS_UPDATES} meals per request")
+    restaurant_id = service.owned_restaurant(user)
+    updated = service.post_surplus(restaurant_id, {str(k): v for k, v in updates.items()})
+    changed = {m["id"] for m in updated}
+    return {"updated": updated, "unchanged": [str(k) for k in updates if str(k) not in changed]}
+
 @router.put("/{meal_id}", response_model=MealResponse)
 async def modify_meal(
     meal_id: str,
     meal: MealUpdate,
     user: dict = Depends(require_owner)
 ):
-    restaurant_id = service.get_restaurant_by_owner(user["id"])
+    restaurant_id = service.owned_restaurant(user)
     return service.update_meal(meal_id, restaurant_id, meal)
 
 @router.delete("/{meal_id}", status_code=204)
@@ -28,12 +77,17 @@ async def remove_meal(
     meal_id: str,
     user: dict = Depends(require_owner)
 ):
-    restaurant_id = service.get_restaurant_by_owner(user["id"])
+    restaurant_id = service.owned_restaurant(user)
     service.delete_meal(meal_id, restaurant_id)
 
 @router.get("", response_model=List[MealResponse])
 async def list_my_meals(
-    user: dict = Depends(require_owner)
+    request: Request,
+    response: Response,
+    user: dict = Depends(require_owner),
 ):
-    restaurant_id = service.get_restaurant_by_owner(user["id"])
+    restaurant_id = service.owned_restaurant(user)
+    cached = not_modified(request, response, menu_versions.restaurant(restaurant_id))
+    if cached is not None:
+        return cached
     return service.get_restaurant_meals(restaurant_id)
@@ -32,3 +32,11 @@ class MealResponse(BaseModel):
     allergens: Optional[List[str]]
     calories: Optional[int]
     image_link: Optional[str]
+
+class SurplusUpdate(BaseModel):
+    quantity: Optional[int] = Field(None, ge=0)
+    surplus_price: Optional[float] = Field(None, ge=0)
+
+class SurplusPostResponse(BaseModel):
+    updated: List[MealResponse]
+    unchanged: List[str]
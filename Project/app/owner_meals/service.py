@@ -1,6 +1,8 @@
+from typing import Dict, List
 from fastapi import HTTPException
 from ..db import get_db
-from .schemas import MealCreate, MealUpdate
+from ..services.menu_caches import safe_menu_changed, safe_menu_removed
+from .schemas import MealCreate, MealUpdate, SurplusUpdate
 
 def get_restaurant_by_owner(user_id: str) -> str:
     db = get_db()
@@ -9,6 +11,10 @@ def get_restaurant_by_owner(user_id: str) -> str:
         raise HTTPException(status_code=404, detail="No restaurant found for this owner")
     return str(result.data[0]["id"])
 
+def owned_restaurant(user: dict) -> str:
+    """The owner's restaurant, as resolved by require_owner when it could."""
+    return user.get("restaurant_id") or get_restaurant_by_owner(user["id"])
+
 def create_meal(restaurant_id: str, meal: MealCreate):
     db = get_db()
     result = db.table("meals").insert({
@@ -22,17 +28,33 @@ def create_meal(restaurant_id: str, meal: MealCreate):
         "calories": meal.calories,
         "image_link": meal.image_link
     }).execute()
-    data = result.data[0]
-    data["id"] = str(data["id"])
-    data["restaurant_id"] = str(data["restaurant_id"])
-    return data
+    return safe_menu_changed(restaurant_id, result.data[:1])[0]
 
-def update_meal(meal_id: str, restaurant_id: str, meal: MealUpdate):
+def create_meals(restaurant_id: str, meals: List[MealCreate]) -> List[dict]:
+    """Insert several meals with one request; same effects as create_meal for each."""
+    if not meals:
+        return []
     db = get_db()
-    check = db.table("meals").select("id").eq("id", meal_id).eq("restaurant_id", restaurant_id).execute()
-    if not check.data:
-        raise HTTPException(status_code=404, detail="Meal not found or not owned by your restaurant")
-    
+    result = db.table("meals").insert([
+        {**meal.model_dump(), "restaurant_id": str(restaurant_id)} for meal in meals
+    ]).execute()
+    return safe_menu_changed(restaurant_id, result.data)
+
+def post_surplus(restaurant_id: str, updates: Dict[str, SurplusUpdate]) -> List[dict]:
+    """Set end-of-day stock and surplus prices for many of the restaurant's
+    meals in one statement. Returns the meals that changed; ids that are not
+    this restaurant's are ignored."""
+    payload = {
+        meal_id: update.model_dump(exclude_none=True) for meal_id, update in updates.items()
+    }
+    payload = {meal_id: fields for meal_id, fields in payload.items() if fields}
+    if not payload:
+        return []
+    db = get_db()
+    result = db.rpc("post_surplus", {"p_restaurant_id": str(restaurant_id), "p_updates": payload}).execute()
+    return safe_menu_changed(restaurant_id, result.data or [])
+
+def update_meal(meal_id: str, restaurant_id: str, meal: MealUpdate):
     updates = {}
     if meal.name is not None:
         updates["name"] = meal.name
@@ -54,19 +76,19 @@ def update_meal(meal_id: str, restaurant_id: str, meal: MealUpdate):
     if not updates:
         raise HTTPException(status_code=400, detail="No fields to update")
     
-    result = db.table("meals").update(updates).eq("id", meal_id).execute()
-    data = result.data[0]
-    data["id"] = str(data["id"])
-    data["restaurant_id"] = str(data["restaurant_id"])
-    return data
+    # one statement: the restaurant filter is the ownership check
+    db = get_db()
+    result = db.table("meals").update(updates).eq("id", meal_id).eq("restaurant_id", restaurant_id).execute()
+    if not result.data:
+        raise HTTPException(status_code=404, detail="Meal not found or not owned by your restaurant")
+    return safe_menu_changed(restaurant_id, result.data[:1])[0]
 
 def delete_meal(meal_id: str, restaurant_id: str):
     db = get_db()
-    check = db.table("meals").select("id").eq("id", meal_id).eq("restaurant_id", restaurant_id).execute()
-    if not check.data:
+    result = db.table("meals").delete().eq("id", meal_id).eq("restaurant_id", restaurant_id).execute()
+    if not result.data:
         raise HTTPException(status_code=404, detail="Meal not found or not owned by your restaurant")
-    
-    db.table("meals").delete().eq("id", meal_id).execute()
+    safe_menu_removed(restaurant_id, [meal_id])
 
 def get_restaurant_meals(restaurant_id: str):
     db = get_db()
@@ -7,6 +7,10 @@ from typing import Optional
 from ..config import settings
 from ..db import get_db
 from ..auth import current_user
+from ..services.catalog_autocomplete import catalog_autocomplete
+from ..services.catalog_snapshot import catalog_snapshot
+from ..services.delivery_zones import delivery_zones
+from ..services.restaurant_locations import restaurant_locations
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -132,6 +136,10 @@ async def owner_signup(payload: OwnerSignupRequest):
         if not restaurant_response.data:
             raise HTTPException(status_code=500, detail="failed to create restaurant record")
         restaurant_id = restaurant_response.data[0]["id"]
+        restaurant_locations.upsert(restaurant_id, payload.latitude, payload.longitude)
+        delivery_zones.upsert({"id": restaurant_id, "latitude": payload.latitude, "longitude": payload.longitude})
+        catalog_autocomplete.restaurant_changed({"id": restaurant_id, "name": payload.restaurant_name})
+        catalog_snapshot.restaurant_changed(restaurant_response.data[0])
         
         supabase.table("restaurant_staff").insert({"restaurant_id": restaurant_id, "user_id": user_id, "role": "owner"}).execute()
         
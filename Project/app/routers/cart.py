@@ -1,10 +1,11 @@
 # app/routers/cart.py
 from fastapi import APIRouter, Depends, HTTPException, Query, Path
 from typing import Dict, Any
-import requests
-import os
 from ..db import get_db
 from ..auth import current_user
+from ..services.delivery_zones import compile_zone, delivery_zones
+from ..services.distance import DistanceProviderError, get_distance_provider
+from ..services.menu_caches import safe_menu_changed
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -28,40 +29,27 @@ def _get_restaurant_location(restaurant_id: str) -> Dict[str, float]:
     return {"latitude": float(response.data[0]["latitude"]), "longitude": float(response.data[0]["longitude"])}
 
 def _get_distance_and_duration(origin_lat: float, origin_lng: float, dest_lat: float, dest_lng: float) -> Dict[str, float]:
-    """Get distance (in miles) and duration (in minutes) between two points using Mapbox Directions API"""
-    mapbox_token = os.getenv("MAPBOX_TOKEN")
-    if not mapbox_token:
-        raise HTTPException(status_code=500, detail="Mapbox token not configured")
-    
-    url = f"https://api.mapbox.com/directions/v5/mapbox/driving/{origin_lng},{origin_lat};{dest_lng},{dest_lat}"
-    params = {
-        "access_token": mapbox_token,
-        "geometries": "geojson"
-    }
-    
+    """Get distance (in miles) and duration (in minutes) between two points from the distance provider"""
+    provider = get_distance_provider()
     try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        if not data.get("routes"):
-            raise HTTPException(status_code=400, detail="No route found between locations")
-        
-        route = data["routes"][0]
-        distance_meters = route["distance"]
-        duration_seconds = route["duration"]
-        
-        # Convert to miles and minutes
-        distance_miles = distance_meters / 1609.34
-        duration_minutes = duration_seconds / 60
-        
-        return {
-            "distance_miles": round(distance_miles, 2),
-            "duration_minutes": round(duration_minutes, 1)
-        }
-    except requests.RequestException as e:
+        leg = provider.route((origin_lat, origin_lng), (dest_lat, dest_lng))
+    except DistanceProviderError as e:
         raise HTTPException(status_code=500, detail=f"Failed to get directions: {str(e)}")
 
+    if leg is None:
+        raise HTTPException(status_code=400, detail="No route found between locations")
+
+    distance_meters, duration_seconds = leg
+
+    # Convert to miles and minutes
+    distance_miles = distance_meters / 1609.34
+    duration_minutes = duration_seconds / 60
+
+    return {
+        "distance_miles": round(distance_miles, 2),
+        "duration_minutes": round(duration_minutes, 1)
+    }
+
 def _get_cart_payload(cart_id: str) -> Dict[str, Any]:
     supabase = get_db()
     response = supabase.table("cart_items").select("*, meals(*)").eq("cart_id", cart_id).execute()
@@ -174,8 +162,22 @@ def checkout_cart(payload: dict, user=Depends(current_user)):
         raise HTTPException(status_code=400, detail="cart contains items from multiple restaurants")
     restaurant_id = list(rest_ids)[0]
     
+    # Reject addresses outside the delivery zone before any routing call
+    try:
+        dest_lat, dest_lng = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="latitude and longitude must be numbers")
+    deliverable = delivery_zones.delivers_to(restaurant_id, dest_lat, dest_lng)
+    if deliverable is False:
+        raise HTTPException(status_code=400, detail="restaurant does not deliver to this address")
+    
     # Get restaurant location
     restaurant_location = _get_restaurant_location(restaurant_id)
+    if deliverable is None:
+        # not in the index yet; fall back to the default radius
+        zone = compile_zone({"id": restaurant_id, **restaurant_location})
+        if zone is not None and not zone.contains(dest_lat, dest_lng):
+            raise HTTPException(status_code=400, detail="restaurant does not deliver to this address")
     
     # Get distance and duration from restaurant to delivery location
     route_info = _get_distance_and_duration(
@@ -230,9 +232,13 @@ def checkout_cart(payload: dict, user=Depends(current_user)):
         }).execute()
         
         if is_surplus:
-            current_meal = supabase.table("meals").select("quantity").eq("id", item["meal_id"]).execute().data[0]
+            current_meal = supabase.table("meals").select("*").eq("id", item["meal_id"]).execute().data[0]
             new_qty = int(current_meal["quantity"]) - int(item["qty"])
             supabase.table("meals").update({"quantity": new_qty}).eq("id", item["meal_id"]).execute()
+            safe_menu_changed(
+                current_meal.get("restaurant_id") or restaurant_id,
+                [{**current_meal, "id": item["meal_id"], "quantity": new_qty}],
+            )
     
     supabase.table("order_status_events").insert({"order_id": order_id, "status": "pending"}).execute()
     supabase.table("cart_items").delete().eq("cart_id", cart_id).execute()
@@ -1,89 +1,254 @@
 # app/routers/catalog.py
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from typing import Optional, List
 from ..db import get_db
+from ..services.catalog_autocomplete import MAX_LIMIT as AUTOCOMPLETE_MAX_LIMIT, catalog_autocomplete
+from ..services.catalog_search import catalog_search
+from ..services.catalog_snapshot import MEAL_FIELDS, catalog_snapshot, serving as snapshot_serving
+from ..services.delivery_zones import delivery_zones
+from ..services.dietary_index import dietary_index, parse_labels
+from ..services.keyset import decode_cursor, encode_cursor, page_of, seek_page
+from ..services.meal_facets import SORTS as MEAL_SORTS, meal_facets
+from ..services.menu_versions import menu_versions, not_modified
+from ..services.restaurant_locations import restaurant_locations
 
 router = APIRouter()
 
 @router.get("/restaurants")
 def list_restaurants(
+    response: Response,
     search: Optional[str] = Query(default=None, description="Search substring for restaurant name"),
-    limit: int = Query(default=20, le=100),
-    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0, description="Deprecated; pass cursor instead"),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor from the previous page"),
     sort: str = Query(default="name_asc", description="one of: name_asc,name_desc"),
+    lat: Optional[float] = Query(default=None, ge=-90, le=90, description="Only restaurants that deliver to this point"),
+    lng: Optional[float] = Query(default=None, ge=-180, le=180),
 ):
-    supabase = get_db()
-    query = supabase.table("restaurants").select("id,name,address,latitude,longitude")
+    """Restaurants by name, one keyset page at a time; the next page's
+    cursor is in the X-Next-Cursor header."""
+    after = decode_cursor(cursor) if cursor else None
     
-    if search:
-        query = query.ilike("name", f"%{search}%")
+    # Deliverability comes from the in-memory zone index; an empty index
+    # (cold start or failed load) lists everything rather than nothing.
+    deliverable = None
+    if lat is not None and lng is not None:
+        deliverable = delivery_zones.deliverable(lat, lng)
+        if not len(delivery_zones):
+            deliverable = None
+        elif not deliverable:
+            return []
     
     ascending = sort == "name_asc"
-    query = query.order("name", desc=not ascending).range(offset, offset + limit - 1)
+    if snapshot_serving():
+        rows = catalog_snapshot.list_restaurants(search, deliverable, not ascending, limit + 1, offset, after)
+        page, next_cursor = page_of(rows, limit, "name")
+    else:
+        supabase = get_db()
+        
+        def build_query():
+            query = supabase.table("restaurants").select("id,name,address,latitude,longitude")
+            if search:
+                query = query.ilike("name", f"%{search}%")
+            if deliverable is not None:
+                query = query.in_("id", deliverable)
+            return query
+        
+        if offset and after is None:
+            rows = build_query().order("name", desc=not ascending).order("id").range(offset, offset + limit).execute().data
+            page, next_cursor = page_of(rows or [], limit, "name")
+        else:
+            page, next_cursor = seek_page(build_query, "name", limit, after, descending=not ascending)
     
-    response = query.execute()
-    return response.data
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return page
+
+
+@router.get("/restaurants/nearby")
+def list_nearby_restaurants(
+    response: Response,
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius: float = Query(default=10.0, gt=0, le=50, description="Search radius in miles"),
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor from the previous page"),
+):
+    """Restaurants within the radius, nearest first, one keyset page at a
+    time; the next page's cursor is in the X-Next-Cursor header.
+
+    Distances come from the in-memory location index; only the restaurants
+    on the returned page are read from the database.
+    """
+    # (distance, id) is a total order, so pages never overlap or skip ties
+    hits = sorted(
+        (round(miles, 6), str(rid)) for miles, rid in restaurant_locations.within(lat, lng, radius)
+    )
+    if cursor:
+        distance, restaurant_id = decode_cursor(cursor)
+        try:
+            after = (float(distance), str(restaurant_id))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="invalid cursor")
+        hits = [h for h in hits if h > after]
+
+    page = hits[:limit]
+    next_cursor = encode_cursor(*page[-1]) if len(hits) > limit else None
+    if not page:
+        return []
+
+    supabase = get_db()
+    result = supabase.table("restaurants").select("id,name,address,latitude,longitude").in_(
+        "id", [rid for _, rid in page]
+    ).execute()
+    rows = {str(r["id"]): r for r in result.data or []}
+
+    items = []
+    for miles, rid in page:
+        row = rows.get(rid)
+        # deleted since the index last loaded
+        if row is None:
+            continue
+        items.append({**row, "distance_miles": round(miles, 3)})
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+
+@router.get("/search")
+def search_catalog(
+    q: str = Query(..., min_length=1, max_length=200, description="Search text; typos are tolerated"),
+    limit: int = Query(default=20, ge=1, le=100),
+    kind: Optional[str] = Query(default=None, alias="type", pattern="^(restaurant|meal)$"),
+):
+    """Restaurants and meals matching the query by name or tag, best match first"""
+    return catalog_search.search(q, limit, kind)
+
+
+@router.get("/autocomplete")
+def autocomplete_catalog(
+    q: str = Query(..., min_length=1, max_length=100, description="What the user has typed so far"),
+    limit: int = Query(default=8, ge=1, le=AUTOCOMPLETE_MAX_LIMIT),
+):
+    """Restaurant, meal and tag names starting with the typed prefix (at any word), most popular first"""
+    return catalog_autocomplete.complete(q, limit)
+
+
+@router.get("/meals")
+def browse_meals(
+    tags: Optional[str] = Query(default=None, description="Comma-separated tags every meal must have"),
+    exclude_allergens: Optional[str] = Query(default=None, description="Comma-separated allergens to exclude"),
+    min_price: Optional[float] = Query(default=None, ge=0),
+    max_price: Optional[float] = Query(default=None, ge=0),
+    surplus_only: bool = Query(default=False, description="Only show meals with surplus available"),
+    restaurant_ids: Optional[str] = Query(default=None, description="Comma-separated restaurant ids"),
+    lat: Optional[float] = Query(default=None, ge=-90, le=90, description="Only restaurants within radius of this point"),
+    lng: Optional[float] = Query(default=None, ge=-180, le=180),
+    radius: float = Query(default=10.0, gt=0, le=50, description="Search radius in miles"),
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0),
+    sort: str = Query(default="name_asc", description="one of: " + ",".join(MEAL_SORTS)),
+):
+    """Meals across all restaurants matching every filter, with tag and
+    allergen counts over the full result set"""
+    if sort not in MEAL_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(MEAL_SORTS)}")
+    
+    restaurants = None
+    if restaurant_ids:
+        restaurants = {r.strip() for r in restaurant_ids.split(",") if r.strip()}
+    if lat is not None and lng is not None:
+        nearby = {str(rid) for _, rid in restaurant_locations.within(lat, lng, radius)}
+        restaurants = nearby if restaurants is None else restaurants & nearby
+    
+    return meal_facets.browse(
+        tags=parse_labels(tags),
+        exclude_allergens=parse_labels(exclude_allergens),
+        min_price=min_price,
+        max_price=max_price,
+        surplus_only=surplus_only,
+        restaurant_ids=restaurants,
+        sort=sort,
+        limit=limit,
+        offset=offset,
+    )
 
 
 @router.get("/restaurants/{restaurant_id}/meals")
 def list_meals_for_restaurant(
     restaurant_id: str,
+    request: Request,
+    response: Response,
     surplus_only: bool = Query(default=False, description="Only show meals with surplus available"),
     search: Optional[str] = Query(default=None, description="Search substring for meal name"),
     vegetarian: bool = Query(default=False, description="Filter for vegetarian meals"),
     vegan: bool = Query(default=False, description="Filter for vegan meals"),
     gluten_free: bool = Query(default=False, description="Filter for gluten-free meals"),
     exclude_allergens: Optional[str] = Query(default=None, description="Comma-separated allergens to exclude"),
-    limit: int = Query(default=20, le=100),
-    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0, description="Deprecated; pass cursor instead"),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor from the previous page"),
     sort: str = Query(
         default="name_asc",
         description="one of: name_asc,name_desc,price_asc,price_desc"
     ),
 ):
-    supabase = get_db()
-    query = supabase.table("meals").select("*").eq("restaurant_id", restaurant_id)
-    
-    if surplus_only:
-        query = query.gt("quantity", 0)
-    
-    if search:
-        query = query.ilike("name", f"%{search}%")
-    
-    # Apply dietary filters
-    if vegetarian:
-        query = query.contains("tags", ["vegetarian"])
-    
-    if vegan:
-        query = query.contains("tags", ["vegan"])
-    
-    if gluten_free:
-        query = query.contains("tags", ["gluten-free"])
-    
-    # Handle allergen exclusion
-    if exclude_allergens:
-        allergens_to_exclude = [allergen.strip().lower() for allergen in exclude_allergens.split(",")]
-        # This will need to be handled in post-processing since Supabase doesn't have a "not contains" operator
+    """The restaurant's menu, one keyset page at a time; the next page's
+    cursor is in the X-Next-Cursor header."""
+    # unchanged menu: answer from the version stamp alone
+    cached = not_modified(request, response, menu_versions.restaurant(restaurant_id))
+    if cached is not None:
+        return cached
     
     sort_col = "name" if "name" in sort else "surplus_price"
     ascending = "asc" in sort
-    query = query.order(sort_col, desc=not ascending).range(offset, offset + limit - 1)
-    
-    response = query.execute()
-    meals = response.data
+    after = decode_cursor(cursor) if cursor else None
+    if after is not None:
+        offset = 0
     
-    # Post-process to exclude allergens if specified
-    if exclude_allergens:
-        allergens_to_exclude = [allergen.strip().lower() for allergen in exclude_allergens.split(",")]
-        meals = [
-            meal for meal in meals
-            if not any(
-                allergen.lower() in [a.lower() for a in meal.get("allergens", [])]
-                for allergen in allergens_to_exclude
+    # Dietary filters run as bitmask checks before paging, so pages stay
+    # full; see services/dietary_index.py
+    tags = [tag for wanted, tag in ((vegetarian, "vegetarian"), (vegan, "vegan"), (gluten_free, "gluten-free")) if wanted]
+    allergens = parse_labels(exclude_allergens)
+    if snapshot_serving():
+        rows = catalog_snapshot.list_meals(
+            restaurant_id, tags, allergens,
+            surplus_only=surplus_only, search=search,
+            sort_column=sort_col, descending=not ascending,
+            limit=limit + 1, offset=offset, after=after,
+        )
+        page, next_cursor = page_of(rows, limit, sort_col)
+    elif tags or allergens:
+        rows = dietary_index.list_meals(
+            restaurant_id, tags, allergens,
+            surplus_only=surplus_only, search=search,
+            sort_column=sort_col, descending=not ascending,
+            limit=limit + 1, offset=offset, after=after,
+        )
+        page, next_cursor = page_of(rows, limit, sort_col)
+    else:
+        supabase = get_db()
+        
+        def build_query():
+            query = supabase.table("meals").select(",".join(MEAL_FIELDS)).eq("restaurant_id", restaurant_id)
+            if surplus_only:
+                query = query.gt("quantity", 0)
+            if search:
+                query = query.ilike("name", f"%{search}%")
+            return query
+        
+        if offset:
+            rows = build_query().order(sort_col, desc=not ascending).order("id").range(offset, offset + limit).execute().data
+            page, next_cursor = page_of(rows or [], limit, sort_col)
+        else:
+            page, next_cursor = seek_page(
+                build_query, sort_col, limit, after,
+                descending=not ascending, nullable=sort_col == "surplus_price",
             )
-        ]
     
-    return meals
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return page
 
 
 @router.get("/meals/{meal_id}/nutrition")
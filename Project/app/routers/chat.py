@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from pydantic import BaseModel
 from typing import Optional
 import uuid
@@ -14,6 +14,7 @@ from ..services.chat_persistence import (
     update_session_title,
     delete_session,
 )
+from ..services.keyset import decode_cursor
 from ..auth import current_user
 
 router = APIRouter()
@@ -173,17 +174,30 @@ async def get_history_route(session_id: Optional[str] = None, user: dict = Depen
 
 
 @router.get("/sessions")
-async def list_sessions(limit: int = 50, offset: int = 0, user: dict = Depends(current_user)):
+async def list_sessions(
+    response: Response,
+    limit: int = Query(default=50, ge=1),
+    offset: int = Query(default=0, ge=0),
+    user: dict = Depends(current_user),
+    cursor: Optional[str] = None,
+):
     """List chat sessions for the authenticated user.
 
     Returns sessions ordered by created_at desc with a `last_message` preview.
-    Pagination via `limit` and `offset`.
+    The next page's cursor is in the X-Next-Cursor header; `offset` is still
+    accepted but deprecated.
     """
+    after = decode_cursor(cursor) if cursor else None
     try:
-        sessions = get_sessions_for_user(user.get("id"), limit=limit, offset=offset)
-        return {"sessions": sessions}
+        if after is not None:
+            sessions, next_cursor = get_sessions_for_user(user.get("id"), limit=limit, after=after)
+        else:
+            sessions, next_cursor = get_sessions_for_user(user.get("id"), limit=limit, offset=offset)
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return {"sessions": sessions}
 
 
 class CreateSessionRequest(BaseModel):
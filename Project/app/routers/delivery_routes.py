@@ -1,11 +1,22 @@
-import httpx
 from fastapi import APIRouter, HTTPException, status, Depends, Header, Query
+from fastapi.responses import StreamingResponse
 import os
 import asyncio
+import json
 from dotenv import load_dotenv
 from app.models.delivery_models import Location
 from app.db import get_db
 from app.auth import current_user
+from app.services.distance import DistanceProviderError, get_distance_provider
+from app.services.driver_locations import driver_locations
+from app.services.eta_model import predict_eta
+from app.services.geo import haversine_miles, parse_coords
+from app.services.matrix_cache import matrix_cache
+from app.services.ready_board import ready_board, safe_publish_status
+from app.services import ready_board as ready_board_settings
+from app.services.restaurant_locations import restaurant_locations
+from app.services import route_planner
+from app.services.route_planner import StackCandidate, propose_stack
 
 load_dotenv()
 
@@ -13,6 +24,13 @@ router = APIRouter()
 
 MAPBOX_TOKEN = os.getenv("NEXT_PUBLIC_MAPBOX_TOKEN") or os.getenv("MAPBOX_TOKEN")
 MAX_DEST_PER_MATRIX = 24
+DEFAULT_RADIUS_MILES = 30.0
+DEFAULT_READY_LIMIT = 50
+# Upper bound on restaurant ids pushed into the orders query as an IN filter
+MAX_NEARBY_RESTAURANTS = 200
+# Stacking only considers ready orders this close to the driver
+STACK_RADIUS_MILES = 5.0
+STACK_CANDIDATES = 30
 
 if not MAPBOX_TOKEN:
     print("WARNING: MAPBOX_TOKEN not found in environment variables")
@@ -58,76 +76,69 @@ def _prepare_destinations(restaurant_ids, restaurant_coords_by_id):
     return [ri for ri in dests if ri["lat"] is not None and ri["lng"] is not None]
 
 async def _fetch_matrix_for_chunk(src_lng, src_lat, chunk):
-    """Fetch distance matrix for a chunk of destinations."""
-    if not MAPBOX_TOKEN:
-        print("ERROR: MAPBOX_TOKEN is not set")
-        return {}
-    
+    """Fetch (distance, duration) legs for a chunk of destinations.
+
+    Returns one entry per destination, or an empty list if the provider failed.
+    """
     if not chunk:
-        return {}
-    
-    coordinates = [[src_lng, src_lat]] + [[c["lng"], c["lat"]] for c in chunk]
-    coordinates_str = ";".join(f"{lng},{lat}" for lng, lat in coordinates)
-    
-    params = {
-        "access_token": MAPBOX_TOKEN,
-        "sources": "0",
-        "annotations": "distance,duration",
-    }
-
-    url = f"https://api.mapbox.com/directions-matrix/v1/mapbox/driving/{coordinates_str}"
-    
-    try:
-        async with httpx.AsyncClient(timeout=20.0) as client:
-            resp = await client.get(url, params=params)
-            resp.raise_for_status()
-            return resp.json()
-    except httpx.HTTPError as http_err:
-        print(f"HTTP error occurred while fetching matrix: {http_err}")
-        return {}
+        return []
 
+    try:
+        return await get_distance_provider().matrix(
+            (src_lat, src_lng), [(c["lat"], c["lng"]) for c in chunk]
+        )
+    except DistanceProviderError as err:
+        print(f"Error occurred while fetching matrix: {err}")
+        return []
+
+async def _fetch_chunk_cached(src_lng, src_lat, cell, chunk):
+    """Fetch one chunk, sharing the request with identical concurrent ones."""
+    key = (cell, tuple(c["restaurant_id"] for c in chunk))
+    legs = await matrix_cache.coalesce(
+        key, lambda: _fetch_matrix_for_chunk(src_lng, src_lat, chunk)
+    )
+    # Failed requests come back empty; leave them uncached so the next poll retries
+    if not legs:
+        return {c.get("restaurant_id"): (None, None) for c in chunk}
+    parsed = {}
+    for item, leg in zip(chunk, legs):
+        entry = leg if leg is not None else (None, None)
+        parsed[item.get("restaurant_id")] = entry
+        matrix_cache.put(cell, item.get("restaurant_id"), entry)
+    return parsed
 
 async def _compute_distances_and_durations(src_lng, src_lat, dests):
-    """Compute distances and durations to all destinations."""
+    """Compute distances and durations to all destinations.
+
+    Pairs already cached for the driver's cell are answered locally; only
+    the missing restaurants are sent to the distance provider.
+    """
     if not dests:
         return {}, {}
 
-    chunks = [
-        dests[i : i + MAX_DEST_PER_MATRIX]
-        for i in range(0, len(dests), MAX_DEST_PER_MATRIX)
-    ]
-
-    tasks = [_fetch_matrix_for_chunk(src_lng, src_lat, chunk) for chunk in chunks]
-    results = await asyncio.gather(*tasks)
-
+    cell = matrix_cache.cell(src_lat, src_lng)
     distance_by_restaurant = {}
     duration_by_restaurant = {}
+    missing = []
+    for d in dests:
+        entry = matrix_cache.get(cell, d["restaurant_id"])
+        if entry is None:
+            missing.append(d)
+        else:
+            distance_by_restaurant[d["restaurant_id"]], duration_by_restaurant[d["restaurant_id"]] = entry
 
-    for chunk_result, chunk in zip(results, chunks):
-        distances_matrix = chunk_result.get("distances")
-        durations_matrix = chunk_result.get("durations")
+    chunks = [
+        missing[i : i + MAX_DEST_PER_MATRIX]
+        for i in range(0, len(missing), MAX_DEST_PER_MATRIX)
+    ]
 
-        distances_from_source = (
-            distances_matrix[0][1:]
-            if distances_matrix and len(distances_matrix) > 0
-            else [None] * len(chunk)
-        )
-        durations_from_source = (
-            durations_matrix[0][1:]
-            if durations_matrix and len(durations_matrix) > 0
-            else [None] * len(chunk)
-        )
+    tasks = [_fetch_chunk_cached(src_lng, src_lat, cell, chunk) for chunk in chunks]
+    results = await asyncio.gather(*tasks)
 
-        for item, dist_val, dur_val in zip(
-            chunk, distances_from_source, durations_from_source
-        ):
-            rid = item.get("restaurant_id")
-            distance_by_restaurant[rid] = (
-                float(dist_val) if dist_val is not None else None
-            )
-            duration_by_restaurant[rid] = (
-                float(dur_val) if dur_val is not None else None
-            )
+    for parsed in results:
+        for rid, (dist_val, dur_val) in parsed.items():
+            distance_by_restaurant[rid] = dist_val
+            duration_by_restaurant[rid] = dur_val
 
     return distance_by_restaurant, duration_by_restaurant
 
@@ -155,52 +166,247 @@ def _enrich_order_with_distance(order, distance_by_restaurant, duration_by_resta
 
     return o_enriched
 
-@router.get("/deliveries/ready", response_model=list)
-async def fetch_ready_orders(source: Location = Depends(location_from_query)):
-    """Fetch all orders that are ready for delivery"""
-    try:
-        supabase = get_db()
-        result = (
-            supabase.from_("orders")
-            .select(
-                "id, user_id, restaurant_id, restaurants(name, latitude, longitude, address), customer:user_id(name), delivery_address , delivery_fee, tip_amount, latitude, longitude, status, distance_restaurant_delivery, duration_restaurant_delivery"
-            )
-            .eq("status", "ready")
-            .is_("delivery_user_id", None)
-            .execute()
-        )
-        orders = result.data or []
+def _rank_by_straight_line(orders, src_lat, src_lng, radius_miles, limit):
+    """Drop orders beyond the radius and keep the `limit` nearest.
 
-        if not orders:
+    Restaurant coordinates come from the location index, falling back to the
+    joined row. Orders whose restaurant has no usable coordinates cannot be
+    ranked and are kept after the ranked ones.
+    """
+    ranked, unlocated = [], []
+    for o in orders:
+        rid = o.get("restaurant_id")
+        coords = restaurant_locations.get(rid)
+        if coords is None:
+            rest_info = o.get("restaurants") or {}
+            coords = parse_coords(rest_info.get("latitude"), rest_info.get("longitude"))
+        if coords is None:
+            unlocated.append(o)
+            continue
+        miles = haversine_miles(src_lat, src_lng, coords[0], coords[1])
+        if miles <= radius_miles:
+            ranked.append((miles, o))
+    ranked.sort(key=lambda pair: pair[0])
+    kept = []
+    for miles, o in ranked:
+        o = dict(o)
+        o["straight_line_distance_miles"] = round(miles, 3)
+        kept.append(o)
+    return (kept + unlocated)[:limit]
+
+READY_ORDER_COLUMNS = "id, user_id, restaurant_id, restaurants(name, latitude, longitude, address), customer:user_id(name), delivery_address , delivery_fee, tip_amount, latitude, longitude, status, distance_restaurant_delivery, duration_restaurant_delivery"
+
+def _nearby_ready_orders(supabase, src_lat, src_lng, radius_miles, limit):
+    """Ready, unassigned orders within the radius, nearest restaurant first."""
+    query = (
+        supabase.from_("orders")
+        .select(READY_ORDER_COLUMNS)
+        .eq("status", "ready")
+        .is_("delivery_user_id", None)
+    )
+
+    # Narrow the scan to restaurants inside the radius. An empty index
+    # (cold start or failed load) falls back to the city-wide query.
+    nearby = restaurant_locations.within(src_lat, src_lng, radius_miles, MAX_NEARBY_RESTAURANTS)
+    if len(restaurant_locations):
+        if not nearby:
             return []
-
-        # Extract restaurant coordinates
-        restaurant_ids, restaurant_coords_by_id = _extract_restaurant_coords(orders)
-
-        # Prepare destinations
-        dests = _prepare_destinations(restaurant_ids, restaurant_coords_by_id)
-        src_lng, src_lat = float(source.longitude), float(source.latitude)
-
-        # Compute distances and durations
-        distance_by_restaurant, duration_by_restaurant = (
-            await _compute_distances_and_durations(src_lng, src_lat, dests)
+        query = query.in_("restaurant_id", [rid for _, rid in nearby])
+
+    result = query.execute()
+    orders = result.data or []
+    if not orders:
+        return []
+    return _rank_by_straight_line(orders, src_lat, src_lng, radius_miles, limit)
+
+async def _with_road_distances(orders, src_lat, src_lng):
+    """Attach road distance and duration from the driver to each restaurant."""
+    if not orders:
+        return []
+
+    # Extract restaurant coordinates
+    restaurant_ids, restaurant_coords_by_id = _extract_restaurant_coords(orders)
+
+    # Prepare destinations; only the nearest candidates reach the distance provider
+    dests = _prepare_destinations(restaurant_ids, restaurant_coords_by_id)
+
+    # Compute distances and durations
+    distance_by_restaurant, duration_by_restaurant = (
+        await _compute_distances_and_durations(src_lng, src_lat, dests)
+    )
+
+    # Attach distances and durations to orders
+    enriched_orders = [
+        _enrich_order_with_distance(
+            o, distance_by_restaurant, duration_by_restaurant
         )
+        for o in orders
+    ]
+    # Pickup-to-door estimate from the trained model, no extra provider call
+    for o in enriched_orders:
+        o["eta"] = predict_eta(o)
+    return enriched_orders
 
-        # Attach distances and durations to orders
-        enriched_orders = [
-            _enrich_order_with_distance(
-                o, distance_by_restaurant, duration_by_restaurant
-            )
-            for o in orders
-        ]
+@router.get("/deliveries/ready", response_model=list)
+async def fetch_ready_orders(
+    source: Location = Depends(location_from_query),
+    radius_miles: float = Query(DEFAULT_RADIUS_MILES, gt=0, le=100),
+    limit: int = Query(DEFAULT_READY_LIMIT, ge=1, le=200),
+):
+    """Fetch ready orders near the driver, nearest first"""
+    try:
+        supabase = get_db()
+        src_lng, src_lat = float(source.longitude), float(source.latitude)
 
-        return enriched_orders
-        # return orders
+        orders = _nearby_ready_orders(supabase, src_lat, src_lng, radius_miles, limit)
+        return await _with_road_distances(orders, src_lat, src_lng)
 
     except Exception as e:
         print(f"Error fetching ready orders: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch ready orders")
 
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def _fetch_ready_order(supabase, order_id):
+    result = (
+        supabase.from_("orders")
+        .select(READY_ORDER_COLUMNS)
+        .eq("id", order_id)
+        .eq("status", "ready")
+        .is_("delivery_user_id", None)
+        .execute()
+    )
+    return result.data[0] if result.data else None
+
+async def _ready_board_events(supabase, user_id, src_lat, src_lng, radius_miles, limit, sub):
+    """Server-sent events for one driver's ready board.
+
+    Starts with a full `snapshot`, then relays `added` and `removed` events
+    for orders inside the radius. The database and the distance provider
+    are only consulted again for a newly readied order, or for a fresh
+    snapshot once the driver's heartbeat position has moved more than
+    REFRESH_MILES (or the driver fell behind on events).
+    """
+    try:
+        origin = (src_lat, src_lng)
+        held = set()
+        refresh = True
+        while True:
+            if refresh:
+                refresh = False
+                while not sub.queue.empty():
+                    sub.queue.get_nowait()
+                sub.overflowed = False
+                # the Supabase client is synchronous; keep it off the event loop
+                orders = await asyncio.to_thread(
+                    _nearby_ready_orders, supabase, origin[0], origin[1], radius_miles, limit
+                )
+                board = await _with_road_distances(orders, origin[0], origin[1])
+                held = {o.get("id") for o in board}
+                yield _sse("snapshot", board)
+
+            event = await sub.next(ready_board_settings.KEEPALIVE_SECONDS)
+
+            position = driver_locations.get(user_id)
+            if position is not None and haversine_miles(
+                origin[0], origin[1], position.latitude, position.longitude
+            ) >= ready_board_settings.REFRESH_MILES:
+                origin = (position.latitude, position.longitude)
+                refresh = True
+            if sub.overflowed:
+                refresh = True
+            if refresh:
+                continue
+
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+
+            if event.kind == "removed":
+                if event.order_id in held:
+                    held.discard(event.order_id)
+                    yield _sse("removed", {"id": event.order_id})
+                continue
+
+            # Skip the lookup for restaurants the index already places outside the radius
+            coords = restaurant_locations.get(event.restaurant_id) if event.restaurant_id is not None else None
+            if coords is not None and haversine_miles(origin[0], origin[1], coords[0], coords[1]) > radius_miles:
+                continue
+            order_id = event.order_id
+            row = await asyncio.to_thread(
+                ready_board.order_row, order_id, lambda: _fetch_ready_order(supabase, order_id)
+            )
+            ranked = _rank_by_straight_line([row], origin[0], origin[1], radius_miles, 1) if row else []
+            if not ranked:
+                continue
+            enriched = await _with_road_distances(ranked, origin[0], origin[1])
+            held.add(event.order_id)
+            yield _sse("added", enriched[0])
+    except Exception as e:
+        print(f"Error streaming ready orders: {e}")
+        yield _sse("error", {"detail": "Failed to stream ready orders"})
+    finally:
+        ready_board.unsubscribe(sub)
+
+@router.get("/deliveries/ready/stream")
+async def stream_ready_orders(
+    source: Location = Depends(location_from_query),
+    radius_miles: float = Query(DEFAULT_RADIUS_MILES, gt=0, le=100),
+    limit: int = Query(DEFAULT_READY_LIMIT, ge=1, le=200),
+    user = Depends(current_user),
+):
+    """Push ready orders near the driver as server-sent events instead of polling"""
+    supabase = get_db()
+    # Subscribe before the snapshot query so nothing published in between is lost
+    sub = ready_board.subscribe()
+    events = _ready_board_events(
+        supabase, user["id"], float(source.latitude), float(source.longitude), radius_miles, limit, sub
+    )
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/deliveries/stack")
+async def propose_stacked_delivery(
+    source: Location = Depends(location_from_query),
+    user = Depends(current_user),
+):
+    """Suggest ready orders to carry together and the order to visit stops in"""
+    try:
+        supabase = get_db()
+        cap = route_planner.MAX_STACKED_ORDERS
+        active_orders = supabase.table("orders").select("id").eq("delivery_user_id", user["id"]).in_("status", ["assigned", "out-for-delivery"]).execute()
+        slots = cap - len(active_orders.data or [])
+        empty = {"order_ids": [], "stops": [], "miles": 0, "max_stacked_orders": cap}
+        if slots < 1:
+            return empty
+
+        src_lat, src_lng = float(source.latitude), float(source.longitude)
+        orders = _nearby_ready_orders(supabase, src_lat, src_lng, STACK_RADIUS_MILES, STACK_CANDIDATES)
+        candidates = []
+        for o in orders:
+            rest_info = o.get("restaurants") or {}
+            pickup = parse_coords(rest_info.get("latitude"), rest_info.get("longitude"))
+            dropoff = parse_coords(o.get("latitude"), o.get("longitude"))
+            if pickup and dropoff:
+                candidates.append(StackCandidate(o["id"], pickup, dropoff))
+
+        plan = propose_stack((src_lat, src_lng), candidates, cap=slots)
+        if plan is None:
+            return empty
+        return {
+            "order_ids": plan.order_ids,
+            "stops": [{"type": kind, "order_id": oid} for kind, oid in plan.stops],
+            "miles": plan.miles,
+            "max_stacked_orders": cap,
+        }
+    except Exception as e:
+        print(f"Error proposing stacked delivery: {e}")
+        raise HTTPException(status_code=500, detail="Failed to propose stacked delivery")
+
 @router.get("/deliveries/active", response_model=list)
 async def fetch_active_orders(user = Depends(current_user)):
     """Fetch active delivery orders for the current driver"""
@@ -227,10 +433,13 @@ async def accept_delivery_order(order_id: str, user = Depends(current_user)):
         import random
         supabase = get_db()
         
-        # Check if driver already has an active order
+        # Check the driver has room for another order (one unless stacking is enabled)
+        cap = route_planner.MAX_STACKED_ORDERS
         active_orders = supabase.table("orders").select("id").eq("delivery_user_id", user["id"]).in_("status", ["assigned", "out-for-delivery"]).execute()
-        if active_orders.data:
-            raise HTTPException(status_code=400, detail="You already have an active delivery order")
+        if len(active_orders.data or []) >= cap:
+            if cap == 1:
+                raise HTTPException(status_code=400, detail="You already have an active delivery order")
+            raise HTTPException(status_code=400, detail=f"You already have {cap} active delivery orders")
         
         order_response = supabase.table("orders").select("*").eq("id", order_id).execute()
         if not order_response.data:
@@ -255,6 +464,7 @@ async def accept_delivery_order(order_id: str, user = Depends(current_user)):
             "order_id": order_id,
             "status": "assigned"
         }).execute()
+        safe_publish_status(order_id, "assigned", order.get("restaurant_id"))
         
         updated = supabase.table("orders").select("*").eq("id", order_id).execute()
         return updated.data[0]
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends
+from app.auth import current_user
+from app.services.dispatch import dispatch_engine
+
+router = APIRouter()
+
+
+@router.get("/offer")
+async def get_dispatch_offer(user=Depends(current_user)):
+    """The order the dispatch engine currently suggests for this driver.
+
+    Accepting still goes through PATCH /deliveries/{order_id}/accept.
+    """
+    offer = dispatch_engine.offer_for(user["id"])
+    if offer is None:
+        return {"offer": None}
+    return {
+        "offer": {
+            "order_id": offer.order_id,
+            "restaurant_id": offer.restaurant_id,
+            "pickup_miles": offer.pickup_miles,
+        }
+    }
@@ -1,24 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException
-from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import date, datetime, timedelta, timezone
+from typing import Annotated, Optional
 from ..db import get_db
 from ..auth import current_user
+from ..services.analytics_window import resolve_window, window_bounds
+from ..services.driver_earnings import EarningsBucketer, stream_daily_rows
 
 router = APIRouter()
 
 
 @router.get("/analytics")
-def get_driver_analytics(user=Depends(current_user)):
-    supabase = get_db()
+def get_driver_analytics(
+    user=Depends(current_user),
+    date_from: Annotated[Optional[date], Query(alias="from", description="first day (inclusive), YYYY-MM-DD")] = None,
+    date_to: Annotated[Optional[date], Query(alias="to", description="last day (inclusive), YYYY-MM-DD")] = None,
+    granularity: Annotated[str, Query(description="one of: day,week,month")] = "day",
+):
+    date_from, date_to, granularity = resolve_window(date_from, date_to, granularity)
+    windowed = date_from is not None or date_to is not None
 
-    # Get all delivered orders for this driver
-    orders_response = supabase.table("orders").select(
-        "id, restaurant_id, delivery_fee, tip_amount, created_at, "
-        "restaurants(name), customer:user_id(name)"
-    ).eq("delivery_user_id", user["id"]).eq("status", "delivered").execute()
+    # Without a window, stats cover all time and the chart shows the last 7 days
+    today = datetime.now(timezone.utc).date()
+    if windowed:
+        chart_from = date_from
+        chart_to = date_to or today
+    else:
+        chart_from, chart_to = today - timedelta(days=6), today
 
-    orders = orders_response.data
-    total_deliveries = len(orders)
+    # Totals, top restaurants and the chart come from pre-aggregated
+    # (day, restaurant) rows, folded in a single pass.
+    bucketer = EarningsBucketer(granularity, chart_from, chart_to)
+    for row in stream_daily_rows(user["id"], date_from, date_to):
+        bucketer.add(
+            date.fromisoformat(str(row["day"])[:10]),
+            row["restaurant_id"],
+            (row.get("restaurants") or {}).get("name"),
+            int(row.get("deliveries") or 0),
+            float(row.get("delivery_fees") or 0),
+            float(row.get("tips") or 0),
+        )
 
+    total_deliveries = bucketer.deliveries
     if total_deliveries == 0:
         return {
             "stats": {
@@ -33,33 +55,21 @@ def get_driver_analytics(user=Depends(current_user)):
             "earningsByDay": []
         }
 
-    # Calculate earnings
-    total_delivery_fees = sum(order.get("delivery_fee", 0) or 0 for order in orders)
-    total_tips = sum(order.get("tip_amount", 0) or 0 for order in orders)
-    total_earnings = total_delivery_fees + total_tips
+    total_earnings = bucketer.earnings
     avg_earnings = round(total_earnings / total_deliveries, 2) if total_deliveries > 0 else 0
 
-    # Top restaurants by delivery count
-    restaurant_stats = {}
-    for order in orders:
-        rid = order["restaurant_id"]
-        if rid not in restaurant_stats:
-            restaurant_stats[rid] = {
-                "name": order["restaurants"]["name"],
-                "deliveries": 0,
-                "earnings": 0
-            }
-        restaurant_stats[rid]["deliveries"] += 1
-        restaurant_stats[rid]["earnings"] += (order.get("delivery_fee", 0) or 0) + (order.get("tip_amount", 0) or 0)
-
-    top_restaurants = sorted(
-        [{"id": k, **v, "earnings": round(v["earnings"], 2)} for k, v in restaurant_stats.items()],
-        key=lambda x: x["deliveries"],
-        reverse=True
-    )[:5]
+    # Only the ten most recent raw orders are read, newest first off the index
+    supabase = get_db()
+    start, end = window_bounds(date_from, date_to)
+    recent_query = supabase.table("orders").select(
+        "id, delivery_fee, tip_amount, created_at, restaurants(name), customer:user_id(name)"
+    ).eq("delivery_user_id", user["id"]).eq("status", "delivered")
+    if start:
+        recent_query = recent_query.gte("created_at", start)
+    if end:
+        recent_query = recent_query.lt("created_at", end)
+    recent_response = recent_query.order("created_at", desc=True).limit(10).execute()
 
-    # Recent deliveries
-    recent_deliveries = sorted(orders, key=lambda x: x["created_at"], reverse=True)[:10]
     recent_deliveries_formatted = [
         {
             "id": d["id"],
@@ -68,43 +78,18 @@ def get_driver_analytics(user=Depends(current_user)):
             "earnings": round((d.get("delivery_fee", 0) or 0) + (d.get("tip_amount", 0) or 0), 2),
             "date": d["created_at"]
         }
-        for d in recent_deliveries
+        for d in recent_response.data or []
     ]
 
-    # Earnings by day (last 7 days)
-    today = datetime.now(timezone.utc)
-    earnings_by_day = []
-    for i in range(6, -1, -1):
-        day = today - timedelta(days=i)
-        day_start = day.replace(hour=0, minute=0, second=0, microsecond=0)
-        day_end = day.replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        day_orders = [
-            o for o in orders
-            if day_start <= datetime.fromisoformat(o["created_at"].replace('Z', '+00:00')) <= day_end
-        ]
-        
-        day_earnings = sum(
-            (o.get("delivery_fee", 0) or 0) + (o.get("tip_amount", 0) or 0)
-            for o in day_orders
-        )
-        
-        earnings_by_day.append({
-            "date": day.strftime("%Y-%m-%d"),
-            "day": day.strftime("%a"),
-            "earnings": round(day_earnings, 2),
-            "deliveries": len(day_orders)
-        })
-
     return {
         "stats": {
             "totalEarnings": round(total_earnings, 2),
             "totalDeliveries": total_deliveries,
             "avgEarningsPerDelivery": avg_earnings,
-            "totalTips": round(total_tips, 2),
-            "totalDeliveryFees": round(total_delivery_fees, 2)
+            "totalTips": round(bucketer.tips, 2),
+            "totalDeliveryFees": round(bucketer.delivery_fees, 2)
         },
-        "topRestaurants": top_restaurants,
+        "topRestaurants": bucketer.top_restaurants(5),
         "recentDeliveries": recent_deliveries_formatted,
-        "earningsByDay": earnings_by_day
+        "earningsByDay": bucketer.series()
     }
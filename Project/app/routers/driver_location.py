@@ -0,0 +1,23 @@
+from fastapi import APIRouter, BackgroundTasks, Depends
+from app.models.delivery_models import DriverLocationUpdate
+from app.auth import current_user
+from app.services.driver_locations import driver_locations
+
+router = APIRouter()
+
+
+@router.post("/location")
+async def update_driver_location(
+    payload: DriverLocationUpdate,
+    background_tasks: BackgroundTasks,
+    user=Depends(current_user),
+):
+    """Driver heartbeat: record the driver's current position.
+
+    Only touches process memory; positions are written to the database in
+    batches when snapshotting is enabled.
+    """
+    driver_locations.update(user["id"], payload.latitude, payload.longitude, payload.available)
+    if driver_locations.snapshot_due():
+        background_tasks.add_task(driver_locations.snapshot)
+    return {"status": "ok"}
@@ -3,6 +3,7 @@ from pydantic import BaseModel, Field
 from typing import Optional
 from ..db import get_db
 from ..auth import current_user
+from ..services.analytics_rollups import safe_record_restaurant_rating
 
 router = APIRouter()
 
@@ -32,6 +33,7 @@ def submit_restaurant_feedback(order_id: str, feedback: FeedbackRequest, user=De
         "restaurant_rating": feedback.rating,
         "restaurant_comment": feedback.comment
     }).eq("id", order_id).execute()
+    safe_record_restaurant_rating(order_id)
     
     return {"message": "Restaurant feedback submitted", "rating": feedback.rating}
 
@@ -1,17 +1,39 @@
 # app/routers/meals.py
-from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from ..db import get_db
+from ..services.catalog_snapshot import MEAL_FIELDS, catalog_snapshot, serving as snapshot_serving
+from ..services.menu_versions import menu_versions, not_modified
+from ..services.surplus_feed import surplus_feed
 
 router = APIRouter()
 
 @router.get("")
 def list_meals(
+    request: Request,
+    response: Response,
     surplus_only: bool = Query(default=True),
     limit: int = Query(default=50, le=100),
+    sort: str = Query(default="recent", description="one of: recent,rank"),
+    lat: Optional[float] = Query(default=None, ge=-90, le=90, description="Customer location for sort=rank"),
+    lng: Optional[float] = Query(default=None, ge=-180, le=180),
+    offset: int = Query(default=0, ge=0, description="Only used with sort=rank"),
 ):
+    if sort not in ("recent", "rank"):
+        raise HTTPException(status_code=400, detail="sort must be one of: recent,rank")
+    if sort == "rank":
+        # Scores move with time and order counts as well as menu edits,
+        # so the ranked feed carries no ETag.
+        return surplus_feed.rank(lat, lng, limit, offset)
+    
+    cached = not_modified(request, response, menu_versions.catalog())
+    if cached is not None:
+        return cached
+    if snapshot_serving():
+        return catalog_snapshot.recent_meals(surplus_only, limit)
     try:
         supabase = get_db()
-        query = supabase.table("meals").select("*")
+        query = supabase.table("meals").select(",".join(MEAL_FIELDS))
         
         if surplus_only:
             query = query.gt("quantity", 0)
@@ -1,8 +1,14 @@
 # app/routers/orders.py
-from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import List, Dict, Any, Optional
 from ..db import get_db
 from ..auth import current_user
+from ..services.analytics_rollups import safe_record_order_completion
+from ..services.driver_earnings import safe_record_delivery
+from ..services.eta_model import predict_eta
+from ..services.keyset import decode_cursor, seek_page
+from ..services.menu_caches import safe_menu_changed
+from ..services.ready_board import safe_publish_status
 
 router = APIRouter()
 
@@ -38,6 +44,9 @@ def _transition_order(order_id: str, target: str):
     
     supabase.table("orders").update({"status": target}).eq("id", order_id).execute()
     supabase.table("order_status_events").insert({"order_id": order_id, "status": target}).execute()
+    safe_record_order_completion(order_id, target)
+    if target == "ready" or cur == "ready":
+        safe_publish_status(order_id, target, order.get("restaurant_id"))
     
     updated = supabase.table("orders").select("*").eq("id", order_id).execute()
     return updated.data[0]
@@ -88,16 +97,30 @@ def create_order(payload: Dict[str, Any], user=Depends(current_user)):
         
         new_qty = int(meal["quantity"]) - qty
         supabase.table("meals").update({"quantity": new_qty}).eq("id", meal_id).execute()
+        safe_menu_changed(meal.get("restaurant_id") or restaurant_id, [{**meal, "quantity": new_qty}])
     
     supabase.table("orders").update({"total": total}).eq("id", order_id).execute()
     final = supabase.table("orders").select("*").eq("id", order_id).execute()
     return final.data[0]
 
 @router.get("/mine")
-def list_my_orders(user=Depends(current_user), limit: int = Query(default=50, le=100)):
+def list_my_orders(
+    response: Response,
+    user=Depends(current_user),
+    limit: int = Query(default=50, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor from the previous page"),
+):
+    """Newest orders first; the next page's cursor is in the X-Next-Cursor header."""
     supabase = get_db()
-    response = supabase.table("orders").select("id,restaurant_id,restaurants(name),status,total,created_at,delivery_code").eq("user_id", user["id"]).order("created_at", desc=True).limit(limit).execute()
-    return response.data
+    
+    def build_query():
+        return supabase.table("orders").select("id,restaurant_id,restaurants(name),status,total,created_at,delivery_code").eq("user_id", user["id"])
+    
+    after = decode_cursor(cursor) if cursor else None
+    page, next_cursor = seek_page(build_query, "created_at", limit, after, descending=True)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return page
 
 @router.get("/{order_id}")
 def get_order(order_id: str, user=Depends(current_user)):
@@ -113,7 +136,7 @@ def get_order(order_id: str, user=Depends(current_user)):
     items_response = supabase.table("order_items").select("*, meals(name)").eq("order_id", order_id).execute()
     items = [{"id": item["id"], "meal_id": item["meal_id"], "meal_name": item["meals"]["name"], "qty": item["qty"], "price": item["price"]} for item in items_response.data]
     
-    return {"order": order, "items": items}
+    return {"order": order, "items": items, "eta": predict_eta(order)}
 
 @router.get("/{order_id}/status")
 def get_order_status_timeline(order_id: str, user=Depends(current_user)):
@@ -144,9 +167,13 @@ def cancel_order(order_id: str, user=Depends(current_user)):
     
     items_response = supabase.table("order_items").select("meal_id,qty").eq("order_id", order_id).execute()
     for item in items_response.data:
-        meal = supabase.table("meals").select("quantity").eq("id", item["meal_id"]).execute().data[0]
+        meal = supabase.table("meals").select("*").eq("id", item["meal_id"]).execute().data[0]
         new_qty = int(meal["quantity"]) + int(item["qty"])
         supabase.table("meals").update({"quantity": new_qty}).eq("id", item["meal_id"]).execute()
+        safe_menu_changed(
+            meal.get("restaurant_id") or order.get("restaurant_id"),
+            [{**meal, "id": item["meal_id"], "quantity": new_qty}],
+        )
     
     supabase.table("orders").update({"status": "cancelled"}).eq("id", order_id).execute()
     supabase.table("order_status_events").insert({"order_id": order_id, "status": "cancelled"}).execute()
@@ -200,6 +227,8 @@ def update_order_status(order_id: str, payload: Dict[str, Any], user=Depends(cur
     
     supabase.table("orders").update({"status": status}).eq("id", order_id).execute()
     supabase.table("order_status_events").insert({"order_id": order_id, "status": status}).execute()
+    safe_record_order_completion(order_id, status)
+    safe_record_delivery(order_id, status)
     
     updated = supabase.table("orders").select("*").eq("id", order_id).execute()
     return updated.data[0]
@@ -1,7 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+from typing import Annotated, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 from ..db import get_db
 from ..auth import current_user
+from ..services.analytics_rollups import (
+    get_restaurant_series,
+    get_window_customers,
+    get_window_dishes,
+    get_popular_dishes,
+    safe_record_order_completion,
+    summarize_daily_rows,
+)
+from ..services.analytics_window import (
+    bucket_label,
+    bucket_range,
+    resolve_window,
+    window_bounds,
+)
+from ..services.driver_earnings import safe_record_delivery
+from ..services.ready_board import safe_publish_status
 
 router = APIRouter()
 
@@ -89,11 +107,45 @@ def update_order_status(
         {"order_id": order_id, "status": request.status}
     ).execute()
 
+    safe_record_order_completion(order_id, request.status)
+    safe_record_delivery(order_id, request.status)
+    safe_publish_status(order_id, request.status, order_response.data[0].get("restaurant_id"))
+
     return {"id": order_id, "status": request.status}
 
 
+def _format_series(rows, date_from, date_to, granularity):
+    """Turn SQL bucket rows into a gap-free series for charting."""
+    by_bucket = {date.fromisoformat(str(row["bucket"])[:10]): row for row in rows}
+    if not by_bucket and not (date_from and date_to):
+        return []
+    start = date_from or min(by_bucket)
+    end = date_to or max(by_bucket)
+
+    series = []
+    for bucket in bucket_range(start, end, granularity):
+        row = by_bucket.get(bucket, {})
+        orders = int(row.get("orders") or 0)
+        rating_count = int(row.get("rating_count") or 0)
+        series.append({
+            "date": bucket.isoformat(),
+            "label": bucket_label(bucket, granularity),
+            "orders": orders,
+            "revenue": round(float(row.get("revenue") or 0), 2),
+            "avgRating": round(int(row.get("rating_sum") or 0) / rating_count, 1) if rating_count else 0,
+        })
+    return series
+
+
 @router.get("/analytics")
-def get_restaurant_analytics(user=Depends(current_user)):
+def get_restaurant_analytics(
+    user=Depends(current_user),
+    date_from: Annotated[Optional[date], Query(alias="from", description="first day (inclusive), YYYY-MM-DD")] = None,
+    date_to: Annotated[Optional[date], Query(alias="to", description="last day (inclusive), YYYY-MM-DD")] = None,
+    granularity: Annotated[str, Query(description="one of: day,week,month")] = "day",
+):
+    date_from, date_to, granularity = resolve_window(date_from, date_to, granularity)
+    windowed = date_from is not None or date_to is not None
     supabase = get_db()
 
     staff_response = supabase.table("restaurant_staff").select(
@@ -109,75 +161,32 @@ def get_restaurant_analytics(user=Depends(current_user)):
     restaurant_id = staff_response.data[0]["restaurant_id"]
     restaurant_name = staff_response.data[0]["restaurants"]["name"]
 
-    # Get all orders for the restaurant
-    orders_response = (
-        supabase.table("orders")
-        .select(
-        "id, user_id, total, restaurant_rating, restaurant_comment, created_at, delivery_fee, tip_amount, tax"
-        )
-        .eq("restaurant_id", restaurant_id)
-        .in_("status", ["delivered", "completed"])
-        .execute()
-    )
-
-    orders = orders_response.data
-    total_orders = len(orders)
-    total_revenue = sum(
-        order["total"] - (order.get("delivery_fee", 0) or 0) - (order.get("tip_amount", 0) or 0) - (order.get("tax", 0) or 0)
-        for order in orders
-    )
-    avg_order_value = round(total_revenue / total_orders, 2) if total_orders > 0 else 0
-
-    # Calculate average rating
-    ratings = [order["restaurant_rating"] for order in orders if order.get("restaurant_rating")]
-    avg_rating = round(sum(ratings) / len(ratings), 1) if ratings else 0
-    total_reviews = len(ratings)
-
-    # Calculate repeat customers
-    user_order_counts = {}
-    for order in orders:
-        user_id = order["user_id"]
-        user_order_counts[user_id] = user_order_counts.get(user_id, 0) + 1
-    
-    unique_customers = len(user_order_counts)
-    repeat_customers = sum(1 for count in user_order_counts.values() if count > 1)
-    repeat_customer_ratio = round((repeat_customers / unique_customers * 100), 0) if unique_customers > 0 else 0
-
-    # Get popular dishes
-    order_items_response = (
-        supabase.table("order_items")
-        .select(
-            "meal_id, qty, price, meals(name, image_link), order_id"
+    # Totals and the chart series are bucketed in SQL over the daily rollups
+    series_rows = get_restaurant_series(restaurant_id, date_from, date_to, granularity)
+    summary = summarize_daily_rows(series_rows)
+
+    start, end = window_bounds(date_from, date_to)
+    if windowed:
+        # Rollups only know first-ever orders, so windowed customer and dish
+        # figures are aggregated from the orders inside the window instead.
+        customers = get_window_customers(restaurant_id, start, end)
+        unique = customers["unique_customers"]
+        summary["repeat_customer_ratio"] = (
+            round(customers["repeat_customers"] / unique * 100, 0) if unique > 0 else 0
         )
-        .in_("order_id", [order["id"] for order in orders])
-        .execute()
-    )
-
-    print(order_items_response)
-
-    meal_stats = {}
-    for item in order_items_response.data:
-        meal_id = item["meal_id"]
-        if meal_id not in meal_stats:
-            meal_stats[meal_id] = {
-                "name": item["meals"]["name"],
-                "image": item["meals"].get("image_link", ""),
-                "orders": 0,
-                "revenue": 0
-            }
-        meal_stats[meal_id]["orders"] += 1
-        meal_stats[meal_id]["revenue"] += item["price"]
-
-    popular_dishes = sorted(
-        [{"id": k, **v, "revenue": round(v.get("revenue", 0), 2)} for k, v in meal_stats.items()],
-        key=lambda x: x["orders"],
-        reverse=True
-    )[:5]
+        popular_dishes = get_window_dishes(restaurant_id, start, end, limit=5)
+    else:
+        popular_dishes = get_popular_dishes(restaurant_id, limit=5)
 
     # Get recent reviews
-    recent_reviews_response = supabase.table("orders").select(
+    reviews_query = supabase.table("orders").select(
         "id, restaurant_rating, restaurant_comment, created_at, users:user_id(name)"
-    ).eq("restaurant_id", restaurant_id).not_.is_("restaurant_rating", "null").order(
+    ).eq("restaurant_id", restaurant_id)
+    if start:
+        reviews_query = reviews_query.gte("created_at", start)
+    if end:
+        reviews_query = reviews_query.lt("created_at", end)
+    recent_reviews_response = reviews_query.not_.is_("restaurant_rating", "null").order(
         "created_at", desc=True
     ).limit(10).execute()
 
@@ -195,15 +204,21 @@ def get_restaurant_analytics(user=Depends(current_user)):
     return {
         "restaurant": {
             "name": restaurant_name,
-            "averageRating": avg_rating,
-            "totalReviews": total_reviews,
-            "totalOrders": total_orders
+            "averageRating": summary["avg_rating"],
+            "totalReviews": summary["total_reviews"],
+            "totalOrders": summary["total_orders"]
         },
         "stats": {
-            "totalRevenue": round(total_revenue, 2),
-            "avgOrderValue": avg_order_value,
-            "repeatCustomers": int(repeat_customer_ratio)
+            "totalRevenue": round(summary["total_revenue"], 2),
+            "avgOrderValue": summary["avg_order_value"],
+            "repeatCustomers": int(summary["repeat_customer_ratio"])
+        },
+        "window": {
+            "from": date_from.isoformat() if date_from else None,
+            "to": date_to.isoformat() if date_to else None,
+            "granularity": granularity
         },
+        "series": _format_series(series_rows, date_from, date_to, granularity),
         "popularDishes": popular_dishes,
         "recentReviews": recent_reviews
     }
@@ -0,0 +1,26 @@
+# scripts/backfill_rollups.py
+# Builds the restaurant analytics rollups and driver daily earnings from
+# existing order history.
+#
+#   python -m app.scripts.backfill_rollups                    # everything
+#   python -m app.scripts.backfill_rollups --restaurant-id X  # a single restaurant
+#   python -m app.scripts.backfill_rollups --driver-id Y      # a single driver
+#
+# Safe to re-run: orders that are already rolled up are skipped.
+import argparse
+
+from app.services import analytics_rollups, driver_earnings
+
+parser = argparse.ArgumentParser(description="Backfill analytics rollups")
+parser.add_argument("--restaurant-id", default=None, help="only backfill this restaurant")
+parser.add_argument("--driver-id", default=None, help="only backfill this driver")
+parser.add_argument("--batch-size", type=int, default=1000, help="orders per database call")
+args = parser.parse_args()
+
+if not args.driver_id:
+    processed = analytics_rollups.backfill(restaurant_id=args.restaurant_id, batch_size=args.batch_size)
+    print(f"rolled up {processed} orders into restaurant analytics")
+
+if not args.restaurant_id:
+    processed = driver_earnings.backfill(driver_id=args.driver_id, batch_size=args.batch_size)
+    print(f"rolled up {processed} deliveries into driver earnings")
@@ -0,0 +1,99 @@
+# scripts/mapbox_standin.py
+# Local stand-in for the Mapbox Directions and Matrix APIs, for load tests
+# and offline development. Distances are haversine estimates, so responses
+# are deterministic; any access token is accepted.
+#
+#   python -m app.scripts.mapbox_standin --port 8765 --latency-ms 80
+#
+# then run the API with
+#
+#   MAPBOX_BASE_URL=http://127.0.0.1:8765 MAPBOX_TOKEN=local uvicorn app.main:app
+import argparse
+import asyncio
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException, Query
+
+from app.services.distance import HaversineProvider
+
+
+def _parse_coordinates(coordinates: str) -> List[tuple]:
+    """Mapbox "lng,lat;lng,lat" path segment -> [(lat, lng), ...]."""
+    points = []
+    try:
+        for pair in coordinates.split(";"):
+            lng, lat = pair.split(",")
+            points.append((float(lat), float(lng)))
+    except ValueError:
+        raise HTTPException(status_code=422, detail={"code": "InvalidInput", "message": "bad coordinates"})
+    if len(points) < 2:
+        raise HTTPException(status_code=422, detail={"code": "InvalidInput", "message": "need at least two coordinates"})
+    return points
+
+
+def _parse_indexes(value: Optional[str], n: int) -> List[int]:
+    if value is None or value == "all":
+        return list(range(n))
+    return [int(i) for i in value.split(";")]
+
+
+def make_app(latency_ms: float = 0.0, estimator: Optional[HaversineProvider] = None) -> FastAPI:
+    estimator = estimator or HaversineProvider()
+    app = FastAPI(title="Mapbox stand-in")
+    app.state.requests = {"directions": 0, "matrix": 0}
+
+    async def _delay():
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+
+    @app.get("/directions/v5/mapbox/driving/{coordinates}")
+    async def directions(coordinates: str, access_token: str = Query(...)):
+        app.state.requests["directions"] += 1
+        await _delay()
+        points = _parse_coordinates(coordinates)
+        distance = duration = 0.0
+        for a, b in zip(points, points[1:]):
+            meters, seconds = estimator.estimate(a, b)
+            distance += meters
+            duration += seconds
+        return {
+            "code": "Ok",
+            "routes": [{
+                "distance": round(distance, 1),
+                "duration": round(duration, 1),
+                "geometry": {"type": "LineString", "coordinates": [[lng, lat] for lat, lng in points]},
+            }],
+        }
+
+    @app.get("/directions-matrix/v1/mapbox/driving/{coordinates}")
+    async def matrix(
+        coordinates: str,
+        access_token: str = Query(...),
+        sources: Optional[str] = None,
+        destinations: Optional[str] = None,
+    ):
+        app.state.requests["matrix"] += 1
+        await _delay()
+        points = _parse_coordinates(coordinates)
+        src = _parse_indexes(sources, len(points))
+        dst = _parse_indexes(destinations, len(points))
+        cells = [[estimator.estimate(points[i], points[j]) for j in dst] for i in src]
+        return {
+            "code": "Ok",
+            "distances": [[round(m, 1) for m, _ in row] for row in cells],
+            "durations": [[round(s, 1) for _, s in row] for row in cells],
+        }
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a local Mapbox stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added delay per request")
+    args = parser.parse_args()
+
+    uvicorn.run(make_app(args.latency_ms), host=args.host, port=args.port, log_level="warning")
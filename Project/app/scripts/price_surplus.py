@@ -0,0 +1,25 @@
+# scripts/price_surplus.py
+# Runs one dynamic surplus pricing round for restaurants that opted in
+# (restaurants.dynamic_pricing) and prints every price it moves.
+#
+#   python -m app.scripts.price_surplus --dry-run                    # show, write nothing
+#   python -m app.scripts.price_surplus --restaurant-id X --dry-run  # a single restaurant
+#   python -m app.scripts.price_surplus                              # apply
+#
+# A one-off run has no sell rates from earlier rounds, so demand is not
+# taken into account; the API's periodic engine (SURPLUS_PRICING_ENABLED)
+# learns them between rounds.
+import argparse
+
+from app.services.surplus_pricing import surplus_pricing_engine
+
+parser = argparse.ArgumentParser(description="Reprice surplus meals towards closing time")
+parser.add_argument("--restaurant-id", default=None, help="only price this restaurant")
+parser.add_argument("--dry-run", action="store_true", help="print the new prices without writing them")
+args = parser.parse_args()
+
+changes = surplus_pricing_engine.run_once(dry_run=args.dry_run, restaurant_id=args.restaurant_id)
+for c in sorted(changes, key=lambda c: (c.restaurant_id, c.hours_to_close, c.name)):
+    old = "-" if c.old_price is None else f"{c.old_price:.2f}"
+    print(f"{c.restaurant_id}  {c.name[:30]:<30} qty {c.quantity:>3}  {c.hours_to_close:>5.2f}h to close  {old:>7} -> {c.new_price:.2f}")
+print(f"{len(changes)} prices {'would change' if args.dry_run else 'changed'}")
@@ -0,0 +1,35 @@
+# scripts/train_eta.py
+# Fits the ETA model (prep time per restaurant, travel time per distance
+# band and hour of day) from delivered order history and writes the
+# coefficients the API serves predictions from.
+#
+#   python -m app.scripts.train_eta                       # to ETA_MODEL_PATH
+#   python -m app.scripts.train_eta --output eta.json
+#
+# Restart the API (or point ETA_MODEL_PATH at the new file) to serve it.
+import argparse
+
+import numpy as np
+
+from app.services import eta_model
+
+parser = argparse.ArgumentParser(description="Train the ETA model from order history")
+parser.add_argument("--output", default=eta_model.MODEL_PATH, help="where to write the coefficients")
+parser.add_argument("--ridge", type=float, default=eta_model.RIDGE, help="shrinkage for sparse groups")
+args = parser.parse_args()
+
+samples = eta_model.extract_samples(eta_model.stream_training_orders())
+model = eta_model.fit(samples, ridge=args.ridge)
+model.save(args.output)
+
+prep_ok = samples.prep_ok()
+travel_ok = samples.travel_ok()
+if prep_ok.any():
+    predicted = np.array([model.prep_minutes(r) for r, ok in zip(samples.restaurant_ids, prep_ok) if ok])
+    print(f"prep:   {prep_ok.sum()} orders, MAE {np.abs(predicted - samples.prep_minutes[prep_ok]).mean():.1f} min")
+if travel_ok.any():
+    predicted = np.array([
+        model.travel_minutes(m, h) for m, h in zip(samples.miles[travel_ok], samples.hours[travel_ok])
+    ])
+    print(f"travel: {travel_ok.sum()} orders, MAE {np.abs(predicted - samples.travel_minutes[travel_ok]).mean():.1f} min")
+print(f"wrote {args.output}")
@@ -0,0 +1,200 @@
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from ..db import get_db
+
+# Order statuses that count towards restaurant analytics.
+ROLLUP_STATUSES = ("delivered", "completed")
+
+
+def record_order_completion(order_id: str) -> bool:
+    """Fold a delivered/completed order into the restaurant rollup tables.
+
+    The work happens in the `record_order_rollup` SQL function so the daily,
+    per-meal and per-customer rows are updated in a single transaction. The
+    function claims the order via `orders.rolled_up_at`, so calling this more
+    than once for the same order is harmless. Returns True if the order was
+    newly recorded.
+    """
+    supabase = get_db()
+    r = supabase.rpc("record_order_rollup", {"p_order_id": order_id}).execute()
+    return bool(getattr(r, "data", None))
+
+
+def record_restaurant_rating(order_id: str) -> bool:
+    """Add an order's restaurant rating to the daily rollup it belongs to.
+
+    Ratings submitted before the order was rolled up are picked up by
+    `record_order_completion` instead, so this is safe to call unconditionally
+    after the rating has been stored on the order.
+    """
+    supabase = get_db()
+    r = supabase.rpc("record_restaurant_rating", {"p_order_id": order_id}).execute()
+    return bool(getattr(r, "data", None))
+
+
+def safe_record_order_completion(order_id: str, status: Optional[str]) -> None:
+    """Best-effort hook for status transitions; never fails the caller."""
+    if status not in ROLLUP_STATUSES:
+        return
+    try:
+        record_order_completion(order_id)
+    except Exception as exc:
+        # the backfill command picks up anything missed here
+        print(f"Failed to record analytics rollup for order {order_id}: {exc}")
+
+
+def safe_record_restaurant_rating(order_id: str) -> None:
+    """Best-effort hook for restaurant feedback; never fails the caller."""
+    try:
+        record_restaurant_rating(order_id)
+    except Exception as exc:
+        print(f"Failed to record restaurant rating rollup for order {order_id}: {exc}")
+
+
+def backfill(restaurant_id: Optional[str] = None, batch_size: int = 1000) -> int:
+    """Roll up every delivered/completed order that has not been recorded yet.
+
+    Runs `backfill_order_rollups` in batches so each call stays a short
+    transaction. Returns the total number of orders recorded.
+    """
+    supabase = get_db()
+    total = 0
+    while True:
+        r = supabase.rpc(
+            "backfill_order_rollups",
+            {"p_restaurant_id": restaurant_id, "p_limit": batch_size},
+        ).execute()
+        processed = int(r.data or 0)
+        total += processed
+        if processed < batch_size:
+            return total
+
+
+def summarize_daily_rows(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Collapse per-day (or per-bucket) rollup rows into restaurant-level totals.
+
+    The customer figures are only meaningful over a restaurant's whole
+    history, since `new_customers` counts first-ever orders.
+    """
+    total_orders = 0
+    total_revenue = 0.0
+    rating_sum = 0
+    rating_count = 0
+    unique_customers = 0
+    repeat_customers = 0
+    for row in rows:
+        total_orders += int(row.get("orders") or 0)
+        total_revenue += float(row.get("revenue") or 0)
+        rating_sum += int(row.get("rating_sum") or 0)
+        rating_count += int(row.get("rating_count") or 0)
+        unique_customers += int(row.get("new_customers") or 0)
+        repeat_customers += int(row.get("new_repeat_customers") or 0)
+
+    return {
+        "total_orders": total_orders,
+        "total_revenue": total_revenue,
+        "avg_order_value": round(total_revenue / total_orders, 2) if total_orders > 0 else 0,
+        "avg_rating": round(rating_sum / rating_count, 1) if rating_count else 0,
+        "total_reviews": rating_count,
+        "unique_customers": unique_customers,
+        "repeat_customer_ratio": round((repeat_customers / unique_customers * 100), 0) if unique_customers > 0 else 0,
+    }
+
+
+def get_restaurant_series(
+    restaurant_id: str,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    granularity: str = "day",
+) -> List[Dict[str, Any]]:
+    """Return rollup totals grouped into day/week/month buckets.
+
+    Bucketing happens in SQL (`date_trunc` over `restaurant_daily_stats`), so
+    at most one row per active day is scanned. `date_from`/`date_to` are
+    inclusive and may be None for an open-ended range.
+    """
+    supabase = get_db()
+    r = supabase.rpc(
+        "restaurant_analytics_series",
+        {
+            "p_restaurant_id": restaurant_id,
+            "p_from": date_from.isoformat() if date_from else None,
+            "p_to": (date_to + timedelta(days=1)).isoformat() if date_to else None,
+            "p_granularity": granularity,
+        },
+    ).execute()
+    return r.data or []
+
+
+def get_window_customers(restaurant_id: str, start: Optional[str], end: Optional[str]) -> Dict[str, int]:
+    """Count unique and repeat customers for orders in [start, end)."""
+    supabase = get_db()
+    r = supabase.rpc(
+        "restaurant_window_customers",
+        {"p_restaurant_id": restaurant_id, "p_from": start, "p_to": end},
+    ).execute()
+    row = (r.data or [{}])[0]
+    return {
+        "unique_customers": int(row.get("unique_customers") or 0),
+        "repeat_customers": int(row.get("repeat_customers") or 0),
+    }
+
+
+def get_window_dishes(restaurant_id: str, start: Optional[str], end: Optional[str], limit: int = 5) -> List[Dict[str, Any]]:
+    """Return the most-ordered meals for orders in [start, end)."""
+    supabase = get_db()
+    r = supabase.rpc(
+        "restaurant_window_dishes",
+        {"p_restaurant_id": restaurant_id, "p_from": start, "p_to": end, "p_limit": limit},
+    ).execute()
+    return [
+        {
+            "id": row["meal_id"],
+            "name": row.get("name"),
+            "image": row.get("image_link") or "",
+            "orders": int(row.get("orders") or 0),
+            "revenue": round(float(row.get("revenue") or 0), 2),
+        }
+        for row in r.data or []
+    ]
+
+
+def get_popular_dishes(restaurant_id: str, limit: int = 5) -> List[Dict[str, Any]]:
+    """Return the restaurant's most-ordered meals from `restaurant_meal_stats`."""
+    supabase = get_db()
+    r = (
+        supabase
+        .table("restaurant_meal_stats")
+        .select("meal_id,orders,revenue,meals(name,image_link)")
+        .eq("restaurant_id", restaurant_id)
+        .order("orders", desc=True)
+        .limit(limit)
+        .execute()
+    )
+    dishes = []
+    for row in r.data or []:
+        meal = row.get("meals") or {}
+        dishes.append({
+            "id": row["meal_id"],
+            "name": meal.get("name"),
+            "image": meal.get("image_link", ""),
+            "orders": int(row.get("orders") or 0),
+            "revenue": round(float(row.get("revenue") or 0), 2),
+        })
+    return dishes
+
+
+__all__ = [
+    "ROLLUP_STATUSES",
+    "record_order_completion",
+    "record_restaurant_rating",
+    "safe_record_order_completion",
+    "safe_record_restaurant_rating",
+    "backfill",
+    "summarize_daily_rows",
+    "get_restaurant_series",
+    "get_window_customers",
+    "get_window_dishes",
+    "get_popular_dishes",
+]
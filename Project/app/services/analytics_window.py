@@ -0,0 +1,95 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+
+GRANULARITIES = ("day", "week", "month")
+
+
+def resolve_window(
+    date_from: Optional[date],
+    date_to: Optional[date],
+    granularity: str,
+) -> Tuple[Optional[date], Optional[date], str]:
+    """Validate analytics window query params.
+
+    `date_from` and `date_to` are inclusive calendar days (UTC); either may be
+    None for an open-ended window. Raises 400 on an unknown granularity or an
+    inverted range.
+    """
+    if granularity not in GRANULARITIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"granularity must be one of: {','.join(GRANULARITIES)}",
+        )
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    return date_from, date_to, granularity
+
+
+def window_bounds(
+    date_from: Optional[date], date_to: Optional[date]
+) -> Tuple[Optional[str], Optional[str]]:
+    """Return ISO timestamps for a half-open [from, to + 1 day) range."""
+    start = datetime.combine(date_from, datetime.min.time()).isoformat() if date_from else None
+    end = (
+        datetime.combine(date_to + timedelta(days=1), datetime.min.time()).isoformat()
+        if date_to
+        else None
+    )
+    return start, end
+
+
+def bucket_start(day: date, granularity: str) -> date:
+    """Python equivalent of Postgres `date_trunc` for day/week/month."""
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(bucket: date, granularity: str) -> date:
+    if granularity == "week":
+        return bucket + timedelta(days=7)
+    if granularity == "month":
+        return (bucket.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return bucket + timedelta(days=1)
+
+
+def bucket_range(start: date, end: date, granularity: str) -> List[date]:
+    """Every bucket start covering the inclusive range [start, end]."""
+    buckets = []
+    current = bucket_start(start, granularity)
+    while current <= end:
+        buckets.append(current)
+        current = next_bucket(current, granularity)
+    return buckets
+
+
+def bucket_label(bucket: date, granularity: str) -> str:
+    if granularity == "week":
+        return bucket.strftime("Wk %b %d")
+    if granularity == "month":
+        return bucket.strftime("%b %Y")
+    return bucket.strftime("%a")
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse a PostgREST timestamp, treating naive values as UTC."""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+__all__ = [
+    "GRANULARITIES",
+    "resolve_window",
+    "window_bounds",
+    "bucket_start",
+    "next_bucket",
+    "bucket_range",
+    "bucket_label",
+    "parse_timestamp",
+]
@@ -0,0 +1,263 @@
+import bisect
+import math
+import os
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from ..db import get_db, stream_rows
+from .catalog_search import tokenize
+from .refreshing_index import RefreshingIndex
+
+REFRESH_SECONDS = float(os.getenv("CATALOG_AUTOCOMPLETE_REFRESH_SECONDS", "900"))
+MAX_LIMIT = 20
+# Prefix ranges wider than this are ranked once and cached until a
+# change touches them; narrower ranges are ranked on every keystroke.
+SCAN_LIMIT = 512
+CACHE_SIZE = 4096
+
+HEAD_BONUS = 0.5   # the prefix matches the start of the name, not a later word
+EXACT_BONUS = 1.0  # the prefix is the whole name, or all of it from some word on
+
+Ref = Tuple[str, Hashable]  # (type, id)
+
+
+def _keys(text: Any) -> List[str]:
+    """Normalised name followed by each of its later word-start suffixes,
+    so "pi" finds "Margherita Pizza" as well as "Pizza Palace"."""
+    tokens = tokenize(text)
+    return [" ".join(tokens[i:]) for i in range(len(tokens))]
+
+
+class _Entry:
+    __slots__ = ("kind", "id", "restaurant_id", "text", "popularity", "keys")
+
+    def __init__(self, kind: str, id: Hashable, restaurant_id: Any, text: str, popularity: float):
+        self.kind = kind
+        self.id = id
+        self.restaurant_id = restaurant_id
+        self.text = text
+        self.popularity = popularity
+        self.keys = _keys(text)
+
+
+class AutocompleteIndex:
+    """Sorted array of normalised name keys, searched with binary search.
+
+    Every restaurant name, meal name and tag contributes one key per word
+    start; the keys extending a prefix are a contiguous slice, found with
+    two bisects. Entries are ranked by popularity (orders for meals, the
+    sum of their meals' orders for restaurants, meal count for tags). Adds
+    and edits insert into the arrays in place, so owners' changes show up
+    without a rebuild.
+    """
+
+    def __init__(self):
+        self._keys: List[str] = []
+        self._refs: List[Ref] = []
+        self._entries: Dict[Ref, _Entry] = {}
+        self._meal_tags: Dict[Hashable, List[str]] = {}
+        self._tag_counts: Dict[str, int] = defaultdict(int)
+        self._top: Dict[str, List[Tuple[float, Ref]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def build(
+        self,
+        restaurants: Iterable[Dict[str, Any]],
+        meals: Iterable[Dict[str, Any]],
+        meal_orders: Optional[Dict[Hashable, float]] = None,
+    ) -> "AutocompleteIndex":
+        meal_orders = meal_orders or {}
+        restaurant_orders: Dict[Hashable, float] = defaultdict(float)
+        pairs: List[Tuple[str, Ref]] = []
+
+        def add(entry: _Entry) -> None:
+            ref = (entry.kind, entry.id)
+            self._entries[ref] = entry
+            pairs.extend((key, ref) for key in entry.keys)
+
+        for m in meals:
+            orders = float(meal_orders.get(m["id"]) or 0)
+            restaurant_orders[m.get("restaurant_id")] += orders
+            add(_Entry("meal", m["id"], m.get("restaurant_id"), m.get("name") or "", orders))
+            self._meal_tags[m["id"]] = self._tags_of(m)
+            for tag in self._meal_tags[m["id"]]:
+                self._tag_counts[tag] += 1
+        for r in restaurants:
+            add(_Entry("restaurant", r["id"], r["id"], r.get("name") or "", restaurant_orders.get(r["id"], 0.0)))
+        for tag, count in self._tag_counts.items():
+            add(_Entry("tag", tag, None, tag, count))
+
+        pairs.sort(key=lambda p: p[0])
+        self._keys = [key for key, _ in pairs]
+        self._refs = [ref for _, ref in pairs]
+        return self
+
+    @staticmethod
+    def _tags_of(meal: Dict[str, Any]) -> List[str]:
+        return list(dict.fromkeys(t for t in (" ".join(tokenize(tag)) for tag in meal.get("tags") or []) if t))
+
+    # -- incremental maintenance (caller holds the lock) --
+
+    def _insert(self, entry: _Entry) -> None:
+        ref = (entry.kind, entry.id)
+        self._entries[ref] = entry
+        for key in entry.keys:
+            i = bisect.bisect_right(self._keys, key)
+            self._keys.insert(i, key)
+            self._refs.insert(i, ref)
+        self._invalidate(entry.keys)
+
+    def _delete(self, ref: Ref) -> Optional[_Entry]:
+        entry = self._entries.pop(ref, None)
+        if entry is None:
+            return None
+        for key in entry.keys:
+            i = bisect.bisect_left(self._keys, key)
+            while i < len(self._keys) and self._keys[i] == key:
+                if self._refs[i] == ref:
+                    del self._keys[i]
+                    del self._refs[i]
+                    break
+                i += 1
+        self._invalidate(entry.keys)
+        return entry
+
+    def _invalidate(self, keys: List[str]) -> None:
+        if self._top:
+            stale = [p for p in self._top if any(key.startswith(p) for key in keys)]
+            for prefix in stale:
+                del self._top[prefix]
+
+    def _bump_tag(self, tag: str, delta: int) -> None:
+        count = self._tag_counts[tag] + delta
+        self._delete(("tag", tag))
+        if count > 0:
+            self._tag_counts[tag] = count
+            self._insert(_Entry("tag", tag, None, tag, count))
+        else:
+            self._tag_counts.pop(tag, None)
+
+    def upsert_meal(self, meal: Dict[str, Any]) -> None:
+        ref = ("meal", meal["id"])
+        with self._lock:
+            old = self._delete(ref)
+            popularity = old.popularity if old is not None else 0.0
+            self._insert(_Entry("meal", meal["id"], meal.get("restaurant_id"), meal.get("name") or "", popularity))
+            old_tags = set(self._meal_tags.get(meal["id"], ()))
+            new_tags = self._tags_of(meal)
+            self._meal_tags[meal["id"]] = new_tags
+            for tag in old_tags.difference(new_tags):
+                self._bump_tag(tag, -1)
+            for tag in set(new_tags).difference(old_tags):
+                self._bump_tag(tag, 1)
+
+    def remove_meal(self, meal_id: Hashable) -> None:
+        with self._lock:
+            self._delete(("meal", meal_id))
+            for tag in self._meal_tags.pop(meal_id, ()):
+                self._bump_tag(tag, -1)
+
+    def upsert_restaurant(self, restaurant: Dict[str, Any]) -> None:
+        ref = ("restaurant", restaurant["id"])
+        with self._lock:
+            old = self._delete(ref)
+            popularity = old.popularity if old is not None else 0.0
+            self._insert(_Entry("restaurant", restaurant["id"], restaurant["id"], restaurant.get("name") or "", popularity))
+
+    # -- queries --
+
+    def _rank(self, prefix: str, lo: int, hi: int, limit: int) -> List[Tuple[float, Ref]]:
+        best: Dict[Ref, float] = {}
+        for i in range(lo, hi):
+            ref, key = self._refs[i], self._keys[i]
+            entry = self._entries[ref]
+            score = math.log1p(entry.popularity)
+            if key == entry.keys[0]:
+                score += HEAD_BONUS
+            if key == prefix:
+                score += EXACT_BONUS
+            if score > best.get(ref, -1.0):
+                best[ref] = score
+        ranked = sorted(best.items(), key=lambda item: (-item[1], self._entries[item[0]].text, str(item[0][1])))
+        return [(score, ref) for ref, score in ranked[:limit]]
+
+    def complete(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Top `limit` completions of the query, most popular first."""
+        prefix = " ".join(tokenize(query))
+        if query[-1:].isspace() and prefix:
+            prefix += " "
+        if not prefix:
+            return []
+        limit = max(1, min(limit, MAX_LIMIT))
+        with self._lock:
+            lo = bisect.bisect_left(self._keys, prefix)
+            hi = bisect.bisect_left(self._keys, prefix + "\uffff", lo)
+            if hi - lo > SCAN_LIMIT:
+                top = self._top.get(prefix)
+                if top is None:
+                    if len(self._top) >= CACHE_SIZE:
+                        self._top.clear()
+                    top = self._top[prefix] = self._rank(prefix, lo, hi, MAX_LIMIT)
+            else:
+                top = self._rank(prefix, lo, hi, limit)
+            entries = [(score, self._entries[ref]) for score, ref in top[:limit]]
+        return [
+            {
+                "type": e.kind,
+                "id": e.id,
+                "restaurant_id": e.restaurant_id,
+                "text": e.text,
+                "score": round(score, 4),
+            }
+            for score, e in entries
+        ]
+
+
+class CatalogAutocomplete(RefreshingIndex[AutocompleteIndex]):
+    """The process-wide autocomplete index; rebuilds every REFRESH_SECONDS
+    also pick up new order counts."""
+
+    name = "autocomplete"
+
+    def __init__(self, refresh_seconds: float = REFRESH_SECONDS):
+        super().__init__(refresh_seconds)
+
+    def _load(self) -> AutocompleteIndex:
+        supabase = get_db()
+        meal_orders: Dict[Hashable, float] = defaultdict(float)
+        for row in stream_rows(
+            lambda: supabase.table("restaurant_meal_stats").select("meal_id, restaurant_id, orders"), "meal_id", "restaurant_id"
+        ):
+            meal_orders[row["meal_id"]] += float(row.get("orders") or 0)
+        restaurants = stream_rows(lambda: supabase.table("restaurants").select("id, name"))
+        meals = stream_rows(lambda: supabase.table("meals").select("id, restaurant_id, name, tags"))
+        return AutocompleteIndex().build(restaurants, meals, meal_orders)
+
+    def _empty(self) -> AutocompleteIndex:
+        return AutocompleteIndex()
+
+    def complete(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        return self.index().complete(query, limit)
+
+    def restaurant_changed(self, restaurant: Dict[str, Any]) -> None:
+        try:
+            if self._index is not None:
+                self._index.upsert_restaurant(restaurant)
+        except Exception as e:
+            print(f"Error updating autocomplete for restaurant {restaurant.get('id')}: {e}")
+
+
+catalog_autocomplete = CatalogAutocomplete()
+
+
+__all__ = [
+    "REFRESH_SECONDS",
+    "MAX_LIMIT",
+    "AutocompleteIndex",
+    "CatalogAutocomplete",
+    "catalog_autocomplete",
+]
@@ -0,0 +1,211 @@
+import bisect
+import math
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ..db import get_db, stream_rows
+from .refreshing_index import RefreshingIndex
+
+# "postgres" ranks with the search_catalog SQL function; "memory" serves the
+# in-process inverted index (tests, local development without pg_trgm).
+BACKEND = os.getenv("CATALOG_SEARCH_BACKEND", "postgres").lower()
+REFRESH_SECONDS = float(os.getenv("CATALOG_SEARCH_REFRESH_SECONDS", "300"))
+
+NAME_WEIGHT = 2.0
+TAG_WEIGHT = 1.0
+PREFIX_FACTOR = 0.8
+FUZZY_FACTOR = 0.7
+MIN_FUZZY_SIMILARITY = 0.4
+MAX_EXPANSIONS = 20
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: Any) -> str:
+    """Lowercase and strip accents, so "Crème Brûlée" matches "creme brulee"."""
+    folded = unicodedata.normalize("NFKD", str(text or ""))
+    return "".join(c for c in folded if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text: Any) -> List[str]:
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def _trigrams(term: str) -> set:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CatalogSearchIndex:
+    """In-memory inverted index over restaurant names, meal names and tags.
+
+    Each query token is expanded to vocabulary terms that equal it, extend
+    it (as-you-type prefixes) or are trigram-similar to it (typos). Scores
+    are accumulated over NumPy posting arrays, so a query costs a
+    vectorised pass per expanded term rather than a Python loop over
+    documents.
+    """
+
+    def __init__(self):
+        self.types: List[str] = []
+        self.ids: List[Any] = []
+        self.restaurant_ids: List[Any] = []
+        self.names: List[str] = []
+        self._is_meal = np.zeros(0, dtype=bool)
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._vocab: List[str] = []
+        self._trigram_terms: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def build(self, restaurants: Iterable[Dict[str, Any]], meals: Iterable[Dict[str, Any]]) -> "CatalogSearchIndex":
+        postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+
+        def add(doc: int, text: Any, weight: float) -> None:
+            for term in tokenize(text):
+                if postings[term].get(doc, 0.0) < weight:
+                    postings[term][doc] = weight
+
+        for r in restaurants:
+            doc = len(self.ids)
+            self.types.append("restaurant")
+            self.ids.append(r["id"])
+            self.restaurant_ids.append(r["id"])
+            self.names.append(r.get("name") or "")
+            add(doc, r.get("name"), NAME_WEIGHT)
+        for m in meals:
+            doc = len(self.ids)
+            self.types.append("meal")
+            self.ids.append(m["id"])
+            self.restaurant_ids.append(m.get("restaurant_id"))
+            self.names.append(m.get("name") or "")
+            add(doc, m.get("name"), NAME_WEIGHT)
+            for tag in m.get("tags") or []:
+                add(doc, tag, TAG_WEIGHT)
+
+        self._is_meal = np.asarray([t == "meal" for t in self.types], dtype=bool)
+        n = max(len(self.ids), 1)
+        for term, docs in postings.items():
+            idf = math.log(1 + n / len(docs))
+            self._postings[term] = (
+                np.fromiter(docs.keys(), dtype=np.int64, count=len(docs)),
+                np.fromiter(docs.values(), dtype=float, count=len(docs)) * idf,
+            )
+        self._vocab = sorted(self._postings)
+        trigram_terms: Dict[str, List[str]] = defaultdict(list)
+        for term in self._vocab:
+            for gram in _trigrams(term):
+                trigram_terms[gram].append(term)
+        self._trigram_terms = dict(trigram_terms)
+        return self
+
+    def _expand(self, token: str) -> List[Tuple[str, float]]:
+        """(vocabulary term, weight multiplier) pairs a query token matches."""
+        expansions = {}
+        if token in self._postings:
+            expansions[token] = 1.0
+        if len(token) >= 2:
+            i = bisect.bisect_left(self._vocab, token)
+            while i < len(self._vocab) and self._vocab[i].startswith(token) and len(expansions) < MAX_EXPANSIONS:
+                expansions.setdefault(self._vocab[i], PREFIX_FACTOR)
+                i += 1
+        if not expansions and len(token) >= 4:
+            grams = _trigrams(token)
+            overlap: Dict[str, int] = defaultdict(int)
+            for gram in grams:
+                for term in self._trigram_terms.get(gram, ()):
+                    overlap[term] += 1
+            scored = []
+            for term, shared in overlap.items():
+                similarity = shared / (len(grams) + len(_trigrams(term)) - shared)
+                if similarity >= MIN_FUZZY_SIMILARITY:
+                    scored.append((similarity, term))
+            for similarity, term in sorted(scored, reverse=True)[:5]:
+                expansions[term] = FUZZY_FACTOR * similarity
+        return list(expansions.items())
+
+    def search(self, query: str, limit: int = 20, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self.ids:
+            return []
+        n = len(self.ids)
+        total = np.zeros(n)
+        matched = np.zeros(n)
+        for token in tokens:
+            best = np.zeros(n)
+            for term, factor in self._expand(token):
+                docs, weights = self._postings[term]
+                best[docs] = np.maximum(best[docs], weights * factor)
+            total += best
+            matched += best > 0
+
+        # documents matching every token outrank partial matches
+        score = total * (matched / len(tokens)) ** 2
+        if kind == "meal":
+            score[~self._is_meal] = 0.0
+        elif kind == "restaurant":
+            score[self._is_meal] = 0.0
+        hits = np.flatnonzero(score)
+        if len(hits) > limit:
+            hits = hits[np.argpartition(-score[hits], limit - 1)[:limit]]
+        hits = sorted(hits, key=lambda d: (-score[d], self.names[d], str(self.ids[d])))
+        return [
+            {
+                "type": self.types[d],
+                "id": self.ids[d],
+                "restaurant_id": self.restaurant_ids[d],
+                "name": self.names[d],
+                "score": round(float(score[d]), 4),
+            }
+            for d in hits
+        ]
+
+
+class CatalogSearch(RefreshingIndex[CatalogSearchIndex]):
+    """Serves search from Postgres, or from an in-memory index that is
+    rebuilt from the catalog every REFRESH_SECONDS."""
+
+    name = "catalog search index"
+
+    def __init__(self, backend: str = BACKEND, refresh_seconds: float = REFRESH_SECONDS):
+        super().__init__(refresh_seconds)
+        self.backend = backend
+
+    def _load(self) -> CatalogSearchIndex:
+        supabase = get_db()
+        restaurants = stream_rows(lambda: supabase.table("restaurants").select("id, name"))
+        meals = stream_rows(lambda: supabase.table("meals").select("id, restaurant_id, name, tags"))
+        return CatalogSearchIndex().build(restaurants, meals)
+
+    def _empty(self) -> CatalogSearchIndex:
+        return CatalogSearchIndex()
+
+    def search(self, query: str, limit: int = 20, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        if self.backend == "postgres":
+            try:
+                r = get_db().rpc(
+                    "search_catalog", {"p_query": query, "p_limit": limit, "p_kind": kind}
+                ).execute()
+                return r.data or []
+            except Exception as e:
+                # e.g. the migration has not run yet; degrade to the local index
+                print(f"search_catalog failed, using in-memory index: {e}")
+        return self.index().search(query, limit, kind)
+
+
+catalog_search = CatalogSearch()
+
+
+__all__ = [
+    "normalize",
+    "tokenize",
+    "CatalogSearchIndex",
+    "CatalogSearch",
+    "catalog_search",
+]
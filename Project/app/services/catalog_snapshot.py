@@ -0,0 +1,388 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+from ..db import get_db, stream_rows
+from .dietary_index import LabelCodebook
+from .keyset import Key, seek_list
+
+# "on" serves catalog browsing from the snapshot; "off" queries the
+# database per request (tests, debugging).
+ENABLED = os.getenv("CATALOG_SNAPSHOT", "on").lower() not in ("off", "0", "false")
+# Upper bound on how old surplus quantities (and any other catalog edit
+# made outside this process) may be when served.
+STALENESS_SECONDS = float(os.getenv("CATALOG_STALENESS_SECONDS", "10"))
+FULL_RELOAD_SECONDS = float(os.getenv("CATALOG_FULL_RELOAD_SECONDS", "3600"))
+# Versions are taken at write time but become visible at commit, so a
+# slow transaction can commit a version below the watermark. Each
+# incremental refresh re-reads this many versions back to catch it.
+VERSION_OVERLAP = int(os.getenv("CATALOG_VERSION_OVERLAP", "500"))
+
+RESTAURANT_FIELDS = ("id", "name", "address", "latitude", "longitude")
+MEAL_FIELDS = (
+    "id", "restaurant_id", "name", "tags", "base_price", "quantity", "surplus_price",
+    "allergens", "calories", "created_at", "image_link",
+)
+
+
+class _Restaurant:
+    __slots__ = RESTAURANT_FIELDS + ("name_key",)
+
+    def __init__(self, row: Dict[str, Any]):
+        for field in RESTAURANT_FIELDS:
+            setattr(self, field, row.get(field))
+        self.id = str(self.id)
+        self.name_key = (self.name or "").lower()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in RESTAURANT_FIELDS}
+
+
+class _Meal:
+    __slots__ = MEAL_FIELDS + ("name_key", "tag_mask", "allergen_mask")
+
+    def __init__(self, row: Dict[str, Any], tags: LabelCodebook, allergens: LabelCodebook):
+        for field in MEAL_FIELDS:
+            setattr(self, field, row.get(field))
+        self.id = str(self.id)
+        self.restaurant_id = str(self.restaurant_id)
+        self.name_key = (self.name or "").lower()
+        self.tag_mask = tags.encode(self.tags)
+        self.allergen_mask = allergens.encode(self.allergens)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in MEAL_FIELDS}
+
+
+def _meal_key(column: str):
+    if column == "surplus_price":
+        return lambda m: float(m.surplus_price)
+    return lambda m: getattr(m, column)
+
+
+def _sorted_meals(meals: Iterable[_Meal], column: str, descending: bool) -> List[_Meal]:
+    """Order like the database: nulls last either way, ties by id."""
+    present, missing = [], []
+    for meal in meals:
+        (missing if getattr(meal, column) is None else present).append(meal)
+    present.sort(key=lambda m: m.id)
+    present.sort(key=_meal_key(column), reverse=descending)
+    missing.sort(key=lambda m: m.id)
+    return present + missing
+
+
+class CatalogSnapshot:
+    """Restaurants and meals held in memory for catalog browsing.
+
+    A full load reads both tables; after that, every STALENESS_SECONDS a
+    request triggers an incremental refresh that reads only rows whose
+    version is past the watermark, plus catalog_tombstones for deletes.
+    Owner edits made through this process are applied immediately. A
+    failed refresh keeps serving the previous state.
+    """
+
+    def __init__(
+        self,
+        staleness_seconds: float = STALENESS_SECONDS,
+        full_reload_seconds: float = FULL_RELOAD_SECONDS,
+    ):
+        self.staleness_seconds = staleness_seconds
+        self.full_reload_seconds = full_reload_seconds
+        self.tags = LabelCodebook()
+        self.allergens = LabelCodebook()
+        self._restaurants: Dict[str, _Restaurant] = {}
+        self._meals: Dict[str, _Meal] = {}
+        self._menus: Dict[str, Dict[str, _Meal]] = {}
+        self._by_name: Optional[List[_Restaurant]] = None
+        self._by_name_desc: Optional[List[_Restaurant]] = None
+        self._by_created: Optional[List[_Meal]] = None
+        # restaurant_menu_versions stamps; edits written through from this
+        # process drop the stamp until the next refresh reads the new one
+        self._menu_versions: Dict[str, int] = {}
+        self._unstamped: set = set()
+        self._version = 0
+        self._loaded_at: Optional[float] = None
+        self._full_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._meals)
+
+    @property
+    def ready(self) -> bool:
+        return self._full_at is not None
+
+    # -- loading (caller holds self._lock unless noted) --
+
+    def _put_restaurant(self, row: Dict[str, Any]) -> None:
+        restaurant = _Restaurant(row)
+        self._restaurants[restaurant.id] = restaurant
+        self._by_name = self._by_name_desc = None
+
+    def _drop_restaurant(self, restaurant_id: Hashable) -> None:
+        if self._restaurants.pop(str(restaurant_id), None) is not None:
+            self._by_name = self._by_name_desc = None
+
+    def _put_meal(self, row: Dict[str, Any]) -> None:
+        meal = _Meal(row, self.tags, self.allergens)
+        old = self._meals.get(meal.id)
+        if old is not None and old.restaurant_id != meal.restaurant_id:
+            self._menus.get(old.restaurant_id, {}).pop(meal.id, None)
+        self._meals[meal.id] = meal
+        self._menus.setdefault(meal.restaurant_id, {})[meal.id] = meal
+        self._by_created = None
+
+    def _drop_meal(self, meal_id: Hashable) -> None:
+        meal = self._meals.pop(str(meal_id), None)
+        if meal is not None:
+            self._menus.get(meal.restaurant_id, {}).pop(meal.id, None)
+            self._by_created = None
+
+    def _put_menu_version(self, row: Dict[str, Any]) -> None:
+        restaurant_id = str(row["restaurant_id"])
+        self._menu_versions[restaurant_id] = int(row["version"])
+        self._unstamped.discard(restaurant_id)
+
+    def _unstamp(self, restaurant_id: Optional[str]) -> None:
+        if restaurant_id is not None:
+            self._menu_versions.pop(restaurant_id, None)
+            self._unstamped.add(restaurant_id)
+
+    @staticmethod
+    def _changes(table: str, fields: Iterable[str], since: int) -> List[Dict[str, Any]]:
+        supabase = get_db()
+        columns = ", ".join((*fields, "version"))
+        return list(stream_rows(lambda: supabase.table(table).select(columns).gt("version", since), "version", "version"))
+
+    def _load_full(self) -> None:
+        """Read both tables into a new snapshot, then swap it in (no lock held)."""
+        fresh = CatalogSnapshot()
+        # stamps first: a stamp may be older than the meals read after it,
+        # never newer, so an ETag never labels content it does not cover
+        menu_versions = self._changes("restaurant_menu_versions", ("restaurant_id",), -1)
+        restaurants = self._changes("restaurants", RESTAURANT_FIELDS, -1)
+        meals = self._changes("meals", MEAL_FIELDS, -1)
+        for row in menu_versions:
+            fresh._put_menu_version(row)
+        for row in restaurants:
+            fresh._put_restaurant(row)
+        for row in meals:
+            fresh._put_meal(row)
+        version = max((int(r.get("version") or 0) for r in menu_versions + restaurants + meals), default=0)
+        with self._lock:
+            self.tags, self.allergens = fresh.tags, fresh.allergens
+            self._restaurants, self._meals, self._menus = fresh._restaurants, fresh._meals, fresh._menus
+            self._menu_versions, self._unstamped = fresh._menu_versions, set()
+            self._by_name = self._by_created = None
+            self._version = version
+
+    def _load_changes(self) -> None:
+        """Apply rows past the watermark and tombstones (no lock held)."""
+        since = max(self._version - VERSION_OVERLAP, 0)
+        menu_versions = self._changes("restaurant_menu_versions", ("restaurant_id",), since)
+        restaurants = self._changes("restaurants", RESTAURANT_FIELDS, since)
+        meals = self._changes("meals", MEAL_FIELDS, since)
+        tombstones = self._changes("catalog_tombstones", ("kind", "id"), since)
+        with self._lock:
+            for row in menu_versions:
+                self._put_menu_version(row)
+            for row in restaurants:
+                self._put_restaurant(row)
+            for row in meals:
+                self._put_meal(row)
+            for row in tombstones:
+                if row.get("kind") == "restaurant":
+                    self._drop_restaurant(row["id"])
+                else:
+                    self._drop_meal(row["id"])
+            self._version = max(
+                [self._version]
+                + [int(r.get("version") or 0) for r in menu_versions + restaurants + meals + tombstones]
+            )
+
+    def refresh(self, force: bool = False) -> None:
+        """Load in full on first use and every full_reload_seconds;
+        otherwise apply changes once the snapshot is staleness_seconds old.
+
+        Readers keep being served from the current state while a refresh
+        reads from the database.
+        """
+        now = time.monotonic()
+        if not force and self._loaded_at is not None and now - self._loaded_at < self.staleness_seconds:
+            return
+        with self._refresh_lock:
+            if not force and self._loaded_at is not None and now - self._loaded_at < self.staleness_seconds:
+                return
+            full = force or self._full_at is None or now - self._full_at >= self.full_reload_seconds
+            try:
+                if full:
+                    self._load_full()
+                    self._full_at = now
+                else:
+                    self._load_changes()
+            except Exception as e:
+                print(f"Failed to refresh catalog snapshot: {e}")
+            self._loaded_at = now
+
+    def reset(self) -> None:
+        """Forget everything; the next refresh loads in full."""
+        with self._refresh_lock, self._lock:
+            self._restaurants, self._meals, self._menus = {}, {}, {}
+            self._by_name = self._by_created = None
+            self._menu_versions, self._unstamped = {}, set()
+            self._version = 0
+            self._loaded_at = self._full_at = None
+
+    # -- write-through from this process --
+
+    def meal_changed(self, meal: Dict[str, Any]) -> None:
+        if not self.ready:
+            return
+        try:
+            with self._lock:
+                current = self._meals.get(str(meal["id"]))
+                merged = current.to_dict() if current is not None else {}
+                merged.update(meal)
+                self._put_meal(merged)
+                self._unstamp(current.restaurant_id if current is not None else None)
+                self._unstamp(str(merged.get("restaurant_id")))
+        except Exception as e:
+            print(f"Error updating catalog snapshot for meal {meal.get('id')}: {e}")
+
+    def meal_removed(self, meal_id: Hashable) -> None:
+        with self._lock:
+            meal = self._meals.get(str(meal_id))
+            self._drop_meal(meal_id)
+            self._unstamp(meal.restaurant_id if meal is not None else None)
+
+    def restaurant_changed(self, restaurant: Dict[str, Any]) -> None:
+        if not self.ready:
+            return
+        try:
+            with self._lock:
+                current = self._restaurants.get(str(restaurant["id"]))
+                merged = current.to_dict() if current is not None else {}
+                merged.update(restaurant)
+                self._put_restaurant(merged)
+        except Exception as e:
+            print(f"Error updating catalog snapshot for restaurant {restaurant.get('id')}: {e}")
+
+    # -- queries --
+
+    def menu_version(self, restaurant_id: Hashable) -> Optional[int]:
+        """Stamp of the restaurant's menu as held here; None if unknown."""
+        return self._menu_versions.get(str(restaurant_id))
+
+    def catalog_version(self) -> Optional[int]:
+        """Newest stamp of any menu; None while an edit awaits its stamp."""
+        with self._lock:
+            if self._unstamped:
+                return None
+            return max(self._menu_versions.values(), default=0)
+
+    def list_restaurants(
+        self,
+        search: Optional[str] = None,
+        restaurant_ids: Optional[Iterable[Any]] = None,
+        descending: bool = False,
+        limit: int = 20,
+        offset: int = 0,
+        after: Optional[Key] = None,
+    ) -> List[Dict[str, Any]]:
+        """Restaurants by (name, id), starting after the cursor key if given."""
+        with self._lock:
+            if self._by_name is None:
+                self._by_name = sorted(self._restaurants.values(), key=lambda r: (r.name or "", r.id))
+                # descending by name, ties still by id ascending
+                self._by_name_desc = sorted(self._by_name, key=lambda r: r.name or "", reverse=True)
+            ordered = self._by_name_desc if descending else self._by_name
+        start = seek_list(ordered, lambda r: (r.name or "", r.id), after, descending)
+        needle = search.lower() if search else None
+        wanted = {str(r) for r in restaurant_ids} if restaurant_ids is not None else None
+        page, skipped = [], 0
+        for restaurant in ordered[start:]:
+            if needle and needle not in restaurant.name_key:
+                continue
+            if wanted is not None and restaurant.id not in wanted:
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            page.append(restaurant.to_dict())
+            if len(page) >= limit:
+                break
+        return page
+
+    def list_meals(
+        self,
+        restaurant_id: Hashable,
+        tags: Iterable[str] = (),
+        exclude_allergens: Iterable[str] = (),
+        surplus_only: bool = False,
+        search: Optional[str] = None,
+        sort_column: str = "name",
+        descending: bool = False,
+        limit: int = 20,
+        offset: int = 0,
+        after: Optional[Key] = None,
+    ) -> List[Dict[str, Any]]:
+        """One page of a restaurant's menu; dietary filters are the same
+        bitmask checks as dietary_index, applied before paging."""
+        required = self.tags.lookup(tags)
+        if required is None:
+            return []
+        excluded = self.allergens.known(exclude_allergens)
+        needle = search.lower() if search else None
+        with self._lock:
+            menu = list(self._menus.get(str(restaurant_id), {}).values())
+        meals = [
+            m for m in menu
+            if m.tag_mask & required == required
+            and not m.allergen_mask & excluded
+            and (not surplus_only or (m.quantity or 0) > 0)
+            and (not needle or needle in m.name_key)
+        ]
+        meals = _sorted_meals(meals, sort_column, descending)
+        key = _meal_key(sort_column)
+        start = seek_list(
+            meals, lambda m: (None if getattr(m, sort_column) is None else key(m), m.id), after, descending
+        ) + offset
+        return [m.to_dict() for m in meals[start:start + limit]]
+
+    def recent_meals(self, surplus_only: bool = True, limit: int = 50) -> List[Dict[str, Any]]:
+        """Newest meals first, as served by GET /meals."""
+        with self._lock:
+            if self._by_created is None:
+                self._by_created = _sorted_meals(self._meals.values(), "created_at", descending=True)
+            ordered = self._by_created
+        page = []
+        for meal in ordered:
+            if surplus_only and not (meal.quantity or 0) > 0:
+                continue
+            page.append(meal.to_dict())
+            if len(page) >= limit:
+                break
+        return page
+
+
+catalog_snapshot = CatalogSnapshot()
+
+
+def serving() -> bool:
+    """True when browse requests should be answered from the snapshot."""
+    if not ENABLED:
+        return False
+    catalog_snapshot.refresh()
+    return catalog_snapshot.ready
+
+
+__all__ = [
+    "ENABLED",
+    "STALENESS_SECONDS",
+    "FULL_RELOAD_SECONDS",
+    "CatalogSnapshot",
+    "catalog_snapshot",
+    "serving",
+]
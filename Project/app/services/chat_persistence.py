@@ -1,7 +1,8 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import uuid4
 
 from ..db import get_db
+from .keyset import Key, page_of, seek, seek_page
 
 
 def create_session(user_id: Optional[str] = None, title: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None) -> str:
@@ -79,28 +80,36 @@ def session_belongs_to_user(session_id: str, user_id: Optional[str]) -> bool:
     return str(session_user_id) == str(user_id)
 
 
-def get_sessions_for_user(user_id: str, limit: int = 50, offset: int = 0):
-    """Return a list of sessions for the given user with a last_message preview.
+def get_sessions_for_user(
+    user_id: str, limit: int = 50, offset: int = 0, after: Optional[Key] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Return one page of sessions for the given user with a last_message
+    preview, and the cursor for the next page (None on the last one).
 
     Each session dict contains: id, user_id, title, metadata, created_at, last_message
-    where last_message is either a message dict or None.
+    where last_message is either a message dict or None. Pass `after`, the
+    (created_at, id) of the last session already shown, to resume there.
     """
     supabase = get_db()
-    # 1) fetch sessions for user
-    r = (
-        supabase
-        .table("chat_sessions")
-        .select("id,user_id,title,metadata,created_at")
-        .eq("user_id", user_id)
-        .order("created_at", desc=True)
-        .limit(limit)
-        .execute()
-    )
-    sessions = r.data or []
+
+    def build_query():
+        return (
+            supabase
+            .table("chat_sessions")
+            .select("id,user_id,title,metadata,created_at")
+            .eq("user_id", user_id)
+        )
+
+    # 1) fetch sessions for user, newest first
+    if after is None and offset:
+        rows = seek(build_query(), "created_at", descending=True).range(offset, offset + limit).execute().data or []
+        sessions, next_cursor = page_of(rows, limit, "created_at")
+    else:
+        sessions, next_cursor = seek_page(build_query, "created_at", limit, after, descending=True)
 
     # 2) for each session, fetch latest message preview
     out = []
-    for s in sessions[offset:]:
+    for s in sessions:
         sid = s.get("id")
         last = (
             supabase
@@ -122,7 +131,7 @@ def get_sessions_for_user(user_id: str, limit: int = 50, offset: int = 0):
             "last_message": last_msg,
         })
 
-    return out
+    return out, next_cursor
 
 
 def update_session_title(session_id: str, title: Optional[str]) -> bool:
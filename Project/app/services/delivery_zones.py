@@ -0,0 +1,234 @@
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+from ..db import get_db
+from .geo import MILES_PER_DEGREE, haversine_miles, parse_coords
+
+# Radius used for restaurants with neither a zone polygon nor a radius.
+DEFAULT_RADIUS_MILES = float(os.getenv("DEFAULT_DELIVERY_RADIUS_MILES", "10"))
+REFRESH_SECONDS = float(os.getenv("DELIVERY_ZONE_REFRESH_SECONDS", "300"))
+
+Ring = List[Tuple[float, float]]  # (lat, lng) vertices
+
+
+def _ring_contains(ring: Ring, lat: float, lng: float) -> bool:
+    """Even-odd ray cast along the latitude line through the point."""
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        lat_i, lng_i = ring[i]
+        lat_j, lng_j = ring[j]
+        if (lat_i > lat) != (lat_j > lat):
+            cross_lng = lng_i + (lat - lat_i) * (lng_j - lng_i) / (lat_j - lat_i)
+            if lng < cross_lng:
+                inside = not inside
+        j = i
+    return inside
+
+
+def _parse_polygons(zone: Any) -> List[List[Ring]]:
+    """GeoJSON Polygon/MultiPolygon -> polygons of (lat, lng) rings."""
+    if not isinstance(zone, dict):
+        return []
+    kind, coords = zone.get("type"), zone.get("coordinates")
+    if kind == "Polygon":
+        coords = [coords]
+    elif kind != "MultiPolygon":
+        return []
+    polygons = []
+    for polygon in coords or []:
+        rings = []
+        for ring in polygon or []:
+            points = [(float(p[1]), float(p[0])) for p in ring]
+            if len(points) >= 3:
+                rings.append(points)
+        if rings:
+            polygons.append(rings)
+    return polygons
+
+
+class DeliveryZone:
+    """Where one restaurant delivers: polygons if it has any, else a circle."""
+
+    __slots__ = ("restaurant_id", "bbox", "center", "radius_miles", "polygons")
+
+    def __init__(
+        self,
+        restaurant_id: Hashable,
+        center: Optional[Tuple[float, float]] = None,
+        radius_miles: Optional[float] = None,
+        polygons: Optional[List[List[Ring]]] = None,
+    ):
+        self.restaurant_id = restaurant_id
+        self.center = center
+        self.radius_miles = radius_miles
+        self.polygons = polygons or []
+        if self.polygons:
+            lats = [p[0] for poly in self.polygons for p in poly[0]]
+            lngs = [p[1] for poly in self.polygons for p in poly[0]]
+            self.bbox = (min(lats), min(lngs), max(lats), max(lngs))
+        else:
+            dlat = radius_miles / MILES_PER_DEGREE
+            dlng = radius_miles / (MILES_PER_DEGREE * max(math.cos(math.radians(center[0])), 1e-6))
+            self.bbox = (center[0] - dlat, center[1] - dlng, center[0] + dlat, center[1] + dlng)
+
+    def contains(self, lat: float, lng: float) -> bool:
+        min_lat, min_lng, max_lat, max_lng = self.bbox
+        if not (min_lat <= lat <= max_lat and min_lng <= lng <= max_lng):
+            return False
+        if self.polygons:
+            # inside the outer ring and not inside an odd number of holes
+            return any(
+                sum(_ring_contains(ring, lat, lng) for ring in rings) % 2 == 1
+                for rings in self.polygons
+            )
+        return haversine_miles(self.center[0], self.center[1], lat, lng) <= self.radius_miles
+
+
+def compile_zone(row: Dict[str, Any], default_radius_miles: float = DEFAULT_RADIUS_MILES) -> Optional[DeliveryZone]:
+    """Zone for a `restaurants` row, or None if it has neither a usable
+    polygon nor coordinates to draw a radius around."""
+    restaurant_id = row.get("id")
+    try:
+        polygons = _parse_polygons(row.get("delivery_zone"))
+    except (TypeError, ValueError, IndexError):
+        polygons = []
+    if polygons:
+        return DeliveryZone(restaurant_id, polygons=polygons)
+    center = parse_coords(row.get("latitude"), row.get("longitude"))
+    if center is None:
+        return None
+    try:
+        radius = float(row.get("delivery_radius_miles") or default_radius_miles)
+    except (TypeError, ValueError):
+        radius = default_radius_miles
+    return DeliveryZone(restaurant_id, center=center, radius_miles=radius)
+
+
+class DeliveryZoneIndex:
+    """Process-local index answering "who delivers here?".
+
+    Each zone is registered in every grid cell its bounding box overlaps,
+    so a lookup visits one cell, prefilters by bounding box and only then
+    runs the exact radius or point-in-polygon test.
+    """
+
+    def __init__(self, refresh_seconds: float = REFRESH_SECONDS, cell_degrees: float = 0.1):
+        self.refresh_seconds = refresh_seconds
+        self.cell_degrees = cell_degrees
+        self._zones: Dict[Hashable, DeliveryZone] = {}
+        self._cells: Dict[Tuple[int, int], Set[Hashable]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._zones)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees))
+
+    def _box_cells(self, zone: DeliveryZone):
+        lat_lo, lng_lo = self._cell(zone.bbox[0], zone.bbox[1])
+        lat_hi, lng_hi = self._cell(zone.bbox[2], zone.bbox[3])
+        for i in range(lat_lo, lat_hi + 1):
+            for j in range(lng_lo, lng_hi + 1):
+                yield (i, j)
+
+    def _add(self, zone: DeliveryZone) -> None:
+        self._discard(zone.restaurant_id)
+        self._zones[zone.restaurant_id] = zone
+        for cell in self._box_cells(zone):
+            self._cells.setdefault(cell, set()).add(zone.restaurant_id)
+
+    def _discard(self, restaurant_id: Hashable) -> None:
+        old = self._zones.pop(restaurant_id, None)
+        if old is None:
+            return
+        for cell in self._box_cells(old):
+            bucket = self._cells.get(cell)
+            if bucket is not None:
+                bucket.discard(restaurant_id)
+                if not bucket:
+                    del self._cells[cell]
+
+    def load(self, rows: Sequence[Dict[str, Any]]) -> None:
+        """Replace the index with zones compiled from `restaurants` rows."""
+        zones: Dict[Hashable, DeliveryZone] = {}
+        cells: Dict[Tuple[int, int], Set[Hashable]] = {}
+        for row in rows:
+            zone = compile_zone(row)
+            if zone is None or zone.restaurant_id is None:
+                continue
+            zones[zone.restaurant_id] = zone
+            for cell in self._box_cells(zone):
+                cells.setdefault(cell, set()).add(zone.restaurant_id)
+        # build aside and swap, so lookups never see a half-loaded index
+        with self._lock:
+            self._zones, self._cells = zones, cells
+
+    def refresh(self, force: bool = False) -> None:
+        """Reload from the database if the TTL has expired.
+
+        A failed reload keeps serving the previous zones.
+        """
+        now = time.monotonic()
+        if not force and self._loaded_at is not None and now - self._loaded_at < self.refresh_seconds:
+            return
+        try:
+            supabase = get_db()
+            rows = supabase.table("restaurants").select(
+                "id, latitude, longitude, delivery_radius_miles, delivery_zone"
+            ).execute().data or []
+            self.load(rows)
+        except Exception as e:
+            print(f"Failed to refresh delivery zone index: {e}")
+        self._loaded_at = now
+
+    def reset(self) -> None:
+        """Drop all zones; the next query reloads from the database."""
+        with self._lock:
+            self._zones, self._cells = {}, {}
+            self._loaded_at = None
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        zone = compile_zone(row)
+        with self._lock:
+            if zone is None:
+                self._discard(row.get("id"))
+            else:
+                self._add(zone)
+
+    def get(self, restaurant_id: Hashable) -> Optional[DeliveryZone]:
+        return self._zones.get(restaurant_id)
+
+    def deliverable(self, lat: float, lng: float) -> List[Hashable]:
+        """Ids of restaurants whose zone contains the point."""
+        self.refresh()
+        hits = []
+        for rid in list(self._cells.get(self._cell(lat, lng), ())):
+            zone = self._zones.get(rid)
+            if zone is not None and zone.contains(lat, lng):
+                hits.append(rid)
+        return hits
+
+    def delivers_to(self, restaurant_id: Hashable, lat: float, lng: float) -> Optional[bool]:
+        """Whether the restaurant delivers to the point; None if its zone is unknown."""
+        self.refresh()
+        zone = self._zones.get(restaurant_id)
+        return None if zone is None else zone.contains(lat, lng)
+
+
+delivery_zones = DeliveryZoneIndex()
+
+
+__all__ = [
+    "DEFAULT_RADIUS_MILES",
+    "REFRESH_SECONDS",
+    "DeliveryZone",
+    "compile_zone",
+    "DeliveryZoneIndex",
+    "delivery_zones",
+]
@@ -0,0 +1,226 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+from ..db import get_db, stream_rows
+from .keyset import Key, seek_list
+
+# "postgres" pages with the list_restaurant_meals SQL function over the
+# stored tag_mask/allergen_mask columns; "memory" filters cached menus.
+BACKEND = os.getenv("DIETARY_FILTER_BACKEND", "postgres").lower()
+MENU_CACHE_SECONDS = float(os.getenv("MENU_CACHE_SECONDS", "30"))
+
+
+def normalize_label(label: Any) -> str:
+    return str(label or "").strip().lower()
+
+
+def parse_labels(text: Optional[str]) -> List[str]:
+    """Comma-separated query parameter -> distinct normalised labels."""
+    return list(dict.fromkeys(l for l in (normalize_label(p) for p in (text or "").split(",")) if l))
+
+
+class LabelCodebook:
+    """Dictionary encoding of tag or allergen labels as bit positions.
+
+    A meal's labels become one integer, so "has all of these tags" and
+    "has none of these allergens" are a single AND each, whatever the
+    number of labels involved.
+    """
+
+    def __init__(self):
+        self._bits: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._bits)
+
+    def labels(self) -> List[str]:
+        """Known labels in bit order."""
+        return sorted(self._bits, key=self._bits.get)
+
+    def encode(self, labels: Optional[Iterable[Any]]) -> int:
+        """Mask for a stored row, assigning bits to labels seen for the first time."""
+        mask = 0
+        for label in labels or ():
+            label = normalize_label(label)
+            if not label:
+                continue
+            bit = self._bits.get(label)
+            if bit is None:
+                with self._lock:
+                    bit = self._bits.setdefault(label, len(self._bits))
+            mask |= 1 << bit
+        return mask
+
+    def lookup(self, labels: Iterable[str]) -> Optional[int]:
+        """Mask for query labels; None if any is unknown (no row carries it)."""
+        mask = 0
+        for label in labels:
+            bit = self._bits.get(normalize_label(label))
+            if bit is None:
+                return None
+            mask |= 1 << bit
+        return mask
+
+    def known(self, labels: Iterable[str]) -> int:
+        """Mask of the query labels that any row carries; unknown ones are dropped."""
+        mask = 0
+        for label in labels:
+            bit = self._bits.get(normalize_label(label))
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def decode(self, mask: int) -> List[str]:
+        return [label for label, bit in self._bits.items() if mask >> bit & 1]
+
+
+class _Menu:
+    __slots__ = ("rows", "tag_masks", "allergen_masks", "loaded_at")
+
+    def __init__(self, rows: List[Dict[str, Any]], tag_masks: List[int], allergen_masks: List[int], loaded_at: float):
+        self.rows = rows
+        self.tag_masks = tag_masks
+        self.allergen_masks = allergen_masks
+        self.loaded_at = loaded_at
+
+
+def _sort_value(row: Dict[str, Any], column: str) -> Any:
+    value = row.get(column)
+    return float(value) if column == "surplus_price" and value is not None else value
+
+
+def _sort_rows(rows: List[Dict[str, Any]], column: str, descending: bool) -> List[Dict[str, Any]]:
+    """Order like list_restaurant_meals: nulls last either way, ties by id."""
+    present = sorted((r for r in rows if r.get(column) is not None), key=lambda r: str(r.get("id")))
+    missing = sorted((r for r in rows if r.get(column) is None), key=lambda r: str(r.get("id")))
+    if column == "surplus_price":
+        present.sort(key=lambda r: float(r[column]), reverse=descending)
+    else:
+        present.sort(key=lambda r: r[column], reverse=descending)
+    return present + missing
+
+
+class DietaryIndex:
+    """Restaurant menus filtered by dietary tags and excluded allergens
+    before pagination.
+
+    The database keeps the masks as stored columns maintained by trigger;
+    the in-memory path encodes each cached menu once per load, after
+    which every filter check is two integer ANDs per meal.
+    """
+
+    def __init__(self, backend: str = BACKEND, cache_seconds: float = MENU_CACHE_SECONDS):
+        self.backend = backend
+        self.cache_seconds = cache_seconds
+        self.tags = LabelCodebook()
+        self.allergens = LabelCodebook()
+        self._menus: Dict[Hashable, _Menu] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, restaurant_id: Hashable, now: float) -> _Menu:
+        supabase = get_db()
+        rows = list(stream_rows(
+            lambda: supabase.table("meals").select("*").eq("restaurant_id", restaurant_id)
+        ))
+        return _Menu(
+            rows,
+            [self.tags.encode(r.get("tags")) for r in rows],
+            [self.allergens.encode(r.get("allergens")) for r in rows],
+            now,
+        )
+
+    def menu(self, restaurant_id: Hashable) -> _Menu:
+        now = time.monotonic()
+        menu = self._menus.get(restaurant_id)
+        if menu is None or now - menu.loaded_at >= self.cache_seconds:
+            menu = self._load(restaurant_id, now)
+            with self._lock:
+                self._menus[restaurant_id] = menu
+        return menu
+
+    def invalidate(self, restaurant_id: Hashable) -> None:
+        """Drop a cached menu after the owner edits it."""
+        with self._lock:
+            self._menus.pop(restaurant_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._menus.clear()
+
+    def filter_menu(
+        self,
+        restaurant_id: Hashable,
+        tags: Iterable[str] = (),
+        exclude_allergens: Iterable[str] = (),
+        surplus_only: bool = False,
+        search: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        menu = self.menu(restaurant_id)
+        required = self.tags.lookup(tags)
+        if required is None:
+            return []
+        excluded = self.allergens.known(exclude_allergens)
+        needle = search.lower() if search else None
+        rows = []
+        for row, tag_mask, allergen_mask in zip(menu.rows, menu.tag_masks, menu.allergen_masks):
+            if tag_mask & required != required or allergen_mask & excluded:
+                continue
+            if surplus_only and not (row.get("quantity") or 0) > 0:
+                continue
+            if needle and needle not in (row.get("name") or "").lower():
+                continue
+            rows.append(row)
+        return rows
+
+    def list_meals(
+        self,
+        restaurant_id: Hashable,
+        tags: List[str],
+        exclude_allergens: List[str],
+        surplus_only: bool = False,
+        search: Optional[str] = None,
+        sort_column: str = "name",
+        descending: bool = False,
+        limit: int = 20,
+        offset: int = 0,
+        after: Optional[Key] = None,
+    ) -> List[Dict[str, Any]]:
+        """One full page of the restaurant's menu matching the filters,
+        starting after the (sort value, id) cursor key if one is given."""
+        if self.backend == "postgres":
+            try:
+                r = get_db().rpc("list_restaurant_meals", {
+                    "p_restaurant_id": restaurant_id,
+                    "p_tags": tags,
+                    "p_exclude_allergens": exclude_allergens,
+                    "p_surplus_only": surplus_only,
+                    "p_search": search,
+                    "p_sort_column": sort_column,
+                    "p_descending": descending,
+                    "p_limit": limit,
+                    "p_offset": offset,
+                    "p_after_value": None if after is None or after[0] is None else str(after[0]),
+                    "p_after_id": None if after is None else after[1],
+                }).execute()
+                return r.data or []
+            except Exception as e:
+                print(f"list_restaurant_meals failed, filtering cached menu: {e}")
+        rows = _sort_rows(self.filter_menu(restaurant_id, tags, exclude_allergens, surplus_only, search), sort_column, descending)
+        start = seek_list(rows, lambda r: (_sort_value(r, sort_column), r.get("id")), after, descending) + offset
+        return rows[start:start + limit]
+
+
+dietary_index = DietaryIndex()
+
+
+__all__ = [
+    "MENU_CACHE_SECONDS",
+    "normalize_label",
+    "parse_labels",
+    "LabelCodebook",
+    "DietaryIndex",
+    "dietary_index",
+]
@@ -0,0 +1,274 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..db import get_db
+from .driver_locations import DriverPosition, driver_locations
+from .geo import EARTH_RADIUS_MILES, METERS_PER_MILE, parse_coords
+from .matrix_cache import matrix_cache
+
+DISPATCH_ENABLED = os.getenv("DISPATCH_ENABLED", "false").lower() in ("1", "true", "yes")
+DISPATCH_INTERVAL_SECONDS = float(os.getenv("DISPATCH_INTERVAL_SECONDS", "15"))
+# Pairs further apart than this are never offered.
+MAX_PICKUP_MILES = float(os.getenv("DISPATCH_MAX_PICKUP_MILES", "15"))
+# Road distance is roughly this much longer than straight-line distance.
+DETOUR_FACTOR = 1.3
+# How long an offer stays valid if the engine does not refresh it.
+OFFER_TTL_SECONDS = 60.0
+
+INFEASIBLE = 1e9
+
+
+def pairwise_miles(
+    a_lat: np.ndarray, a_lng: np.ndarray, b_lat: np.ndarray, b_lng: np.ndarray
+) -> np.ndarray:
+    """Vectorized haversine distance matrix, shape (len(a), len(b))."""
+    a_lat, a_lng = np.radians(a_lat)[:, None], np.radians(a_lng)[:, None]
+    b_lat, b_lng = np.radians(b_lat)[None, :], np.radians(b_lng)[None, :]
+    h = (
+        np.sin((b_lat - a_lat) / 2) ** 2
+        + np.cos(a_lat) * np.cos(b_lat) * np.sin((b_lng - a_lng) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+
+
+def solve_assignment(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Minimum-cost assignment (Hungarian method, shortest augmenting paths).
+
+    Works on rectangular matrices; every row is assigned if rows <= columns,
+    otherwise every column. Returns (row_indices, col_indices) sorted by
+    row. The per-row relaxation step runs over all columns at once in NumPy.
+    """
+    cost = np.asarray(cost, dtype=float)
+    if cost.size == 0:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=int)    # p[j]: row (1-based) matched to column j
+    way = np.zeros(m + 1, dtype=int)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    cols = np.nonzero(p[1:])[0]
+    rows = p[1:][cols] - 1
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+def greedy_assignment(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """First-come-first-served baseline: each column (order), in turn, takes
+    the cheapest row (driver) still free."""
+    cost = np.asarray(cost, dtype=float)
+    free = np.ones(cost.shape[0], dtype=bool)
+    rows, cols = [], []
+    for j in range(cost.shape[1]):
+        if not free.any():
+            break
+        column = np.where(free, cost[:, j], np.inf)
+        i = int(np.argmin(column))
+        free[i] = False
+        rows.append(i)
+        cols.append(j)
+    rows, cols = np.array(rows, dtype=int), np.array(cols, dtype=int)
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+def build_cost_matrix(
+    drivers: Sequence[Tuple[float, float]],
+    restaurants: Sequence[Tuple[Hashable, float, float]],
+    max_pickup_miles: float = MAX_PICKUP_MILES,
+) -> np.ndarray:
+    """Pickup distance in miles from each driver to each order's restaurant.
+
+    Road distances already in the matrix cache are used where present;
+    everything else is the straight-line distance times DETOUR_FACTOR.
+    Pairs beyond `max_pickup_miles` cost INFEASIBLE.
+    """
+    if not drivers or not restaurants:
+        return np.zeros((len(drivers), len(restaurants)))
+    d = np.asarray(drivers, dtype=float)
+    r = np.asarray([(lat, lng) for _, lat, lng in restaurants], dtype=float)
+    cost = pairwise_miles(d[:, 0], d[:, 1], r[:, 0], r[:, 1]) * DETOUR_FACTOR
+
+    if len(matrix_cache):
+        # drivers share cells and orders share restaurants: look each
+        # (cell, restaurant) up once, then scatter over the whole matrix
+        cells: Dict[Hashable, int] = {}
+        driver_cell = np.asarray([cells.setdefault(matrix_cache.cell(lat, lng), len(cells)) for lat, lng in drivers])
+        rids: Dict[Hashable, int] = {}
+        order_rid = np.asarray([rids.setdefault(rid, len(rids)) for rid, _, _ in restaurants])
+        cached = np.full((len(cells), len(rids)), np.nan)
+        for cell, ci in cells.items():
+            for rid, ri in rids.items():
+                entry = matrix_cache.peek(cell, rid)
+                if entry is not None and entry[0] is not None:
+                    cached[ci, ri] = entry[0] / METERS_PER_MILE
+        road = cached[driver_cell[:, None], order_rid[None, :]]
+        cost = np.where(np.isnan(road), cost, road)
+
+    cost[cost > max_pickup_miles] = INFEASIBLE
+    return cost
+
+
+class Offer(NamedTuple):
+    order_id: Any
+    restaurant_id: Any
+    pickup_miles: float
+    expires_at: float
+
+
+class DispatchEngine:
+    """Periodically matches available drivers to ready orders.
+
+    Offers are advisory: a driver still claims an order through
+    `PATCH /deliveries/{order_id}/accept`, which keeps first-come-first-
+    served semantics as the source of truth.
+    """
+
+    def __init__(self, interval_seconds: float = DISPATCH_INTERVAL_SECONDS):
+        self.interval_seconds = interval_seconds
+        self.offers: Dict[Hashable, Offer] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _ready_orders(self) -> List[Dict[str, Any]]:
+        supabase = get_db()
+        result = (
+            supabase.from_("orders")
+            .select("id, restaurant_id, created_at, restaurants(latitude, longitude)")
+            .eq("status", "ready")
+            .is_("delivery_user_id", None)
+            .order("created_at")
+            .execute()
+        )
+        return result.data or []
+
+    def _busy_drivers(self) -> set:
+        supabase = get_db()
+        result = (
+            supabase.table("orders")
+            .select("delivery_user_id")
+            .in_("status", ["assigned", "out-for-delivery"])
+            .execute()
+        )
+        return {row["delivery_user_id"] for row in result.data or []}
+
+    def plan(
+        self,
+        drivers: Dict[Hashable, DriverPosition],
+        orders: List[Dict[str, Any]],
+        now: Optional[float] = None,
+    ) -> Dict[Hashable, Offer]:
+        """Compute offers for the given drivers and orders without side effects."""
+        now = time.monotonic() if now is None else now
+        driver_ids = list(drivers)
+        located = []
+        for o in orders:
+            rest = o.get("restaurants") or {}
+            coords = parse_coords(rest.get("latitude"), rest.get("longitude"))
+            if coords:
+                located.append((o, coords))
+        if not driver_ids or not located:
+            return {}
+
+        cost = build_cost_matrix(
+            [(drivers[d].latitude, drivers[d].longitude) for d in driver_ids],
+            [(o.get("restaurant_id"), lat, lng) for o, (lat, lng) in located],
+        )
+        rows, cols = solve_assignment(cost)
+        offers = {}
+        for i, j in zip(rows, cols):
+            if cost[i, j] >= INFEASIBLE:
+                continue
+            order = located[j][0]
+            offers[driver_ids[i]] = Offer(
+                order["id"], order.get("restaurant_id"), round(float(cost[i, j]), 3), now + OFFER_TTL_SECONDS
+            )
+        return offers
+
+    def run_once(self) -> Dict[Hashable, Offer]:
+        drivers = driver_locations.available()
+        if drivers:
+            busy = self._busy_drivers()
+            drivers = {d: p for d, p in drivers.items() if d not in busy}
+        orders = self._ready_orders() if drivers else []
+        self.offers = self.plan(drivers, orders)
+        return self.offers
+
+    def offer_for(self, driver_id: Hashable, now: Optional[float] = None) -> Optional[Offer]:
+        offer = self.offers.get(driver_id)
+        now = time.monotonic() if now is None else now
+        if offer is None or offer.expires_at <= now:
+            return None
+        return offer
+
+    async def run_forever(self) -> None:
+        while True:
+            try:
+                # the Supabase client is synchronous; keep it off the event loop
+                await asyncio.to_thread(self.run_once)
+            except Exception as e:
+                print(f"Dispatch round failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run_forever())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+dispatch_engine = DispatchEngine()
+
+
+__all__ = [
+    "DISPATCH_ENABLED",
+    "INFEASIBLE",
+    "pairwise_miles",
+    "solve_assignment",
+    "greedy_assignment",
+    "build_cost_matrix",
+    "Offer",
+    "DispatchEngine",
+    "dispatch_engine",
+]
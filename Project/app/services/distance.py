@@ -0,0 +1,252 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import httpx
+import requests
+
+from .geo import METERS_PER_MILE, haversine_miles
+
+LatLng = Tuple[float, float]
+# (distance_meters, duration_seconds); None when there is no road route
+Leg = Optional[Tuple[float, float]]
+
+
+class DistanceProviderError(Exception):
+    """The provider could not answer (misconfigured, network, bad response)."""
+
+
+class DistanceProvider(ABC):
+    """Road distance and travel time between coordinates.
+
+    `route` answers a single origin/destination pair and is synchronous,
+    for request handlers that already block. `matrix` answers one source
+    against many destinations and is async. Implementations return None
+    for a leg that has no route and raise DistanceProviderError when the
+    provider itself fails.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def route(self, origin: LatLng, dest: LatLng) -> Leg:
+        ...
+
+    @abstractmethod
+    async def matrix(self, source: LatLng, dests: Sequence[LatLng]) -> List[Leg]:
+        ...
+
+
+class MapboxProvider(DistanceProvider):
+    """Mapbox Directions and Matrix APIs.
+
+    `base_url` can point at the local stand-in (app/scripts/mapbox_standin.py)
+    for offline load tests.
+    """
+
+    name = "mapbox"
+
+    def __init__(self, base_url: Optional[str] = None, token: Optional[str] = None, timeout: float = 20.0):
+        self.base_url = (base_url or os.getenv("MAPBOX_BASE_URL") or "https://api.mapbox.com").rstrip("/")
+        self._token = token
+        self.timeout = timeout
+        self._ssl_context = None
+
+    @property
+    def token(self) -> Optional[str]:
+        # read at call time so a token added to the environment is picked up
+        return self._token or os.getenv("NEXT_PUBLIC_MAPBOX_TOKEN") or os.getenv("MAPBOX_TOKEN")
+
+    def _require_token(self) -> str:
+        token = self.token
+        if not token:
+            raise DistanceProviderError("Mapbox token not configured")
+        return token
+
+    def route(self, origin: LatLng, dest: LatLng) -> Leg:
+        token = self._require_token()
+        url = (
+            f"{self.base_url}/directions/v5/mapbox/driving/"
+            f"{origin[1]},{origin[0]};{dest[1]},{dest[0]}"
+        )
+        params = {"access_token": token, "geometries": "geojson"}
+        try:
+            response = requests.get(url, params=params, timeout=10)
+            response.raise_for_status()
+            data = response.json()
+        except requests.RequestException as e:
+            raise DistanceProviderError(str(e)) from e
+        if not data.get("routes"):
+            return None
+        route = data["routes"][0]
+        return float(route["distance"]), float(route["duration"])
+
+    async def matrix(self, source: LatLng, dests: Sequence[LatLng]) -> List[Leg]:
+        token = self._require_token()
+        if not dests:
+            return []
+        coordinates_str = ";".join(f"{lng},{lat}" for lat, lng in [source, *dests])
+        url = f"{self.base_url}/directions-matrix/v1/mapbox/driving/{coordinates_str}"
+        params = {"access_token": token, "sources": "0", "annotations": "distance,duration"}
+        if self._ssl_context is None:
+            # building the default context costs ~30 ms; do it once, not per request
+            self._ssl_context = httpx.create_ssl_context()
+        try:
+            async with httpx.AsyncClient(timeout=self.timeout, verify=self._ssl_context) as client:
+                resp = await client.get(url, params=params)
+                resp.raise_for_status()
+                data = resp.json()
+        except httpx.HTTPError as e:
+            raise DistanceProviderError(str(e)) from e
+
+        distances = (data.get("distances") or [[None] * (len(dests) + 1)])[0][1:]
+        durations = (data.get("durations") or [[None] * (len(dests) + 1)])[0][1:]
+        return [
+            (float(d), float(t)) if d is not None and t is not None else None
+            for d, t in zip(distances, durations)
+        ]
+
+
+class HaversineProvider(DistanceProvider):
+    """Offline estimate: straight-line distance times a detour factor, at a
+    constant average speed. Optional artificial latency for load tests."""
+
+    name = "haversine"
+
+    def __init__(self, detour_factor: float = 1.3, speed_mph: float = 25.0, latency_seconds: float = 0.0):
+        self.detour_factor = detour_factor
+        self.speed_mph = speed_mph
+        self.latency_seconds = latency_seconds
+
+    def estimate(self, origin: LatLng, dest: LatLng) -> Tuple[float, float]:
+        miles = haversine_miles(origin[0], origin[1], dest[0], dest[1]) * self.detour_factor
+        return miles * METERS_PER_MILE, miles / self.speed_mph * 3600
+
+    def route(self, origin: LatLng, dest: LatLng) -> Leg:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return self.estimate(origin, dest)
+
+    async def matrix(self, source: LatLng, dests: Sequence[LatLng]) -> List[Leg]:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return [self.estimate(source, d) for d in dests]
+
+
+def _pair_key(origin: LatLng, dest: LatLng) -> str:
+    return f"{origin[0]:.5f},{origin[1]:.5f};{dest[0]:.5f},{dest[1]:.5f}"
+
+
+class FixtureProvider(DistanceProvider):
+    """Replays recorded legs from a JSON file of {"lat,lng;lat,lng": [m, s]}.
+
+    With a `fallback` provider, misses are answered by it and recorded;
+    call save() to write them back. Without one, a miss raises
+    DistanceProviderError so tests notice unrecorded pairs.
+    """
+
+    name = "fixture"
+
+    def __init__(self, path: Optional[str] = None, fallback: Optional[DistanceProvider] = None):
+        self.path = path
+        self.fallback = fallback
+        self._legs: Dict[str, Leg] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self._legs = {k: tuple(v) if v is not None else None for k, v in json.load(f).items()}
+
+    def __len__(self) -> int:
+        return len(self._legs)
+
+    def record(self, origin: LatLng, dest: LatLng, leg: Leg) -> None:
+        with self._lock:
+            self._legs[_pair_key(origin, dest)] = leg
+
+    def save(self, path: Optional[str] = None) -> None:
+        path = path or self.path
+        if not path:
+            raise DistanceProviderError("no fixture path to save to")
+        with self._lock:
+            data = {k: list(v) if v is not None else None for k, v in sorted(self._legs.items())}
+        with open(path, "w") as f:
+            json.dump(data, f, indent=1)
+
+    def _lookup(self, origin: LatLng, dest: LatLng) -> Tuple[bool, Leg]:
+        key = _pair_key(origin, dest)
+        if key in self._legs:
+            return True, self._legs[key]
+        return False, None
+
+    def route(self, origin: LatLng, dest: LatLng) -> Leg:
+        found, leg = self._lookup(origin, dest)
+        if found:
+            return leg
+        if self.fallback is None:
+            raise DistanceProviderError(f"no recorded leg for {_pair_key(origin, dest)}")
+        leg = self.fallback.route(origin, dest)
+        self.record(origin, dest, leg)
+        return leg
+
+    async def matrix(self, source: LatLng, dests: Sequence[LatLng]) -> List[Leg]:
+        legs: List[Leg] = [None] * len(dests)
+        missing = []
+        for i, d in enumerate(dests):
+            found, leg = self._lookup(source, d)
+            if found:
+                legs[i] = leg
+            else:
+                missing.append(i)
+        if missing:
+            if self.fallback is None:
+                raise DistanceProviderError(
+                    f"no recorded leg for {_pair_key(source, dests[missing[0]])}"
+                )
+            fetched = await self.fallback.matrix(source, [dests[i] for i in missing])
+            for i, leg in zip(missing, fetched):
+                legs[i] = leg
+                self.record(source, dests[i], leg)
+        return legs
+
+
+_provider: Optional[DistanceProvider] = None
+
+
+def _provider_from_env() -> DistanceProvider:
+    kind = os.getenv("DISTANCE_PROVIDER", "mapbox").lower()
+    if kind == "haversine":
+        return HaversineProvider(latency_seconds=float(os.getenv("DISTANCE_PROVIDER_LATENCY_MS", "0")) / 1000)
+    if kind == "fixture":
+        return FixtureProvider(os.getenv("DISTANCE_FIXTURE_PATH"))
+    if kind != "mapbox":
+        print(f"WARNING: unknown DISTANCE_PROVIDER {kind!r}, using mapbox")
+    return MapboxProvider()
+
+
+def get_distance_provider() -> DistanceProvider:
+    """The process-wide provider, chosen by DISTANCE_PROVIDER on first use."""
+    global _provider
+    if _provider is None:
+        _provider = _provider_from_env()
+    return _provider
+
+
+def set_distance_provider(provider: Optional[DistanceProvider]) -> None:
+    """Swap the provider (benchmarks, tests); None re-reads the environment."""
+    global _provider
+    _provider = provider
+
+
+__all__ = [
+    "DistanceProviderError",
+    "DistanceProvider",
+    "MapboxProvider",
+    "HaversineProvider",
+    "FixtureProvider",
+    "get_distance_provider",
+    "set_distance_provider",
+]
@@ -0,0 +1,158 @@
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional
+
+from ..db import get_db, stream_rows
+from .analytics_window import bucket_label, bucket_range, bucket_start
+
+
+def record_delivery(order_id: str) -> bool:
+    """Fold a delivered order into `driver_daily_earnings`.
+
+    The `record_driver_delivery` SQL function claims the order via
+    `orders.driver_rolled_up_at`, so repeated calls are harmless. Returns True
+    if the order was newly recorded.
+    """
+    supabase = get_db()
+    r = supabase.rpc("record_driver_delivery", {"p_order_id": order_id}).execute()
+    return bool(getattr(r, "data", None))
+
+
+def safe_record_delivery(order_id: str, status: Optional[str]) -> None:
+    """Best-effort hook for status transitions; never fails the caller."""
+    if status != "delivered":
+        return
+    try:
+        record_delivery(order_id)
+    except Exception as exc:
+        # the backfill command picks up anything missed here
+        print(f"Failed to record driver earnings for order {order_id}: {exc}")
+
+
+def backfill(driver_id: Optional[str] = None, batch_size: int = 1000) -> int:
+    """Build driver daily earnings for delivered orders not yet recorded."""
+    supabase = get_db()
+    total = 0
+    while True:
+        r = supabase.rpc(
+            "backfill_driver_earnings",
+            {"p_driver_id": driver_id, "p_limit": batch_size},
+        ).execute()
+        processed = int(r.data or 0)
+        total += processed
+        if processed < batch_size:
+            return total
+
+
+def stream_daily_rows(
+    driver_id: str,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Yield a driver's (day, restaurant) earnings rows for an inclusive range.
+
+    There is at most one row per restaurant per active day, so a year of
+    history is a few hundred rows regardless of delivery volume.
+    """
+    supabase = get_db()
+
+    def build_query():
+        query = supabase.table("driver_daily_earnings").select(
+            "day, restaurant_id, deliveries, delivery_fees, tips, restaurants(name)"
+        ).eq("driver_id", driver_id)
+        if date_from:
+            query = query.gte("day", date_from.isoformat())
+        if date_to:
+            query = query.lte("day", date_to.isoformat())
+        return query
+
+    return stream_rows(build_query, "day", "restaurant_id")
+
+
+class EarningsBucketer:
+    """Single-pass accumulator for driver earnings.
+
+    Each record is added once with an already-parsed day; totals, the
+    per-restaurant leaderboard and the chart buckets are all updated from
+    that one call, so no input is rescanned per bucket.
+    """
+
+    __slots__ = (
+        "granularity", "chart_from", "chart_to",
+        "deliveries", "delivery_fees", "tips",
+        "_restaurants", "_buckets",
+    )
+
+    def __init__(self, granularity: str, chart_from: Optional[date], chart_to: date):
+        self.granularity = granularity
+        self.chart_from = chart_from
+        self.chart_to = chart_to
+        self.deliveries = 0
+        self.delivery_fees = 0.0
+        self.tips = 0.0
+        self._restaurants: Dict[Any, List[Any]] = {}
+        self._buckets: Dict[date, List[float]] = {}
+
+    def add(
+        self,
+        day: date,
+        restaurant_id: Any,
+        restaurant_name: Optional[str],
+        deliveries: int,
+        delivery_fees: float,
+        tips: float,
+    ) -> None:
+        earnings = delivery_fees + tips
+        self.deliveries += deliveries
+        self.delivery_fees += delivery_fees
+        self.tips += tips
+
+        stats = self._restaurants.get(restaurant_id)
+        if stats is None:
+            stats = self._restaurants[restaurant_id] = [restaurant_name, 0, 0.0]
+        stats[1] += deliveries
+        stats[2] += earnings
+
+        if (self.chart_from is None or self.chart_from <= day) and day <= self.chart_to:
+            bucket = bucket_start(day, self.granularity)
+            entry = self._buckets.get(bucket)
+            if entry is None:
+                entry = self._buckets[bucket] = [0.0, 0]
+            entry[0] += earnings
+            entry[1] += deliveries
+
+    @property
+    def earnings(self) -> float:
+        return self.delivery_fees + self.tips
+
+    def top_restaurants(self, limit: int = 5) -> List[Dict[str, Any]]:
+        ranked = sorted(self._restaurants.items(), key=lambda kv: kv[1][1], reverse=True)[:limit]
+        return [
+            {"id": rid, "name": name, "deliveries": count, "earnings": round(earnings, 2)}
+            for rid, (name, count, earnings) in ranked
+        ]
+
+    def series(self) -> List[Dict[str, Any]]:
+        """Gap-free chart buckets between chart_from and chart_to."""
+        chart_from = self.chart_from
+        if chart_from is None:
+            # open-ended windows start the chart at the first delivery seen
+            chart_from = min(self._buckets) if self._buckets else self.chart_to
+        out = []
+        for bucket in bucket_range(chart_from, self.chart_to, self.granularity):
+            earnings, deliveries = self._buckets.get(bucket, (0.0, 0))
+            out.append({
+                "date": bucket.strftime("%Y-%m-%d"),
+                "day": bucket_label(bucket, self.granularity),
+                "earnings": round(earnings, 2),
+                "deliveries": deliveries,
+            })
+        return out
+
+
+__all__ = [
+    "record_delivery",
+    "safe_record_delivery",
+    "backfill",
+    "stream_daily_rows",
+    "EarningsBucketer",
+]
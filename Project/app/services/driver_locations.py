@@ -0,0 +1,194 @@
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from ..db import get_db
+from .geo import GeoGrid
+
+# Drivers who have not sent a heartbeat for this long are treated as offline.
+STALE_SECONDS = float(os.getenv("DRIVER_LOCATION_STALE_SECONDS", "60"))
+# How often positions are written to `driver_locations`; 0 disables it.
+SNAPSHOT_SECONDS = float(os.getenv("DRIVER_LOCATION_SNAPSHOT_SECONDS", "0"))
+# Stale entries are swept at most this often, so heartbeats stay O(1).
+SWEEP_SECONDS = 5.0
+
+
+class DriverPosition(NamedTuple):
+    latitude: float
+    longitude: float
+    seen_at: float  # time.monotonic() of the last heartbeat
+    available: bool
+
+
+class DriverLocationIndex:
+    """In-memory index of where active drivers are.
+
+    Heartbeats replace a driver's previous entry. Only drivers that are
+    available and seen within `stale_seconds` appear in queries. A single
+    short lock guards writes and the small read sections.
+    """
+
+    def __init__(
+        self,
+        stale_seconds: float = STALE_SECONDS,
+        snapshot_seconds: float = SNAPSHOT_SECONDS,
+        cell_degrees: float = 0.01,
+    ):
+        self.stale_seconds = stale_seconds
+        self.snapshot_seconds = snapshot_seconds
+        self._grid = GeoGrid(cell_degrees)
+        self._positions: Dict[Hashable, DriverPosition] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self._last_snapshot = time.monotonic()
+        self._dirty: Dict[Hashable, DriverPosition] = {}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def update(
+        self,
+        driver_id: Hashable,
+        latitude: float,
+        longitude: float,
+        available: bool = True,
+        now: Optional[float] = None,
+    ) -> None:
+        now = time.monotonic() if now is None else now
+        position = DriverPosition(latitude, longitude, now, available)
+        with self._lock:
+            self._positions[driver_id] = position
+            self._dirty[driver_id] = position
+            if available:
+                self._grid.upsert(driver_id, latitude, longitude)
+            else:
+                self._grid.remove(driver_id)
+        if now - self._last_sweep >= SWEEP_SECONDS:
+            self.evict_stale(now)
+
+    def remove(self, driver_id: Hashable) -> None:
+        with self._lock:
+            self._positions.pop(driver_id, None)
+            self._dirty.pop(driver_id, None)
+            self._grid.remove(driver_id)
+
+    def evict_stale(self, now: Optional[float] = None) -> int:
+        now = time.monotonic() if now is None else now
+        cutoff = now - self.stale_seconds
+        with self._lock:
+            stale = [d for d, p in self._positions.items() if p.seen_at < cutoff]
+            for driver_id in stale:
+                del self._positions[driver_id]
+                self._grid.remove(driver_id)
+            self._last_sweep = now
+        return len(stale)
+
+    def _fresh(self, driver_id: Hashable, cutoff: float) -> bool:
+        p = self._positions.get(driver_id)
+        return p is not None and p.available and p.seen_at >= cutoff
+
+    def get(self, driver_id: Hashable, now: Optional[float] = None) -> Optional[DriverPosition]:
+        now = time.monotonic() if now is None else now
+        p = self._positions.get(driver_id)
+        if p is None or p.seen_at < now - self.stale_seconds:
+            return None
+        return p
+
+    def within(
+        self, lat: float, lng: float, radius_miles: float, now: Optional[float] = None
+    ) -> List[Tuple[float, Hashable]]:
+        """(distance_miles, driver_id) for available drivers, nearest first."""
+        cutoff = (time.monotonic() if now is None else now) - self.stale_seconds
+        with self._lock:
+            hits = self._grid.within(lat, lng, radius_miles)
+            return [h for h in hits if self._fresh(h[1], cutoff)]
+
+    def nearest(
+        self,
+        lat: float,
+        lng: float,
+        k: int = 1,
+        max_radius_miles: float = 25.0,
+        now: Optional[float] = None,
+    ) -> List[Tuple[float, Hashable]]:
+        cutoff = (time.monotonic() if now is None else now) - self.stale_seconds
+        with self._lock:
+            # ask for extra so stale entries not yet swept can be skipped
+            hits = self._grid.nearest(lat, lng, k + 8, max_radius_miles)
+            return [h for h in hits if self._fresh(h[1], cutoff)][:k]
+
+    def available(self, now: Optional[float] = None) -> Dict[Hashable, DriverPosition]:
+        """Snapshot of every available, non-stale driver."""
+        cutoff = (time.monotonic() if now is None else now) - self.stale_seconds
+        with self._lock:
+            return {d: p for d, p in self._positions.items() if p.available and p.seen_at >= cutoff}
+
+    def density(self, cell_degrees: float = 0.01, now: Optional[float] = None) -> Dict[Tuple[float, float], int]:
+        """Available drivers per cell, keyed by the cell's south-west corner."""
+        counts: Dict[Tuple[float, float], int] = {}
+        for p in self.available(now).values():
+            key = (
+                round(math.floor(p.latitude / cell_degrees) * cell_degrees, 6),
+                round(math.floor(p.longitude / cell_degrees) * cell_degrees, 6),
+            )
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def snapshot_due(self, now: Optional[float] = None) -> bool:
+        if self.snapshot_seconds <= 0 or not self._dirty:
+            return False
+        now = time.monotonic() if now is None else now
+        return now - self._last_snapshot >= self.snapshot_seconds
+
+    def snapshot(self, now: Optional[float] = None) -> int:
+        """Upsert positions changed since the last snapshot into `driver_locations`."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            self._last_snapshot = now
+        if not dirty:
+            return 0
+        wall_now = time.time()
+        rows = [
+            {
+                "driver_id": driver_id,
+                "latitude": p.latitude,
+                "longitude": p.longitude,
+                "available": p.available,
+                "updated_at": datetime.fromtimestamp(
+                    wall_now - (now - p.seen_at), tz=timezone.utc
+                ).isoformat(),
+            }
+            for driver_id, p in dirty.items()
+        ]
+        try:
+            get_db().table("driver_locations").upsert(rows).execute()
+        except Exception as e:
+            print(f"Failed to snapshot driver locations: {e}")
+            with self._lock:
+                # keep newer heartbeats that arrived meanwhile
+                for driver_id, p in dirty.items():
+                    self._dirty.setdefault(driver_id, p)
+            return 0
+        return len(rows)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._positions.clear()
+            self._dirty.clear()
+            self._grid = GeoGrid(self._grid.cell_degrees)
+
+
+driver_locations = DriverLocationIndex()
+
+
+__all__ = [
+    "STALE_SECONDS",
+    "SNAPSHOT_SECONDS",
+    "DriverPosition",
+    "DriverLocationIndex",
+    "driver_locations",
+]
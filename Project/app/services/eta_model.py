@@ -0,0 +1,305 @@
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+
+from ..db import get_db, stream_rows
+from .analytics_window import parse_timestamp
+
+# Where the trainer writes coefficients and the API reads them from.
+MODEL_PATH = os.getenv("ETA_MODEL_PATH", "eta_model.json")
+# Upper edges (miles) of the distance bands; the last band is open-ended.
+DISTANCE_BANDS = (1.0, 2.0, 3.0, 5.0, 8.0, 12.0)
+# Shrinkage towards the global fit for restaurants, bands and hours with
+# few samples, in units of "pseudo-orders".
+RIDGE = 5.0
+# Durations outside this range (minutes) are treated as bad data.
+MAX_MINUTES = 180.0
+
+PREP_START = ("accepted", "preparing")
+# Pickup when recorded; assignment (which includes the drive to the
+# restaurant) only as a fallback.
+TRAVEL_START = ("out-for-delivery", "out_for_delivery", "assigned")
+TRAVEL_END = ("delivered", "completed")
+
+
+class EtaSamples(NamedTuple):
+    restaurant_ids: List[Any]
+    prep_minutes: np.ndarray  # NaN where the order has no prep interval
+    miles: np.ndarray
+    hours: np.ndarray
+    travel_minutes: np.ndarray  # NaN where the order has no travel interval
+
+    def prep_ok(self) -> np.ndarray:
+        """Mask of orders with a usable prep interval."""
+        return _valid(self.prep_minutes)
+
+    def travel_ok(self) -> np.ndarray:
+        """Mask of orders with a usable travel interval and distance."""
+        return _valid(self.travel_minutes) & np.isfinite(self.miles) & (self.miles >= 0)
+
+
+def _first(events: Dict[str, datetime], statuses: Iterable[str]) -> Optional[datetime]:
+    """Time of the first status in `statuses` (in priority order) the order reached."""
+    for status in statuses:
+        if status in events:
+            return events[status]
+    return None
+
+
+def extract_samples(orders: Iterable[Dict[str, Any]]) -> EtaSamples:
+    """Turn delivered orders with embedded `order_status_events` into
+    prep and travel durations."""
+    restaurant_ids, prep, miles, hours, travel = [], [], [], [], []
+    for order in orders:
+        events: Dict[str, datetime] = {}
+        for e in order.get("order_status_events") or []:
+            if e.get("status") and e.get("created_at"):
+                at = parse_timestamp(e["created_at"])
+                # keep the first time each status was reached
+                if e["status"] not in events or at < events[e["status"]]:
+                    events[e["status"]] = at
+        try:
+            distance = float(order.get("distance_restaurant_delivery"))
+        except (TypeError, ValueError):
+            distance = np.nan
+
+        prep_start, ready = _first(events, PREP_START), events.get("ready")
+        travel_start, travel_end = _first(events, TRAVEL_START), _first(events, TRAVEL_END)
+        if prep_start is None and travel_start is None:
+            continue
+        restaurant_ids.append(order.get("restaurant_id"))
+        prep.append((ready - prep_start).total_seconds() / 60 if prep_start and ready else np.nan)
+        if travel_start and travel_end:
+            travel.append((travel_end - travel_start).total_seconds() / 60)
+            hours.append(travel_start.hour)
+        else:
+            travel.append(np.nan)
+            hours.append(0)
+        miles.append(distance)
+
+    return EtaSamples(
+        restaurant_ids,
+        np.asarray(prep, dtype=float),
+        np.asarray(miles, dtype=float),
+        np.asarray(hours, dtype=int),
+        np.asarray(travel, dtype=float),
+    )
+
+
+def _valid(minutes: np.ndarray) -> np.ndarray:
+    return np.isfinite(minutes) & (minutes > 0) & (minutes <= MAX_MINUTES)
+
+
+def _band(miles: float) -> int:
+    for i, edge in enumerate(DISTANCE_BANDS):
+        if miles < edge:
+            return i
+    return len(DISTANCE_BANDS)
+
+
+class EtaModel:
+    """Additive ETA model.
+
+    prep    = prep_base + restaurant offset
+    travel  = travel_base + per_mile * miles + band offset + hour offset
+
+    Offsets are ridge-shrunk towards zero so sparse restaurants, bands and
+    hours fall back to the global fit. Prediction is a handful of dict and
+    list lookups.
+    """
+
+    __slots__ = (
+        "prep_base", "prep_by_restaurant", "travel_base", "per_mile",
+        "band_offsets", "hour_offsets", "samples", "trained_at",
+    )
+
+    def __init__(
+        self,
+        prep_base: float = 15.0,
+        prep_by_restaurant: Optional[Dict[str, float]] = None,
+        travel_base: float = 5.0,
+        per_mile: float = 2.5,
+        band_offsets: Optional[List[float]] = None,
+        hour_offsets: Optional[List[float]] = None,
+        samples: int = 0,
+        trained_at: Optional[str] = None,
+    ):
+        self.prep_base = prep_base
+        self.prep_by_restaurant = prep_by_restaurant or {}
+        self.travel_base = travel_base
+        self.per_mile = per_mile
+        self.band_offsets = band_offsets or [0.0] * (len(DISTANCE_BANDS) + 1)
+        self.hour_offsets = hour_offsets or [0.0] * 24
+        self.samples = samples
+        self.trained_at = trained_at
+
+    def prep_minutes(self, restaurant_id) -> float:
+        return max(0.0, self.prep_base + self.prep_by_restaurant.get(str(restaurant_id), 0.0))
+
+    def travel_minutes(self, miles: float, hour: int) -> float:
+        return max(
+            0.0,
+            self.travel_base + self.per_mile * miles
+            + self.band_offsets[_band(miles)] + self.hour_offsets[hour % 24],
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "EtaModel":
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+
+    def save(self, path: str = MODEL_PATH) -> None:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = MODEL_PATH) -> "EtaModel":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def fit(samples: EtaSamples, ridge: float = RIDGE) -> EtaModel:
+    """Fit an EtaModel from extracted samples."""
+    model = EtaModel(samples=len(samples.restaurant_ids))
+    model.trained_at = datetime.now(timezone.utc).isoformat()
+
+    # Prep: one offset per restaurant. With the base fixed at the mean the
+    # ridge solution is closed form, so this stays O(n) however many
+    # restaurants there are.
+    ok = samples.prep_ok()
+    if ok.any():
+        y = samples.prep_minutes[ok]
+        rids = [str(r) for r, keep in zip(samples.restaurant_ids, ok) if keep]
+        names, idx = np.unique(np.asarray(rids, dtype=object), return_inverse=True)
+        model.prep_base = float(y.mean())
+        sums = np.bincount(idx, weights=y - model.prep_base, minlength=len(names))
+        counts = np.bincount(idx, minlength=len(names))
+        offsets = sums / (counts + ridge)
+        model.prep_by_restaurant = {str(n): round(float(o), 3) for n, o in zip(names, offsets)}
+
+    # Travel: least squares over [1, miles, band one-hot, hour one-hot], with
+    # ridge rows appended for the one-hot columns only.
+    ok = samples.travel_ok()
+    if ok.sum() >= 2:
+        miles = samples.miles[ok]
+        hours = samples.hours[ok] % 24
+        bands = np.searchsorted(np.asarray(DISTANCE_BANDS), miles, side="right")
+        n_bands = len(DISTANCE_BANDS) + 1
+        n = len(miles)
+        X = np.zeros((n, 2 + n_bands + 24))
+        X[:, 0] = 1.0
+        X[:, 1] = miles
+        X[np.arange(n), 2 + bands] = 1.0
+        X[np.arange(n), 2 + n_bands + hours] = 1.0
+        penalty = np.zeros((n_bands + 24, X.shape[1]))
+        penalty[:, 2:] = np.eye(n_bands + 24) * np.sqrt(ridge)
+        A = np.vstack([X, penalty])
+        b = np.concatenate([samples.travel_minutes[ok], np.zeros(n_bands + 24)])
+        coef, *_ = np.linalg.lstsq(A, b, rcond=None)
+        model.travel_base = round(float(coef[0]), 4)
+        model.per_mile = round(float(coef[1]), 4)
+        model.band_offsets = [round(float(c), 4) for c in coef[2:2 + n_bands]]
+        model.hour_offsets = [round(float(c), 4) for c in coef[2 + n_bands:]]
+
+    return model
+
+
+def stream_training_orders(restaurant_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Delivered orders with their status timeline, oldest first."""
+    supabase = get_db()
+
+    def build_query():
+        query = supabase.table("orders").select(
+            "id, restaurant_id, created_at, distance_restaurant_delivery, order_status_events(status, created_at)"
+        ).in_("status", list(TRAVEL_END))
+        if restaurant_id:
+            query = query.eq("restaurant_id", restaurant_id)
+        return query
+
+    return stream_rows(build_query, "created_at")
+
+
+def train(path: str = MODEL_PATH, restaurant_id: Optional[str] = None) -> EtaModel:
+    """Fit from order history, save to `path` and serve it in this process."""
+    model = fit(extract_samples(stream_training_orders(restaurant_id)))
+    model.save(path)
+    set_eta_model(model)
+    return model
+
+
+_model: Optional[EtaModel] = None
+_model_lock = threading.Lock()
+
+
+def get_eta_model() -> EtaModel:
+    """The served model: the trained file if present, otherwise defaults."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                try:
+                    _model = EtaModel.load(MODEL_PATH)
+                except FileNotFoundError:
+                    _model = EtaModel()
+                except (OSError, ValueError, TypeError) as e:
+                    print(f"Failed to load ETA model from {MODEL_PATH}: {e}")
+                    _model = EtaModel()
+    return _model
+
+
+def set_eta_model(model: Optional[EtaModel]) -> None:
+    """Swap the served model; None reloads from MODEL_PATH on next use."""
+    global _model
+    _model = model
+
+
+PREP_PENDING = {"pending", "accepted", "preparing"}
+TRAVEL_PENDING = PREP_PENDING | {"ready", "assigned", "out-for-delivery", "out_for_delivery"}
+
+
+def predict_eta(order: Dict[str, Any], now: Optional[datetime] = None) -> Optional[Dict[str, float]]:
+    """Minutes until the order is ready and delivered, from its status,
+    restaurant and restaurant-to-customer distance. None once the order is
+    finished or cancelled."""
+    status = order.get("status")
+    if status not in TRAVEL_PENDING:
+        return None
+    model = get_eta_model()
+    hour = (now or datetime.now(timezone.utc)).hour
+    prep = model.prep_minutes(order.get("restaurant_id")) if status in PREP_PENDING else 0.0
+    try:
+        miles = float(order.get("distance_restaurant_delivery"))
+        travel = model.travel_minutes(miles, hour)
+    except (TypeError, ValueError):
+        # no stored distance; fall back to the checkout-time route duration
+        try:
+            travel = float(order.get("duration_restaurant_delivery"))
+        except (TypeError, ValueError):
+            travel = model.travel_base
+    return {
+        "prep_minutes": round(prep, 1),
+        "travel_minutes": round(travel, 1),
+        "total_minutes": round(prep + travel, 1),
+    }
+
+
+__all__ = [
+    "MODEL_PATH",
+    "DISTANCE_BANDS",
+    "EtaSamples",
+    "EtaModel",
+    "extract_samples",
+    "fit",
+    "train",
+    "get_eta_model",
+    "set_eta_model",
+    "predict_eta",
+]
@@ -0,0 +1,131 @@
+import math
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+EARTH_RADIUS_MILES = 3958.8
+METERS_PER_MILE = 1609.34
+# One degree of latitude, in miles.
+MILES_PER_DEGREE = 69.0
+
+
+def haversine_miles(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle (straight-line) distance in miles."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(a)))
+
+
+def parse_coords(lat: Any, lng: Any) -> Optional[Tuple[float, float]]:
+    """(lat, lng) as floats, or None if either is missing or out of range."""
+    try:
+        if lat is None or lng is None:
+            return None
+        lat, lng = float(lat), float(lng)
+    except (TypeError, ValueError):
+        return None
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lng <= 180.0):
+        return None
+    return lat, lng
+
+
+class GeoGrid:
+    """Fixed-size lat/lng bucket grid for radius and nearest-point queries.
+
+    Points are bucketed into `cell_degrees` squares. A radius query only
+    visits the cells overlapping the search box and then checks the exact
+    haversine distance, so cost depends on local density rather than on the
+    total number of points.
+    """
+
+    __slots__ = ("cell_degrees", "_cells", "_points")
+
+    def __init__(self, cell_degrees: float = 0.05):
+        self.cell_degrees = cell_degrees
+        self._cells: Dict[Tuple[int, int], Dict[Hashable, Tuple[float, float]]] = {}
+        self._points: Dict[Hashable, Tuple[float, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._points
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees))
+
+    def get(self, key: Hashable) -> Optional[Tuple[float, float]]:
+        return self._points.get(key)
+
+    def upsert(self, key: Hashable, lat: float, lng: float) -> None:
+        old = self._points.get(key)
+        if old is not None:
+            if old == (lat, lng):
+                return
+            self.remove(key)
+        self._points[key] = (lat, lng)
+        self._cells.setdefault(self._cell(lat, lng), {})[key] = (lat, lng)
+
+    def remove(self, key: Hashable) -> None:
+        old = self._points.pop(key, None)
+        if old is None:
+            return
+        cell = self._cell(*old)
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self._cells[cell]
+
+    def items(self) -> Iterator[Tuple[Hashable, Tuple[float, float]]]:
+        return iter(self._points.items())
+
+    def _cells_within(self, lat: float, lng: float, radius_miles: float) -> Iterator[Dict]:
+        dlat = radius_miles / MILES_PER_DEGREE
+        # longitude degrees shrink towards the poles
+        cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+        dlng = min(180.0, radius_miles / (MILES_PER_DEGREE * cos_lat))
+        lat_lo, lng_lo = self._cell(lat - dlat, lng - dlng)
+        lat_hi, lng_hi = self._cell(lat + dlat, lng + dlng)
+        if (lat_hi - lat_lo + 1) * (lng_hi - lng_lo + 1) > len(self._cells):
+            # the box covers more cells than are occupied; scan occupied ones
+            yield from self._cells.values()
+            return
+        for i in range(lat_lo, lat_hi + 1):
+            for j in range(lng_lo, lng_hi + 1):
+                bucket = self._cells.get((i, j))
+                if bucket:
+                    yield bucket
+
+    def within(
+        self, lat: float, lng: float, radius_miles: float, limit: Optional[int] = None
+    ) -> List[Tuple[float, Hashable]]:
+        """(distance_miles, key) pairs within the radius, nearest first."""
+        hits = []
+        for bucket in self._cells_within(lat, lng, radius_miles):
+            for key, (plat, plng) in bucket.items():
+                d = haversine_miles(lat, lng, plat, plng)
+                if d <= radius_miles:
+                    hits.append((d, key))
+        hits.sort(key=lambda h: h[0])
+        return hits[:limit] if limit is not None else hits
+
+    def nearest(
+        self, lat: float, lng: float, k: int = 1, max_radius_miles: float = 50.0
+    ) -> List[Tuple[float, Hashable]]:
+        """The k nearest points, growing the search ring until k are found."""
+        radius = max(self.cell_degrees * MILES_PER_DEGREE, 0.5)
+        while True:
+            hits = self.within(lat, lng, radius, k)
+            if len(hits) >= k or radius >= max_radius_miles:
+                return hits
+            radius = min(radius * 2, max_radius_miles)
+
+
+__all__ = [
+    "EARTH_RADIUS_MILES",
+    "METERS_PER_MILE",
+    "haversine_miles",
+    "parse_coords",
+    "GeoGrid",
+]
@@ -0,0 +1,125 @@
+import base64
+import json
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+# Every keyset list is ordered by (key, id): the key ascending or
+# descending, ties by id ascending, rows whose key is NULL after all
+# others. Each page resumes strictly after the (key, id) of the last row
+# of the previous one, so it is one index seek whatever its depth, and
+# rows inserted or deleted meanwhile never shift later pages.
+
+Key = Tuple[Any, str]
+
+
+def encode_cursor(*key: Any) -> str:
+    raw = json.dumps([k if k is None or isinstance(k, (int, float)) else str(k) for k in key]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int = 2) -> tuple:
+    """Opaque cursor -> key tuple; 400 if it was not issued by encode_cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    if not isinstance(key, list) or len(key) != size:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    return tuple(key)
+
+
+def comes_after(value: Any, row_id: str, after: Key, descending: bool = False) -> bool:
+    """Whether (value, row_id) sorts strictly after the cursor key."""
+    after_value, after_id = after
+    if value is None or after_value is None:
+        if value is None and after_value is None:
+            return str(row_id) > str(after_id)
+        return value is None
+    if value != after_value:
+        return value < after_value if descending else value > after_value
+    return str(row_id) > str(after_id)
+
+
+def seek_list(rows: Sequence[Any], key: Callable[[Any], Key], after: Optional[Key], descending: bool = False) -> int:
+    """Index of the first row after the cursor in an already ordered list (binary search)."""
+    if after is None:
+        return 0
+    lo, hi = 0, len(rows)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if comes_after(*key(rows[mid]), after, descending):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+def _literal(value: Any) -> str:
+    """A value quoted for a PostgREST logic filter."""
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def page_of(rows: List[Dict[str, Any]], limit: int, column: str) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Trim a read of limit + 1 rows to a page and the cursor for the next."""
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1].get(column), page[-1]["id"]) if len(rows) > limit else None
+    return page, next_cursor
+
+
+def seek(query: Any, column: str, after: Optional[Key] = None, descending: bool = False, tiebreak: str = "id") -> Any:
+    """Order a PostgREST query by (column, tiebreak) and keep the rows after
+    the cursor. The column must not be NULL in the rows queried; pass
+    tiebreak=column when the column is unique on its own."""
+    op = "lt" if descending else "gt"
+    if tiebreak == column:
+        if after is not None:
+            query = getattr(query, op)(column, after[0])
+        return query.order(column, desc=descending)
+    if after is not None:
+        value, last = _literal(after[0]), _literal(after[1])
+        query = query.or_(f"{column}.{op}.{value},and({column}.eq.{value},{tiebreak}.gt.{last})")
+    return query.order(column, desc=descending).order(tiebreak)
+
+
+def seek_page(
+    build_query: Callable[[], Any],
+    column: str,
+    limit: int,
+    after: Optional[Key] = None,
+    descending: bool = False,
+    nullable: bool = False,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One keyset page from PostgREST and the cursor for the next.
+
+    `build_query` must return a fresh, filtered query without ordering.
+    The seek is a range on (column, id), which a composite index on the
+    filter columns plus (column, id) answers directly. For a nullable
+    column the non-null rows are read first, then NULL rows by id, in at
+    most two requests.
+    """
+    rows: List[Dict[str, Any]] = []
+    if after is None or after[0] is not None:
+        query = build_query()
+        if nullable:
+            query = query.not_.is_(column, "null")
+        rows = seek(query, column, after, descending).limit(limit + 1).execute().data or []
+    if nullable and len(rows) <= limit:
+        query = build_query().is_(column, "null")
+        if after is not None and after[0] is None:
+            query = query.gt("id", after[1])
+        rows += query.order("id").limit(limit + 1 - len(rows)).execute().data or []
+    return page_of(rows, limit, column)
+
+
+__all__ = [
+    "encode_cursor",
+    "decode_cursor",
+    "comes_after",
+    "seek_list",
+    "page_of",
+    "seek",
+    "seek_page",
+]
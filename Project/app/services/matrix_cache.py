@@ -0,0 +1,112 @@
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+# Driver locations are snapped to cells of this size (about 200 m) before
+# lookup, so repeated polls from roughly the same spot share entries.
+CELL_DEGREES = float(os.getenv("MATRIX_CACHE_CELL_DEGREES", "0.002"))
+TTL_SECONDS = float(os.getenv("MATRIX_CACHE_TTL_SECONDS", "120"))
+MAX_ENTRIES = int(os.getenv("MATRIX_CACHE_MAX_ENTRIES", "50000"))
+
+Cell = Tuple[int, int]
+# (distance_m, duration_s); either may be None when there is no road route
+Entry = Tuple[Optional[float], Optional[float]]
+
+
+def quantize(lat: float, lng: float, cell_degrees: float = CELL_DEGREES) -> Cell:
+    return (math.floor(lat / cell_degrees), math.floor(lng / cell_degrees))
+
+
+class MatrixCache:
+    """TTL + LRU cache of driver-cell -> restaurant matrix cells.
+
+    Also coalesces concurrent identical fetches: callers asking for the same
+    key while a fetch is running await the same task instead of issuing
+    their own request.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = TTL_SECONDS,
+        max_entries: int = MAX_ENTRIES,
+        cell_degrees: float = CELL_DEGREES,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.cell_degrees = cell_degrees
+        self._entries: "OrderedDict[Tuple[Cell, Hashable], Tuple[float, Entry]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def cell(self, lat: float, lng: float) -> Cell:
+        return quantize(lat, lng, self.cell_degrees)
+
+    def get(self, cell: Cell, restaurant_id: Hashable) -> Optional[Entry]:
+        key = (cell, restaurant_id)
+        item = self._entries.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, entry = item
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def peek(self, cell: Cell, restaurant_id: Hashable) -> Optional[Entry]:
+        """Like get(), but without touching LRU order or hit counters."""
+        item = self._entries.get((cell, restaurant_id))
+        if item is None or item[0] <= time.monotonic():
+            return None
+        return item[1]
+
+    def put(self, cell: Cell, restaurant_id: Hashable, entry: Entry) -> None:
+        key = (cell, restaurant_id)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def coalesce(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `fetch` once per key among concurrent callers."""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+        task = asyncio.ensure_future(fetch())
+        self._inflight[key] = task
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._inflight.clear()
+        self.hits = self.misses = self.coalesced = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
+
+
+matrix_cache = MatrixCache()
+
+
+__all__ = ["CELL_DEGREES", "TTL_SECONDS", "MAX_ENTRIES", "quantize", "MatrixCache", "matrix_cache"]
@@ -0,0 +1,241 @@
+import os
+import threading
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+import numpy as np
+
+from ..db import get_db, stream_rows
+from .dietary_index import LabelCodebook
+from .refreshing_index import RefreshingIndex
+
+REFRESH_SECONDS = float(os.getenv("MEAL_FACETS_REFRESH_SECONDS", "300"))
+COLUMNS = "id, restaurant_id, name, tags, allergens, base_price, surplus_price, quantity, calories, image_link"
+SORTS = {
+    "name_asc": ("name", False),
+    "name_desc": ("name", True),
+    "price_asc": ("price", False),
+    "price_desc": ("price", True),
+}
+
+_WORD = (1 << 64) - 1
+
+
+def _words(mask: int, width: int) -> List[int]:
+    return [(mask >> (64 * w)) & _WORD for w in range(width)]
+
+
+def _width(book: LabelCodebook) -> int:
+    return max(1, -(-len(book) // 64))
+
+
+def _price(row: Dict[str, Any]) -> float:
+    """Surplus price, else the base price; NaN sorts last and fails range filters."""
+    for key in ("surplus_price", "base_price"):
+        try:
+            if row.get(key) is not None:
+                return float(row[key])
+        except (TypeError, ValueError):
+            pass
+    return float("nan")
+
+
+class MealFacetIndex:
+    """Columnar snapshot of every meal for cross-restaurant browsing.
+
+    Each meal is a row position in parallel NumPy arrays: restaurant code,
+    price, quantity, and tag and allergen bitmaps (one uint64 word per 64
+    labels, bits assigned by LabelCodebook). A query builds one boolean
+    selection with array-wide predicates, and facet counts are column sums
+    over the unpacked bitmaps of the selected rows.
+    """
+
+    def __init__(self):
+        self.tags = LabelCodebook()
+        self.allergens = LabelCodebook()
+        self.rows: List[Dict[str, Any]] = []
+        self._positions: Dict[Hashable, int] = {}
+        self._restaurant_codes: Dict[str, int] = {}
+        self._restaurant = np.zeros(0, dtype=np.int32)
+        self._price = np.zeros(0, dtype=np.float64)
+        self._quantity = np.zeros(0, dtype=np.int32)
+        self._tag_bits = np.zeros((0, 1), dtype=np.uint64)
+        self._allergen_bits = np.zeros((0, 1), dtype=np.uint64)
+        self._live = np.zeros(0, dtype=bool)
+        self._name_rank: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return int(self._live.sum())
+
+    def _restaurant_code(self, restaurant_id: Any) -> int:
+        return self._restaurant_codes.setdefault(str(restaurant_id), len(self._restaurant_codes))
+
+    def build(self, meals: Iterable[Dict[str, Any]]) -> "MealFacetIndex":
+        restaurant, price, quantity, tag_masks, allergen_masks = [], [], [], [], []
+        for m in meals:
+            self._positions[m["id"]] = len(self.rows)
+            self.rows.append(m)
+            restaurant.append(self._restaurant_code(m.get("restaurant_id")))
+            price.append(_price(m))
+            quantity.append(int(m.get("quantity") or 0))
+            tag_masks.append(self.tags.encode(m.get("tags")))
+            allergen_masks.append(self.allergens.encode(m.get("allergens")))
+
+        tag_width, allergen_width = _width(self.tags), _width(self.allergens)
+        self._restaurant = np.asarray(restaurant, dtype=np.int32)
+        self._price = np.asarray(price, dtype=np.float64)
+        self._quantity = np.asarray(quantity, dtype=np.int32)
+        self._tag_bits = np.asarray([_words(m, tag_width) for m in tag_masks], dtype=np.uint64).reshape(-1, tag_width)
+        self._allergen_bits = np.asarray(
+            [_words(m, allergen_width) for m in allergen_masks], dtype=np.uint64
+        ).reshape(-1, allergen_width)
+        self._live = np.ones(len(self.rows), dtype=bool)
+        return self
+
+    # -- incremental maintenance --
+
+    @staticmethod
+    def _widen(bits: np.ndarray, width: int) -> np.ndarray:
+        if bits.shape[1] >= width:
+            return bits
+        return np.pad(bits, ((0, 0), (0, width - bits.shape[1])))
+
+    def upsert_meal(self, meal: Dict[str, Any]) -> None:
+        """Overwrite a meal's row in place; new meals are appended."""
+        with self._lock:
+            tag_mask = self.tags.encode(meal.get("tags"))
+            allergen_mask = self.allergens.encode(meal.get("allergens"))
+            self._tag_bits = self._widen(self._tag_bits, _width(self.tags))
+            self._allergen_bits = self._widen(self._allergen_bits, _width(self.allergens))
+            code = self._restaurant_code(meal.get("restaurant_id"))
+
+            i = self._positions.get(meal["id"])
+            if i is None:
+                i = self._positions[meal["id"]] = len(self.rows)
+                self.rows.append(meal)
+                self._restaurant = np.append(self._restaurant, np.int32(0))
+                self._price = np.append(self._price, 0.0)
+                self._quantity = np.append(self._quantity, np.int32(0))
+                self._tag_bits = np.vstack([self._tag_bits, np.zeros((1, self._tag_bits.shape[1]), dtype=np.uint64)])
+                self._allergen_bits = np.vstack(
+                    [self._allergen_bits, np.zeros((1, self._allergen_bits.shape[1]), dtype=np.uint64)]
+                )
+                self._live = np.append(self._live, True)
+            else:
+                self.rows[i] = meal
+                self._live[i] = True
+            self._restaurant[i] = code
+            self._price[i] = _price(meal)
+            self._quantity[i] = int(meal.get("quantity") or 0)
+            self._tag_bits[i] = _words(tag_mask, self._tag_bits.shape[1])
+            self._allergen_bits[i] = _words(allergen_mask, self._allergen_bits.shape[1])
+            self._name_rank = None
+
+    def remove_meal(self, meal_id: Hashable) -> None:
+        with self._lock:
+            i = self._positions.get(meal_id)
+            if i is not None:
+                self._live[i] = False
+
+    # -- queries --
+
+    @staticmethod
+    def _facets(book: LabelCodebook, bits: np.ndarray) -> Dict[str, int]:
+        counts = np.unpackbits(
+            np.ascontiguousarray(bits).view(np.uint8), axis=1, bitorder="little"
+        ).sum(axis=0, dtype=np.int64)
+        labels = book.labels()
+        facets = [(labels[b], int(counts[b])) for b in np.flatnonzero(counts[:len(labels)])]
+        return dict(sorted(facets, key=lambda f: (-f[1], f[0])))
+
+    def _order(self, hits: np.ndarray, sort: str) -> np.ndarray:
+        column, descending = SORTS.get(sort, SORTS["name_asc"])
+        if column == "price":
+            price = self._price[hits]
+            # NaN sorts last either way; stable, so ties keep snapshot order
+            order = np.argsort(-price if descending else price, kind="stable")
+        else:
+            if self._name_rank is None:
+                names = np.asarray([r.get("name") or "" for r in self.rows], dtype=object)
+                self._name_rank = np.unique(names, return_inverse=True)[1].reshape(-1)
+            rank = self._name_rank[hits]
+            order = np.argsort(-rank if descending else rank, kind="stable")
+        return hits[order]
+
+    def browse(
+        self,
+        tags: Iterable[str] = (),
+        exclude_allergens: Iterable[str] = (),
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        surplus_only: bool = False,
+        restaurant_ids: Optional[Iterable[Any]] = None,
+        sort: str = "name_asc",
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Dict[str, Any]:
+        """One page of matching meals, the total, and tag/allergen counts
+        over the whole matching set."""
+        with self._lock:
+            selected = self._live.copy()
+            required = self.tags.lookup(tags)
+            if required is None:
+                selected[:] = False
+            elif required:
+                want = np.asarray(_words(required, self._tag_bits.shape[1]), dtype=np.uint64)
+                selected &= ((self._tag_bits & want) == want).all(axis=1)
+            excluded = self.allergens.known(exclude_allergens)
+            if excluded:
+                drop = np.asarray(_words(excluded, self._allergen_bits.shape[1]), dtype=np.uint64)
+                selected &= ~(self._allergen_bits & drop).any(axis=1)
+            if min_price is not None:
+                selected &= self._price >= min_price
+            if max_price is not None:
+                selected &= self._price <= max_price
+            if surplus_only:
+                selected &= self._quantity > 0
+            if restaurant_ids is not None:
+                codes = [self._restaurant_codes[r] for r in map(str, restaurant_ids) if r in self._restaurant_codes]
+                selected &= np.isin(self._restaurant, np.asarray(codes, dtype=np.int32))
+
+            hits = np.flatnonzero(selected)
+            page = self._order(hits, sort)[offset:offset + limit]
+            return {
+                "items": [self.rows[i] for i in page],
+                "total": int(len(hits)),
+                "facets": {
+                    "tags": self._facets(self.tags, self._tag_bits[hits]),
+                    "allergens": self._facets(self.allergens, self._allergen_bits[hits]),
+                },
+            }
+
+
+class MealFacets(RefreshingIndex[MealFacetIndex]):
+    """The process-wide meal browse index."""
+
+    name = "meal facets"
+
+    def __init__(self, refresh_seconds: float = REFRESH_SECONDS):
+        super().__init__(refresh_seconds)
+
+    def _load(self) -> MealFacetIndex:
+        supabase = get_db()
+        return MealFacetIndex().build(stream_rows(lambda: supabase.table("meals").select(COLUMNS)))
+
+    def _empty(self) -> MealFacetIndex:
+        return MealFacetIndex()
+
+    def browse(self, **filters: Any) -> Dict[str, Any]:
+        return self.index().browse(**filters)
+
+
+meal_facets = MealFacets()
+
+
+__all__ = [
+    "REFRESH_SECONDS",
+    "SORTS",
+    "MealFacetIndex",
+    "MealFacets",
+    "meal_facets",
+]
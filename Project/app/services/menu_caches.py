@@ -0,0 +1,63 @@
+from typing import Any, Dict, Hashable, Iterable, List
+
+from .catalog_autocomplete import catalog_autocomplete
+from .catalog_snapshot import catalog_snapshot
+from .dietary_index import dietary_index
+from .meal_facets import meal_facets
+from .menu_versions import menu_versions
+from .surplus_feed import surplus_feed
+
+# In-process indexes patched meal by meal as menus change.
+MEAL_CACHES = {
+    "autocomplete": catalog_autocomplete,
+    "meal facets": meal_facets,
+    "surplus feed": surplus_feed,
+    "catalog snapshot": catalog_snapshot,
+}
+
+
+def _invalidate(restaurant_id: str) -> None:
+    for name, cache in (("dietary index", dietary_index), ("menu version", menu_versions)):
+        try:
+            cache.invalidate(restaurant_id)
+        except Exception as e:
+            print(f"Error invalidating {name} for restaurant {restaurant_id}: {e}")
+
+
+def safe_menu_changed(restaurant_id: Hashable, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Patch the in-process catalog caches with meal rows just written for
+    one restaurant, then drop its cached menu and stamp once. Returns the
+    rows with string ids. Never raises: the write has already committed,
+    and the caches catch up on their next refresh."""
+    restaurant_id = str(restaurant_id)
+    changed = [
+        {**row, "id": str(row["id"]), "restaurant_id": str(row.get("restaurant_id") or restaurant_id)}
+        for row in rows
+    ]
+    for name, cache in MEAL_CACHES.items():
+        for meal in changed:
+            try:
+                cache.meal_changed(meal)
+            except Exception as e:
+                print(f"Error updating {name} for meal {meal['id']}: {e}")
+    _invalidate(restaurant_id)
+    return changed
+
+
+def safe_menu_removed(restaurant_id: Hashable, meal_ids: Iterable[Hashable]) -> None:
+    """Drop deleted meals from the in-process caches; never raises."""
+    meal_ids = list(meal_ids)
+    for name, cache in MEAL_CACHES.items():
+        for meal_id in meal_ids:
+            try:
+                cache.meal_removed(meal_id)
+            except Exception as e:
+                print(f"Error removing meal {meal_id} from {name}: {e}")
+    _invalidate(str(restaurant_id))
+
+
+__all__ = [
+    "MEAL_CACHES",
+    "safe_menu_changed",
+    "safe_menu_removed",
+]
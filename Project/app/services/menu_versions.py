@@ -0,0 +1,108 @@
+import threading
+import time
+import zlib
+from typing import Dict, Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+
+from ..db import get_db
+from .catalog_snapshot import STALENESS_SECONDS, catalog_snapshot, serving as snapshot_serving
+
+_CATALOG = object()
+
+
+class MenuVersions:
+    """Menu version stamps for ETags, from restaurant_menu_versions.
+
+    With the catalog snapshot serving, stamps come from the snapshot, so
+    they describe exactly the data it returns. Otherwise each stamp is
+    read once and kept for up to STALENESS_SECONDS, the same bound the
+    snapshot puts on stock changes; edits made through this process drop
+    it at once.
+    """
+
+    def __init__(self, ttl_seconds: float = STALENESS_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._stamps: Dict[Hashable, Tuple[Optional[int], float]] = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, key: Hashable, load) -> Optional[int]:
+        now = time.monotonic()
+        hit = self._stamps.get(key)
+        if hit is not None and now - hit[1] < self.ttl_seconds:
+            return hit[0]
+        try:
+            version = load()
+        except Exception as e:
+            print(f"Failed to read menu version: {e}")
+            return None
+        with self._lock:
+            self._stamps[key] = (version, now)
+        return version
+
+    def restaurant(self, restaurant_id: Hashable) -> Optional[int]:
+        if snapshot_serving():
+            return catalog_snapshot.menu_version(restaurant_id)
+
+        def load():
+            rows = get_db().table("restaurant_menu_versions").select("version").eq(
+                "restaurant_id", str(restaurant_id)
+            ).execute().data
+            return int(rows[0]["version"]) if rows else None
+
+        return self._cached(str(restaurant_id), load)
+
+    def catalog(self) -> Optional[int]:
+        """Newest stamp across all menus, for cross-restaurant lists."""
+        if snapshot_serving():
+            return catalog_snapshot.catalog_version()
+
+        def load():
+            rows = get_db().table("restaurant_menu_versions").select("version").order(
+                "version", desc=True
+            ).limit(1).execute().data
+            return int(rows[0]["version"]) if rows else 0
+
+        return self._cached(_CATALOG, load)
+
+    def invalidate(self, restaurant_id: Hashable) -> None:
+        with self._lock:
+            self._stamps.pop(str(restaurant_id), None)
+            self._stamps.pop(_CATALOG, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stamps.clear()
+
+
+menu_versions = MenuVersions()
+
+
+def menu_etag(request: Request, version: Optional[int]) -> Optional[str]:
+    """Weak ETag for a menu version and this request's query string, so
+    different filters of one menu never share a tag."""
+    if version is None:
+        return None
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    return f'W/"{version}.{zlib.crc32(query.encode()):08x}"'
+
+
+def not_modified(request: Request, response: Response, version: Optional[int]) -> Optional[Response]:
+    """Tag the response; a 304 to return instead if the client's copy is current."""
+    etag = menu_etag(request, version)
+    if etag is None:
+        return None
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    candidates = [t.strip() for t in request.headers.get("if-none-match", "").split(",")]
+    if "*" in candidates or any(t.removeprefix("W/") == etag.removeprefix("W/") for t in candidates if t):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+__all__ = [
+    "MenuVersions",
+    "menu_versions",
+    "menu_etag",
+    "not_modified",
+]
@@ -0,0 +1,146 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional
+
+# A driver's board is recomputed (distances included) only after they have
+# moved at least this far from where it was last computed.
+REFRESH_MILES = float(os.getenv("READY_BOARD_REFRESH_MILES", "0.25"))
+# Comment frames keep idle streams from being closed by proxies.
+KEEPALIVE_SECONDS = float(os.getenv("READY_BOARD_KEEPALIVE_SECONDS", "15"))
+# Events buffered per subscriber; a slower client gets a full resync instead.
+QUEUE_SIZE = 256
+# Freshly readied rows are shared by every subscriber for this long, so one
+# status change costs one lookup however many drivers are watching.
+ROW_TTL_SECONDS = 5.0
+
+
+class BoardEvent(NamedTuple):
+    kind: str  # "added" | "removed"
+    order_id: Any
+    restaurant_id: Any
+
+
+class Subscription:
+    """One driver's event queue, bound to the loop that reads it."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int = QUEUE_SIZE):
+        self.loop = loop
+        self.queue: "asyncio.Queue[BoardEvent]" = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def _put(self, event: BoardEvent) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def deliver(self, event: BoardEvent) -> None:
+        # publishers are usually sync handlers running on the threadpool
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # loop already closed; the stream is gone
+            pass
+
+    async def next(self, timeout: float) -> Optional[BoardEvent]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class ReadyBoard:
+    """In-process pub/sub of orders entering and leaving the ready board.
+
+    Status changes publish "added" when an order becomes ready and
+    "removed" for any other status; each open driver stream filters events
+    to its own area. Only streams connected to this process see its
+    events, so multi-worker deployments need sticky routing or an external
+    broker in front of this.
+    """
+
+    def __init__(self, row_ttl_seconds: float = ROW_TTL_SECONDS):
+        self.row_ttl_seconds = row_ttl_seconds
+        self._subscribers: List[Subscription] = []
+        self._rows: Dict[Hashable, tuple] = {}
+        self._fetching: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscription:
+        sub = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+
+    def publish(self, order_id, status: str, restaurant_id=None) -> None:
+        event = BoardEvent("added" if status == "ready" else "removed", order_id, restaurant_id)
+        with self._lock:
+            self._rows.pop(order_id, None)
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            sub.deliver(event)
+
+    def order_row(self, order_id, fetch: Callable[[], Optional[dict]], now: Optional[float] = None):
+        """Row for a just-readied order, fetched once and shared briefly."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            cached = self._rows.get(order_id)
+            if cached is not None and cached[0] > now:
+                return cached[1]
+            fetching = self._fetching.setdefault(order_id, threading.Lock())
+        # streams asking from worker threads at once wait for one fetch
+        with fetching:
+            with self._lock:
+                cached = self._rows.get(order_id)
+                if cached is not None and cached[0] > now:
+                    return cached[1]
+            try:
+                row = fetch()
+            except Exception:
+                with self._lock:
+                    self._fetching.pop(order_id, None)
+                raise
+            with self._lock:
+                self._rows[order_id] = (now + self.row_ttl_seconds, row)
+                self._fetching.pop(order_id, None)
+                if len(self._rows) > 1000:
+                    self._rows = {k: v for k, v in self._rows.items() if v[0] > now}
+        return row
+
+    def clear(self) -> None:
+        with self._lock:
+            self._subscribers.clear()
+            self._rows.clear()
+
+
+ready_board = ReadyBoard()
+
+
+def safe_publish_status(order_id, status: str, restaurant_id=None) -> None:
+    """Tell open driver streams about a status change. Never raises: the
+    board is an optimisation and must not fail the status update."""
+    try:
+        ready_board.publish(order_id, status, restaurant_id)
+    except Exception as e:
+        print(f"Error publishing ready board event for order {order_id}: {e}")
+
+
+__all__ = [
+    "REFRESH_MILES",
+    "KEEPALIVE_SECONDS",
+    "BoardEvent",
+    "Subscription",
+    "ReadyBoard",
+    "ready_board",
+    "safe_publish_status",
+]
@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Generic, Hashable, Optional, TypeVar
+
+# Seconds before a failed build is tried again, instead of waiting out a
+# whole refresh interval on an empty or stale index.
+RETRY_SECONDS = float(os.getenv("INDEX_RETRY_SECONDS", "30"))
+
+IndexT = TypeVar("IndexT")
+
+
+class RefreshingIndex(ABC, Generic[IndexT]):
+    """Holds a process-wide in-memory index: built from the catalog on
+    first use, rebuilt every `refresh_seconds`, and patched in place
+    between rebuilds when owners edit meals.
+
+    A failed build keeps serving the last good index, or an empty one
+    before the first success, and is retried after RETRY_SECONDS. The
+    empty stand-in is never patched: edits made while it is served are
+    read from the table by the build that replaces it.
+    """
+
+    name = "index"
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._index: Optional[IndexT] = None
+        self._loaded_at: Optional[float] = None
+        self._failed_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _load(self) -> IndexT:
+        """Build the index from the database."""
+
+    @abstractmethod
+    def _empty(self) -> IndexT:
+        """An index with nothing in it, served until a build succeeds."""
+
+    def _due(self, now: float) -> bool:
+        if self._failed_at is not None and now - self._failed_at < RETRY_SECONDS:
+            return False
+        return self._index is None or now - self._loaded_at >= self.refresh_seconds
+
+    def index(self) -> IndexT:
+        now = time.monotonic()
+        if self._due(now):
+            with self._lock:
+                if self._due(now):
+                    try:
+                        index = self._load()
+                    except Exception as e:
+                        print(f"Failed to build {self.name}: {e}")
+                        self._failed_at = now
+                    else:
+                        self._index, self._loaded_at, self._failed_at = index, now, None
+        index = self._index
+        return index if index is not None else self._empty()
+
+    def set_index(self, index: Optional[IndexT]) -> None:
+        """Serve a prebuilt index (tests, benchmarks); None rebuilds on next use."""
+        with self._lock:
+            self._index = index
+            self._loaded_at = time.monotonic() if index is not None else None
+            self._failed_at = None
+
+    # Menu edits patch a loaded index; before the first load there is
+    # nothing to patch and the build will read the change from the table.
+    # These never raise: a stale entry must not fail the owner's edit.
+
+    def meal_changed(self, meal: Dict[str, Any]) -> None:
+        try:
+            if self._index is not None:
+                self._index.upsert_meal(meal)
+        except Exception as e:
+            print(f"Error updating {self.name} for meal {meal.get('id')}: {e}")
+
+    def meal_removed(self, meal_id: Hashable) -> None:
+        try:
+            if self._index is not None:
+                self._index.remove_meal(meal_id)
+        except Exception as e:
+            print(f"Error removing meal {meal_id} from {self.name}: {e}")
+
+
+__all__ = [
+    "RETRY_SECONDS",
+    "RefreshingIndex",
+]
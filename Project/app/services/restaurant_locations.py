@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+from typing import Any, Hashable, List, Optional, Tuple
+
+from ..db import get_db
+from .geo import GeoGrid, parse_coords
+
+# Seconds between full reloads of restaurant coordinates. Restaurants created
+# through this API are upserted immediately; the reload picks up anything
+# edited directly in the database.
+REFRESH_SECONDS = float(os.getenv("RESTAURANT_INDEX_REFRESH_SECONDS", "300"))
+
+
+class RestaurantLocationIndex:
+    """Process-local spatial index over restaurant coordinates."""
+
+    def __init__(self, refresh_seconds: float = REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._grid = GeoGrid()
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._grid)
+
+    def _load(self) -> None:
+        supabase = get_db()
+        rows = supabase.table("restaurants").select("id, latitude, longitude").execute().data or []
+        grid = GeoGrid(self._grid.cell_degrees)
+        for row in rows:
+            coords = parse_coords(row.get("latitude"), row.get("longitude"))
+            if row.get("id") is not None and coords:
+                grid.upsert(row["id"], *coords)
+        self._grid = grid
+
+    def refresh(self, force: bool = False) -> None:
+        """Reload from the database if the TTL has expired.
+
+        A failed reload keeps serving the previous snapshot.
+        """
+        now = time.monotonic()
+        if not force and self._loaded_at is not None and now - self._loaded_at < self.refresh_seconds:
+            return
+        with self._lock:
+            if not force and self._loaded_at is not None and now - self._loaded_at < self.refresh_seconds:
+                return
+            try:
+                self._load()
+            except Exception as e:
+                print(f"Failed to refresh restaurant location index: {e}")
+            self._loaded_at = now
+
+    def reset(self) -> None:
+        """Drop all entries; the next query reloads from the database."""
+        with self._lock:
+            self._grid = GeoGrid(self._grid.cell_degrees)
+            self._loaded_at = None
+
+    def upsert(self, restaurant_id: Hashable, latitude: Any, longitude: Any) -> None:
+        coords = parse_coords(latitude, longitude)
+        with self._lock:
+            if coords:
+                self._grid.upsert(restaurant_id, *coords)
+            else:
+                self._grid.remove(restaurant_id)
+
+    def remove(self, restaurant_id: Hashable) -> None:
+        with self._lock:
+            self._grid.remove(restaurant_id)
+
+    def get(self, restaurant_id: Hashable) -> Optional[Tuple[float, float]]:
+        return self._grid.get(restaurant_id)
+
+    def within(
+        self, lat: float, lng: float, radius_miles: float, limit: Optional[int] = None
+    ) -> List[Tuple[float, Hashable]]:
+        self.refresh()
+        return self._grid.within(lat, lng, radius_miles, limit)
+
+
+restaurant_locations = RestaurantLocationIndex()
+
+
+__all__ = ["REFRESH_SECONDS", "RestaurantLocationIndex", "restaurant_locations"]
@@ -0,0 +1,171 @@
+import os
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .dispatch import DETOUR_FACTOR, pairwise_miles
+
+# Most orders one driver may carry at once. 1 keeps the original
+# one-active-order behaviour.
+MAX_STACKED_ORDERS = max(1, int(os.getenv("MAX_STACKED_ORDERS", "1")))
+# An order joins a stack only if it lengthens the route by at most this much.
+STACK_MAX_EXTRA_MILES = float(os.getenv("STACK_MAX_EXTRA_MILES", "1.5"))
+
+
+class StackCandidate(NamedTuple):
+    order_id: Any
+    pickup: Tuple[float, float]
+    dropoff: Tuple[float, float]
+
+
+class RoutePlan(NamedTuple):
+    order_ids: List[Any]
+    stops: List[Tuple[str, Any]]  # ("pickup" | "dropoff", order_id), in visit order
+    miles: float
+
+
+def _distance_matrix(start: Tuple[float, float], orders: Sequence[StackCandidate]) -> np.ndarray:
+    """Node 0 is the start; order k has pickup 2k+1 and dropoff 2k+2."""
+    points = [start]
+    for o in orders:
+        points.append(o.pickup)
+        points.append(o.dropoff)
+    pts = np.asarray(points, dtype=float)
+    return pairwise_miles(pts[:, 0], pts[:, 1], pts[:, 0], pts[:, 1]) * DETOUR_FACTOR
+
+
+def route_cost(route: Sequence[int], dist: np.ndarray) -> float:
+    if not route:
+        return 0.0
+    path = [0, *route]
+    return float(dist[path[:-1], path[1:]].sum())
+
+
+def _best_insertion(route: List[int], p: int, d: int, dist: np.ndarray) -> Tuple[float, int, int]:
+    """Cheapest (added_miles, i, j) for placing pickup p at i and dropoff d
+    at j (positions in the route after p is inserted), with i < j."""
+    n = len(route)
+    best = (float("inf"), 0, 1)
+    for i in range(n + 1):
+        prev_i = route[i - 1] if i > 0 else 0
+        next_i = route[i] if i < n else None
+        add_p = dist[prev_i, p] - (dist[prev_i, next_i] if next_i is not None else 0.0)
+        # dropoff immediately after the pickup
+        delta = add_p + dist[p, d] + (dist[d, next_i] if next_i is not None else 0.0)
+        if delta < best[0]:
+            best = (delta, i, i + 1)
+        if next_i is None:
+            continue
+        add_p += dist[p, next_i]
+        for j in range(i + 1, n + 1):
+            prev_j = route[j - 1]
+            next_j = route[j] if j < n else None
+            add_d = dist[prev_j, d] + (
+                dist[d, next_j] - dist[prev_j, next_j] if next_j is not None else 0.0
+            )
+            if add_p + add_d < best[0]:
+                best = (add_p + add_d, i, j + 1)
+    return best
+
+
+def _insert(route: List[int], p: int, d: int, i: int, j: int) -> List[int]:
+    out = route[:i] + [p] + route[i:]
+    return out[:j] + [d] + out[j:]
+
+
+def _two_opt(route: List[int], dist: np.ndarray) -> List[int]:
+    """Segment reversals that shorten the path, keeping each pickup ahead of
+    its dropoff."""
+    route = list(route)
+    n = len(route)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(n - 1):
+            prev_i = route[i - 1] if i > 0 else 0
+            for j in range(i + 1, n):
+                segment = route[i:j + 1]
+                # node 2k+1 is a pickup, 2k+2 its dropoff; both in the segment
+                # means reversing would deliver before collecting
+                orders_in = [(node - 1) // 2 for node in segment]
+                if len(set(orders_in)) != len(orders_in):
+                    continue
+                next_j = route[j + 1] if j + 1 < n else None
+                before = dist[prev_i, route[i]] + (dist[route[j], next_j] if next_j is not None else 0.0)
+                after = dist[prev_i, route[j]] + (dist[route[i], next_j] if next_j is not None else 0.0)
+                if after < before - 1e-9:
+                    route[i:j + 1] = segment[::-1]
+                    improved = True
+    return route
+
+
+def plan_route(
+    start: Tuple[float, float],
+    orders: Sequence[StackCandidate],
+    dist: Optional[np.ndarray] = None,
+) -> RoutePlan:
+    """Pickup-and-delivery route for a fixed set of orders: cheapest
+    insertion in the given order, then 2-opt."""
+    if dist is None:
+        dist = _distance_matrix(start, orders)
+    route: List[int] = []
+    for k in range(len(orders)):
+        _, i, j = _best_insertion(route, 2 * k + 1, 2 * k + 2, dist)
+        route = _insert(route, 2 * k + 1, 2 * k + 2, i, j)
+    route = _two_opt(route, dist)
+    return _as_plan(route, orders, dist)
+
+
+def _as_plan(route: List[int], orders: Sequence[StackCandidate], dist: np.ndarray) -> RoutePlan:
+    stops = [
+        ("pickup" if node % 2 == 1 else "dropoff", orders[(node - 1) // 2].order_id)
+        for node in route
+    ]
+    order_ids = [oid for kind, oid in stops if kind == "pickup"]
+    return RoutePlan(order_ids, stops, round(route_cost(route, dist), 3))
+
+
+def propose_stack(
+    start: Tuple[float, float],
+    candidates: Sequence[StackCandidate],
+    cap: int = MAX_STACKED_ORDERS,
+    max_extra_miles: float = STACK_MAX_EXTRA_MILES,
+) -> Optional[RoutePlan]:
+    """Pick up to `cap` orders worth carrying together.
+
+    Seeds with the order whose pickup is nearest, then repeatedly adds the
+    candidate with the cheapest insertion, as long as it lengthens the
+    route by no more than `max_extra_miles`.
+    """
+    if not candidates:
+        return None
+    dist = _distance_matrix(start, candidates)
+    seed = int(np.argmin(dist[0, 1::2]))
+    route = [2 * seed + 1, 2 * seed + 2]
+    remaining = set(range(len(candidates))) - {seed}
+
+    while remaining and len(route) // 2 < cap:
+        best = None
+        for k in remaining:
+            delta, i, j = _best_insertion(route, 2 * k + 1, 2 * k + 2, dist)
+            if best is None or delta < best[0]:
+                best = (delta, k, i, j)
+        delta, k, i, j = best
+        if delta > max_extra_miles:
+            break
+        route = _insert(route, 2 * k + 1, 2 * k + 2, i, j)
+        remaining.discard(k)
+
+    route = _two_opt(route, dist)
+    return _as_plan(route, candidates, dist)
+
+
+__all__ = [
+    "MAX_STACKED_ORDERS",
+    "STACK_MAX_EXTRA_MILES",
+    "StackCandidate",
+    "RoutePlan",
+    "route_cost",
+    "plan_route",
+    "propose_stack",
+]
@@ -0,0 +1,250 @@
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+import numpy as np
+
+from ..db import get_db, stream_rows
+from .geo import EARTH_RADIUS_MILES, parse_coords
+from .refreshing_index import RefreshingIndex
+from .restaurant_locations import restaurant_locations
+
+REFRESH_SECONDS = float(os.getenv("SURPLUS_FEED_REFRESH_SECONDS", "300"))
+# Freshness halves every this many hours since the meal was posted.
+FRESHNESS_HALF_LIFE_HOURS = float(os.getenv("SURPLUS_FEED_HALF_LIFE_HOURS", "6"))
+# Proximity is 1/e at this many miles from the customer.
+DISTANCE_SCALE_MILES = float(os.getenv("SURPLUS_FEED_DISTANCE_SCALE_MILES", "3"))
+COLUMNS = "id, restaurant_id, name, tags, allergens, base_price, surplus_price, quantity, calories, image_link, created_at"
+
+# Each signal is scaled to [0, 1] before weighting. Stock and popularity
+# saturate at fixed points instead of being divided by a catalog-wide
+# maximum, so one meal's score never depends on the others and an edit
+# only touches its own row.
+WEIGHTS = {
+    "discount": 0.35,
+    "freshness": 0.2,
+    "distance": 0.2,
+    "stock": 0.15,
+    "popularity": 0.1,
+}
+STOCK_SATURATION = 20
+POPULARITY_HALF = 10.0
+
+
+def _discount(row: Dict[str, Any]) -> float:
+    try:
+        base, surplus = float(row.get("base_price")), float(row.get("surplus_price"))
+    except (TypeError, ValueError):
+        return 0.0
+    if base <= 0:
+        return 0.0
+    return min(1.0, max(0.0, (base - surplus) / base))
+
+
+def _stock(quantity: int) -> float:
+    return min(1.0, math.log1p(max(quantity, 0)) / math.log1p(STOCK_SATURATION))
+
+
+def _popularity(orders: float) -> float:
+    return orders / (orders + POPULARITY_HALF) if orders > 0 else 0.0
+
+
+def _posted(row: Dict[str, Any]) -> float:
+    """created_at as epoch seconds; unknown dates count as long ago."""
+    value = row.get("created_at")
+    try:
+        posted = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        return 0.0
+    if posted.tzinfo is None:
+        posted = posted.replace(tzinfo=timezone.utc)
+    return posted.timestamp()
+
+
+class SurplusFeedIndex:
+    """Precomputed ranking of meals that still have surplus.
+
+    Discount depth, remaining stock and popularity do not depend on who is
+    asking, so their weighted sum is kept per meal in a NumPy column and
+    patched as stock and prices change. Freshness and distance to the
+    customer are added at request time over whole arrays. Candidates are
+    visited in descending order of the precomputed part (cached until the
+    next edit), and scanning stops once no unvisited meal could still reach
+    the requested page even with full freshness and proximity.
+    """
+
+    def __init__(self, half_life_hours: float = FRESHNESS_HALF_LIFE_HOURS, distance_scale_miles: float = DISTANCE_SCALE_MILES):
+        self.half_life_seconds = half_life_hours * 3600
+        self.distance_scale_miles = distance_scale_miles
+        self.rows: List[Dict[str, Any]] = []
+        self._positions: Dict[Hashable, int] = {}
+        self._popularity: Dict[str, float] = {}
+        self._static = np.zeros(0, dtype=np.float64)
+        self._posted = np.zeros(0, dtype=np.float64)
+        self._lat = np.zeros(0, dtype=np.float64)
+        self._lng = np.zeros(0, dtype=np.float64)
+        self._live = np.zeros(0, dtype=bool)
+        self._order: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return int(self._live.sum())
+
+    def _columns(self, row: Dict[str, Any]):
+        quantity = int(row.get("quantity") or 0)
+        static = (
+            WEIGHTS["discount"] * _discount(row)
+            + WEIGHTS["stock"] * _stock(quantity)
+            + WEIGHTS["popularity"] * _popularity(self._popularity.get(str(row["id"]), 0.0))
+        )
+        coords = restaurant_locations.get(row.get("restaurant_id"))
+        lat, lng = coords if coords else (np.nan, np.nan)
+        return static, _posted(row), lat, lng, quantity > 0
+
+    def build(self, meals: Iterable[Dict[str, Any]], popularity: Optional[Dict[str, float]] = None) -> "SurplusFeedIndex":
+        self._popularity = dict(popularity or {})
+        columns = []
+        for m in meals:
+            self._positions[m["id"]] = len(self.rows)
+            self.rows.append(m)
+            columns.append(self._columns(m))
+        static, posted, lat, lng, live = zip(*columns) if columns else ((),) * 5
+        self._static = np.asarray(static, dtype=np.float64)
+        self._posted = np.asarray(posted, dtype=np.float64)
+        self._lat = np.asarray(lat, dtype=np.float64)
+        self._lng = np.asarray(lng, dtype=np.float64)
+        self._live = np.asarray(live, dtype=bool)
+        self._order = None
+        return self
+
+    # -- incremental maintenance --
+
+    def upsert_meal(self, meal: Dict[str, Any]) -> None:
+        """Rescore one meal; fields the change does not carry are kept."""
+        with self._lock:
+            i = self._positions.get(meal["id"])
+            if i is None:
+                i = self._positions[meal["id"]] = len(self.rows)
+                self.rows.append(meal)
+                self._static = np.append(self._static, 0.0)
+                self._posted = np.append(self._posted, 0.0)
+                self._lat = np.append(self._lat, np.nan)
+                self._lng = np.append(self._lng, np.nan)
+                self._live = np.append(self._live, False)
+            else:
+                self.rows[i] = {**self.rows[i], **meal}
+            self._static[i], self._posted[i], self._lat[i], self._lng[i], self._live[i] = self._columns(self.rows[i])
+            self._order = None
+
+    def remove_meal(self, meal_id: Hashable) -> None:
+        with self._lock:
+            i = self._positions.get(meal_id)
+            if i is not None and self._live[i]:
+                self._live[i] = False
+                self._order = None
+
+    # -- queries --
+
+    def _ranked(self) -> np.ndarray:
+        """Live positions by precomputed score, best first, ties by position."""
+        if self._order is None:
+            live = np.flatnonzero(self._live)
+            self._order = live[np.lexsort((live, -self._static[live]))]
+        return self._order
+
+    def _miles(self, hits: np.ndarray, lat: float, lng: float) -> np.ndarray:
+        p1, p2 = np.radians(lat), np.radians(self._lat[hits])
+        dl = np.radians(self._lng[hits] - lng)
+        a = np.sin((p2 - p1) / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+        return 2 * EARTH_RADIUS_MILES * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+    def rank(
+        self,
+        lat: Optional[float] = None,
+        lng: Optional[float] = None,
+        limit: int = 50,
+        offset: int = 0,
+        now: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """One page of the feed, best first, each row with its `score` and,
+        for a located customer, `distance_miles`."""
+        now = time.time() if now is None else now
+        located = lat is not None and lng is not None
+        headroom = WEIGHTS["freshness"] + (WEIGHTS["distance"] if located else 0.0)
+        want = offset + limit
+        with self._lock:
+            order = self._ranked()
+            scan = min(len(order), max(4 * want, 256))
+            while True:
+                hits = order[:scan]
+                age = np.maximum(now - self._posted[hits], 0.0)
+                score = self._static[hits] + WEIGHTS["freshness"] * np.exp2(-age / self.half_life_seconds)
+                if located:
+                    miles = self._miles(hits, lat, lng)
+                    # restaurants without coordinates get no proximity credit
+                    score += WEIGHTS["distance"] * np.nan_to_num(np.exp(-miles / self.distance_scale_miles))
+                if scan == len(order) or want == 0:
+                    break
+                # the best an unvisited meal could do is its precomputed
+                # part plus full freshness and proximity
+                kth = np.partition(score, len(score) - want)[len(score) - want] if len(score) >= want else -np.inf
+                if self._static[order[scan]] + headroom < kth:
+                    break
+                scan = min(len(order), scan * 2)
+
+            best = np.lexsort((hits, -score))[offset:want]
+            page = []
+            for j in best:
+                row = dict(self.rows[hits[j]], score=round(float(score[j]), 4))
+                if located:
+                    row["distance_miles"] = None if np.isnan(miles[j]) else round(float(miles[j]), 2)
+                page.append(row)
+            return page
+
+
+class SurplusFeed(RefreshingIndex[SurplusFeedIndex]):
+    """The process-wide surplus feed; rebuilds every REFRESH_SECONDS also
+    pick up new order counts and moved restaurants."""
+
+    name = "surplus feed"
+
+    def __init__(self, refresh_seconds: float = REFRESH_SECONDS):
+        super().__init__(refresh_seconds)
+
+    def _load(self) -> SurplusFeedIndex:
+        supabase = get_db()
+        popularity: Dict[str, float] = {}
+        for row in stream_rows(
+            lambda: supabase.table("restaurant_meal_stats").select("meal_id, restaurant_id, orders"), "meal_id", "restaurant_id"
+        ):
+            key = str(row["meal_id"])
+            popularity[key] = popularity.get(key, 0.0) + float(row.get("orders") or 0)
+        restaurant_locations.refresh()
+        meals = stream_rows(lambda: supabase.table("meals").select(COLUMNS))
+        return SurplusFeedIndex().build(meals, popularity)
+
+    def _empty(self) -> SurplusFeedIndex:
+        return SurplusFeedIndex()
+
+    def rank(self, lat: Optional[float] = None, lng: Optional[float] = None, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        coords = parse_coords(lat, lng)
+        if coords is None:
+            lat = lng = None
+        else:
+            lat, lng = coords
+        return self.index().rank(lat, lng, limit, offset)
+
+
+surplus_feed = SurplusFeed()
+
+
+__all__ = [
+    "REFRESH_SECONDS",
+    "WEIGHTS",
+    "SurplusFeedIndex",
+    "SurplusFeed",
+    "surplus_feed",
+]
@@ -0,0 +1,271 @@
+import asyncio
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from ..db import get_db, stream_rows
+from .catalog_snapshot import MEAL_FIELDS
+from .menu_caches import safe_menu_changed
+
+SURPLUS_PRICING_ENABLED = os.getenv("SURPLUS_PRICING_ENABLED", "false").lower() in ("1", "true", "yes")
+SURPLUS_PRICING_INTERVAL_SECONDS = float(os.getenv("SURPLUS_PRICING_INTERVAL_SECONDS", "900"))
+# closes_at is read as local time here.
+TIMEZONE = ZoneInfo(os.getenv("SURPLUS_PRICING_TIMEZONE", "UTC"))
+# Repricing starts this many hours before close; earlier, meals sit at the
+# opening discount.
+DECAY_WINDOW_HOURS = float(os.getenv("SURPLUS_PRICING_WINDOW_HOURS", "4"))
+# >1 keeps prices up for most of the window and drops them near close.
+DECAY_CURVE = float(os.getenv("SURPLUS_PRICING_CURVE", "2"))
+OPENING_DISCOUNT = float(os.getenv("SURPLUS_PRICING_OPENING_DISCOUNT", "0.2"))
+# Lowest price as a fraction of base_price, unless the restaurant sets its own.
+FLOOR_RATIO = float(os.getenv("SURPLUS_PRICING_FLOOR_RATIO", "0.3"))
+# How much of the closing-time markdown a meal that is selling out on its
+# own is spared (0 ignores demand, 1 skips the markdown entirely).
+SELL_THROUGH_WEIGHT = 0.6
+# Weight of the newest observation in the smoothed sell rate.
+RATE_SMOOTHING = 0.5
+
+
+def seconds_of_day(value: Any) -> float:
+    """'HH:MM[:SS]' as seconds after midnight; NaN if unparseable."""
+    try:
+        parts = [float(p) for p in str(value).split(":")]
+        hours, minutes, seconds = (parts + [0.0, 0.0])[:3]
+    except (TypeError, ValueError):
+        return float("nan")
+    if not (0 <= hours < 24 and 0 <= minutes < 60 and 0 <= seconds < 60):
+        return float("nan")
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def hours_to_close(close_seconds: np.ndarray, now: datetime) -> np.ndarray:
+    """Hours until each next closing time. Once a restaurant has closed the
+    next one is tomorrow's, so its prices reset for the new day."""
+    local = now.astimezone(TIMEZONE)
+    now_seconds = local.hour * 3600 + local.minute * 60 + local.second
+    return ((close_seconds - now_seconds) % 86400) / 3600
+
+
+def compute_prices(
+    base_price: np.ndarray,
+    quantity: np.ndarray,
+    hours_left: np.ndarray,
+    sell_rate: np.ndarray,
+    floor_ratio: np.ndarray,
+    window_hours: float = DECAY_WINDOW_HOURS,
+    curve: float = DECAY_CURVE,
+    opening_discount: float = OPENING_DISCOUNT,
+    sell_through_weight: float = SELL_THROUGH_WEIGHT,
+) -> np.ndarray:
+    """Surplus price per meal, over whole arrays.
+
+    The discount runs from `opening_discount` when the window opens to the
+    floor at closing time along progress ** curve. A meal whose recent
+    sell rate (units/hour, NaN if unknown) would clear its stock before
+    close is spared part of that markdown.
+    """
+    floor_ratio = np.clip(floor_ratio, 0.0, 1.0)
+    max_discount = 1.0 - floor_ratio
+    start = np.minimum(opening_discount, max_discount)
+    progress = 1.0 - np.clip(hours_left / window_hours, 0.0, 1.0)
+    decay = progress ** curve
+    stock = np.maximum(quantity, 1)
+    projected = np.clip(np.nan_to_num(sell_rate * hours_left / stock, nan=0.0), 0.0, 1.0)
+    discount = start + (max_discount - start) * decay * (1.0 - sell_through_weight * projected)
+    price = np.round(base_price * (1.0 - discount), 2)
+    return np.maximum(price, np.round(base_price * floor_ratio, 2))
+
+
+class PriceChange(NamedTuple):
+    meal_id: str
+    restaurant_id: str
+    name: str
+    quantity: int
+    hours_to_close: float
+    old_price: Optional[float]
+    new_price: float
+
+
+class SellRates:
+    """Units sold per hour for each meal, inferred from how its stock
+    dropped between pricing rounds. Kept as id-sorted arrays so a round
+    joins against it with one searchsorted; a restock restarts the
+    estimate. Process-local: after a restart rates are unknown for a
+    round and demand is ignored."""
+
+    def __init__(self):
+        self.ids = np.zeros(0, dtype=str)
+        self.quantity = np.zeros(0, dtype=np.int64)
+        self.at = np.zeros(0, dtype=np.float64)
+        self.rate = np.zeros(0, dtype=np.float64)
+
+    def _match(self, ids: np.ndarray):
+        pos = np.minimum(np.searchsorted(self.ids, ids), max(len(self.ids) - 1, 0))
+        found = (self.ids[pos] == ids) if len(self.ids) else np.zeros(len(ids), dtype=bool)
+        return pos, found
+
+    def estimate(self, ids: np.ndarray, quantity: np.ndarray, at: float) -> np.ndarray:
+        """Smoothed rate per meal given its stock now; NaN if unknown."""
+        pos, found = self._match(ids)
+        if not found.any():
+            return np.full(len(ids), np.nan)
+        prev_rate = self.rate[pos]
+        hours = (at - self.at[pos]) / 3600
+        sold = self.quantity[pos] - quantity
+        observed = found & (hours > 0) & (sold >= 0)
+        fresh = np.where(observed, sold / np.where(hours > 0, hours, 1.0), np.nan)
+        blended = np.where(np.isnan(prev_rate), fresh, RATE_SMOOTHING * fresh + (1 - RATE_SMOOTHING) * prev_rate)
+        return np.where(observed, blended, np.nan)
+
+    def record(self, ids: np.ndarray, quantity: np.ndarray, rate: np.ndarray, at: float) -> None:
+        order = np.argsort(ids, kind="stable")
+        self.ids = ids[order]
+        self.quantity = quantity[order].astype(np.int64)
+        self.rate = rate[order]
+        self.at = np.full(len(ids), at)
+
+
+class SurplusPricingEngine:
+    """Periodically reprices surplus at restaurants that opted in.
+
+    Each round loads every meal with stock at those restaurants, prices
+    them all at once with `compute_prices`, and writes one
+    `apply_surplus_prices` call per restaurant whose prices moved.
+    """
+
+    def __init__(self, interval_seconds: float = SURPLUS_PRICING_INTERVAL_SECONDS):
+        self.interval_seconds = interval_seconds
+        self.rates = SellRates()
+        self._task: Optional[asyncio.Task] = None
+
+    def _restaurants(self, restaurant_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        supabase = get_db()
+        query = (
+            supabase.table("restaurants")
+            .select("id, closes_at, surplus_floor_ratio")
+            .eq("dynamic_pricing", True)
+            .not_.is_("closes_at", "null")
+        )
+        if restaurant_id is not None:
+            query = query.eq("id", restaurant_id)
+        return query.execute().data or []
+
+    def _meals(self, restaurant_ids: Sequence[str]) -> Iterable[Dict[str, Any]]:
+        supabase = get_db()
+        return stream_rows(
+            lambda: supabase.table("meals").select(",".join(MEAL_FIELDS))
+            .in_("restaurant_id", list(restaurant_ids)).gt("quantity", 0)
+        )
+
+    def plan(
+        self,
+        restaurants: List[Dict[str, Any]],
+        meals: Iterable[Dict[str, Any]],
+        now: Optional[datetime] = None,
+    ):
+        """Price changes for the given restaurants and meals, without side
+        effects. Also returns the observed stock and rates, for `record`."""
+        now = datetime.now(TIMEZONE) if now is None else now
+        at = now.timestamp()
+        close = {str(r["id"]): seconds_of_day(r.get("closes_at")) for r in restaurants}
+        floor = {
+            str(r["id"]): float(r["surplus_floor_ratio"]) if r.get("surplus_floor_ratio") is not None else FLOOR_RATIO
+            for r in restaurants
+        }
+        rows = [m for m in meals if str(m.get("restaurant_id")) in close and m.get("base_price") is not None]
+        ids = np.asarray([str(m["id"]) for m in rows], dtype=str)
+        quantity = np.asarray([int(m.get("quantity") or 0) for m in rows], dtype=np.int64)
+        rate = self.rates.estimate(ids, quantity, at)
+        if not rows:
+            return [], (ids, quantity, rate)
+
+        restaurant_ids = [str(m["restaurant_id"]) for m in rows]
+        base = np.asarray([float(m["base_price"]) for m in rows], dtype=np.float64)
+        old = np.asarray(
+            [float(m["surplus_price"]) if m.get("surplus_price") is not None else np.nan for m in rows], dtype=np.float64
+        )
+        left = hours_to_close(np.asarray([close[r] for r in restaurant_ids]), now)
+        price = compute_prices(base, quantity, left, rate, np.asarray([floor[r] for r in restaurant_ids]))
+
+        moved = np.flatnonzero(np.isfinite(left) & ~(np.abs(price - old) < 0.005))
+        changes = [
+            PriceChange(
+                ids[i], restaurant_ids[i], rows[i].get("name") or "", int(quantity[i]), round(float(left[i]), 2),
+                None if np.isnan(old[i]) else float(old[i]), float(price[i]),
+            )
+            for i in moved
+        ]
+        return changes, (ids, quantity, rate)
+
+    def apply(self, changes: List[PriceChange], meals: Dict[str, Dict[str, Any]]) -> int:
+        """One bulk update per restaurant, then the in-process caches."""
+        supabase = get_db()
+        by_restaurant: Dict[str, List[PriceChange]] = {}
+        for c in changes:
+            by_restaurant.setdefault(c.restaurant_id, []).append(c)
+        updated = 0
+        for restaurant_id, batch in by_restaurant.items():
+            try:
+                result = supabase.rpc("apply_surplus_prices", {
+                    "p_restaurant_id": restaurant_id,
+                    "p_meal_ids": [c.meal_id for c in batch],
+                    "p_prices": [c.new_price for c in batch],
+                }).execute()
+            except Exception as e:
+                print(f"Failed to apply surplus prices for restaurant {restaurant_id}: {e}")
+                continue
+            updated += int(result.data or 0)
+            safe_menu_changed(restaurant_id, [
+                {**meals.get(c.meal_id, {"id": c.meal_id, "restaurant_id": restaurant_id}), "surplus_price": c.new_price}
+                for c in batch
+            ])
+        return updated
+
+    def run_once(self, dry_run: bool = False, restaurant_id: Optional[str] = None) -> List[PriceChange]:
+        restaurants = self._restaurants(restaurant_id)
+        if not restaurants:
+            return []
+        meals = {str(m["id"]): m for m in self._meals([str(r["id"]) for r in restaurants])}
+        now = datetime.now(TIMEZONE)
+        changes, (ids, quantity, rate) = self.plan(restaurants, meals.values(), now)
+        if not dry_run:
+            self.apply(changes, meals)
+            if restaurant_id is None:
+                self.rates.record(ids, quantity, rate, now.timestamp())
+        return changes
+
+    async def run_forever(self) -> None:
+        while True:
+            try:
+                # the Supabase client is synchronous; keep it off the event loop
+                await asyncio.to_thread(self.run_once)
+            except Exception as e:
+                print(f"Surplus pricing round failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run_forever())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+surplus_pricing_engine = SurplusPricingEngine()
+
+
+__all__ = [
+    "SURPLUS_PRICING_ENABLED",
+    "seconds_of_day",
+    "hours_to_close",
+    "compute_prices",
+    "PriceChange",
+    "SellRates",
+    "SurplusPricingEngine",
+    "surplus_pricing_engine",
+]
@@ -10,6 +10,8 @@ os.environ.setdefault('SUPABASE_URL', 'https://test.supabase.co')
 os.environ.setdefault('SUPABASE_KEY', 'test-key')
 os.environ.setdefault('SUPABASE_JWT_SECRET', 'test-secret')
 os.environ.setdefault('SUPABASE_ANON_KEY', 'test-anon-key')
+# Route tests exercise the per-request queries; snapshot tests opt in
+os.environ.setdefault('CATALOG_SNAPSHOT', 'off')
 
 # Add project root to path
 ROOT = pathlib.Path(__file__).resolve().parents[1]
@@ -25,6 +27,110 @@ mock_supabase.table = MagicMock(return_value=mock_table)
 mock_supabase.auth = MagicMock()
 patch('supabase.create_client', return_value=mock_supabase).start()
 
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "benchmark: timing comparisons over large fixtures; CI deselects them",
+    )
+
+@pytest.fixture(autouse=True)
+def reset_delivery_caches():
+    """The location and zone indexes, matrix cache, ready board,
+    menu cache and menu stamps are process-wide; isolate them per test."""
+    from app.services.restaurant_locations import restaurant_locations
+    from app.services.driver_locations import driver_locations
+    from app.services.matrix_cache import matrix_cache
+    from app.services.ready_board import ready_board
+    from app.services.delivery_zones import delivery_zones
+    from app.services.dietary_index import dietary_index
+    from app.services.menu_versions import menu_versions
+    restaurant_locations.reset()
+    delivery_zones.reset()
+    driver_locations.clear()
+    matrix_cache.clear()
+    ready_board.clear()
+    dietary_index.clear()
+    menu_versions.clear()
+    yield
+    restaurant_locations.reset()
+    delivery_zones.reset()
+    driver_locations.clear()
+    matrix_cache.clear()
+    ready_board.clear()
+    dietary_index.clear()
+    menu_versions.clear()
+
+# A small catalog shared by the search and autocomplete tests.
+CATALOG_RESTAURANTS = [
+    {"id": "r1", "name": "Pizza Palace"},
+    {"id": "r2", "name": "Green Bowl"},
+    {"id": "r3", "name": "Café Crème"},
+]
+CATALOG_MEALS = [
+    {"id": "m1", "restaurant_id": "r1", "name": "Margherita Pizza", "tags": ["vegetarian", "italian"]},
+    {"id": "m2", "restaurant_id": "r1", "name": "Pepperoni Pizza", "tags": ["italian"]},
+    {"id": "m3", "restaurant_id": "r2", "name": "Tofu Buddha Bowl", "tags": ["vegan", "gluten-free"]},
+    {"id": "m4", "restaurant_id": "r2", "name": "Chicken Caesar Salad", "tags": []},
+    {"id": "m5", "restaurant_id": "r3", "name": "Crème Brûlée", "tags": ["dessert"]},
+]
+# Vocabulary for synthetic catalogs.
+CATALOG_WORDS = [
+    "chicken", "beef", "tofu", "paneer", "shrimp", "salmon", "pork", "lamb", "veggie", "mushroom",
+    "curry", "tikka", "masala", "burger", "taco", "burrito", "ramen", "pho", "pizza", "pasta",
+    "salad", "bowl", "wrap", "sandwich", "soup", "noodles", "rice", "fried", "grilled", "spicy",
+    "garlic", "lemon", "teriyaki", "bbq", "honey", "chipotle", "pesto", "alfredo", "korma", "biryani",
+]
+CATALOG_TAGS = ["vegan", "vegetarian", "gluten-free", "spicy", "halal", "keto", "dairy-free", "organic"]
+
+@pytest.fixture
+def catalog_rows():
+    """(restaurants, meals) of the shared catalog; copies, so tests may edit them."""
+    return (
+        [dict(r) for r in CATALOG_RESTAURANTS],
+        [dict(m, tags=list(m["tags"])) for m in CATALOG_MEALS],
+    )
+
+@pytest.fixture
+def seeded_catalog():
+    """Builds a synthetic (restaurants, meals) catalog of n meals, 50 per
+    restaurant, each meal named from three random words plus "No<i>"."""
+    import random
+
+    def build(n_meals, seed=7):
+        rng = random.Random(seed)
+        n_restaurants = max(n_meals // 50, 1)
+        restaurants = [
+            {"id": f"r{i}", "name": f"{rng.choice(CATALOG_WORDS).title()} House {i}"} for i in range(n_restaurants)
+        ]
+        meals = [
+            {"id": f"m{i}", "restaurant_id": f"r{i % n_restaurants}",
+             "name": " ".join(rng.sample(CATALOG_WORDS, 3)).title() + f" No{i}",
+             "tags": rng.sample(CATALOG_TAGS, rng.randint(0, 3))}
+            for i in range(n_meals)
+        ]
+        return restaurants, meals
+
+    return build
+
+@pytest.fixture(autouse=True)
+def reset_catalog_indexes():
+    """The search, autocomplete, facet and surplus feed indexes are
+    process-wide; drop whatever a test installed so the next one rebuilds."""
+    yield
+    from app.services.catalog_search import catalog_search
+    from app.services.catalog_autocomplete import catalog_autocomplete
+    from app.services.meal_facets import meal_facets
+    from app.services.surplus_feed import surplus_feed
+    for holder in (catalog_search, catalog_autocomplete, meal_facets, surplus_feed):
+        holder.set_index(None)
+
+@pytest.fixture
+def client():
+    """A test client for the full app."""
+    from fastapi.testclient import TestClient
+    from app import main as main_app
+    return TestClient(main_app.app)
+
 @pytest.fixture
 def mock_database():
     """Mock database fixture for all tests"""
@@ -428,10 +428,13 @@ def test_checkout_cart():
             return mock_table
         
         mock_supabase.table.side_effect = table_mock
-        with patch('app.routers.cart.get_db', return_value=mock_supabase), patch('app.db.get_db', return_value=mock_supabase), patch('app.routers.cart._get_distance_and_duration', return_value={"distance_miles": 5.0, "duration_minutes": 10.0}):
+        with patch('app.routers.cart.get_db', return_value=mock_supabase), patch('app.db.get_db', return_value=mock_supabase), patch('app.routers.cart._get_distance_and_duration', return_value={"distance_miles": 5.0, "duration_minutes": 10.0}), \
+                patch('app.routers.cart.safe_menu_changed') as menu_changed:
             client = get_test_client()
             response = client.post("/cart/checkout", json={"delivery_address": "123 Main St", "latitude": 35.7796, "longitude": -78.6382, "tax": 1.0, "tip_amount": 2.0, "total": 15.0, "delivery_fee": 4.0}, headers={"Authorization": "Bearer token123"})
             assert_and_log(response, [200, 400, 500], "Checkout cart")
+            if response.status_code == 200:
+                menu_changed.assert_called_once_with("r1", [{"quantity": 8, "id": "meal1"}])
 
 # -------- COMPREHENSIVE GET /cart TESTS --------
 
@@ -0,0 +1,85 @@
+import pytest
+from unittest.mock import Mock, patch
+from app.services import analytics_rollups
+from app.services.analytics_rollups import (
+    record_order_completion,
+    safe_record_order_completion,
+    safe_record_restaurant_rating,
+    backfill,
+    summarize_daily_rows,
+)
+
+
+@patch("app.services.analytics_rollups.get_db")
+def test_record_order_completion_calls_rollup_function(mock_get_db):
+    mock_supabase = Mock()
+    mock_get_db.return_value = mock_supabase
+    mock_supabase.rpc.return_value.execute.return_value.data = True
+
+    assert record_order_completion("order1") is True
+    mock_supabase.rpc.assert_called_once_with("record_order_rollup", {"p_order_id": "order1"})
+
+
+@patch("app.services.analytics_rollups.get_db")
+def test_record_order_completion_already_recorded(mock_get_db):
+    mock_supabase = Mock()
+    mock_get_db.return_value = mock_supabase
+    mock_supabase.rpc.return_value.execute.return_value.data = False
+
+    assert record_order_completion("order1") is False
+
+
+@pytest.mark.parametrize("status", ["pending", "accepted", "ready", "assigned", "cancelled", None])
+def test_safe_record_skips_non_terminal_statuses(status):
+    with patch.object(analytics_rollups, "record_order_completion") as mock_record:
+        safe_record_order_completion("order1", status)
+    mock_record.assert_not_called()
+
+
+@pytest.mark.parametrize("status", ["delivered", "completed"])
+def test_safe_record_rolls_up_terminal_statuses(status):
+    with patch.object(analytics_rollups, "record_order_completion") as mock_record:
+        safe_record_order_completion("order1", status)
+    mock_record.assert_called_once_with("order1")
+
+
+def test_safe_record_swallows_errors():
+    with patch.object(analytics_rollups, "record_order_completion", side_effect=Exception("db down")):
+        safe_record_order_completion("order1", "delivered")
+    with patch.object(analytics_rollups, "record_restaurant_rating", side_effect=Exception("db down")):
+        safe_record_restaurant_rating("order1")
+
+
+@patch("app.services.analytics_rollups.get_db")
+def test_backfill_runs_until_batch_is_short(mock_get_db):
+    mock_supabase = Mock()
+    mock_get_db.return_value = mock_supabase
+    mock_supabase.rpc.return_value.execute.side_effect = [Mock(data=2), Mock(data=2), Mock(data=1)]
+
+    assert backfill(restaurant_id="rest1", batch_size=2) == 5
+    assert mock_supabase.rpc.call_count == 3
+    mock_supabase.rpc.assert_called_with("backfill_order_rollups", {"p_restaurant_id": "rest1", "p_limit": 2})
+
+
+def test_summarize_daily_rows():
+    rows = [
+        {"orders": 3, "revenue": 30.0, "rating_sum": 9, "rating_count": 2, "new_customers": 2, "new_repeat_customers": 0},
+        {"orders": 1, "revenue": "12.5", "rating_sum": 0, "rating_count": 0, "new_customers": 1, "new_repeat_customers": 1},
+    ]
+    summary = summarize_daily_rows(rows)
+
+    assert summary["total_orders"] == 4
+    assert summary["total_revenue"] == 42.5
+    assert summary["avg_order_value"] == 10.62
+    assert summary["avg_rating"] == 4.5
+    assert summary["total_reviews"] == 2
+    assert summary["unique_customers"] == 3
+    assert summary["repeat_customer_ratio"] == 33
+
+
+def test_summarize_daily_rows_empty():
+    summary = summarize_daily_rows([])
+    assert summary["total_orders"] == 0
+    assert summary["avg_order_value"] == 0
+    assert summary["avg_rating"] == 0
+    assert summary["repeat_customer_ratio"] == 0
@@ -0,0 +1,169 @@
+import random
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from app.owner_meals import service
+from app.owner_meals.schemas import MealCreate, MealUpdate
+from app.services.catalog_autocomplete import AutocompleteIndex, CatalogAutocomplete, catalog_autocomplete
+
+ORDERS = {"m1": 40, "m2": 120, "m3": 5}
+
+
+@pytest.fixture
+def index(catalog_rows):
+    return AutocompleteIndex().build(*catalog_rows, ORDERS)
+
+
+def _texts(results):
+    return [r["text"] for r in results]
+
+
+def test_prefix_matches_any_word_ranked_by_popularity(index):
+    # r1 sums its meals' 160 orders; m2 outsells m1
+    assert _texts(index.complete("piz")) == ["Pizza Palace", "Pepperoni Pizza", "Margherita Pizza"]
+    assert _texts(index.complete("bu")) == ["Tofu Buddha Bowl"]
+    # "creme" is all of "Café Crème" from its second word on
+    assert _texts(index.complete("CREME")) == ["Café Crème", "Crème Brûlée"]
+    # otherwise a match at the start of the name beats one at a later word
+    assert _texts(index.complete("cre")) == ["Crème Brûlée", "Café Crème"]
+    assert index.complete("zz") == []
+    assert index.complete("  ") == []
+
+
+def test_multi_word_prefix_and_trailing_space(index):
+    assert _texts(index.complete("buddha b")) == ["Tofu Buddha Bowl"]
+    assert _texts(index.complete("pizza ")) == ["Pizza Palace"]
+
+
+def test_tags_are_suggested_with_meal_counts(index):
+    results = index.complete("ital")
+    assert results[0]["type"] == "tag"
+    assert results[0]["text"] == "italian"
+    assert _texts(index.complete("free")) == ["gluten free"]
+
+
+def test_incremental_upsert_and_remove(index):
+    assert _texts(index.complete("cal")) == []
+    index.upsert_meal({"id": "m6", "restaurant_id": "r3", "name": "Calzone", "tags": ["italian"]})
+    assert _texts(index.complete("cal")) == ["Calzone"]
+
+    # renaming keeps the meal's popularity and moves it to the new keys
+    index.upsert_meal({"id": "m2", "restaurant_id": "r1", "name": "Diavola", "tags": []})
+    assert "Pepperoni Pizza" not in _texts(index.complete("pi"))
+    assert index.complete("diav")[0]["score"] > index.complete("cal")[0]["score"]
+
+    index.remove_meal("m6")
+    index.remove_meal("m1")
+    assert index.complete("cal") == []
+    assert [r for r in index.complete("ital") if r["type"] == "tag"] == []
+
+
+def test_wide_prefixes_are_cached_and_invalidated():
+    meals = [{"id": f"m{i}", "restaurant_id": "r1", "name": f"Soup {i}", "tags": []} for i in range(2000)]
+    index = AutocompleteIndex().build([], meals, {"m7": 3})
+    assert index.complete("s", 3)[0]["id"] == "m7"
+    assert "s" in index._top
+
+    index.upsert_meal({"id": "new", "restaurant_id": "r1", "name": "Stew", "tags": []})
+    assert "s" not in index._top
+    assert len(index.complete("s", 20)) == 20
+
+
+def test_index_built_from_database(catalog_rows):
+    mock_supabase = MagicMock()
+    restaurants, meals = catalog_rows
+    tables = {
+        "restaurants": restaurants,
+        "meals": meals,
+        "restaurant_meal_stats": [{"meal_id": "m1", "restaurant_id": "r1", "orders": 500}],
+    }
+    mock_supabase.table.side_effect = lambda name: MagicMock(**{
+        "select.return_value.order.return_value.limit.return_value.execute.return_value.data": tables[name],
+        "select.return_value.order.return_value.order.return_value.limit.return_value.execute.return_value.data": tables[name],
+    })
+    autocomplete = CatalogAutocomplete()
+    with patch("app.services.catalog_autocomplete.get_db", return_value=mock_supabase):
+        assert _texts(autocomplete.complete("pi")) == ["Pizza Palace", "Margherita Pizza", "Pepperoni Pizza"]
+        autocomplete.complete("bo")
+    assert mock_supabase.table.call_count == 3
+
+
+def test_owner_meal_edits_update_the_index(index):
+    catalog_autocomplete.set_index(index)
+    with patch("app.owner_meals.service.get_db") as mock_get_db:
+        table = mock_get_db.return_value.table.return_value
+        table.insert.return_value.execute.return_value.data = [
+            {"id": "m9", "restaurant_id": "r2", "name": "Quinoa Bowl", "tags": ["vegan"]}
+        ]
+        service.create_meal("r2", MealCreate(name="Quinoa Bowl", base_price=9.0, tags=["vegan"]))
+        assert _texts(catalog_autocomplete.complete("quin")) == ["Quinoa Bowl"]
+
+        table.delete.return_value.eq.return_value.eq.return_value.execute.return_value.data = [{"id": "m9"}]
+        table.update.return_value.eq.return_value.eq.return_value.execute.return_value.data = [
+            {"id": "m9", "restaurant_id": "r2", "name": "Kale Bowl", "tags": ["vegan"]}
+        ]
+        service.update_meal("m9", "r2", MealUpdate(name="Kale Bowl"))
+        assert catalog_autocomplete.complete("quin") == []
+        assert _texts(catalog_autocomplete.complete("kale")) == ["Kale Bowl"]
+
+        service.delete_meal("m9", "r2")
+        assert catalog_autocomplete.complete("kale") == []
+
+
+def test_autocomplete_endpoint(index, client):
+    catalog_autocomplete.set_index(index)
+
+    response = client.get("/catalog/autocomplete?q=pi&limit=2")
+    assert response.status_code == 200
+    assert response.json()[0] == {"type": "restaurant", "id": "r1", "restaurant_id": "r1",
+                                  "text": "Pizza Palace", "score": response.json()[0]["score"]}
+    assert len(response.json()) == 2
+    assert client.get("/catalog/autocomplete?q=").status_code == 422
+    assert client.get("/catalog/autocomplete?q=pi&limit=50").status_code == 422
+
+
+def _orders(n_meals, seed=11):
+    rng = random.Random(seed)
+    return {f"m{i}": rng.randint(0, 500) for i in range(0, n_meals, 3)}
+
+
+def test_autocomplete_on_a_seeded_catalog(seeded_catalog):
+    restaurants, meals = seeded_catalog(2000, seed=11)
+    orders = _orders(2000)
+    index = AutocompleteIndex().build(restaurants, meals, orders)
+
+    assert index.complete("no1234")[0]["text"] == meals[1234]["name"]
+    for q in ["c", "chi", "chicken t", "veg"]:
+        assert index.complete(q)
+    index.upsert_meal({"id": "new1", "restaurant_id": "r1", "name": "Special One", "tags": ["keto"]})
+    assert _texts(index.complete("special")) == ["Special One"]
+
+
+@pytest.mark.benchmark
+def test_autocomplete_latency_100k_meals(seeded_catalog):
+    restaurants, meals = seeded_catalog(100_000, seed=11)
+    orders = _orders(100_000)
+    start_time = time.time()
+    index = AutocompleteIndex().build(restaurants, meals, orders)
+    build = time.time() - start_time
+
+    # every keystroke of a few typical queries
+    keystrokes = [q[:n] for q in ["chicken tikka", "spicy ramen", "no4242", "veg", "burrito bowl"] for n in range(1, len(q) + 1)]
+    for q in keystrokes:
+        index.complete(q)  # first hit on a wide prefix ranks and caches it
+    timings = []
+    for q in keystrokes * 3:
+        start_time = time.time()
+        index.complete(q)
+        timings.append(time.time() - start_time)
+    timings.sort()
+
+    start_time = time.time()
+    for i in range(100):
+        index.upsert_meal({"id": f"new{i}", "restaurant_id": "r1", "name": f"Special {i}", "tags": ["keto"]})
+    upsert = (time.time() - start_time) / 100
+
+    print(f"\n100k meals: build {build:.2f}s, keystroke median {timings[len(timings) // 2] * 1e6:.0f} us, "
+          f"p95 {timings[int(len(timings) * 0.95)] * 1e6:.0f} us, upsert {upsert * 1000:.2f} ms")
+    assert index.complete("no4242")[0]["text"] == meals[4242]["name"]
+    assert timings[len(timings) // 2] < 0.001
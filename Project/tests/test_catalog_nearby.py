@@ -0,0 +1,96 @@
+import random
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from app.services.geo import haversine_miles
+from app.services.restaurant_locations import restaurant_locations
+
+RALEIGH = (35.7796, -78.6382)
+
+
+def _seed(n, seed=0, spread=0.3):
+    rng = random.Random(seed)
+    rows = {}
+    restaurant_locations.refresh(force=True)
+    for i in range(n):
+        lat, lng = RALEIGH[0] + rng.uniform(-spread, spread), RALEIGH[1] + rng.uniform(-spread, spread)
+        rows[f"r{i:05d}"] = {"id": f"r{i:05d}", "name": f"R{i}", "address": "", "latitude": lat, "longitude": lng}
+        restaurant_locations.upsert(f"r{i:05d}", lat, lng)
+    return rows
+
+
+def _mock_db(rows):
+    mock_supabase = MagicMock()
+    in_ = mock_supabase.table.return_value.select.return_value.in_
+
+    def lookup(column, ids):
+        return MagicMock(**{"execute.return_value.data": [rows[i] for i in ids if i in rows]})
+
+    in_.side_effect = lookup
+    return mock_supabase
+
+
+def test_nearby_pages_cover_radius_in_distance_order(client):
+    rows = _seed(500)
+    mock_supabase = _mock_db(rows)
+    seen, cursor = [], None
+    with patch("app.routers.catalog.get_db", return_value=mock_supabase):
+        while True:
+            url = f"/catalog/restaurants/nearby?lat={RALEIGH[0]}&lng={RALEIGH[1]}&radius=8&limit=25"
+            response = client.get(url + (f"&cursor={cursor}" if cursor else ""))
+            assert response.status_code == 200
+            data = response.json()
+            assert len(data) <= 25
+            seen.extend(data)
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+
+    expected = sorted(
+        (round(haversine_miles(*RALEIGH, r["latitude"], r["longitude"]), 6), rid)
+        for rid, r in rows.items()
+        if haversine_miles(*RALEIGH, r["latitude"], r["longitude"]) <= 8
+    )
+    assert [r["id"] for r in seen] == [rid for _, rid in expected]
+    distances = [r["distance_miles"] for r in seen]
+    assert distances == sorted(distances)
+    assert distances[-1] <= 8
+
+
+def test_nearby_skips_rows_deleted_since_index_load(client):
+    rows = _seed(10, spread=0.01)
+    deleted = next(iter(rows))
+    mock_supabase = _mock_db({k: v for k, v in rows.items() if k != deleted})
+    with patch("app.routers.catalog.get_db", return_value=mock_supabase):
+        data = client.get(f"/catalog/restaurants/nearby?lat={RALEIGH[0]}&lng={RALEIGH[1]}&radius=5").json()
+    assert len(data) == 9
+    assert deleted not in [r["id"] for r in data]
+
+
+def test_nearby_empty_and_bad_cursor(client):
+    with patch("app.routers.catalog.get_db") as get_db:
+        response = client.get("/catalog/restaurants/nearby?lat=40&lng=-100")
+        assert response.json() == []
+        assert "X-Next-Cursor" not in response.headers
+        get_db.assert_not_called()
+
+        response = client.get("/catalog/restaurants/nearby?lat=40&lng=-100&cursor=not-a-cursor")
+        assert response.status_code == 400
+
+    assert client.get("/catalog/restaurants/nearby?lat=40&lng=-100&radius=0").status_code == 422
+
+
+@pytest.mark.benchmark
+def test_nearby_page_latency(client):
+    rows = _seed(20000, seed=4, spread=0.5)
+    mock_supabase = _mock_db(rows)
+    timings = []
+    with patch("app.routers.catalog.get_db", return_value=mock_supabase):
+        for _ in range(20):
+            start_time = time.time()
+            response = client.get(f"/catalog/restaurants/nearby?lat={RALEIGH[0]}&lng={RALEIGH[1]}&radius=5&limit=20")
+            timings.append(time.time() - start_time)
+            assert len(response.json()) == 20
+    timings.sort()
+    print(f"\n20k restaurants, 5 mi radius: median {timings[10] * 1000:.1f} ms per page")
+    assert timings[10] < 0.1
@@ -0,0 +1,125 @@
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from app.services.catalog_search import CatalogSearch, CatalogSearchIndex, catalog_search, tokenize
+
+
+@pytest.fixture
+def index(catalog_rows):
+    return CatalogSearchIndex().build(*catalog_rows)
+
+
+@pytest.fixture(autouse=True)
+def memory_backend():
+    with patch.object(catalog_search, "backend", "memory"):
+        yield
+
+
+def _ids(results):
+    return [r["id"] for r in results]
+
+
+def test_tokenize_folds_case_and_accents():
+    assert tokenize("Crème  Brûlée!") == ["creme", "brulee"]
+
+
+def test_name_matches_outrank_tag_matches(index):
+    results = index.search("pizza")
+    assert set(_ids(results)) == {"r1", "m1", "m2"}
+    assert all(r["score"] > 0 for r in results)
+
+    results = index.search("italian vegetarian")
+    assert _ids(results)[0] == "m1"
+
+
+def test_typos_prefixes_and_accents(index):
+    assert "m1" in _ids(index.search("margarita"))
+    assert set(_ids(index.search("piza"))) == {"r1", "m1", "m2"}
+    assert set(_ids(index.search("pepp"))) == {"m2"}
+    assert _ids(index.search("creme brulee", kind="meal")) == ["m5"]
+    assert index.search("zzzz") == []
+
+
+def test_all_tokens_beat_partial_matches(index):
+    results = index.search("pizza bowl")
+    # nothing matches both; each partial match still comes back
+    assert {"r1", "r2", "m2", "m3"} <= set(_ids(results))
+    results = index.search("buddha bowl")
+    assert _ids(results)[0] == "m3"
+
+
+def test_type_filter_and_limit(index):
+    assert _ids(index.search("pizza", kind="restaurant")) == ["r1"]
+    assert set(_ids(index.search("pizza", kind="meal"))) == {"m1", "m2"}
+    assert len(index.search("pizza", limit=1)) == 1
+
+
+def test_postgres_backend_uses_rpc_and_falls_back(index):
+    mock_supabase = MagicMock()
+    mock_supabase.rpc.return_value.execute.return_value.data = [{"type": "meal", "id": "m1"}]
+    search = CatalogSearch(backend="postgres")
+    search.set_index(index)
+
+    with patch("app.services.catalog_search.get_db", return_value=mock_supabase):
+        assert search.search("pizza", 5) == [{"type": "meal", "id": "m1"}]
+        mock_supabase.rpc.assert_called_once_with(
+            "search_catalog", {"p_query": "pizza", "p_limit": 5, "p_kind": None}
+        )
+
+        mock_supabase.rpc.side_effect = Exception("function search_catalog does not exist")
+        assert set(_ids(search.search("pizza"))) == {"r1", "m1", "m2"}
+
+
+def test_index_built_from_database(catalog_rows):
+    mock_supabase = MagicMock()
+    tables = dict(zip(("restaurants", "meals"), catalog_rows))
+    mock_supabase.table.side_effect = lambda name: MagicMock(**{
+        "select.return_value.order.return_value.limit.return_value.execute.return_value.data": tables[name]
+    })
+    search = CatalogSearch(backend="memory")
+    with patch("app.services.catalog_search.get_db", return_value=mock_supabase):
+        assert _ids(search.search("tofu")) == ["m3"]
+        search.search("salad")
+    assert mock_supabase.table.call_count == 2
+
+
+def test_search_endpoint(index, client):
+    catalog_search.set_index(index)
+
+    response = client.get("/catalog/search?q=vegan")
+    assert response.status_code == 200
+    assert _ids(response.json()) == ["m3"]
+    assert client.get("/catalog/search?q=pizza&type=restaurant").json()[0]["id"] == "r1"
+    assert client.get("/catalog/search?q=pizza&type=drink").status_code == 422
+    assert client.get("/catalog/search?q=").status_code == 422
+
+
+def test_search_on_a_seeded_catalog(seeded_catalog):
+    restaurants, meals = seeded_catalog(2000)
+    index = CatalogSearchIndex().build(restaurants, meals)
+
+    for q in ["chicken curry", "spicy ramen", "vegan bowl", "bur"]:
+        assert index.search(q, limit=20)
+    assert "chicken" in index.search("chiken tika")[0]["name"].lower()
+
+
+@pytest.mark.benchmark
+def test_search_benchmark_100k_meals(seeded_catalog):
+    restaurants, meals = seeded_catalog(100_000)
+    start_time = time.time()
+    index = CatalogSearchIndex().build(restaurants, meals)
+    build = time.time() - start_time
+
+    queries = ["chicken curry", "spicy ramen", "vegan bowl", "chiken tika", "pesto pasta", "bur", "korma vegan"]
+    timings = []
+    for q in queries * 5:
+        start_time = time.time()
+        results = index.search(q, limit=20)
+        timings.append(time.time() - start_time)
+        assert results
+    timings.sort()
+
+    print(f"\n100k meals: build {build:.2f}s, query median {timings[len(timings) // 2] * 1000:.1f} ms, "
+          f"max {timings[-1] * 1000:.1f} ms")
+    assert "chicken" in index.search("chiken tika")[0]["name"].lower()
+    assert timings[len(timings) // 2] < 0.1
@@ -0,0 +1,210 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from app import main as main_app
+from app.owner_meals import service
+from app.owner_meals.schemas import MealUpdate
+from app.services import catalog_snapshot as snapshot_module
+from app.services.catalog_snapshot import CatalogSnapshot, catalog_snapshot
+
+RESTAURANTS = [
+    {"id": "r1", "name": "Pizza Palace", "address": "1 Main St", "latitude": 40.0, "longitude": -74.0, "version": 1},
+    {"id": "r2", "name": "Green Bowl", "address": "2 Elm St", "latitude": 40.1, "longitude": -74.1, "version": 2},
+    {"id": "r3", "name": "Bagel Barn", "address": "3 Oak St", "latitude": 40.2, "longitude": -74.2, "version": 3},
+]
+MEALS = [
+    {"id": "m1", "restaurant_id": "r1", "name": "Margherita", "tags": ["vegetarian"], "allergens": ["dairy", "gluten"],
+     "quantity": 2, "base_price": 12, "surplus_price": 6.0, "created_at": "2026-10-01T10:00:00", "version": 4},
+    {"id": "m2", "restaurant_id": "r1", "name": "Garden Pizza", "tags": ["vegan"], "allergens": ["gluten"],
+     "quantity": 0, "base_price": 11, "surplus_price": 5.0, "created_at": "2026-10-03T10:00:00", "version": 5},
+    {"id": "m3", "restaurant_id": "r1", "name": "Calzone", "tags": [], "allergens": ["dairy"],
+     "quantity": 4, "base_price": 13, "surplus_price": None, "created_at": "2026-10-02T10:00:00", "version": 6},
+    {"id": "m4", "restaurant_id": "r2", "name": "Tofu Bowl", "tags": ["vegan"], "allergens": ["soy"],
+     "quantity": 1, "base_price": 10, "surplus_price": 7.5, "created_at": "2026-10-04T10:00:00", "version": 7},
+]
+
+
+class FakeCatalog:
+    """Serves version-filtered pages of in-memory tables like PostgREST."""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.reads = []
+        self.client = MagicMock()
+        self.client.table.side_effect = self._table
+
+    def _table(self, name):
+        query = MagicMock()
+        state = {}
+        query.select.return_value = query
+        query.order.return_value = query
+
+        def gt(column, value):
+            state["since"] = value
+            self.reads.append((name, value))
+            return query
+
+        def page(size):
+            rows = sorted(
+                (r for r in self.tables.get(name, []) if r["version"] > state["since"]), key=lambda r: r["version"]
+            )
+            return MagicMock(**{"execute.return_value.data": rows[:size]})
+
+        query.gt.side_effect = gt
+        query.limit.side_effect = page
+        return query
+
+
+@pytest.fixture
+def catalog():
+    fake = FakeCatalog({
+        "restaurants": [dict(r) for r in RESTAURANTS],
+        "meals": [dict(m) for m in MEALS],
+        "catalog_tombstones": [],
+        "restaurant_menu_versions": [
+            {"restaurant_id": "r1", "version": 6},
+            {"restaurant_id": "r2", "version": 7},
+        ],
+    })
+    with patch("app.services.catalog_snapshot.get_db", return_value=fake.client):
+        yield fake
+
+
+@pytest.fixture
+def snapshot(catalog):
+    snap = CatalogSnapshot(staleness_seconds=60)
+    snap.refresh()
+    return snap
+
+
+@pytest.fixture(autouse=True)
+def reset_snapshot():
+    yield
+    catalog_snapshot.reset()
+
+
+def _ids(rows):
+    return [r["id"] for r in rows]
+
+
+def test_list_restaurants(snapshot):
+    assert _ids(snapshot.list_restaurants()) == ["r3", "r2", "r1"]
+    assert _ids(snapshot.list_restaurants(descending=True, limit=2, offset=1)) == ["r2", "r3"]
+    assert _ids(snapshot.list_restaurants(search="PIZZA")) == ["r1"]
+    assert _ids(snapshot.list_restaurants(restaurant_ids=["r1", "r2"])) == ["r2", "r1"]
+    assert snapshot.list_restaurants()[0] == {
+        "id": "r3", "name": "Bagel Barn", "address": "3 Oak St", "latitude": 40.2, "longitude": -74.2
+    }
+
+
+def test_list_meals_filters_before_paging(snapshot):
+    assert _ids(snapshot.list_meals("r1")) == ["m3", "m2", "m1"]
+    assert _ids(snapshot.list_meals("r1", exclude_allergens=["dairy"], limit=1)) == ["m2"]
+    assert _ids(snapshot.list_meals("r1", tags=["vegan"])) == ["m2"]
+    assert snapshot.list_meals("r1", tags=["keto"]) == []
+    assert _ids(snapshot.list_meals("r1", surplus_only=True, search="ar")) == ["m1"]
+    assert _ids(snapshot.list_meals("r1", sort_column="surplus_price")) == ["m2", "m1", "m3"]
+    assert _ids(snapshot.list_meals("r1", sort_column="surplus_price", descending=True)) == ["m1", "m2", "m3"]
+
+
+def test_recent_meals(snapshot):
+    assert _ids(snapshot.recent_meals()) == ["m4", "m3", "m1"]
+    assert _ids(snapshot.recent_meals(surplus_only=False, limit=2)) == ["m4", "m2"]
+
+
+def test_incremental_refresh_reads_only_changes(catalog, snapshot):
+    catalog.tables["meals"][1].update(quantity=3, version=8)
+    catalog.tables["meals"].append({**MEALS[0], "id": "m5", "name": "Bianca", "version": 9})
+    del catalog.tables["meals"][2]
+    catalog.tables["catalog_tombstones"].append({"kind": "meal", "id": "m3", "version": 10})
+    catalog.tables["restaurants"][2].update(name="Bagel Barn & Deli", version=11)
+
+    # inside the staleness bound nothing is read
+    catalog.reads.clear()
+    snapshot.refresh()
+    assert catalog.reads == []
+
+    snapshot.staleness_seconds = 0
+    with patch.object(snapshot_module, "VERSION_OVERLAP", 0):
+        snapshot.refresh()
+    assert catalog.reads == [
+        ("restaurant_menu_versions", 7), ("restaurants", 7), ("meals", 7), ("catalog_tombstones", 7)
+    ]
+    assert _ids(snapshot.list_meals("r1", surplus_only=True)) == ["m5", "m2", "m1"]
+    assert snapshot.list_restaurants()[0]["name"] == "Bagel Barn & Deli"
+
+    # re-reading the overlap window is harmless
+    snapshot.refresh()
+    assert _ids(snapshot.list_meals("r1")) == ["m5", "m2", "m1"]
+    assert len(snapshot) == 4
+
+
+def test_failed_refresh_keeps_serving(snapshot):
+    snapshot.staleness_seconds = 0
+    with patch("app.services.catalog_snapshot.get_db", side_effect=RuntimeError("db down")):
+        snapshot.refresh()
+    assert _ids(snapshot.list_meals("r2")) == ["m4"]
+
+
+def test_endpoints_served_from_memory(catalog):
+    client = TestClient(main_app.app)
+    with patch.object(snapshot_module, "ENABLED", True), \
+            patch("app.routers.catalog.get_db") as catalog_db, \
+            patch("app.routers.meals.get_db") as meals_db:
+        response = client.get("/catalog/restaurants?search=bowl")
+        assert response.status_code == 200
+        assert _ids(response.json()) == ["r2"]
+
+        response = client.get("/catalog/restaurants/r1/meals?exclude_allergens=dairy&sort=price_desc")
+        assert _ids(response.json()) == ["m2"]
+
+        response = client.get("/meals?limit=2")
+        assert _ids(response.json()) == ["m4", "m3"]
+
+    catalog_db.assert_not_called()
+    meals_db.assert_not_called()
+
+
+def test_owner_edit_writes_through(catalog):
+    catalog_snapshot.refresh()
+    with patch("app.owner_meals.service.get_db") as mock_get_db:
+        table = mock_get_db.return_value.table.return_value
+        table.delete.return_value.eq.return_value.eq.return_value.execute.return_value.data = [{"id": "m2"}]
+        table.update.return_value.eq.return_value.eq.return_value.execute.return_value.data = [
+            {"id": "m2", "restaurant_id": "r1", "name": "Garden Pizza", "quantity": 6}
+        ]
+        service.update_meal("m2", "r1", MealUpdate(quantity=6))
+        service.delete_meal("m1", "r1")
+
+    meals = catalog_snapshot.list_meals("r1", surplus_only=True)
+    assert _ids(meals) == ["m3", "m2"]
+    # fields the update did not return are kept
+    assert meals[1]["tags"] == ["vegan"] and meals[1]["quantity"] == 6
+
+
+def test_menu_stamps_follow_refresh_and_edits(catalog, snapshot):
+    assert snapshot.menu_version("r1") == 6
+    assert snapshot.catalog_version() == 7
+
+    snapshot.meal_changed({"id": "m1", "restaurant_id": "r1", "quantity": 0})
+    assert snapshot.menu_version("r1") is None
+    assert snapshot.catalog_version() is None
+
+    catalog.tables["meals"][0].update(quantity=0, version=8)
+    catalog.tables["restaurant_menu_versions"][0]["version"] = 9
+    snapshot.staleness_seconds = 0
+    snapshot.refresh()
+    assert snapshot.menu_version("r1") == 9
+    assert snapshot.catalog_version() == 9
+
+
+def test_unchanged_menu_is_304_from_memory(catalog):
+    client = TestClient(main_app.app)
+    with patch.object(snapshot_module, "ENABLED", True):
+        response = client.get("/catalog/restaurants/r1/meals")
+        etag = response.headers["ETag"]
+        catalog.reads.clear()
+        response = client.get("/catalog/restaurants/r1/meals", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert catalog.reads == []
@@ -1,6 +1,6 @@
 import pytest
 from unittest.mock import Mock, patch, AsyncMock
-from fastapi import HTTPException
+from fastapi import HTTPException, Response
 from app.routers.chat import send_message, get_history_route, list_sessions, create_session_route, update_session_route, delete_session_route, SendRequest, CreateSessionRequest, UpdateSessionRequest
 
 
@@ -111,11 +111,13 @@ async def test_get_history_no_session(mock_user):
 @patch("app.routers.chat.get_sessions_for_user")
 @pytest.mark.asyncio
 async def test_list_sessions(mock_get_sessions, mock_user):
-    mock_get_sessions.return_value = [{"id": "s1", "title": "Chat 1"}]
+    mock_get_sessions.return_value = ([{"id": "s1", "title": "Chat 1"}], "next")
+    response = Response()
 
-    result = await list_sessions(50, 0, mock_user)
+    result = await list_sessions(response, 50, 0, mock_user)
 
     assert len(result["sessions"]) == 1
+    assert response.headers["X-Next-Cursor"] == "next"
 
 
 @patch("app.routers.chat.create_session")
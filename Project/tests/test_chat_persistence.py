@@ -3,6 +3,7 @@ from unittest.mock import MagicMock
 
 from app.services import chat_persistence
 import app.db as app_db
+from app.services.keyset import decode_cursor
 
 
 def test_create_session_inserts_row(monkeypatch):
@@ -74,3 +75,31 @@ def test_session_belongs_to_user_cases(monkeypatch):
     supabase.table.return_value.select.return_value.limit.return_value.execute.return_value = MagicMock(data=[{"user_id": None}])
     assert chat_persistence.session_belongs_to_user("anon", None) is True
     assert chat_persistence.session_belongs_to_user("anon", "u1") is False
+
+
+def _sessions_db(rows):
+    db = MagicMock()
+    sessions = db.table.return_value.select.return_value.eq.return_value
+    sessions.order.return_value.order.return_value.limit.return_value.execute.return_value = MagicMock(data=rows)
+    return db
+
+
+def test_sessions_page_reads_one_extra_row_for_the_cursor(monkeypatch):
+    rows = [{"id": f"s{i}", "created_at": f"t{9 - i}"} for i in range(3)]
+    db = _sessions_db(rows)
+    monkeypatch.setattr(chat_persistence, "get_db", lambda: db)
+
+    page, next_cursor = chat_persistence.get_sessions_for_user("u1", limit=2)
+
+    db.table.return_value.select.return_value.eq.return_value.order.return_value.order.return_value.limit.assert_called_with(3)
+    assert [s["id"] for s in page] == ["s0", "s1"]
+    assert decode_cursor(next_cursor) == ("t8", "s1")
+
+
+def test_last_sessions_page_has_no_cursor(monkeypatch):
+    monkeypatch.setattr(chat_persistence, "get_db", lambda: _sessions_db([{"id": "s0", "created_at": "t9"}, {"id": "s1", "created_at": "t8"}]))
+
+    page, next_cursor = chat_persistence.get_sessions_for_user("u1", limit=2)
+
+    assert len(page) == 2
+    assert next_cursor is None
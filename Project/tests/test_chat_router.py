@@ -73,10 +73,11 @@ def test_list_sessions_returns_user_sessions(monkeypatch):
     ]
 
     # Router imports get_sessions_for_user at module import time, patch the router's reference
-    monkeypatch.setattr(chat_router_module, "get_sessions_for_user", lambda user_id, limit=50, offset=0: sample_sessions)
+    monkeypatch.setattr(chat_router_module, "get_sessions_for_user", lambda user_id, limit=50, offset=0: (sample_sessions, None))
 
     resp = client.get("/chat/sessions")
     assert resp.status_code == 200
     data = resp.json()
     assert "sessions" in data
     assert data["sessions"] == sample_sessions
+    assert "X-Next-Cursor" not in resp.headers
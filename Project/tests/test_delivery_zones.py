@@ -0,0 +1,188 @@
+import random
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from app import main as main_app
+from app.routers import cart
+from app.services.delivery_zones import DeliveryZoneIndex, compile_zone, delivery_zones
+
+RALEIGH = (35.7796, -78.6382)
+DURHAM = (35.9940, -78.8986)
+
+# A square around downtown Raleigh with a hole in the middle, [lng, lat]
+SQUARE = {
+    "type": "Polygon",
+    "coordinates": [
+        [[-78.70, 35.74], [-78.58, 35.74], [-78.58, 35.82], [-78.70, 35.82], [-78.70, 35.74]],
+        [[-78.645, 35.775], [-78.635, 35.775], [-78.635, 35.785], [-78.645, 35.785], [-78.645, 35.775]],
+    ],
+}
+
+
+def test_radius_zone():
+    zone = compile_zone({"id": "r1", "latitude": RALEIGH[0], "longitude": RALEIGH[1], "delivery_radius_miles": 5})
+    assert zone.contains(RALEIGH[0] + 0.05, RALEIGH[1])
+    assert not zone.contains(*DURHAM)
+    # default radius when none is stored
+    assert compile_zone({"id": "r2", "latitude": RALEIGH[0], "longitude": RALEIGH[1]}).radius_miles == 10
+    assert compile_zone({"id": "r3"}) is None
+
+
+def test_polygon_zone_with_hole():
+    zone = compile_zone({"id": "r1", "latitude": 0, "longitude": 0, "delivery_zone": SQUARE})
+    assert zone.polygons
+    assert zone.contains(35.76, -78.60)
+    assert not zone.contains(35.78, -78.64)  # inside the hole
+    assert not zone.contains(35.83, -78.60)
+
+    multi = {"type": "MultiPolygon", "coordinates": [SQUARE["coordinates"][:1], [[[-79.0, 36.0], [-78.8, 36.0], [-78.8, 36.1], [-79.0, 36.0]]]]}
+    zone = compile_zone({"id": "r2", "delivery_zone": multi})
+    assert zone.contains(35.78, -78.64)
+    assert zone.contains(36.02, -78.85)
+
+    # a malformed polygon falls back to the radius
+    zone = compile_zone({"id": "r3", "latitude": RALEIGH[0], "longitude": RALEIGH[1], "delivery_zone": {"type": "Polygon", "coordinates": [["x"]]}})
+    assert zone.radius_miles == 10
+
+
+def test_index_lookup_and_upsert():
+    index = DeliveryZoneIndex()
+    index.load([
+        {"id": "near", "latitude": RALEIGH[0], "longitude": RALEIGH[1], "delivery_radius_miles": 3},
+        {"id": "durham", "latitude": DURHAM[0], "longitude": DURHAM[1], "delivery_radius_miles": 3},
+        {"id": "square", "delivery_zone": SQUARE},
+        {"id": "nowhere"},
+    ])
+    index._loaded_at = time.monotonic()
+
+    assert sorted(index.deliverable(RALEIGH[0] + 0.03, RALEIGH[1])) == ["near", "square"]
+    assert index.deliverable(*DURHAM) == ["durham"]
+    assert index.delivers_to("durham", *RALEIGH) is False
+    assert index.delivers_to("unknown", *RALEIGH) is None
+
+    index.upsert({"id": "durham", "latitude": DURHAM[0], "longitude": DURHAM[1], "delivery_radius_miles": 30})
+    assert index.delivers_to("durham", *RALEIGH) is True
+    index.upsert({"id": "durham"})
+    assert index.get("durham") is None
+    assert "durham" not in index.deliverable(*DURHAM)
+
+
+def _random_zones(n, rng):
+    rows = [
+        {"id": f"r{i}", "latitude": RALEIGH[0] + rng.uniform(-0.5, 0.5),
+         "longitude": RALEIGH[1] + rng.uniform(-0.5, 0.5), "delivery_radius_miles": rng.uniform(1, 15)}
+        for i in range(n)
+    ]
+    index = DeliveryZoneIndex()
+    index.load(rows)
+    index._loaded_at = time.monotonic()
+    return index, [compile_zone(r) for r in rows]
+
+
+def test_index_lookup_matches_brute_force():
+    rng = random.Random(3)
+    index, zones = _random_zones(1000, rng)
+    points = [(RALEIGH[0] + rng.uniform(-0.6, 0.6), RALEIGH[1] + rng.uniform(-0.6, 0.6)) for _ in range(100)]
+
+    for p in points:
+        assert sorted(index.deliverable(*p)) == sorted(z.restaurant_id for z in zones if z.contains(*p))
+
+
+@pytest.mark.benchmark
+def test_index_lookup_latency():
+    rng = random.Random(3)
+    index, _ = _random_zones(5000, rng)
+    points = [(RALEIGH[0] + rng.uniform(-0.6, 0.6), RALEIGH[1] + rng.uniform(-0.6, 0.6)) for _ in range(200)]
+
+    start_time = time.time()
+    for p in points:
+        index.deliverable(*p)
+    elapsed = time.time() - start_time
+
+    print(f"\n5000 zones: {elapsed / len(points) * 1000:.2f} ms per lookup")
+    assert elapsed / len(points) < 0.02
+
+
+def test_index_refresh_from_database():
+    mock_supabase = MagicMock()
+    mock_supabase.table.return_value.select.return_value.execute.return_value.data = [
+        {"id": "r1", "latitude": RALEIGH[0], "longitude": RALEIGH[1], "delivery_radius_miles": 2},
+    ]
+    index = DeliveryZoneIndex()
+    with patch("app.services.delivery_zones.get_db", return_value=mock_supabase):
+        assert index.deliverable(*RALEIGH) == ["r1"]
+        index.deliverable(*DURHAM)
+    assert mock_supabase.table.call_count == 1
+
+
+def test_list_restaurants_filters_to_deliverable():
+    delivery_zones.load([
+        {"id": "r1", "latitude": RALEIGH[0], "longitude": RALEIGH[1], "delivery_radius_miles": 5},
+        {"id": "r2", "latitude": DURHAM[0], "longitude": DURHAM[1], "delivery_radius_miles": 5},
+    ])
+    delivery_zones._loaded_at = time.monotonic()
+    mock_supabase = MagicMock()
+    query = mock_supabase.table.return_value.select.return_value
+    query.in_.return_value.order.return_value.order.return_value.limit.return_value.execute.return_value.data = [{"id": "r1"}]
+
+    with patch("app.routers.catalog.get_db", return_value=mock_supabase):
+        client = TestClient(main_app.app)
+        response = client.get(f"/catalog/restaurants?lat={RALEIGH[0]}&lng={RALEIGH[1]}")
+        assert response.json() == [{"id": "r1"}]
+        query.in_.assert_called_once_with("id", ["r1"])
+
+        # nobody delivers to the middle of nowhere; no query is run
+        response = client.get("/catalog/restaurants?lat=40.0&lng=-100.0")
+        assert response.json() == []
+        assert query.in_.call_count == 1
+
+
+def _checkout_db(restaurant_row):
+    mock_supabase = MagicMock()
+    items = [{"meal_id": "m1", "qty": 1, "meals": {"restaurant_id": "r1", "base_price": 10, "quantity": 5}}]
+    tables = {
+        "cart_items": MagicMock(data=items),
+        "restaurants": MagicMock(data=[restaurant_row]),
+    }
+    mock_supabase.table.side_effect = lambda name: MagicMock(**{
+        "select.return_value.eq.return_value.execute.return_value": tables.get(name, MagicMock(data=[]))
+    })
+    return mock_supabase
+
+
+@pytest.fixture
+def customer_client():
+    main_app.app.dependency_overrides[cart.current_user] = lambda: {"id": "cust1"}
+    yield TestClient(main_app.app)
+    main_app.app.dependency_overrides.clear()
+
+
+def test_checkout_rejects_addresses_outside_zone_without_routing(customer_client):
+    delivery_zones.load([{"id": "r1", "latitude": RALEIGH[0], "longitude": RALEIGH[1], "delivery_radius_miles": 5}])
+    delivery_zones._loaded_at = time.monotonic()
+    provider = MagicMock()
+
+    with patch("app.routers.cart.get_db", return_value=_checkout_db({"latitude": RALEIGH[0], "longitude": RALEIGH[1]})), \
+            patch("app.routers.cart._get_or_create_cart_id", return_value="cart1"), \
+            patch("app.routers.cart.get_distance_provider", return_value=provider):
+        response = customer_client.post("/cart/checkout", json={
+            "delivery_address": "Durham", "latitude": DURHAM[0], "longitude": DURHAM[1], "total": 10,
+        })
+
+    assert response.status_code == 400
+    assert "does not deliver" in response.json()["detail"]
+    provider.route.assert_not_called()
+
+
+def test_checkout_falls_back_to_default_radius_for_unindexed_restaurant(customer_client):
+    provider = MagicMock()
+    with patch("app.routers.cart.get_db", return_value=_checkout_db({"latitude": RALEIGH[0], "longitude": RALEIGH[1]})), \
+            patch("app.routers.cart._get_or_create_cart_id", return_value="cart1"), \
+            patch("app.routers.cart.get_distance_provider", return_value=provider):
+        response = customer_client.post("/cart/checkout", json={
+            "delivery_address": "Far away", "latitude": 36.5, "longitude": -79.5, "total": 10,
+        })
+
+    assert response.status_code == 400
+    provider.route.assert_not_called()
@@ -0,0 +1,163 @@
+import random
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from app import main as main_app
+from app.owner_meals import service
+from app.owner_meals.schemas import MealUpdate
+from app.services.dietary_index import DietaryIndex, LabelCodebook, dietary_index, parse_labels
+
+MENU = [
+    {"id": "m1", "name": "Peanut Noodles", "tags": ["Vegan"], "allergens": ["Peanuts", "soy"], "quantity": 3, "surplus_price": 6.0},
+    {"id": "m2", "name": "Garden Salad", "tags": ["vegan", "gluten-free"], "allergens": [], "quantity": 0, "surplus_price": 5.0},
+    {"id": "m3", "name": "Cheese Pizza", "tags": ["vegetarian"], "allergens": ["dairy", "gluten"], "quantity": 2, "surplus_price": None},
+    {"id": "m4", "name": "Tofu Bowl", "tags": ["vegan", "gluten-free"], "allergens": ["Soy "], "quantity": 5, "surplus_price": 7.5},
+    {"id": "m5", "name": "Fruit Cup", "tags": ["vegan", "gluten-free"], "allergens": None, "quantity": 1, "surplus_price": 3.0},
+]
+
+
+def _menu_db(rows):
+    """Serves `rows` (already in id order) a keyset page at a time."""
+    mock_supabase = MagicMock()
+    query = mock_supabase.table.return_value.select.return_value.eq.return_value
+
+    def seek(after=None):
+        rest = [r for r in rows if after is None or r["id"] > after]
+        ordered = MagicMock()
+        ordered.limit.side_effect = lambda size: MagicMock(**{"execute.return_value.data": rest[:size]})
+        return MagicMock(**{"order.return_value": ordered})
+
+    query.order.return_value = seek().order.return_value
+    query.gt.side_effect = lambda column, value: seek(value)
+    return mock_supabase
+
+
+@pytest.fixture
+def memory_index():
+    with patch.object(dietary_index, "backend", "memory"), \
+            patch("app.services.dietary_index.get_db", return_value=_menu_db(MENU)) as get_db:
+        yield get_db
+
+
+def _ids(rows):
+    return [r["id"] for r in rows]
+
+
+def test_codebook_encodes_labels_as_bits():
+    book = LabelCodebook()
+    mask = book.encode(["Vegan", " gluten-free", "vegan", ""])
+    assert mask == 0b11
+    assert book.lookup(["VEGAN"]) == 0b01
+    assert book.lookup(["vegan", "keto"]) is None
+    assert book.known(["keto", "gluten-free"]) == 0b10
+    assert sorted(book.decode(mask)) == ["gluten-free", "vegan"]
+    assert parse_labels(" Peanuts, ,soy,peanuts") == ["peanuts", "soy"]
+
+
+def test_filters_apply_before_paging(memory_index):
+    index = DietaryIndex(backend="memory")
+    # the old path excluded after .range(), returning short pages
+    page = index.list_meals("r1", [], ["soy"], limit=2)
+    assert _ids(page) == ["m3", "m5"]
+    assert _ids(index.list_meals("r1", [], ["soy"], limit=2, offset=2)) == ["m2"]
+
+    assert _ids(index.list_meals("r1", ["vegan", "gluten-free"], ["soy"])) == ["m5", "m2"]
+    assert _ids(index.list_meals("r1", ["vegan"], [], surplus_only=True)) == ["m5", "m1", "m4"]
+    assert _ids(index.list_meals("r1", ["vegan"], [], search="BOWL")) == ["m4"]
+    # nobody is tagged keto; nobody lists sesame
+    assert index.list_meals("r1", ["keto"], []) == []
+    assert len(index.list_meals("r1", [], ["sesame"])) == 5
+
+
+def test_price_sort_keeps_nulls_last(memory_index):
+    index = DietaryIndex(backend="memory")
+    assert _ids(index.list_meals("r1", [], ["peanuts"], sort_column="surplus_price")) == ["m5", "m2", "m4", "m3"]
+    assert _ids(index.list_meals("r1", [], ["peanuts"], sort_column="surplus_price", descending=True)) == ["m4", "m2", "m5", "m3"]
+
+
+def test_menu_is_cached_until_invalidated(memory_index):
+    index = DietaryIndex(backend="memory")
+    index.list_meals("r1", ["vegan"], [])
+    index.list_meals("r1", ["vegan"], ["soy"], offset=1)
+    assert memory_index.call_count == 1
+    index.invalidate("r1")
+    index.list_meals("r1", ["vegan"], [])
+    assert memory_index.call_count == 2
+
+
+def test_postgres_backend_pages_in_sql():
+    mock_supabase = MagicMock()
+    mock_supabase.rpc.return_value.execute.return_value.data = [{"id": "m2"}]
+    index = DietaryIndex(backend="postgres")
+    with patch("app.services.dietary_index.get_db", return_value=mock_supabase):
+        assert index.list_meals("r1", ["vegan"], ["soy"], limit=10, offset=20) == [{"id": "m2"}]
+    params = mock_supabase.rpc.call_args[0][1]
+    assert mock_supabase.rpc.call_args[0][0] == "list_restaurant_meals"
+    assert params["p_tags"] == ["vegan"] and params["p_exclude_allergens"] == ["soy"]
+    assert (params["p_limit"], params["p_offset"]) == (10, 20)
+
+
+def test_endpoint_returns_full_filtered_pages(memory_index):
+    client = TestClient(main_app.app)
+    response = client.get("/catalog/restaurants/r1/meals?exclude_allergens=Soy,peanuts&limit=2")
+    assert response.status_code == 200
+    assert _ids(response.json()) == ["m3", "m5"]
+
+    response = client.get("/catalog/restaurants/r1/meals?vegan=true&gluten_free=true&sort=price_desc")
+    assert _ids(response.json()) == ["m4", "m2", "m5"]
+
+
+def test_owner_edit_invalidates_cached_menu(memory_index):
+    dietary_index.list_meals("r1", ["vegan"], [])
+    with patch("app.owner_meals.service.get_db") as mock_get_db:
+        table = mock_get_db.return_value.table.return_value
+        table.delete.return_value.eq.return_value.eq.return_value.execute.return_value.data = [{"id": "m1"}]
+        table.update.return_value.eq.return_value.eq.return_value.execute.return_value.data = [
+            {"id": "m1", "restaurant_id": "r1", "name": "Peanut Noodles", "tags": []}
+        ]
+        service.update_meal("m1", "r1", MealUpdate(tags=[]))
+    dietary_index.list_meals("r1", ["vegan"], [])
+    assert memory_index.call_count == 2
+
+
+def _seeded_menu(n):
+    rng = random.Random(5)
+    tags = ["vegan", "vegetarian", "gluten-free", "halal", "keto", "spicy"]
+    allergens = ["peanuts", "tree nuts", "soy", "dairy", "gluten", "egg", "shellfish", "sesame"]
+    return [
+        {"id": f"m{i:05d}", "name": f"Meal {i}", "tags": rng.sample(tags, rng.randint(0, 3)),
+         "allergens": rng.sample(allergens, rng.randint(0, 3)), "quantity": rng.randint(0, 3), "surplus_price": 5.0}
+        for i in range(n)
+    ]
+
+
+def _expected(rows):
+    return [
+        r["id"] for r in rows
+        if "vegan" in r["tags"] and not {"peanuts", "soy", "sesame"} & set(r["allergens"])
+    ]
+
+
+def test_filter_matches_a_full_scan():
+    rows = _seeded_menu(2000)
+    index = DietaryIndex(backend="memory")
+    with patch("app.services.dietary_index.get_db", return_value=_menu_db(rows)):
+        hits = index.filter_menu("big", ["vegan"], ["peanuts", "soy", "sesame"])
+    assert _ids(hits) == _expected(rows)
+
+
+@pytest.mark.benchmark
+def test_filter_cost_per_meal():
+    rows = _seeded_menu(20000)
+    index = DietaryIndex(backend="memory")
+    with patch("app.services.dietary_index.get_db", return_value=_menu_db(rows)):
+        index.menu("big")
+        start_time = time.time()
+        for _ in range(10):
+            hits = index.filter_menu("big", ["vegan"], ["peanuts", "soy", "sesame"])
+        elapsed = (time.time() - start_time) / 10
+
+    assert _ids(hits) == _expected(rows)
+    print(f"\n20k meals: {elapsed * 1000:.1f} ms per filter ({elapsed / len(rows) * 1e9:.0f} ns per meal)")
+    assert elapsed < 0.1
@@ -0,0 +1,189 @@
+import itertools
+import time
+import numpy as np
+import pytest
+from unittest.mock import MagicMock, patch
+from app.services.dispatch import (
+    INFEASIBLE,
+    DispatchEngine,
+    build_cost_matrix,
+    greedy_assignment,
+    pairwise_miles,
+    solve_assignment,
+)
+from app.services.driver_locations import DriverPosition, driver_locations
+from app.services.geo import haversine_miles
+from app.services.matrix_cache import matrix_cache
+
+
+def _brute_force(cost):
+    n, m = cost.shape
+    if n <= m:
+        return min(sum(cost[i, j] for i, j in zip(range(n), perm)) for perm in itertools.permutations(range(m), n))
+    return min(sum(cost[i, j] for i, j in zip(perm, range(m))) for perm in itertools.permutations(range(n), m))
+
+
+@pytest.mark.parametrize("shape", [(1, 1), (3, 3), (4, 6), (6, 4), (5, 5)])
+def test_solve_assignment_is_optimal(shape):
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        cost = rng.random(shape)
+        rows, cols = solve_assignment(cost)
+        assert len(rows) == min(shape)
+        assert len(set(rows)) == len(rows) and len(set(cols)) == len(cols)
+        assert cost[rows, cols].sum() == pytest.approx(_brute_force(cost))
+
+
+def test_solve_assignment_empty():
+    rows, cols = solve_assignment(np.zeros((0, 3)))
+    assert len(rows) == len(cols) == 0
+
+
+def test_greedy_takes_orders_in_turn():
+    cost = np.array([[1.0, 2.0], [1.5, 10.0]])
+    rows, cols = greedy_assignment(cost)
+    # order 0 grabs driver 0, leaving order 1 with the far driver
+    assert list(zip(rows, cols)) == [(0, 0), (1, 1)]
+    rows, cols = solve_assignment(cost)
+    assert list(zip(rows, cols)) == [(0, 1), (1, 0)]
+
+
+def test_pairwise_miles_matches_haversine():
+    a = np.array([[35.78, -78.64], [35.9, -78.9]])
+    b = np.array([[36.0, -78.5], [35.78, -78.64], [35.5, -79.0]])
+    matrix = pairwise_miles(a[:, 0], a[:, 1], b[:, 0], b[:, 1])
+    for i, j in itertools.product(range(2), range(3)):
+        assert matrix[i, j] == pytest.approx(haversine_miles(*a[i], *b[j]))
+
+
+def test_cost_matrix_prefers_cached_road_distance_and_caps_range():
+    drivers = [(35.78, -78.64)]
+    restaurants = [("r1", 35.79, -78.64), ("r2", 40.0, -75.0)]
+    matrix_cache.put(matrix_cache.cell(35.78, -78.64), "r1", (3218.68, 300.0))
+
+    cost = build_cost_matrix(drivers, restaurants, max_pickup_miles=15)
+
+    assert cost[0, 0] == pytest.approx(2.0)
+    assert cost[0, 1] == INFEASIBLE
+
+
+def test_cost_matrix_looks_up_each_cell_and_restaurant_once():
+    # three drivers in one cell, one in another; two orders from r1
+    drivers = [(35.78, -78.64), (35.78001, -78.64), (35.78002, -78.64), (35.9, -78.9)]
+    restaurants = [("r1", 35.79, -78.64), ("r2", 35.8, -78.65), ("r1", 35.79, -78.64)]
+    matrix_cache.put(matrix_cache.cell(35.78, -78.64), "r1", (3218.68, 300.0))
+
+    with patch.object(matrix_cache, "peek", wraps=matrix_cache.peek) as peek:
+        cost = build_cost_matrix(drivers, restaurants, max_pickup_miles=50)
+
+    assert peek.call_count == 2 * 2
+    assert cost[:3, [0, 2]] == pytest.approx(np.full((3, 2), 2.0))
+    assert cost[3, 0] == pytest.approx(haversine_miles(35.9, -78.9, 35.79, -78.64) * 1.3)
+    assert cost[0, 1] == pytest.approx(haversine_miles(35.78, -78.64, 35.8, -78.65) * 1.3)
+
+
+def _ready_order(order_id, restaurant_id, lat, lng):
+    return {"id": order_id, "restaurant_id": restaurant_id, "restaurants": {"latitude": lat, "longitude": lng}}
+
+
+def test_plan_offers_each_order_once_and_skips_infeasible():
+    engine = DispatchEngine()
+    drivers = {
+        "d1": DriverPosition(35.78, -78.64, 0.0, True),
+        "d2": DriverPosition(35.90, -78.90, 0.0, True),
+        "d3": DriverPosition(45.0, -70.0, 0.0, True),
+    }
+    orders = [
+        _ready_order("o1", "r1", 35.89, -78.89),
+        _ready_order("o2", "r2", 35.781, -78.641),
+        _ready_order("o3", "r3", None, None),
+    ]
+
+    offers = engine.plan(drivers, orders, now=0.0)
+
+    assert {d: o.order_id for d, o in offers.items()} == {"d1": "o2", "d2": "o1"}
+    assert engine.plan({}, orders) == {}
+
+
+def test_run_once_excludes_busy_drivers():
+    driver_locations.update("d1", 35.78, -78.64)
+    driver_locations.update("d2", 35.79, -78.64)
+    mock_supabase = MagicMock()
+    mock_supabase.table.return_value.select.return_value.in_.return_value.execute.return_value.data = [
+        {"delivery_user_id": "d1"}
+    ]
+    ready = mock_supabase.from_.return_value.select.return_value.eq.return_value.is_.return_value.order.return_value
+    ready.execute.return_value.data = [_ready_order("o1", "r1", 35.78, -78.64)]
+    engine = DispatchEngine()
+
+    with patch("app.services.dispatch.get_db", return_value=mock_supabase):
+        offers = engine.run_once()
+
+    assert list(offers) == ["d2"]
+    assert engine.offer_for("d2").order_id == "o1"
+    assert engine.offer_for("d1") is None
+
+
+def test_expired_offer_is_not_returned():
+    engine = DispatchEngine()
+    engine.offers = engine.plan(
+        {"d1": DriverPosition(35.78, -78.64, 0.0, True)}, [_ready_order("o1", "r1", 35.78, -78.64)], now=0.0
+    )
+    assert engine.offer_for("d1", now=1.0) is not None
+    assert engine.offer_for("d1", now=3600.0) is None
+
+
+def _city_costs(n):
+    rng = np.random.default_rng(42)
+    drivers = np.column_stack([35.6 + rng.random(n) * 0.4, -78.9 + rng.random(n) * 0.5])
+    restaurants = np.column_stack([35.6 + rng.random(n) * 0.4, -78.9 + rng.random(n) * 0.5])
+    return pairwise_miles(drivers[:, 0], drivers[:, 1], restaurants[:, 0], restaurants[:, 1])
+
+
+def test_assignment_beats_greedy_on_a_city():
+    cost = _city_costs(60)
+    rows, cols = solve_assignment(cost)
+    g_rows, g_cols = greedy_assignment(cost)
+
+    assert len(rows) == 60 and len(set(cols)) == 60
+    assert cost[rows, cols].sum() < cost[g_rows, g_cols].sum()
+
+
+@pytest.mark.benchmark
+def test_dispatch_benchmark_500_by_500():
+    """Solve time for 500 drivers x 500 orders, and the pickup distance
+    saved over first-come-first-served greedy."""
+    cost = _city_costs(500)
+
+    start_time = time.time()
+    rows, cols = solve_assignment(cost)
+    solve_time = time.time() - start_time
+
+    g_rows, g_cols = greedy_assignment(cost)
+    optimal = cost[rows, cols].mean()
+    greedy = cost[g_rows, g_cols].mean()
+
+    print(f"\n500x500 solve {solve_time:.2f}s, avg pickup {optimal:.2f} mi vs greedy {greedy:.2f} mi "
+          f"({(1 - optimal / greedy) * 100:.0f}% shorter)")
+    assert len(rows) == 500
+    assert optimal < greedy * 0.8
+    assert solve_time < 10.0
+
+
+def test_offer_endpoint():
+    from fastapi.testclient import TestClient
+    from app import main as main_app
+    from app.routers import dispatch as dispatch_router
+    from app.services.dispatch import dispatch_engine
+
+    main_app.app.dependency_overrides[dispatch_router.current_user] = lambda: {"id": "d1"}
+    dispatch_engine.offers = dispatch_engine.plan(
+        {"d1": DriverPosition(35.78, -78.64, 0.0, True)}, [_ready_order("o1", "r1", 35.78, -78.64)]
+    )
+    try:
+        client = TestClient(main_app.app)
+        assert client.get("/driver/offer").json()["offer"]["order_id"] == "o1"
+        dispatch_engine.offers = {}
+        assert client.get("/driver/offer").json() == {"offer": None}
+    finally:
+        main_app.app.dependency_overrides.clear()
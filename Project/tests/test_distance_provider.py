@@ -0,0 +1,189 @@
+import asyncio
+import socket
+import threading
+import time
+import pytest
+import uvicorn
+from unittest.mock import MagicMock, patch
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from app.main import app
+from app.routers.cart import _get_distance_and_duration
+from app.routers.delivery_routes import _compute_distances_and_durations
+from app.scripts.mapbox_standin import make_app
+from app.services import distance
+from app.services.distance import (
+    DistanceProvider,
+    DistanceProviderError,
+    FixtureProvider,
+    HaversineProvider,
+    MapboxProvider,
+    get_distance_provider,
+    set_distance_provider,
+)
+
+RALEIGH = (35.7796, -78.6382)
+DURHAM = (35.9940, -78.8986)
+
+
+@pytest.fixture(autouse=True)
+def reset_provider():
+    set_distance_provider(None)
+    yield
+    set_distance_provider(None)
+
+
+@pytest.fixture(scope="module")
+def standin():
+    """Run the Mapbox stand-in on a free local port for the module."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    standin_app = make_app(latency_ms=20)
+    server = uvicorn.Server(uvicorn.Config(standin_app, host="127.0.0.1", port=port, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    for _ in range(100):
+        if server.started:
+            break
+        time.sleep(0.05)
+    yield f"http://127.0.0.1:{port}", standin_app
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+def test_haversine_provider_estimates():
+    provider = HaversineProvider(detour_factor=1.0, speed_mph=30)
+    meters, seconds = provider.route(RALEIGH, DURHAM)
+    assert meters / 1609.34 == pytest.approx(20.9, abs=1.0)
+    assert seconds == pytest.approx(meters / 1609.34 / 30 * 3600)
+    assert asyncio.run(provider.matrix(RALEIGH, [DURHAM, RALEIGH]))[1] == (0.0, 0.0)
+
+
+def test_fixture_provider_replays_and_flags_misses(tmp_path):
+    path = tmp_path / "legs.json"
+    recorder = FixtureProvider(str(path), fallback=HaversineProvider())
+    leg = recorder.route(RALEIGH, DURHAM)
+    legs = asyncio.run(recorder.matrix(RALEIGH, [DURHAM, (35.9, -78.7)]))
+    recorder.save()
+
+    replay = FixtureProvider(str(path))
+    assert len(replay) == 2
+    assert replay.route(RALEIGH, DURHAM) == pytest.approx(leg)
+    assert asyncio.run(replay.matrix(RALEIGH, [(35.9, -78.7)]))[0] == pytest.approx(legs[1])
+    with pytest.raises(DistanceProviderError):
+        replay.route(DURHAM, RALEIGH)
+
+
+def test_provider_chosen_from_environment(monkeypatch, tmp_path):
+    monkeypatch.setenv("DISTANCE_PROVIDER", "haversine")
+    assert isinstance(get_distance_provider(), HaversineProvider)
+
+    set_distance_provider(None)
+    monkeypatch.setenv("DISTANCE_PROVIDER", "fixture")
+    monkeypatch.setenv("DISTANCE_FIXTURE_PATH", str(tmp_path / "missing.json"))
+    assert isinstance(get_distance_provider(), FixtureProvider)
+
+    set_distance_provider(None)
+    monkeypatch.delenv("DISTANCE_PROVIDER")
+    assert isinstance(get_distance_provider(), MapboxProvider)
+
+
+def test_mapbox_provider_without_token(monkeypatch):
+    monkeypatch.delenv("MAPBOX_TOKEN", raising=False)
+    monkeypatch.delenv("NEXT_PUBLIC_MAPBOX_TOKEN", raising=False)
+    provider = MapboxProvider()
+    with pytest.raises(DistanceProviderError):
+        provider.route(RALEIGH, DURHAM)
+    with pytest.raises(DistanceProviderError):
+        asyncio.run(provider.matrix(RALEIGH, [DURHAM]))
+
+
+def test_cart_maps_provider_results_to_http_errors():
+    set_distance_provider(HaversineProvider(detour_factor=1.0))
+    info = _get_distance_and_duration(*RALEIGH, *DURHAM)
+    assert info["distance_miles"] == pytest.approx(20.9, abs=1.0)
+
+    no_route = MagicMock()
+    no_route.route.return_value = None
+    set_distance_provider(no_route)
+    with pytest.raises(HTTPException) as exc:
+        _get_distance_and_duration(*RALEIGH, *DURHAM)
+    assert exc.value.status_code == 400
+
+    failing = MagicMock()
+    failing.route.side_effect = DistanceProviderError("boom")
+    set_distance_provider(failing)
+    with pytest.raises(HTTPException) as exc:
+        _get_distance_and_duration(*RALEIGH, *DURHAM)
+    assert exc.value.status_code == 500
+
+
+def test_mapbox_provider_against_standin(standin):
+    base_url, _ = standin
+    provider = MapboxProvider(base_url=base_url, token="local")
+    expected = HaversineProvider().estimate(RALEIGH, DURHAM)
+
+    assert provider.route(RALEIGH, DURHAM) == pytest.approx(expected, abs=0.1)
+    legs = asyncio.run(provider.matrix(RALEIGH, [DURHAM, RALEIGH]))
+    assert legs[0] == pytest.approx(expected, abs=0.1)
+    assert legs[1] == (0.0, 0.0)
+
+
+def test_ready_deliveries_through_standin(standin):
+    """The whole /deliveries/ready path, with Mapbox replaced by the stand-in."""
+    base_url, standin_app = standin
+    set_distance_provider(MapboxProvider(base_url=base_url, token="local"))
+    orders = [
+        {
+            "id": f"o{i}", "restaurant_id": f"r{i}", "status": "ready",
+            "restaurants": {"name": "R", "latitude": RALEIGH[0] + i * 0.005, "longitude": RALEIGH[1]},
+            "customer": {"name": "C"},
+        }
+        for i in range(30)
+    ]
+    mock_supabase = MagicMock()
+    mock_supabase.from_.return_value.select.return_value.eq.return_value.is_.return_value.execute.return_value.data = orders
+    before = standin_app.state.requests["matrix"]
+
+    with patch("app.routers.delivery_routes.get_db", return_value=mock_supabase):
+        response = TestClient(app).get(f"/deliveries/ready?latitude={RALEIGH[0]}&longitude={RALEIGH[1]}")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 30
+    assert all(o["restaurant_reachable_by_road"] for o in data)
+    assert data[1]["distance_to_restaurant_miles"] == pytest.approx(0.45, abs=0.05)
+    # 30 restaurants -> two matrix chunks of at most 24
+    assert standin_app.state.requests["matrix"] - before == 2
+
+
+@pytest.mark.benchmark
+def test_matrix_load_benchmark_against_standin(standin):
+    """100 concurrent drivers spread over the city, 20 ms stand-in latency."""
+    base_url, standin_app = standin
+    set_distance_provider(MapboxProvider(base_url=base_url, token="local"))
+    dests = [{"restaurant_id": f"r{i}", "lat": RALEIGH[0] + i * 0.003, "lng": RALEIGH[1]} for i in range(40)]
+
+    async def run():
+        return await asyncio.gather(*[
+            _compute_distances_and_durations(RALEIGH[1] + d * 0.01, RALEIGH[0], dests)
+            for d in range(100)
+        ])
+
+    start_time = time.time()
+    results = asyncio.run(run())
+    elapsed = time.time() - start_time
+
+    print(f"\n100 drivers x 40 restaurants via stand-in: {elapsed:.2f}s")
+    assert all(len(dist) == 40 and None not in dist.values() for dist, _ in results)
+    assert elapsed < 10.0
+
+
+def test_provider_missing_a_method_fails_at_construction():
+    class RouteOnly(DistanceProvider):
+        def route(self, origin, dest):
+            return None
+
+    with pytest.raises(TypeError):
+        RouteOnly()
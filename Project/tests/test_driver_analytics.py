@@ -1,9 +1,49 @@
 import pytest
 from unittest.mock import Mock, patch
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, timezone, timedelta
+from fastapi import HTTPException
 from app.routers.driver_analytics import get_driver_analytics
 
 
+def _daily_rows(orders):
+    """Aggregate raw orders the way record_driver_delivery does."""
+    rows = {}
+    for o in orders:
+        day = datetime.fromisoformat(o["created_at"]).date().isoformat()
+        key = (day, o["restaurant_id"])
+        row = rows.setdefault(key, {
+            "day": day, "restaurant_id": o["restaurant_id"], "deliveries": 0,
+            "delivery_fees": 0.0, "tips": 0.0, "restaurants": o["restaurants"],
+        })
+        row["deliveries"] += 1
+        row["delivery_fees"] += o.get("delivery_fee") or 0
+        row["tips"] += o.get("tip_amount") or 0
+    return [rows[k] for k in sorted(rows)]
+
+
+def _mock_db(mock_supabase, orders, windowed=False):
+    """Wire the daily earnings and recent-orders queries to `orders`."""
+    daily, recent = Mock(), Mock()
+    daily_query = daily.select.return_value.eq.return_value
+    recent_query = recent.select.return_value.eq.return_value.eq.return_value
+    if windowed:
+        daily_query = daily_query.gte.return_value.lte.return_value
+        recent_query = recent_query.gte.return_value.lt.return_value
+    daily_query.order.return_value.order.return_value.limit.return_value.execute.return_value.data = _daily_rows(orders)
+    newest_first = sorted(orders, key=lambda o: o["created_at"], reverse=True)[:10]
+    recent_query.order.return_value.limit.return_value.execute.return_value.data = newest_first
+    mock_supabase.table.side_effect = lambda name: {"driver_daily_earnings": daily, "orders": recent}[name]
+    return daily, recent
+
+
+@pytest.fixture
+def mock_supabase():
+    supabase = Mock()
+    with patch("app.routers.driver_analytics.get_db", return_value=supabase), \
+            patch("app.services.driver_earnings.get_db", return_value=supabase):
+        yield supabase
+
+
 @pytest.fixture
 def mock_user():
     return {"id": "driver123", "email": "driver@test.com"}
@@ -42,11 +82,8 @@ def mock_orders():
     ]
 
 
-@patch("app.routers.driver_analytics.get_db")
-def test_get_driver_analytics_with_orders(mock_get_db, mock_user, mock_orders):
-    mock_supabase = Mock()
-    mock_get_db.return_value = mock_supabase
-    mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute.return_value.data = mock_orders
+def test_get_driver_analytics_with_orders(mock_supabase, mock_user, mock_orders):
+    _mock_db(mock_supabase, mock_orders)
 
     result = get_driver_analytics(user=mock_user)
 
@@ -61,11 +98,8 @@ def test_get_driver_analytics_with_orders(mock_get_db, mock_user, mock_orders):
     assert len(result["earningsByDay"]) == 7
 
 
-@patch("app.routers.driver_analytics.get_db")
-def test_get_driver_analytics_no_orders(mock_get_db, mock_user):
-    mock_supabase = Mock()
-    mock_get_db.return_value = mock_supabase
-    mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute.return_value.data = []
+def test_get_driver_analytics_no_orders(mock_supabase, mock_user):
+    _mock_db(mock_supabase, [])
 
     result = get_driver_analytics(user=mock_user)
 
@@ -77,11 +111,8 @@ def test_get_driver_analytics_no_orders(mock_get_db, mock_user):
     assert result["earningsByDay"] == []
 
 
-@patch("app.routers.driver_analytics.get_db")
-def test_top_restaurants_sorted_by_deliveries(mock_get_db, mock_user, mock_orders):
-    mock_supabase = Mock()
-    mock_get_db.return_value = mock_supabase
-    mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute.return_value.data = mock_orders
+def test_top_restaurants_sorted_by_deliveries(mock_supabase, mock_user, mock_orders):
+    _mock_db(mock_supabase, mock_orders)
 
     result = get_driver_analytics(user=mock_user)
 
@@ -91,11 +122,8 @@ def test_top_restaurants_sorted_by_deliveries(mock_get_db, mock_user, mock_order
     assert result["topRestaurants"][1]["deliveries"] == 1
 
 
-@patch("app.routers.driver_analytics.get_db")
-def test_recent_deliveries_sorted_by_date(mock_get_db, mock_user, mock_orders):
-    mock_supabase = Mock()
-    mock_get_db.return_value = mock_supabase
-    mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute.return_value.data = mock_orders
+def test_recent_deliveries_sorted_by_date(mock_supabase, mock_user, mock_orders):
+    _mock_db(mock_supabase, mock_orders)
 
     result = get_driver_analytics(user=mock_user)
 
@@ -104,11 +132,8 @@ def test_recent_deliveries_sorted_by_date(mock_get_db, mock_user, mock_orders):
     assert result["recentDeliveries"][2]["id"] == "order3"
 
 
-@patch("app.routers.driver_analytics.get_db")
-def test_earnings_by_day_structure(mock_get_db, mock_user, mock_orders):
-    mock_supabase = Mock()
-    mock_get_db.return_value = mock_supabase
-    mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute.return_value.data = mock_orders
+def test_earnings_by_day_structure(mock_supabase, mock_user, mock_orders):
+    _mock_db(mock_supabase, mock_orders)
 
     result = get_driver_analytics(user=mock_user)
 
@@ -120,8 +145,7 @@ def test_earnings_by_day_structure(mock_get_db, mock_user, mock_orders):
         assert "deliveries" in day
 
 
-@patch("app.routers.driver_analytics.get_db")
-def test_handles_null_fees_and_tips(mock_get_db, mock_user):
+def test_handles_null_fees_and_tips(mock_supabase, mock_user):
     orders_with_nulls = [
         {
             "id": "order1",
@@ -133,12 +157,110 @@ def test_handles_null_fees_and_tips(mock_get_db, mock_user):
             "customer": {"name": "Customer 1"}
         }
     ]
-    mock_supabase = Mock()
-    mock_get_db.return_value = mock_supabase
-    mock_supabase.table.return_value.select.return_value.eq.return_value.eq.return_value.execute.return_value.data = orders_with_nulls
+    _mock_db(mock_supabase, orders_with_nulls)
 
     result = get_driver_analytics(user=mock_user)
 
     assert result["stats"]["totalEarnings"] == 0
     assert result["stats"]["totalTips"] == 0
     assert result["stats"]["totalDeliveryFees"] == 0
+
+
+
+
+def test_streams_daily_rows_in_chunks(mock_supabase, mock_user, mock_orders):
+    daily, _ = _mock_db(mock_supabase, mock_orders)
+    rows = _daily_rows(mock_orders)
+    query = daily.select.return_value.eq.return_value
+    first = query.order.return_value.order.return_value.limit
+    first.return_value.execute.return_value = Mock(data=rows[:2])
+    resumed = query.or_.return_value.order.return_value.order.return_value.limit
+    resumed.return_value.execute.return_value = Mock(data=rows[2:])
+
+    with patch("app.db.STREAM_CHUNK_SIZE", 2):
+        result = get_driver_analytics(user=mock_user)
+
+    assert result["stats"]["totalDeliveries"] == 3
+    first.assert_called_once_with(2)
+    # the second chunk seeks past the last (day, restaurant_id) read
+    day, restaurant_id = rows[1]["day"], rows[1]["restaurant_id"]
+    query.or_.assert_called_once_with(
+        f'day.gt."{day}",and(day.eq."{day}",restaurant_id.gt."{restaurant_id}")'
+    )
+    resumed.assert_called_once_with(2)
+
+
+def test_windowed_analytics_filters_and_buckets(mock_supabase, mock_user):
+    orders = [
+        {
+            "id": f"order{i}",
+            "restaurant_id": "rest1",
+            "delivery_fee": 5.0,
+            "tip_amount": 1.0,
+            "created_at": created,
+            "restaurants": {"name": "Restaurant A"},
+            "customer": {"name": "Customer"}
+        }
+        for i, created in enumerate(["2024-03-01T12:00:00", "2024-03-04T09:30:00", "2024-03-20T18:00:00+00:00"])
+    ]
+    daily, recent = _mock_db(mock_supabase, orders, windowed=True)
+
+    result = get_driver_analytics(
+        user=mock_user, date_from=date(2024, 3, 1), date_to=date(2024, 3, 31), granularity="week"
+    )
+
+    daily.select.return_value.eq.return_value.gte.assert_called_once_with("day", "2024-03-01")
+    daily.select.return_value.eq.return_value.gte.return_value.lte.assert_called_once_with("day", "2024-03-31")
+    recent_base = recent.select.return_value.eq.return_value.eq.return_value
+    recent_base.gte.assert_called_once_with("created_at", "2024-03-01T00:00:00")
+    recent_base.gte.return_value.lt.assert_called_once_with("created_at", "2024-04-01T00:00:00")
+    assert result["stats"]["totalDeliveries"] == 3
+    assert result["stats"]["totalEarnings"] == 18.0
+    weeks = {w["date"]: w for w in result["earningsByDay"]}
+    assert list(weeks) == ["2024-02-26", "2024-03-04", "2024-03-11", "2024-03-18", "2024-03-25"]
+    assert weeks["2024-02-26"]["deliveries"] == 1
+    assert weeks["2024-03-04"]["deliveries"] == 1
+    assert weeks["2024-03-18"]["earnings"] == 6.0
+    assert result["recentDeliveries"][0]["id"] == "order2"
+
+
+def test_monthly_view_over_a_year(mock_supabase, mock_user):
+    orders = [
+        {
+            "id": f"order{i}",
+            "restaurant_id": f"rest{i % 3}",
+            "delivery_fee": 4.0,
+            "tip_amount": 1.0,
+            "created_at": (datetime(2023, 1, 1) + timedelta(days=i)).isoformat(),
+            "restaurants": {"name": f"Restaurant {i % 3}"},
+            "customer": {"name": "Customer"}
+        }
+        for i in range(365)
+    ]
+    _mock_db(mock_supabase, orders, windowed=True)
+
+    result = get_driver_analytics(
+        user=mock_user, date_from=date(2023, 1, 1), date_to=date(2023, 12, 31), granularity="month"
+    )
+
+    months = result["earningsByDay"]
+    assert len(months) == 12
+    assert months[0]["date"] == "2023-01-01"
+    assert months[0]["deliveries"] == 31
+    assert months[1]["deliveries"] == 28
+    assert months[0]["day"] == "Jan 2023"
+    assert sum(m["deliveries"] for m in months) == 365
+    assert result["stats"]["totalEarnings"] == 1825.0
+    assert len(result["recentDeliveries"]) == 10
+
+
+def test_invalid_granularity_rejected(mock_user):
+    with pytest.raises(HTTPException) as exc:
+        get_driver_analytics(user=mock_user, granularity="hour")
+    assert exc.value.status_code == 400
+
+
+def test_inverted_window_rejected(mock_user):
+    with pytest.raises(HTTPException) as exc:
+        get_driver_analytics(user=mock_user, date_from=date(2024, 2, 1), date_to=date(2024, 1, 1))
+    assert exc.value.status_code == 400
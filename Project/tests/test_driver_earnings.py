@@ -0,0 +1,183 @@
+import pytest
+import time
+from datetime import date, datetime, timedelta
+from unittest.mock import Mock, patch
+from app.services import driver_earnings
+from app.services.driver_earnings import (
+    EarningsBucketer,
+    record_delivery,
+    safe_record_delivery,
+    backfill,
+    stream_daily_rows,
+)
+
+
+@patch("app.services.driver_earnings.get_db")
+def test_record_delivery_calls_rollup_function(mock_get_db):
+    mock_supabase = Mock()
+    mock_get_db.return_value = mock_supabase
+    mock_supabase.rpc.return_value.execute.return_value.data = True
+
+    assert record_delivery("order1") is True
+    mock_supabase.rpc.assert_called_once_with("record_driver_delivery", {"p_order_id": "order1"})
+
+
+@pytest.mark.parametrize("status", ["pending", "ready", "assigned", "picked_up", "completed", None])
+def test_safe_record_delivery_skips_other_statuses(status):
+    with patch.object(driver_earnings, "record_delivery") as mock_record:
+        safe_record_delivery("order1", status)
+    mock_record.assert_not_called()
+
+
+def test_safe_record_delivery_records_and_swallows_errors():
+    with patch.object(driver_earnings, "record_delivery") as mock_record:
+        safe_record_delivery("order1", "delivered")
+    mock_record.assert_called_once_with("order1")
+
+    with patch.object(driver_earnings, "record_delivery", side_effect=Exception("db down")):
+        safe_record_delivery("order1", "delivered")
+
+
+@patch("app.services.driver_earnings.get_db")
+def test_backfill_runs_until_batch_is_short(mock_get_db):
+    mock_supabase = Mock()
+    mock_get_db.return_value = mock_supabase
+    mock_supabase.rpc.return_value.execute.side_effect = [Mock(data=3), Mock(data=0)]
+
+    assert backfill(driver_id="driver1", batch_size=3) == 3
+    mock_supabase.rpc.assert_called_with("backfill_driver_earnings", {"p_driver_id": "driver1", "p_limit": 3})
+
+
+@patch("app.services.driver_earnings.get_db")
+def test_stream_daily_rows_open_window(mock_get_db):
+    mock_supabase = Mock()
+    mock_get_db.return_value = mock_supabase
+    query = mock_supabase.table.return_value.select.return_value.eq.return_value
+    query.order.return_value.order.return_value.limit.return_value.execute.return_value.data = [{"day": "2024-01-01"}]
+
+    assert list(stream_daily_rows("driver1")) == [{"day": "2024-01-01"}]
+    mock_supabase.table.assert_called_with("driver_daily_earnings")
+    query.gte.assert_not_called()
+    query.lte.assert_not_called()
+
+
+def test_bucketer_totals_and_top_restaurants():
+    bucketer = EarningsBucketer("day", date(2024, 1, 1), date(2024, 1, 3))
+    bucketer.add(date(2024, 1, 1), "r1", "A", 2, 10.0, 3.0)
+    bucketer.add(date(2024, 1, 2), "r2", "B", 1, 5.0, 0.0)
+    bucketer.add(date(2024, 1, 3), "r1", "A", 1, 5.0, 1.0)
+
+    assert bucketer.deliveries == 4
+    assert bucketer.earnings == 24.0
+    assert bucketer.top_restaurants(1) == [{"id": "r1", "name": "A", "deliveries": 3, "earnings": 19.0}]
+    assert [b["earnings"] for b in bucketer.series()] == [13.0, 5.0, 6.0]
+
+
+def test_bucketer_counts_rows_outside_chart_in_totals_only():
+    bucketer = EarningsBucketer("day", date(2024, 1, 7), date(2024, 1, 7))
+    bucketer.add(date(2023, 6, 1), "r1", "A", 1, 5.0, 0.0)
+
+    assert bucketer.deliveries == 1
+    assert bucketer.series() == [{"date": "2024-01-07", "day": "Sun", "earnings": 0, "deliveries": 0}]
+
+
+def test_bucketer_open_ended_chart_starts_at_first_delivery():
+    bucketer = EarningsBucketer("month", None, date(2024, 3, 15))
+    bucketer.add(date(2024, 1, 20), "r1", "A", 1, 5.0, 0.0)
+
+    assert [b["date"] for b in bucketer.series()] == ["2024-01-01", "2024-02-01", "2024-03-01"]
+
+
+def _synthetic_orders(count):
+    start = datetime(2023, 1, 1)
+    return [
+        {
+            "restaurant_id": f"rest{i % 20}",
+            "restaurants": {"name": f"Restaurant {i % 20}"},
+            "delivery_fee": 4.0,
+            "tip_amount": 1.5,
+            "created_at": (start + timedelta(minutes=5 * i)).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+def _legacy_bucketing(orders, today):
+    """The per-day rescan the endpoint used before daily rollups."""
+    days = []
+    for i in range(6, -1, -1):
+        day = today - timedelta(days=i)
+        day_orders = [o for o in orders if datetime.fromisoformat(o["created_at"]).date() == day]
+        days.append(sum((o["delivery_fee"] or 0) + (o["tip_amount"] or 0) for o in day_orders))
+    recent = sorted(orders, key=lambda o: o["created_at"], reverse=True)[:10]
+    return days, recent
+
+
+def _single_pass(orders, today):
+    bucketer = EarningsBucketer("day", today - timedelta(days=6), today)
+    for o in orders:
+        bucketer.add(
+            datetime.fromisoformat(o["created_at"]).date(),
+            o["restaurant_id"],
+            o["restaurants"]["name"],
+            1,
+            o["delivery_fee"],
+            o["tip_amount"],
+        )
+    return bucketer
+
+
+def _rollup_bucketer(orders, today):
+    """Bucket one row per (day, restaurant), as the rollup path reads them."""
+    rollups = {}
+    for o in orders:
+        key = (o["created_at"][:10], o["restaurant_id"])
+        row = rollups.setdefault(key, [0, 0.0, 0.0])
+        row[0] += 1
+        row[1] += o["delivery_fee"]
+        row[2] += o["tip_amount"]
+
+    bucketer = EarningsBucketer("day", today - timedelta(days=6), today)
+    for (day, rid), (n, fees, tips) in rollups.items():
+        bucketer.add(date.fromisoformat(day), rid, None, n, fees, tips)
+    return bucketer, len(rollups)
+
+
+def test_single_pass_and_rollups_match_legacy_bucketing():
+    orders = _synthetic_orders(3000)
+    today = datetime.fromisoformat(orders[-1]["created_at"]).date()
+
+    legacy_days, _ = _legacy_bucketing(orders, today)
+    bucketer = _single_pass(orders, today)
+    from_rollups, _ = _rollup_bucketer(orders, today)
+
+    assert [b["earnings"] for b in bucketer.series()] == [round(d, 2) for d in legacy_days]
+    assert from_rollups.series() == bucketer.series()
+    assert from_rollups.deliveries == len(orders)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("count", [10_000, 100_000])
+def test_bucketing_benchmark(count):
+    """Single pass over raw orders vs. the legacy seven-pass scan, and the
+    rollup path, which only ever sees one row per (day, restaurant)."""
+    orders = _synthetic_orders(count)
+    today = datetime.fromisoformat(orders[-1]["created_at"]).date()
+
+    start_time = time.time()
+    legacy_days, _ = _legacy_bucketing(orders, today)
+    legacy_time = time.time() - start_time
+
+    start_time = time.time()
+    bucketer = _single_pass(orders, today)
+    single_time = time.time() - start_time
+
+    start_time = time.time()
+    from_rollups, rollup_rows = _rollup_bucketer(orders, today)
+    rollup_time = time.time() - start_time
+
+    assert from_rollups.series() == bucketer.series()
+    assert single_time < legacy_time
+    assert rollup_time < single_time
+    print(f"\n{count} deliveries: legacy {legacy_time:.3f}s, single pass {single_time:.3f}s, "
+          f"rollups ({rollup_rows} rows) {rollup_time:.4f}s")
@@ -0,0 +1,136 @@
+import random
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from app import main as main_app
+from app.routers import driver_location as driver_location_module
+from app.services.driver_locations import DriverLocationIndex, driver_locations
+
+
+@pytest.fixture
+def client():
+    main_app.app.dependency_overrides[driver_location_module.current_user] = lambda: {"id": "driver1"}
+    yield TestClient(main_app.app)
+    main_app.app.dependency_overrides.clear()
+
+
+def test_heartbeat_updates_index(client):
+    response = client.post("/driver/location", json={"latitude": 35.78, "longitude": -78.64})
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+    assert driver_locations.get("driver1").latitude == 35.78
+    assert [d for _, d in driver_locations.nearest(35.78, -78.64)] == ["driver1"]
+
+
+def test_unavailable_driver_leaves_queries(client):
+    client.post("/driver/location", json={"latitude": 35.78, "longitude": -78.64})
+    client.post("/driver/location", json={"latitude": 35.78, "longitude": -78.64, "available": False})
+
+    assert driver_locations.nearest(35.78, -78.64) == []
+    assert driver_locations.get("driver1").available is False
+
+
+@pytest.mark.parametrize("body", [
+    {"latitude": 91, "longitude": 0},
+    {"latitude": 0, "longitude": -181},
+    {"latitude": "x", "longitude": 0},
+    {"longitude": 0},
+])
+def test_heartbeat_validates_coordinates(client, body):
+    assert client.post("/driver/location", json=body).status_code == 422
+
+
+def test_heartbeat_schedules_snapshot_when_due(client):
+    with patch.object(driver_locations, "snapshot_due", return_value=True), \
+            patch.object(driver_locations, "snapshot") as mock_snapshot:
+        client.post("/driver/location", json={"latitude": 35.78, "longitude": -78.64})
+    mock_snapshot.assert_called_once()
+
+
+def test_stale_drivers_are_hidden_and_evicted():
+    index = DriverLocationIndex(stale_seconds=30)
+    index.update("old", 35.78, -78.64, now=100.0)
+    index.update("new", 35.79, -78.64, now=125.0)
+
+    assert [d for _, d in index.nearest(35.78, -78.64, k=2, now=135.0)] == ["new"]
+    assert index.get("old", now=135.0) is None
+    assert index.evict_stale(now=135.0) == 1
+    assert len(index) == 1
+
+
+def test_heartbeat_moves_driver():
+    index = DriverLocationIndex()
+    index.update("d1", 35.78, -78.64)
+    index.update("d1", 36.5, -80.0)
+
+    assert index.within(35.78, -78.64, 5) == []
+    assert [d for _, d in index.within(36.5, -80.0, 1)] == ["d1"]
+
+
+def test_density_counts_available_drivers():
+    index = DriverLocationIndex()
+    index.update("d1", 35.781, -78.641)
+    index.update("d2", 35.782, -78.642)
+    index.update("d3", 35.9, -78.9)
+    index.update("d4", 35.9, -78.9, available=False)
+
+    counts = index.density(cell_degrees=0.01)
+    assert sorted(counts.values()) == [1, 2]
+
+
+def test_snapshot_upserts_changed_positions():
+    index = DriverLocationIndex(snapshot_seconds=10)
+    index.update("d1", 35.78, -78.64, now=time.monotonic())
+    mock_supabase = MagicMock()
+
+    assert index.snapshot_due(now=time.monotonic() + 11)
+    with patch("app.services.driver_locations.get_db", return_value=mock_supabase):
+        assert index.snapshot() == 1
+        assert index.snapshot() == 0
+
+    mock_supabase.table.assert_called_with("driver_locations")
+    rows = mock_supabase.table.return_value.upsert.call_args.args[0]
+    assert rows[0]["driver_id"] == "d1"
+    assert rows[0]["latitude"] == 35.78
+    assert not index.snapshot_due(now=time.monotonic() + 100)
+
+
+def test_failed_snapshot_retries_later():
+    index = DriverLocationIndex(snapshot_seconds=10)
+    index.update("d1", 35.78, -78.64)
+    mock_supabase = MagicMock()
+    mock_supabase.table.return_value.upsert.return_value.execute.side_effect = Exception("db down")
+
+    with patch("app.services.driver_locations.get_db", return_value=mock_supabase):
+        assert index.snapshot() == 0
+    assert index.snapshot_due(now=time.monotonic() + 11)
+
+
+def test_snapshotting_disabled_by_default():
+    index = DriverLocationIndex(snapshot_seconds=0)
+    index.update("d1", 35.78, -78.64)
+    assert not index.snapshot_due(now=time.monotonic() + 3600)
+
+
+@pytest.mark.benchmark
+def test_nearest_driver_query_latency():
+    """10k active drivers across a metro area; nearest lookups stay in microseconds."""
+    rng = random.Random(3)
+    index = DriverLocationIndex()
+    for i in range(10_000):
+        index.update(i, 35.5 + rng.random(), -79.0 + rng.random())
+
+    start_time = time.time()
+    for _ in range(1000):
+        index.nearest(35.5 + rng.random(), -79.0 + rng.random(), k=3)
+    per_query = (time.time() - start_time) / 1000
+
+    start_time = time.time()
+    for i in range(10_000):
+        index.update(i, 35.5 + rng.random(), -79.0 + rng.random())
+    per_update = (time.time() - start_time) / 10_000
+
+    assert per_query < 0.001
+    assert per_update < 0.0001
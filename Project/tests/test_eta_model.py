@@ -0,0 +1,205 @@
+import time
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pytest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from app import main as main_app
+from app.routers import orders
+from app.services import eta_model
+from app.services.eta_model import (
+    EtaModel,
+    EtaSamples,
+    extract_samples,
+    fit,
+    get_eta_model,
+    predict_eta,
+    set_eta_model,
+)
+
+
+@pytest.fixture(autouse=True)
+def default_model():
+    set_eta_model(EtaModel())
+    yield
+    set_eta_model(None)
+
+
+def _synthetic(n, seed=0):
+    """Orders whose true prep is 10 + 2*k minutes for restaurant r{k} and
+    whose travel is 4 + 3/mile, plus 6 minutes during the 18:00 rush."""
+    rng = np.random.default_rng(seed)
+    restaurant_ids = [f"r{k}" for k in rng.integers(0, 5, n)]
+    prep = np.array([10 + 2 * int(r[1:]) for r in restaurant_ids]) + rng.normal(0, 1, n)
+    miles = rng.uniform(0.2, 10, n)
+    hours = rng.integers(0, 24, n)
+    travel = 4 + 3 * miles + np.where(hours == 18, 6, 0) + rng.normal(0, 1, n)
+    return EtaSamples(restaurant_ids, prep, miles, hours, travel)
+
+
+def test_sample_masks_drop_unusable_intervals():
+    samples = EtaSamples(
+        ["r1", "r1", "r1", "r1"],
+        np.array([12.0, np.nan, -1.0, 500.0]),
+        np.array([2.0, np.nan, -1.0, 3.0]),
+        np.array([12, 12, 12, 12]),
+        np.array([10.0, 10.0, 10.0, 0.0]),
+    )
+    assert samples.prep_ok().tolist() == [True, False, False, False]
+    assert samples.travel_ok().tolist() == [True, False, False, False]
+
+
+def test_fit_recovers_prep_and_travel_structure():
+    model = fit(_synthetic(20000))
+
+    for k in range(5):
+        assert model.prep_minutes(f"r{k}") == pytest.approx(10 + 2 * k, abs=0.3)
+    assert model.prep_minutes("unknown") == pytest.approx(model.prep_base)
+    assert model.travel_minutes(5.0, 12) == pytest.approx(19.0, abs=0.7)
+    assert model.travel_minutes(5.0, 18) - model.travel_minutes(5.0, 12) == pytest.approx(6.0, abs=0.7)
+    assert model.samples == 20000
+
+
+def test_fit_ignores_bad_durations_and_shrinks_sparse_restaurants():
+    samples = _synthetic(2000)
+    samples.prep_minutes[:50] = np.nan
+    samples.travel_minutes[:50] = -3
+    samples.travel_minutes[50:60] = 10_000
+    model = fit(samples)
+    assert model.travel_minutes(5.0, 12) == pytest.approx(19.0, abs=1.5)
+
+    lone = EtaSamples(["busy"] * 50 + ["new"], np.array([20.0] * 50 + [60.0]),
+                      np.full(51, np.nan), np.zeros(51, dtype=int), np.full(51, np.nan))
+    model = fit(lone, ridge=5.0)
+    # a single slow order moves a new restaurant only part of the way
+    assert model.prep_base < model.prep_minutes("new") < 60.0
+
+
+def _event(status, at):
+    return {"status": status, "created_at": at.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def test_extract_samples_from_status_timeline():
+    t0 = datetime(2024, 3, 1, 17, 50)
+    rows = [
+        {
+            "id": "o1", "restaurant_id": "r1", "distance_restaurant_delivery": 2.5,
+            "order_status_events": [
+                _event("pending", t0),
+                _event("accepted", t0 + timedelta(minutes=2)),
+                _event("preparing", t0 + timedelta(minutes=3)),
+                _event("ready", t0 + timedelta(minutes=17)),
+                _event("assigned", t0 + timedelta(minutes=20)),
+                _event("out-for-delivery", t0 + timedelta(minutes=25)),
+                _event("delivered", t0 + timedelta(minutes=37)),
+            ],
+        },
+        {"id": "o2", "restaurant_id": "r2", "distance_restaurant_delivery": None,
+         "order_status_events": [_event("pending", t0)]},
+    ]
+    samples = extract_samples(rows)
+
+    assert samples.restaurant_ids == ["r1"]
+    assert samples.prep_minutes[0] == pytest.approx(15.0)
+    # travel is timed from pickup, not assignment
+    assert samples.travel_minutes[0] == pytest.approx(12.0)
+    assert samples.hours[0] == 18
+    assert samples.miles[0] == 2.5
+
+
+def test_model_round_trips_through_json(tmp_path):
+    model = fit(_synthetic(500))
+    path = str(tmp_path / "eta.json")
+    model.save(path)
+    loaded = EtaModel.load(path)
+    assert loaded.prep_by_restaurant == model.prep_by_restaurant
+    assert loaded.travel_minutes(3.3, 7) == pytest.approx(model.travel_minutes(3.3, 7))
+
+    set_eta_model(None)
+    with patch.object(eta_model, "MODEL_PATH", path):
+        assert get_eta_model().trained_at == model.trained_at
+    set_eta_model(None)
+    with patch.object(eta_model, "MODEL_PATH", str(tmp_path / "missing.json")):
+        assert get_eta_model().samples == 0
+
+
+def test_predict_eta_depends_on_status():
+    set_eta_model(EtaModel(prep_base=12, prep_by_restaurant={"r1": 3}, travel_base=4, per_mile=3))
+    noon = datetime(2024, 3, 1, 12, tzinfo=timezone.utc)
+    order = {"status": "preparing", "restaurant_id": "r1", "distance_restaurant_delivery": 2}
+
+    assert predict_eta(order, noon) == {"prep_minutes": 15.0, "travel_minutes": 10.0, "total_minutes": 25.0}
+    assert predict_eta({**order, "status": "ready"}, noon)["total_minutes"] == 10.0
+    assert predict_eta({**order, "status": "delivered"}, noon) is None
+    fallback = {**order, "distance_restaurant_delivery": None, "duration_restaurant_delivery": 7}
+    assert predict_eta(fallback, noon)["travel_minutes"] == 7.0
+
+
+def test_predict_eta_from_fitted_model():
+    set_eta_model(fit(_synthetic(2000)))
+    order = {"status": "preparing", "restaurant_id": "r3", "distance_restaurant_delivery": 4.2}
+    eta = predict_eta(order, datetime(2024, 3, 1, 18, tzinfo=timezone.utc))
+
+    assert eta["prep_minutes"] == pytest.approx(16, abs=1.5)
+    assert eta["travel_minutes"] == pytest.approx(4 + 3 * 4.2 + 6, abs=1.5)
+    assert eta["total_minutes"] == pytest.approx(eta["prep_minutes"] + eta["travel_minutes"], abs=0.2)
+
+
+@pytest.mark.benchmark
+def test_predict_eta_latency():
+    set_eta_model(fit(_synthetic(5000)))
+    order = {"status": "preparing", "restaurant_id": "r3", "distance_restaurant_delivery": 4.2}
+    now = datetime(2024, 3, 1, 18, tzinfo=timezone.utc)
+
+    start_time = time.time()
+    for _ in range(100000):
+        predict_eta(order, now)
+    per_call = (time.time() - start_time) / 100000
+
+    print(f"\npredict_eta: {per_call * 1e6:.2f} us per call")
+    assert per_call < 50e-6
+
+
+def test_train_reads_history_and_saves(tmp_path):
+    t0 = datetime(2024, 3, 1, 12)
+    rows = [
+        {"id": f"o{i}", "restaurant_id": "r1", "distance_restaurant_delivery": 1 + i % 4,
+         "order_status_events": [
+             _event("accepted", t0),
+             _event("ready", t0 + timedelta(minutes=14)),
+             _event("out-for-delivery", t0 + timedelta(minutes=15)),
+             _event("delivered", t0 + timedelta(minutes=15 + 3 * (1 + i % 4))),
+         ]}
+        for i in range(40)
+    ]
+    mock_supabase = MagicMock()
+    query = mock_supabase.table.return_value.select.return_value.in_.return_value.order.return_value.order.return_value
+    query.limit.return_value.execute.return_value.data = rows
+    path = str(tmp_path / "eta.json")
+
+    with patch("app.services.eta_model.get_db", return_value=mock_supabase):
+        model = eta_model.train(path)
+
+    assert model.prep_minutes("r1") == pytest.approx(14.0, abs=0.1)
+    assert EtaModel.load(path).samples == 40
+    assert get_eta_model() is model
+
+
+def test_order_page_includes_eta():
+    order = {"id": "o1", "user_id": "cust1", "status": "preparing", "restaurant_id": "r1",
+             "distance_restaurant_delivery": 2.0, "restaurants": {"name": "R"}}
+    mock_supabase = MagicMock()
+    mock_supabase.table.return_value.select.return_value.eq.return_value.execute.side_effect = [
+        MagicMock(data=[order]), MagicMock(data=[]),
+    ]
+    main_app.app.dependency_overrides[orders.current_user] = lambda: {"id": "cust1"}
+    try:
+        with patch("app.routers.orders.get_db", return_value=mock_supabase):
+            response = TestClient(main_app.app).get("/orders/o1")
+    finally:
+        main_app.app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    eta = response.json()["eta"]
+    assert eta["prep_minutes"] == 15.0
+    assert eta["total_minutes"] > eta["prep_minutes"]
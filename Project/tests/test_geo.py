@@ -0,0 +1,91 @@
+import random
+import time
+import pytest
+from app.services.geo import GeoGrid, haversine_miles, parse_coords
+
+
+def test_haversine_known_distance():
+    # Raleigh to Durham is roughly 22 miles as the crow flies
+    assert haversine_miles(35.7796, -78.6382, 35.9940, -78.8986) == pytest.approx(20.9, abs=1.0)
+    assert haversine_miles(35.0, -78.0, 35.0, -78.0) == 0
+
+
+@pytest.mark.parametrize("lat,lng,expected", [
+    (35.1, -78.2, (35.1, -78.2)),
+    ("35.1", "-78.2", (35.1, -78.2)),
+    (None, -78.2, None),
+    ("invalid", "invalid", None),
+    (91, 0, None),
+    (0, 181, None),
+])
+def test_parse_coords(lat, lng, expected):
+    assert parse_coords(lat, lng) == expected
+
+
+def test_grid_within_matches_brute_force():
+    rng = random.Random(7)
+    grid = GeoGrid()
+    points = {}
+    for i in range(2000):
+        lat, lng = 35.5 + rng.random(), -79.0 + rng.random()
+        points[i] = (lat, lng)
+        grid.upsert(i, lat, lng)
+
+    hits = grid.within(35.9, -78.5, 5.0)
+    expected = sorted(
+        (haversine_miles(35.9, -78.5, lat, lng), i)
+        for i, (lat, lng) in points.items()
+        if haversine_miles(35.9, -78.5, lat, lng) <= 5.0
+    )
+    assert [k for _, k in hits] == [k for _, k in expected]
+    assert [d for d, _ in hits] == sorted(d for d, _ in hits)
+
+
+def test_grid_upsert_moves_and_remove():
+    grid = GeoGrid()
+    grid.upsert("a", 35.0, -78.0)
+    grid.upsert("a", 40.0, -75.0)
+    assert len(grid) == 1
+    assert grid.within(35.0, -78.0, 1.0) == []
+    assert [k for _, k in grid.within(40.0, -75.0, 1.0)] == ["a"]
+
+    grid.remove("a")
+    grid.remove("missing")
+    assert len(grid) == 0
+    assert "a" not in grid
+
+
+def test_grid_nearest_expands_search():
+    grid = GeoGrid()
+    grid.upsert("near", 35.01, -78.0)
+    grid.upsert("far", 35.5, -78.0)
+
+    assert [k for _, k in grid.nearest(35.0, -78.0, k=1)] == ["near"]
+    assert [k for _, k in grid.nearest(35.0, -78.0, k=2)] == ["near", "far"]
+    assert len(grid.nearest(35.0, -78.0, k=5, max_radius_miles=10)) == 1
+
+
+def test_grid_handles_poles_and_antimeridian():
+    grid = GeoGrid()
+    grid.upsert("pole", 89.99, 179.9)
+    assert [k for _, k in grid.within(90.0, 180.0, 5.0)] == ["pole"]
+
+
+@pytest.mark.benchmark
+def test_radius_query_latency_is_flat_as_city_grows():
+    """Query cost tracks local density, not total restaurant count."""
+    timings = []
+    for total in (1_000, 100_000):
+        rng = random.Random(1)
+        grid = GeoGrid()
+        # spread restaurants so density stays constant as the area grows
+        span = (total / 1_000) ** 0.5
+        for i in range(total):
+            grid.upsert(i, 35.0 + rng.random() * span, -79.0 + rng.random() * span)
+
+        start_time = time.time()
+        for _ in range(200):
+            grid.within(35.5, -78.5, 3.0)
+        timings.append(time.time() - start_time)
+
+    assert timings[1] < timings[0] * 5
@@ -0,0 +1,139 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from app import main as main_app
+from app.auth import current_user
+from app.db import stream_rows
+from app.services.catalog_snapshot import CatalogSnapshot
+from app.services.keyset import comes_after, decode_cursor, encode_cursor, seek_list, seek_page
+from app.services.menu_versions import menu_versions
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("Bagel Barn", "r3")
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == ("Bagel Barn", "r3")
+    assert decode_cursor(encode_cursor(None, "m3")) == (None, "m3")
+    for bad in ("%%%", encode_cursor("a"), "bm90IGpzb24"):
+        with pytest.raises(HTTPException) as exc:
+            decode_cursor(bad)
+        assert exc.value.status_code == 400
+
+
+def test_comes_after_orders_nulls_last_and_ties_by_id():
+    assert comes_after(6.0, "m1", (5.0, "m9"))
+    assert not comes_after(6.0, "m1", (5.0, "m9"), descending=True)
+    assert comes_after(5.0, "m2", (5.0, "m1"), descending=True)
+    assert comes_after(None, "m1", (9.0, "m9"))
+    assert not comes_after(9.0, "m1", (None, "m0"))
+    assert comes_after(None, "m2", (None, "m1"))
+
+
+def test_seek_list():
+    rows = [(1, "a"), (2, "a"), (2, "b"), (3, "a"), (None, "a")]
+    assert seek_list(rows, lambda r: r, None) == 0
+    assert seek_list(rows, lambda r: r, (2, "a")) == 2
+    assert seek_list(rows, lambda r: r, (3, "a")) == 4
+    assert seek_list(rows, lambda r: r, (None, "a")) == 5
+
+
+def _pages(fetch):
+    """Walk every page, returning the ids seen."""
+    seen, after = [], None
+    while True:
+        page, cursor = fetch(after)
+        seen += [r["id"] for r in page]
+        if cursor is None:
+            return seen
+        after = decode_cursor(cursor)
+
+
+def test_snapshot_pages_match_a_single_read():
+    snap = CatalogSnapshot()
+    for i, price in enumerate([5.0, None, 3.0, 5.0, None, 7.0, 3.0]):
+        snap.meal_changed({"id": f"m{i}", "restaurant_id": "r1", "name": f"Meal {i % 3}", "surplus_price": price})
+    for column in ("name", "surplus_price"):
+        for descending in (False, True):
+            everything = [r["id"] for r in snap.list_meals("r1", sort_column=column, descending=descending, limit=100)]
+
+            def fetch(after):
+                rows = snap.list_meals("r1", sort_column=column, descending=descending, limit=3, after=after)
+                return rows[:2], encode_cursor(rows[1][column], rows[1]["id"]) if len(rows) > 2 else None
+
+            assert _pages(fetch) == everything
+
+
+def test_seek_page_reads_null_segment_after_values():
+    query = MagicMock()
+    query.not_.is_.return_value.or_.return_value.order.return_value.order.return_value.limit.return_value \
+        .execute.return_value.data = [{"id": "m1", "surplus_price": 9.0}]
+    query.is_.return_value.order.return_value.limit.return_value.execute.return_value.data = [
+        {"id": "m2", "surplus_price": None}, {"id": "m3", "surplus_price": None}
+    ]
+    page, cursor = seek_page(lambda: query, "surplus_price", 2, after=(5.0, "m0"), nullable=True)
+    assert [r["id"] for r in page] == ["m1", "m2"]
+    assert decode_cursor(cursor) == (None, "m2")
+    query.not_.is_.return_value.or_.assert_called_once_with(
+        'surplus_price.gt."5.0",and(surplus_price.eq."5.0",id.gt."m0")'
+    )
+    query.is_.return_value.order.return_value.limit.assert_called_once_with(2)
+
+    # resuming inside the NULL segment skips the value read entirely
+    query.reset_mock()
+    seek_page(lambda: query, "surplus_price", 2, after=(None, "m2"), nullable=True)
+    query.not_.is_.assert_not_called()
+    query.is_.return_value.gt.assert_called_once_with("id", "m2")
+
+
+def test_stream_rows_seeks_past_each_chunk():
+    rows = [{"id": f"m{i}"} for i in range(5)]
+    query = MagicMock()
+    query.order.return_value.limit.return_value.execute.return_value.data = rows[:2]
+    query.gt.side_effect = lambda column, value: MagicMock(**{
+        "order.return_value.limit.return_value.execute.return_value.data": [r for r in rows if r["id"] > value][:2]
+    })
+
+    assert list(stream_rows(lambda: query, chunk_size=2)) == rows
+    assert [c.args for c in query.gt.call_args_list] == [("id", "m1"), ("id", "m3")]
+    query.range.assert_not_called()
+
+
+@pytest.fixture
+def client():
+    menu_versions.clear()
+    return TestClient(main_app.app)
+
+
+def test_restaurants_cursor_header(client):
+    rows = [{"id": "r1", "name": "A"}, {"id": "r2", "name": "B"}, {"id": "r3", "name": "C"}]
+    with patch("app.routers.catalog.get_db") as get_db:
+        query = get_db.return_value.table.return_value.select.return_value
+        query.order.return_value.order.return_value.limit.return_value.execute.return_value.data = rows
+        response = client.get("/catalog/restaurants?limit=2")
+        assert [r["id"] for r in response.json()] == ["r1", "r2"]
+        assert decode_cursor(response.headers["X-Next-Cursor"]) == ("B", "r2")
+
+        query.or_.return_value.order.return_value.order.return_value.limit.return_value.execute.return_value.data = rows[2:]
+        response = client.get(f"/catalog/restaurants?limit=2&cursor={encode_cursor('B', 'r2')}")
+        assert [r["id"] for r in response.json()] == ["r3"]
+        assert "X-Next-Cursor" not in response.headers
+        query.or_.assert_called_once_with('name.gt."B",and(name.eq."B",id.gt."r2")')
+
+    assert client.get("/catalog/restaurants?cursor=garbage").status_code == 400
+
+
+def test_orders_cursor_header(client):
+    main_app.app.dependency_overrides[current_user] = lambda: {"id": "u1"}
+    try:
+        with patch("app.routers.orders.get_db") as get_db:
+            query = get_db.return_value.table.return_value.select.return_value.eq.return_value
+            query.or_.return_value.order.return_value.order.return_value.limit.return_value.execute.return_value.data = [
+                {"id": "o2", "created_at": "2026-10-02"}, {"id": "o1", "created_at": "2026-10-01"}
+            ]
+            response = client.get(f"/orders/mine?limit=1&cursor={encode_cursor('2026-10-03', 'o3')}")
+    finally:
+        main_app.app.dependency_overrides.clear()
+    assert [r["id"] for r in response.json()] == ["o2"]
+    assert decode_cursor(response.headers["X-Next-Cursor"]) == ("2026-10-02", "o2")
+    query.or_.assert_called_once_with('created_at.lt."2026-10-03",and(created_at.eq."2026-10-03",id.gt."o3")')
@@ -0,0 +1,126 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import patch
+from app.routers.delivery_routes import _compute_distances_and_durations
+from app.services.matrix_cache import MatrixCache, matrix_cache
+
+SRC = (-78.6382, 35.7796)
+
+
+def _dests(n, start=0):
+    return [{"restaurant_id": f"r{i}", "lat": 35.78 + i * 0.001, "lng": -78.64} for i in range(start, start + n)]
+
+
+def _fake_fetch(calls, delay=0.0):
+    async def fetch(src_lng, src_lat, chunk):
+        calls.append([c["restaurant_id"] for c in chunk])
+        if delay:
+            await asyncio.sleep(delay)
+        return [(1000.0 + int(c["restaurant_id"][1:]), (1000.0 + int(c["restaurant_id"][1:])) / 10) for c in chunk]
+    return fetch
+
+
+def test_entries_expire_and_are_bounded():
+    cache = MatrixCache(ttl_seconds=60, max_entries=2)
+    cell = cache.cell(35.7796, -78.6382)
+    cache.put(cell, "r1", (1.0, 2.0))
+    cache.put(cell, "r2", (3.0, 4.0))
+    cache.get(cell, "r1")
+    cache.put(cell, "r3", (5.0, 6.0))
+
+    assert len(cache) == 2
+    assert cache.get(cell, "r2") is None  # least recently used was evicted
+    assert cache.get(cell, "r1") == (1.0, 2.0)
+
+    with patch("app.services.matrix_cache.time.monotonic", return_value=time.monotonic() + 61):
+        assert cache.get(cell, "r1") is None
+    assert len(cache) == 1
+
+
+def test_nearby_points_share_a_cell():
+    cache = MatrixCache(cell_degrees=0.002)
+    assert cache.cell(35.77961, -78.63821) == cache.cell(35.77965, -78.63825)
+    assert cache.cell(35.7796, -78.6382) != cache.cell(35.7896, -78.6382)
+
+
+@pytest.mark.asyncio
+async def test_only_missing_pairs_are_fetched():
+    calls = []
+    with patch("app.routers.delivery_routes._fetch_matrix_for_chunk", _fake_fetch(calls)):
+        dist, dur = await _compute_distances_and_durations(*SRC, _dests(3))
+        assert dist == {"r0": 1000.0, "r1": 1001.0, "r2": 1002.0}
+        assert dur["r1"] == 100.1
+
+        dist, _ = await _compute_distances_and_durations(*SRC, _dests(5))
+
+    assert calls == [["r0", "r1", "r2"], ["r3", "r4"]]
+    assert dist["r0"] == 1000.0 and dist["r4"] == 1004.0
+
+
+@pytest.mark.asyncio
+async def test_misses_are_chunked_for_mapbox():
+    calls = []
+    with patch("app.routers.delivery_routes._fetch_matrix_for_chunk", _fake_fetch(calls)):
+        dist, _ = await _compute_distances_and_durations(*SRC, _dests(30))
+    assert [len(c) for c in calls] == [24, 6]
+    assert len(dist) == 30
+
+
+@pytest.mark.asyncio
+async def test_failed_fetches_are_not_cached():
+    async def failing(src_lng, src_lat, chunk):
+        return []
+
+    with patch("app.routers.delivery_routes._fetch_matrix_for_chunk", failing):
+        dist, dur = await _compute_distances_and_durations(*SRC, _dests(2))
+    assert dist == {"r0": None, "r1": None}
+    assert len(matrix_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_polls_are_coalesced():
+    calls = []
+    with patch("app.routers.delivery_routes._fetch_matrix_for_chunk", _fake_fetch(calls, delay=0.05)):
+        results = await asyncio.gather(*[
+            _compute_distances_and_durations(SRC[0] + i * 0.00001, SRC[1], _dests(3))
+            for i in range(10)
+        ])
+    assert len(calls) == 1
+    assert all(r == results[0] for r in results)
+    assert matrix_cache.coalesced == 9
+
+
+async def _poll(rounds, drivers, restaurants):
+    for _ in range(rounds):
+        await asyncio.gather(*[
+            _compute_distances_and_durations(SRC[0] + d * 0.00005, SRC[1], _dests(restaurants))
+            for d in range(drivers)
+        ])
+
+
+@pytest.mark.asyncio
+async def test_repeated_polls_fetch_each_cell_once():
+    """20 drivers in one neighbourhood polling 10 times each."""
+    calls = []
+    with patch("app.routers.delivery_routes._fetch_matrix_for_chunk", _fake_fetch(calls)):
+        await _poll(10, 20, 40)
+
+    # without the cache this is 20 drivers x 10 polls x 2 chunks = 400 requests;
+    # with it, one pair of chunk requests per cell the drivers fall into
+    cells = {matrix_cache.cell(SRC[1], SRC[0] + d * 0.00005) for d in range(20)}
+    assert len(calls) == 2 * len(cells) <= 4
+    assert matrix_cache.stats()["hits"] >= 40 * 20 * 9
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_polling_benchmark_cuts_latency():
+    calls = []
+    with patch("app.routers.delivery_routes._fetch_matrix_for_chunk", _fake_fetch(calls, delay=0.02)):
+        start_time = time.time()
+        await _poll(10, 20, 40)
+        elapsed = time.time() - start_time
+
+    print(f"\n200 polls, {len(calls)} matrix requests: {elapsed:.3f}s")
+    assert elapsed < 1.0
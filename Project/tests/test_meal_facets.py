@@ -0,0 +1,155 @@
+import random
+import time
+import pytest
+from unittest.mock import patch
+from app.owner_meals import service
+from app.owner_meals.schemas import MealUpdate
+from app.services.meal_facets import MealFacetIndex, meal_facets
+
+MEALS = [
+    {"id": "m1", "restaurant_id": "r1", "name": "Peanut Noodles", "tags": ["Vegan"], "allergens": ["peanuts", "soy"],
+     "quantity": 3, "base_price": 12, "surplus_price": 6.0},
+    {"id": "m2", "restaurant_id": "r1", "name": "Garden Salad", "tags": ["vegan", "gluten-free"], "allergens": [],
+     "quantity": 0, "base_price": 9, "surplus_price": 5.0},
+    {"id": "m3", "restaurant_id": "r2", "name": "Cheese Pizza", "tags": ["vegetarian"], "allergens": ["dairy", "gluten"],
+     "quantity": 2, "base_price": 10, "surplus_price": None},
+    {"id": "m4", "restaurant_id": "r2", "name": "Tofu Bowl", "tags": ["vegan", "gluten-free"], "allergens": ["soy"],
+     "quantity": 5, "base_price": 14, "surplus_price": 7.5},
+    {"id": "m5", "restaurant_id": "r3", "name": "Fruit Cup", "tags": ["vegan", "gluten-free"], "allergens": None,
+     "quantity": 1, "base_price": 4, "surplus_price": 3.0},
+]
+
+
+@pytest.fixture
+def index():
+    return MealFacetIndex().build(MEALS)
+
+
+def _ids(result):
+    return [m["id"] for m in result["items"]]
+
+
+def test_combined_filters(index):
+    result = index.browse(tags=["vegan", "gluten-free"], max_price=8, surplus_only=True)
+    assert _ids(result) == ["m5", "m4"]
+    assert result["total"] == 2
+
+    assert _ids(index.browse(exclude_allergens=["soy"], restaurant_ids=["r1", "r2"])) == ["m3", "m2"]
+    # no surplus price falls back to the base price
+    assert _ids(index.browse(min_price=10)) == ["m3"]
+    assert index.browse(tags=["keto"])["total"] == 0
+    assert index.browse(exclude_allergens=["sesame"])["total"] == 5
+    assert index.browse(restaurant_ids=["r9"])["total"] == 0
+
+
+def test_facet_counts_cover_all_matches(index):
+    result = index.browse(exclude_allergens=["dairy"], limit=1)
+    assert len(result["items"]) == 1
+    assert result["facets"]["tags"] == {"vegan": 4, "gluten-free": 3}
+    assert result["facets"]["allergens"] == {"soy": 2, "peanuts": 1}
+
+
+def test_sorting_and_paging(index):
+    assert _ids(index.browse(sort="price_asc")) == ["m5", "m2", "m1", "m4", "m3"]
+    assert _ids(index.browse(sort="price_desc", limit=2, offset=1)) == ["m4", "m1"]
+    assert _ids(index.browse(sort="name_desc", limit=2)) == ["m4", "m1"]
+
+
+def test_upsert_and_remove_patch_in_place(index):
+    index.upsert_meal({**MEALS[2], "tags": ["vegetarian", "halal"], "surplus_price": 4.0})
+    index.upsert_meal({"id": "m6", "restaurant_id": "r4", "name": "Lentil Soup", "tags": ["halal"],
+                       "allergens": ["celery"], "quantity": 4, "surplus_price": 2.5})
+    index.remove_meal("m1")
+
+    result = index.browse(tags=["halal"], sort="price_asc")
+    assert _ids(result) == ["m6", "m3"]
+    assert result["facets"]["allergens"] == {"celery": 1, "dairy": 1, "gluten": 1}
+    assert len(index) == 5
+    assert "m1" not in _ids(index.browse())
+
+
+def test_more_than_64_labels(index):
+    for i in range(70):
+        index.upsert_meal({"id": f"x{i}", "restaurant_id": "r5", "name": f"Special {i}", "tags": [f"tag{i}"],
+                           "allergens": [], "quantity": 1, "surplus_price": 1.0})
+    result = index.browse(tags=["tag69"])
+    assert _ids(result) == ["x69"]
+    assert result["facets"]["tags"] == {"tag69": 1}
+    assert index.browse(tags=["vegan"])["total"] == 4
+
+
+def test_endpoint(index, client):
+    meal_facets.set_index(index)
+    response = client.get("/catalog/meals?tags=vegan,gluten-free&exclude_allergens=Soy&surplus_only=true")
+    assert response.status_code == 200
+    body = response.json()
+    assert _ids(body) == ["m5"]
+    assert body["facets"]["tags"] == {"gluten-free": 1, "vegan": 1}
+
+    with patch("app.routers.catalog.restaurant_locations.within", return_value=[(1.2, "r2"), (3.0, "r3")]):
+        body = client.get("/catalog/meals?lat=40.7&lng=-74.0&restaurant_ids=r1,r2&sort=price_asc").json()
+    assert _ids(body) == ["m4", "m3"]
+
+    assert client.get("/catalog/meals?sort=rating").status_code == 400
+
+
+def test_owner_edit_updates_loaded_index(index):
+    meal_facets.set_index(index)
+    with patch("app.owner_meals.service.get_db") as mock_get_db:
+        table = mock_get_db.return_value.table.return_value
+        table.delete.return_value.eq.return_value.eq.return_value.execute.return_value.data = [{"id": "m3"}]
+        table.update.return_value.eq.return_value.eq.return_value.execute.return_value.data = [
+            {**MEALS[2], "tags": ["vegan"]}
+        ]
+        service.update_meal("m3", "r2", MealUpdate(tags=["vegan"]))
+        service.delete_meal("m5", "r3")
+    assert _ids(meal_facets.browse(tags=["vegan"])) == ["m3", "m2", "m1", "m4"]
+
+
+def _seeded_meals(n):
+    rng = random.Random(9)
+    tags = ["vegan", "vegetarian", "gluten-free", "halal", "keto", "spicy", "dessert", "breakfast"]
+    allergens = ["peanuts", "tree nuts", "soy", "dairy", "gluten", "egg", "shellfish", "sesame"]
+    return [
+        {"id": f"m{i}", "restaurant_id": f"r{i % 500}", "name": f"Meal {i}",
+         "tags": rng.sample(tags, rng.randint(0, 3)), "allergens": rng.sample(allergens, rng.randint(0, 3)),
+         "quantity": rng.randint(0, 3), "surplus_price": round(rng.uniform(2, 15), 2)}
+        for i in range(n)
+    ]
+
+
+def _browse_filtered(index):
+    return index.browse(tags=["vegan", "gluten-free"], exclude_allergens=["peanuts"], max_price=8,
+                        surplus_only=True, sort="price_asc")
+
+
+def _assert_matches_scan(result, meals):
+    expected = [
+        m for m in meals
+        if {"vegan", "gluten-free"} <= set(m["tags"]) and "peanuts" not in m["allergens"]
+        and m["surplus_price"] <= 8 and m["quantity"] > 0
+    ]
+    assert result["total"] == len(expected)
+    assert result["facets"]["tags"]["vegan"] == len(expected)
+    assert result["facets"]["allergens"].get("soy") == sum("soy" in m["allergens"] for m in expected)
+
+
+def test_browse_matches_a_full_scan():
+    meals = _seeded_meals(3000)
+    _assert_matches_scan(_browse_filtered(MealFacetIndex().build(meals)), meals)
+
+
+@pytest.mark.benchmark
+def test_browse_cost():
+    meals = _seeded_meals(100000)
+    index = MealFacetIndex().build(meals)
+    index.browse(sort="price_asc")
+
+    start_time = time.time()
+    for _ in range(10):
+        result = _browse_filtered(index)
+    elapsed = (time.time() - start_time) / 10
+
+    _assert_matches_scan(result, meals)
+    print(f"\n100k meals: {elapsed * 1000:.1f} ms per browse with facets")
+    assert elapsed < 0.2
@@ -0,0 +1,84 @@
+from unittest.mock import MagicMock, patch
+from app.owner_meals import service
+from app.owner_meals.schemas import MealUpdate
+from app.routers import orders
+from app.services import menu_caches
+from app.services.menu_caches import safe_menu_changed, safe_menu_removed
+
+
+def test_changed_rows_reach_every_cache_once_per_meal():
+    with patch.object(menu_caches.meal_facets, "meal_changed") as facets, \
+            patch.object(menu_caches.catalog_autocomplete, "meal_changed") as autocomplete, \
+            patch.object(menu_caches.menu_versions, "invalidate") as invalidate:
+        changed = safe_menu_changed("r1", [{"id": 1, "restaurant_id": 7}, {"id": 2}])
+
+    assert changed == [{"id": "1", "restaurant_id": "7"}, {"id": "2", "restaurant_id": "r1"}]
+    assert [c.args[0]["id"] for c in facets.call_args_list] == ["1", "2"]
+    assert autocomplete.call_count == 2
+    invalidate.assert_called_once_with("r1")
+
+
+def test_a_failing_cache_does_not_stop_the_others():
+    with patch.object(menu_caches.catalog_autocomplete, "meal_changed", side_effect=RuntimeError("boom")), \
+            patch.object(menu_caches.dietary_index, "invalidate", side_effect=RuntimeError("boom")), \
+            patch.object(menu_caches.surplus_feed, "meal_changed") as feed, \
+            patch.object(menu_caches.menu_versions, "invalidate") as invalidate:
+        safe_menu_changed("r1", [{"id": "m1", "restaurant_id": "r1"}])
+
+    feed.assert_called_once()
+    invalidate.assert_called_once_with("r1")
+
+
+def test_removed_meals_leave_every_cache():
+    with patch.object(menu_caches.meal_facets, "meal_removed", side_effect=RuntimeError("boom")), \
+            patch.object(menu_caches.catalog_snapshot, "meal_removed") as snapshot, \
+            patch.object(menu_caches.menu_versions, "invalidate") as invalidate:
+        safe_menu_removed("r1", ["m1", "m2"])
+
+    assert [c.args[0] for c in snapshot.call_args_list] == ["m1", "m2"]
+    invalidate.assert_called_once_with("r1")
+
+
+def test_owner_update_succeeds_when_a_cache_fails():
+    with patch("app.owner_meals.service.get_db") as mock_get_db, \
+            patch.object(menu_caches.meal_facets, "meal_changed", side_effect=RuntimeError("boom")):
+        table = mock_get_db.return_value.table.return_value
+        table.update.return_value.eq.return_value.eq.return_value.execute.return_value.data = [
+            {"id": 5, "restaurant_id": 9, "name": "Kale Bowl"}
+        ]
+        meal = service.update_meal("5", "9", MealUpdate(name="Kale Bowl"))
+
+    assert meal == {"id": "5", "restaurant_id": "9", "name": "Kale Bowl"}
+
+
+def _order_db(meal, order=None, items=None):
+    db = MagicMock()
+    tables = {name: MagicMock() for name in ("orders", "order_status_events", "order_items", "meals")}
+    db.table.side_effect = lambda name: tables[name]
+    tables["orders"].insert.return_value.execute.return_value.data = [{"id": "o1"}]
+    tables["orders"].select.return_value.eq.return_value.execute.return_value.data = [
+        order or {"id": "o1", "user_id": "u1", "restaurant_id": "r1", "status": "pending"}
+    ]
+    tables["order_items"].select.return_value.eq.return_value.execute.return_value.data = items or []
+    tables["meals"].select.return_value.eq.return_value.execute.return_value.data = [meal]
+    return db
+
+
+MEAL = {"id": "m1", "restaurant_id": "r1", "name": "Kale Bowl", "quantity": 5, "surplus_price": 4.0}
+
+
+def test_placing_an_order_refreshes_the_menu_caches():
+    with patch("app.routers.orders.get_db", return_value=_order_db(MEAL)), \
+            patch("app.routers.orders.safe_menu_changed") as changed:
+        orders.create_order({"restaurant_id": "r1", "items": [{"meal_id": "m1", "qty": 2}]}, {"id": "u1"})
+
+    changed.assert_called_once_with("r1", [{**MEAL, "quantity": 3}])
+
+
+def test_cancelling_an_order_refreshes_the_menu_caches():
+    db = _order_db(MEAL, items=[{"meal_id": "m1", "qty": 2}])
+    with patch("app.routers.orders.get_db", return_value=db), \
+            patch("app.routers.orders.safe_menu_changed") as changed:
+        orders.cancel_order("o1", {"id": "u1"})
+
+    changed.assert_called_once_with("r1", [{**MEAL, "quantity": 7}])
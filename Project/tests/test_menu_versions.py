@@ -0,0 +1,97 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from app import main as main_app
+from app.owner_meals import service
+from app.owner_meals.auth import require_owner
+from app.services.menu_versions import menu_versions
+
+MENU = [{"id": "m1", "restaurant_id": "r1", "name": "Soup", "quantity": 2}]
+
+
+@pytest.fixture
+def stamps():
+    """restaurant_menu_versions as seen by the stamp lookups."""
+    db = MagicMock()
+    table = db.table.return_value.select.return_value
+    table.eq.return_value.execute.return_value.data = [{"version": 41}]
+    table.order.return_value.limit.return_value.execute.return_value.data = [{"version": 57}]
+    with patch("app.services.menu_versions.get_db", return_value=db):
+        yield table
+
+
+@pytest.fixture
+def menu_db():
+    with patch("app.routers.catalog.get_db") as get_db:
+        query = get_db.return_value.table.return_value.select.return_value.eq.return_value
+        query.order.return_value.order.return_value.limit.return_value.execute.return_value.data = MENU
+        yield get_db
+
+
+@pytest.fixture
+def client():
+    return TestClient(main_app.app)
+
+
+def test_menu_is_tagged_and_revalidated(stamps, menu_db, client):
+    response = client.get("/catalog/restaurants/r1/meals")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"41.')
+    assert response.headers["Cache-Control"] == "no-cache"
+
+    menu_db.reset_mock()
+    response = client.get("/catalog/restaurants/r1/meals", headers={"If-None-Match": f'"other", {etag}'})
+    assert response.status_code == 304
+    assert response.content == b""
+    menu_db.assert_not_called()
+
+    # another filter of the same menu has its own tag
+    response = client.get("/catalog/restaurants/r1/meals?surplus_only=true", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_stamp_is_cached_until_owner_edit(stamps, menu_db, client):
+    client.get("/catalog/restaurants/r1/meals")
+    client.get("/catalog/restaurants/r1/meals")
+    assert stamps.eq.call_count == 1
+
+    with patch("app.owner_meals.service.get_db") as mock_get_db:
+        mock_get_db.return_value.table.return_value.delete.return_value.eq.return_value.eq.return_value \
+            .execute.return_value.data = [{"id": "m1"}]
+        service.delete_meal("m1", "r1")
+    client.get("/catalog/restaurants/r1/meals")
+    assert stamps.eq.call_count == 2
+
+
+def test_no_stamp_means_no_etag(stamps, menu_db, client):
+    stamps.eq.return_value.execute.return_value.data = []
+    response = client.get("/catalog/restaurants/r1/meals", headers={"If-None-Match": "*"})
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+
+
+def test_meals_feed_uses_newest_stamp(stamps, client):
+    with patch("app.routers.meals.get_db") as meals_db:
+        meals_db.return_value.table.return_value.select.return_value.gt.return_value.order.return_value \
+            .limit.return_value.execute.return_value.data = MENU
+        response = client.get("/meals")
+        etag = response.headers["ETag"]
+        assert etag.startswith('W/"57.')
+        meals_db.reset_mock()
+        assert client.get("/meals", headers={"If-None-Match": etag}).status_code == 304
+    meals_db.assert_not_called()
+
+
+def test_owner_menu_etag(stamps, client):
+    main_app.app.dependency_overrides[require_owner] = lambda: {"id": "owner-1"}
+    try:
+        with patch("app.owner_meals.service.get_restaurant_by_owner", return_value="r1"), \
+                patch("app.owner_meals.service.get_restaurant_meals", return_value=[]) as get_meals:
+            etag = client.get("/owner/meals").headers["ETag"]
+            response = client.get("/owner/meals", headers={"If-None-Match": etag})
+    finally:
+        main_app.app.dependency_overrides.clear()
+    assert response.status_code == 304
+    assert get_meals.call_count == 1
@@ -1,6 +1,6 @@
 import pytest
 from unittest.mock import MagicMock, patch
-from fastapi import HTTPException
+from fastapi import HTTPException, Request, Response
 from fastapi.testclient import TestClient
 from app.owner_meals.auth import require_owner
 from app.owner_meals import service
@@ -24,6 +24,48 @@ async def test_require_owner_success():
     assert result == mock_user
 
 
+@pytest.mark.asyncio
+async def test_require_owner_resolves_restaurant():
+    mock_user = {'id': 'owner-123', 'email': 'owner@test.com'}
+    mock_db = MagicMock()
+    mock_db.table.return_value.select.return_value.eq.return_value.execute.return_value = MagicMock(
+        data=[{'role': 'owner', 'restaurants': [{'id': 'rest-123'}]}]
+    )
+    
+    result = await require_owner(mock_user, mock_db)
+    assert result == {**mock_user, 'restaurant_id': 'rest-123'}
+    with patch('app.owner_meals.service.get_db') as mock_get_db:
+        assert service.owned_restaurant(result) == 'rest-123'
+    mock_get_db.assert_not_called()
+
+
+def test_modify_meal_is_two_round_trips():
+    """Role and restaurant in one read, then the scoped update."""
+    from app.auth import current_user
+    from app.db import get_db
+    mock_db = MagicMock()
+    mock_db.table.return_value.select.return_value.eq.return_value.execute.return_value = MagicMock(
+        data=[{'role': 'owner', 'restaurants': [{'id': 'rest-123'}]}]
+    )
+    mock_db.table.return_value.update.return_value.eq.return_value.eq.return_value.execute.return_value = MagicMock(
+        data=[{'id': 'meal-123', 'restaurant_id': 'rest-123', 'name': 'Soup', 'tags': [], 'base_price': 5.0, 'quantity': 1, 'surplus_price': None, 'allergens': [], 'calories': None, 'image_link': None}]
+    )
+    mock_db.table.return_value.delete.return_value.eq.return_value.eq.return_value.execute.return_value = MagicMock(data=[])
+    app.dependency_overrides[current_user] = lambda: {'id': 'owner-123'}
+    app.dependency_overrides[get_db] = lambda: mock_db
+    try:
+        with patch('app.owner_meals.service.get_db', return_value=mock_db):
+            response = client.put('/owner/meals/meal-123', json={'name': 'Soup'})
+            missing = client.delete('/owner/meals/meal-999')
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    assert response.json()['name'] == 'Soup'
+    assert [c.args[0] for c in mock_db.table.call_args_list] == ['users', 'meals', 'users', 'meals']
+    mock_db.table.return_value.update.return_value.eq.return_value.eq.assert_called_with('restaurant_id', 'rest-123')
+    assert missing.status_code == 404
+
+
 @pytest.mark.asyncio
 async def test_require_owner_not_owner_role():
     mock_user = {'id': 'user-123', 'email': 'user@test.com'}
@@ -109,16 +151,17 @@ def test_update_meal_success():
         mock_table.select.return_value = mock_table
         mock_table.eq.return_value = mock_table
         mock_table.update.return_value = mock_table
-        mock_table.execute.side_effect = [
-            MagicMock(data=[{'id': 'meal-123'}]),
-            MagicMock(data=[{'id': 'meal-123', 'restaurant_id': 'rest-123', 'name': 'Updated Pizza', 'quantity': 10, 'tags': [], 'base_price': 10.0, 'surplus_price': None, 'allergens': [], 'calories': None, 'image_link': None}])
-        ]
+        mock_table.execute.return_value = MagicMock(data=[{'id': 'meal-123', 'restaurant_id': 'rest-123', 'name': 'Updated Pizza', 'quantity': 10, 'tags': [], 'base_price': 10.0, 'surplus_price': None, 'allergens': [], 'calories': None, 'image_link': None}])
         mock_db.table.return_value = mock_table
         mock_get_db.return_value = mock_db
         
         meal = MealUpdate(name='Updated Pizza', quantity=10)
         result = service.update_meal('meal-123', 'rest-123', meal)
         assert result['name'] == 'Updated Pizza'
+        # ownership is part of the update itself; no separate check
+        mock_table.select.assert_not_called()
+        mock_table.update.assert_called_once_with({'name': 'Updated Pizza', 'quantity': 10})
+        assert [c.args for c in mock_table.eq.call_args_list] == [('id', 'meal-123'), ('restaurant_id', 'rest-123')]
 
 
 def test_update_meal_not_found():
@@ -127,6 +170,7 @@ def test_update_meal_not_found():
         mock_table = MagicMock()
         mock_table.select.return_value = mock_table
         mock_table.eq.return_value = mock_table
+        mock_table.update.return_value = mock_table
         mock_table.execute.return_value = MagicMock(data=[])
         mock_db.table.return_value = mock_table
         mock_get_db.return_value = mock_db
@@ -171,6 +215,7 @@ def test_delete_meal_not_found():
         mock_table = MagicMock()
         mock_table.select.return_value = mock_table
         mock_table.eq.return_value = mock_table
+        mock_table.delete.return_value = mock_table
         mock_table.execute.return_value = MagicMock(data=[])
         mock_db.table.return_value = mock_table
         mock_get_db.return_value = mock_db
@@ -244,11 +289,15 @@ async def test_router_remove_meal():
 async def test_router_list_my_meals():
     from app.owner_meals.router import list_my_meals
     with patch('app.owner_meals.service.get_restaurant_by_owner') as mock_get_rest, \
-         patch('app.owner_meals.service.get_restaurant_meals') as mock_get_meals:
+         patch('app.owner_meals.service.get_restaurant_meals') as mock_get_meals, \
+         patch('app.owner_meals.router.menu_versions.restaurant', return_value=3):
         mock_get_rest.return_value = 'rest-123'
         mock_get_meals.return_value = [{'id': 'meal-1', 'restaurant_id': 'rest-123', 'name': 'Pizza', 'tags': [], 'base_price': 10.0, 'quantity': 5, 'surplus_price': None, 'allergens': [], 'calories': None, 'image_link': None}]
         
         user = {'id': 'owner-123', 'email': 'owner@test.com'}
-        result = await list_my_meals(user)
+        request = Request({'type': 'http', 'method': 'GET', 'path': '/owner/meals', 'headers': [], 'query_string': b''})
+        response = Response()
+        result = await list_my_meals(request, response, user)
         assert len(result) == 1
         assert result[0]['name'] == 'Pizza'
+        assert response.headers['ETag']
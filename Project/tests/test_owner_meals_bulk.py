@@ -0,0 +1,106 @@
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.owner_meals import bulk
+from app.owner_meals.auth import require_owner
+
+
+@pytest.fixture
+def owner_db():
+    """An owner of r1 whose meal inserts echo back with ids."""
+    app.dependency_overrides[require_owner] = lambda: {"id": "owner-1"}
+    inserts = []
+
+    def insert(rows):
+        inserts.append(rows)
+        result = MagicMock()
+        result.execute.return_value.data = [{**r, "id": f"m{len(inserts)}-{i}"} for i, r in enumerate(rows)]
+        return result
+
+    with patch("app.owner_meals.service.get_restaurant_by_owner", return_value="r1"), \
+            patch("app.owner_meals.service.get_db") as get_db:
+        get_db.return_value.table.return_value.insert.side_effect = insert
+        yield inserts
+    app.dependency_overrides.clear()
+
+
+CSV = (
+    "name,base_price,quantity,surplus_price,tags,allergens\r\n"
+    "Soup,8.5,3,4,vegan;gluten-free,\r\n"
+    '"Bagel, ""everything""",3,,,,sesame;gluten\r\n'
+    "Free Lunch,0,1,,,\r\n"
+    "Too,Many,Columns,1,2,3,4\r\n"
+    '"Multi\nline",5,1,,,\r\n'
+)
+
+
+def test_csv_import_reports_rows_and_inserts_in_chunks(owner_db):
+    client = TestClient(app)
+    with patch.object(bulk, "CHUNK_SIZE", 2):
+        response = client.post("/owner/meals/bulk", content=CSV, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["rows"], body["valid"], body["created"]) == (5, 3, 3)
+    assert [e["row"] for e in body["errors"]] == [3, 4]
+    assert body["errors"][0]["errors"] == ["base_price: Input should be greater than 0"]
+
+    assert [len(rows) for rows in owner_db] == [2, 1]
+    first, second = owner_db[0]
+    assert first["tags"] == ["vegan", "gluten-free"] and first["allergens"] is None
+    assert first["restaurant_id"] == "r1" and first["quantity"] == 3
+    assert second["name"] == 'Bagel, "everything"' and second["allergens"] == ["sesame", "gluten"]
+    assert owner_db[1][0]["name"] == "Multi\nline"
+
+
+def test_jsonl_import_and_dry_run(owner_db):
+    client = TestClient(app)
+    lines = "\n".join([
+        json.dumps({"name": "Stew", "base_price": 9, "tags": ["halal"]}),
+        "{not json",
+        json.dumps({"name": "Pie", "base_price": 5, "colour": "red"}),
+        "",
+    ])
+    response = client.post("/owner/meals/bulk?dry_run=true", content=lines,
+                           headers={"Content-Type": "application/x-ndjson"})
+    body = response.json()
+    assert (body["rows"], body["valid"], body["created"]) == (3, 1, 0)
+    assert body["errors"][1] == {"row": 3, "errors": ["colour: unknown field"]}
+    assert owner_db == []
+
+    response = client.post("/owner/meals/bulk?format=jsonl", content=lines)
+    assert response.json()["created"] == 1
+
+
+def test_import_rejects_bad_requests(owner_db):
+    client = TestClient(app)
+    assert client.post("/owner/meals/bulk", content="name\n", headers={"Content-Type": "text/plain"}).status_code == 415
+    response = client.post("/owner/meals/bulk?format=csv", content="name,price\nSoup,3\n")
+    assert response.status_code == 400
+    with patch.object(bulk, "MAX_ROWS", 2):
+        response = client.post("/owner/meals/bulk?format=csv", content="name,base_price\na,1\nb,1\nc,1\n")
+    assert response.status_code == 413
+
+
+def test_export_round_trips(owner_db):
+    client = TestClient(app)
+    meals = [
+        {"id": "m1", "name": "Bagel, plain", "tags": ["vegan"], "base_price": 3, "quantity": 2, "surplus_price": None,
+         "allergens": ["gluten", "sesame"], "calories": 250, "image_link": None},
+    ]
+    with patch("app.owner_meals.bulk.get_db") as get_db:
+        query = get_db.return_value.table.return_value.select.return_value.eq.return_value.order.return_value
+        query.limit.side_effect = lambda size: MagicMock(**{"execute.return_value.data": meals[:size]})
+        response = client.get("/owner/meals/export")
+        jsonl = client.get("/owner/meals/export?format=jsonl")
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text == (
+        "name,tags,base_price,quantity,surplus_price,allergens,calories,image_link\n"
+        '"Bagel, plain",vegan,3,2,,gluten;sesame,250,\n'
+    )
+    assert json.loads(jsonl.text)["allergens"] == ["gluten", "sesame"]
+
+    response = client.post("/owner/meals/bulk?format=csv", content=response.text)
+    assert response.json()["created"] == 1
+    assert owner_db[0][0]["allergens"] == ["gluten", "sesame"]
@@ -1,4 +1,5 @@
 import pytest
+from datetime import date
 from unittest.mock import Mock, patch
 from fastapi import HTTPException
 from app.routers.owner_orders import get_restaurant_orders, update_order_status, get_restaurant_analytics, UpdateOrderStatusRequest
@@ -73,6 +74,18 @@ def test_update_order_status_success(mock_get_db, mock_user):
     assert result["status"] == "ready"
 
 
+@patch("app.routers.owner_orders.safe_record_delivery")
+@patch("app.routers.owner_orders.get_db")
+def test_update_order_status_records_driver_earnings(mock_get_db, mock_record_delivery, mock_user):
+    mock_supabase = Mock()
+    mock_get_db.return_value = mock_supabase
+    mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [{"id": "order1", "restaurant_id": "rest1"}]
+
+    update_order_status("order1", UpdateOrderStatusRequest(status="delivered"), mock_user)
+
+    mock_record_delivery.assert_called_once_with("order1", "delivered")
+
+
 @patch("app.routers.owner_orders.get_db")
 def test_update_order_status_not_found(mock_get_db, mock_user):
     mock_supabase = Mock()
@@ -85,56 +98,39 @@ def test_update_order_status_not_found(mock_get_db, mock_user):
     assert exc.value.status_code == 404
 
 
+def _analytics_tables(staff, dishes, reviews):
+    """Route supabase.table(name) to a mock preloaded with that table's rows."""
+    tables = {name: Mock() for name in ("restaurant_staff", "restaurant_meal_stats", "orders")}
+    tables["restaurant_staff"].select.return_value.eq.return_value.execute.return_value.data = staff
+    tables["restaurant_meal_stats"].select.return_value.eq.return_value.order.return_value.limit.return_value.execute.return_value.data = dishes
+    tables["orders"].select.return_value.eq.return_value.not_.is_.return_value.order.return_value.limit.return_value.execute.return_value.data = reviews
+    return lambda name: tables[name]
+
+
+@patch("app.services.analytics_rollups.get_db")
 @patch("app.routers.owner_orders.get_db")
-def test_get_restaurant_analytics_success(mock_get_db, mock_user):
+def test_get_restaurant_analytics_success(mock_get_db, mock_rollup_db, mock_user):
     mock_supabase = Mock()
     mock_get_db.return_value = mock_supabase
-    
-    staff_mock = Mock()
-    staff_mock.data = [{"restaurant_id": "rest1", "restaurants": {"name": "Test Restaurant"}}]
-    
-    orders_data = [
-        {
-            "id": "order1",
-            "user_id": "user1",
-            "total": 30.0,
-            "restaurant_rating": 5,
-            "restaurant_comment": "Great!",
-            "created_at": "2024-01-01",
-            "delivery_fee": 5.0,
-            "tip_amount": 3.0,
-            "tax": 2.0
-        },
-        {
-            "id": "order2",
-            "user_id": "user1",
-            "total": 40.0,
-            "restaurant_rating": 4,
-            "restaurant_comment": "Good",
-            "created_at": "2024-01-02",
-            "delivery_fee": 5.0,
-            "tip_amount": 4.0,
-            "tax": 3.0
-        }
+    mock_rollup_db.return_value = mock_supabase
+
+    staff_data = [{"restaurant_id": "rest1", "restaurants": {"name": "Test Restaurant"}}]
+
+    # Two orders from the same customer on consecutive days
+    daily_data = [
+        {"bucket": "2024-01-01", "orders": 1, "revenue": 20.0, "rating_sum": 5, "rating_count": 1, "new_customers": 1, "new_repeat_customers": 0},
+        {"bucket": "2024-01-02", "orders": 1, "revenue": 28.0, "rating_sum": 4, "rating_count": 1, "new_customers": 0, "new_repeat_customers": 1},
     ]
-    
-    orders_mock = Mock()
-    orders_mock.data = orders_data
-    
-    items_mock = Mock()
-    items_mock.data = [{"meal_id": "meal1", "qty": 2, "price": 20.0, "meals": {"name": "Pizza", "image_link": "img.jpg"}, "order_id": "order1"}]
-    
+
+    dishes_data = [{"meal_id": "meal1", "orders": 1, "revenue": 20.0, "meals": {"name": "Pizza", "image_link": "img.jpg"}}]
+
     reviews_data = [
         {"id": "order1", "restaurant_rating": 5, "restaurant_comment": "Great!", "created_at": "2024-01-01", "users": {"name": "John"}},
         {"id": "order2", "restaurant_rating": 4, "restaurant_comment": "Good", "created_at": "2024-01-02", "users": {"name": "Jane"}}
     ]
-    reviews_mock = Mock()
-    reviews_mock.data = reviews_data
-    
-    mock_supabase.table.return_value.select.return_value.eq.return_value.execute.side_effect = [staff_mock]
-    mock_supabase.table.return_value.select.return_value.eq.return_value.in_.return_value.execute.return_value = orders_mock
-    mock_supabase.table.return_value.select.return_value.in_.return_value.execute.return_value = items_mock
-    mock_supabase.table.return_value.select.return_value.eq.return_value.not_.is_.return_value.order.return_value.limit.return_value.execute.return_value = reviews_mock
+
+    mock_supabase.table.side_effect = _analytics_tables(staff_data, dishes_data, reviews_data)
+    mock_supabase.rpc.return_value.execute.return_value.data = daily_data
 
     result = get_restaurant_analytics(mock_user)
 
@@ -142,6 +138,14 @@ def test_get_restaurant_analytics_success(mock_get_db, mock_user):
     assert result["restaurant"]["totalOrders"] == 2
     assert result["restaurant"]["averageRating"] == 4.5
     assert result["stats"]["totalRevenue"] == 48.0
+    assert result["stats"]["avgOrderValue"] == 24.0
+    assert result["stats"]["repeatCustomers"] == 100
+    assert result["popularDishes"] == [{"id": "meal1", "name": "Pizza", "image": "img.jpg", "orders": 1, "revenue": 20.0}]
+    assert len(result["recentReviews"]) == 2
+    assert [point["date"] for point in result["series"]] == ["2024-01-01", "2024-01-02"]
+    mock_supabase.rpc.assert_called_once_with("restaurant_analytics_series", {
+        "p_restaurant_id": "rest1", "p_from": None, "p_to": None, "p_granularity": "day"
+    })
 
 
 @patch("app.routers.owner_orders.get_db")
@@ -155,20 +159,71 @@ def test_get_restaurant_analytics_no_restaurant(mock_get_db, mock_user):
     assert exc.value.status_code == 404
 
 
+@patch("app.services.analytics_rollups.get_db")
 @patch("app.routers.owner_orders.get_db")
-def test_get_restaurant_analytics_no_orders(mock_get_db, mock_user):
+def test_get_restaurant_analytics_no_orders(mock_get_db, mock_rollup_db, mock_user):
     mock_supabase = Mock()
     mock_get_db.return_value = mock_supabase
-    
-    mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [
-        {"restaurant_id": "rest1", "restaurants": {"name": "Test Restaurant"}}
-    ]
-    mock_supabase.table.return_value.select.return_value.eq.return_value.in_.return_value.execute.return_value.data = []
-    mock_supabase.table.return_value.select.return_value.in_.return_value.execute.return_value.data = []
-    mock_supabase.table.return_value.select.return_value.eq.return_value.not_.is_.return_value.order.return_value.limit.return_value.execute.return_value.data = []
+    mock_rollup_db.return_value = mock_supabase
+
+    mock_supabase.table.side_effect = _analytics_tables(
+        [{"restaurant_id": "rest1", "restaurants": {"name": "Test Restaurant"}}], [], []
+    )
+    mock_supabase.rpc.return_value.execute.return_value.data = []
 
     result = get_restaurant_analytics(mock_user)
 
     assert result["restaurant"]["totalOrders"] == 0
     assert result["stats"]["totalRevenue"] == 0
     assert result["stats"]["avgOrderValue"] == 0
+    assert result["popularDishes"] == []
+    assert result["series"] == []
+
+
+@patch("app.services.analytics_rollups.get_db")
+@patch("app.routers.owner_orders.get_db")
+def test_get_restaurant_analytics_windowed(mock_get_db, mock_rollup_db, mock_user):
+    mock_supabase = Mock()
+    mock_get_db.return_value = mock_supabase
+    mock_rollup_db.return_value = mock_supabase
+
+    staff = Mock()
+    staff.select.return_value.eq.return_value.execute.return_value.data = [
+        {"restaurant_id": "rest1", "restaurants": {"name": "Test Restaurant"}}
+    ]
+    orders = Mock()
+    orders.select.return_value.eq.return_value.gte.return_value.lt.return_value.not_.is_.return_value \
+        .order.return_value.limit.return_value.execute.return_value.data = []
+    mock_supabase.table.side_effect = lambda name: {"restaurant_staff": staff, "orders": orders}[name]
+
+    rpc_data = {
+        "restaurant_analytics_series": [
+            {"bucket": "2024-01-08", "orders": 3, "revenue": 60.0, "rating_sum": 8, "rating_count": 2},
+        ],
+        "restaurant_window_customers": [{"unique_customers": 2, "repeat_customers": 1}],
+        "restaurant_window_dishes": [
+            {"meal_id": "meal1", "name": "Pizza", "image_link": None, "orders": 3, "revenue": 45.0},
+        ],
+    }
+    mock_supabase.rpc.side_effect = lambda name, params: Mock(execute=Mock(return_value=Mock(data=rpc_data[name])))
+
+    result = get_restaurant_analytics(
+        mock_user, date_from=date(2024, 1, 1), date_to=date(2024, 1, 21), granularity="week"
+    )
+
+    assert result["restaurant"]["totalOrders"] == 3
+    assert result["stats"]["totalRevenue"] == 60.0
+    assert result["stats"]["repeatCustomers"] == 50
+    assert result["popularDishes"][0]["name"] == "Pizza"
+    assert result["window"] == {"from": "2024-01-01", "to": "2024-01-21", "granularity": "week"}
+    assert [(p["date"], p["orders"]) for p in result["series"]] == [
+        ("2024-01-01", 0), ("2024-01-08", 3), ("2024-01-15", 0)
+    ]
+    orders.select.return_value.eq.return_value.gte.assert_called_once_with("created_at", "2024-01-01T00:00:00")
+    orders.select.return_value.eq.return_value.gte.return_value.lt.assert_called_once_with("created_at", "2024-01-22T00:00:00")
+
+
+def test_get_restaurant_analytics_bad_granularity(mock_user):
+    with pytest.raises(HTTPException) as exc:
+        get_restaurant_analytics(mock_user, granularity="year")
+    assert exc.value.status_code == 400
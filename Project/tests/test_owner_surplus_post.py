@@ -0,0 +1,63 @@
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.owner_meals import service
+from app.owner_meals.auth import require_owner
+from app.owner_meals.schemas import SurplusUpdate
+
+SOUP = "8b0c2f4e-1d6a-4f7e-9a53-0c1b2d3e4f50"
+BREAD = "1f2e3d4c-5b6a-4978-8695-a4b3c2d1e0f9"
+OTHER = "00000000-0000-4000-8000-000000000000"
+
+
+def _row(meal_id, **fields):
+    return {"id": meal_id, "restaurant_id": "r1", "name": "Meal", "tags": None, "base_price": 10, "quantity": 0,
+            "surplus_price": None, "allergens": None, "calories": None, "image_link": None, **fields}
+
+
+@pytest.fixture
+def owner():
+    app.dependency_overrides[require_owner] = lambda: {"id": "owner-1"}
+    with patch("app.owner_meals.service.get_restaurant_by_owner", return_value="r1"):
+        yield
+    app.dependency_overrides.clear()
+
+
+def test_post_surplus_is_one_call(owner):
+    client = TestClient(app)
+    with patch("app.owner_meals.service.get_db") as get_db, \
+            patch("app.services.menu_caches.menu_versions.invalidate") as invalidate, \
+            patch("app.services.menu_caches.catalog_snapshot.meal_changed") as snapshot_changed:
+        get_db.return_value.rpc.return_value.execute.return_value.data = [
+            _row(SOUP, quantity=4, surplus_price=3.5)
+        ]
+        response = client.patch("/owner/meals/surplus", json={
+            SOUP: {"quantity": 4, "surplus_price": 3.5},
+            BREAD.upper(): {"quantity": 2},
+            OTHER: {"quantity": 9},
+        })
+    assert response.status_code == 200
+    body = response.json()
+    assert [m["id"] for m in body["updated"]] == [SOUP]
+    assert body["unchanged"] == [BREAD, OTHER]
+    get_db.return_value.rpc.assert_called_once_with("post_surplus", {
+        "p_restaurant_id": "r1",
+        "p_updates": {SOUP: {"quantity": 4, "surplus_price": 3.5}, BREAD: {"quantity": 2}, OTHER: {"quantity": 9}},
+    })
+    invalidate.assert_called_once_with("r1")
+    snapshot_changed.assert_called_once()
+
+
+def test_post_surplus_validates(owner):
+    client = TestClient(app)
+    assert client.patch("/owner/meals/surplus", json={"not-a-uuid": {"quantity": 1}}).status_code == 422
+    assert client.patch("/owner/meals/surplus", json={SOUP: {"quantity": -1}}).status_code == 422
+    with patch("app.owner_meals.router.MAX_SURPLUS_UPDATES", 1):
+        assert client.patch("/owner/meals/surplus", json={SOUP: {}, BREAD: {}}).status_code == 413
+
+
+def test_empty_updates_skip_the_database():
+    with patch("app.owner_meals.service.get_db") as get_db:
+        assert service.post_surplus("r1", {SOUP: SurplusUpdate()}) == []
+    get_db.assert_not_called()
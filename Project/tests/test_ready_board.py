@@ -0,0 +1,270 @@
+import asyncio
+import json
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from app.routers import delivery_routes
+from app.routers.orders import _transition_order
+from app.services import ready_board as ready_board_settings
+from app.services.distance import HaversineProvider, set_distance_provider
+from app.services.driver_locations import driver_locations
+from app.services.ready_board import ReadyBoard, ready_board, safe_publish_status
+from app.services.restaurant_locations import restaurant_locations
+
+START = (35.7796, -78.6382)
+
+
+@pytest.fixture(autouse=True)
+def offline_distances():
+    set_distance_provider(HaversineProvider())
+    with patch.object(ready_board_settings, "KEEPALIVE_SECONDS", 0.05):
+        yield
+    set_distance_provider(None)
+
+
+def _order(order_id, restaurant_id, lat):
+    return {
+        "id": order_id, "restaurant_id": restaurant_id, "status": "ready",
+        "restaurants": {"name": "R", "latitude": lat, "longitude": START[1]},
+    }
+
+
+def _mock_db(board, single=None):
+    mock_supabase = MagicMock()
+    ready_query = mock_supabase.from_.return_value.select.return_value.eq.return_value
+    ready_query.is_.return_value.execute.return_value.data = board
+    ready_query.eq.return_value.is_.return_value.execute.return_value.data = single or []
+    return mock_supabase
+
+
+def _parse(frame):
+    if frame.startswith(":"):
+        return "keepalive", None
+    event_line, data_line = frame.strip().split("\n")
+    return event_line[len("event: "):], json.loads(data_line[len("data: "):])
+
+
+async def _next(events):
+    return _parse(await asyncio.wait_for(events.__anext__(), 2))
+
+
+def _open(supabase, user_id="driver1", radius=5.0):
+    sub = ready_board.subscribe()
+    return delivery_routes._ready_board_events(supabase, user_id, START[0], START[1], radius, 50, sub)
+
+
+def test_stream_sends_snapshot_then_changes():
+    async def run():
+        supabase = _mock_db([_order("o1", "r1", START[0] + 0.01)], single=[_order("o2", "r2", START[0] + 0.02)])
+        events = _open(supabase)
+        kind, board = await _next(events)
+        assert kind == "snapshot"
+        assert [o["id"] for o in board] == ["o1"]
+        assert board[0]["restaurant_reachable_by_road"] is True
+
+        safe_publish_status("o2", "ready", "r2")
+        kind, added = await _next(events)
+        assert kind == "added" and added["id"] == "o2"
+        assert added["distance_to_restaurant_miles"] > 0
+
+        safe_publish_status("o1", "assigned", "r1")
+        assert await _next(events) == ("removed", {"id": "o1"})
+
+        # orders the driver never saw are not relayed
+        safe_publish_status("elsewhere", "assigned", "r9")
+        assert (await _next(events))[0] == "keepalive"
+        await events.aclose()
+        assert len(ready_board) == 0
+
+    asyncio.run(run())
+
+
+def test_added_orders_outside_radius_skip_the_lookup():
+    async def run():
+        restaurant_locations.refresh(force=True)
+        restaurant_locations.upsert("far", 36.5, -79.5)
+        supabase = _mock_db([])
+        events = _open(supabase)
+        await _next(events)
+        lookups = supabase.from_.call_count
+
+        safe_publish_status("o9", "ready", "far")
+        assert (await _next(events))[0] == "keepalive"
+        assert supabase.from_.call_count == lookups
+        await events.aclose()
+
+    asyncio.run(run())
+
+
+def test_one_lookup_per_readied_order_across_drivers():
+    async def run():
+        supabase = _mock_db([], single=[_order("o2", "r2", START[0] + 0.01)])
+        streams = [_open(supabase, f"d{i}") for i in range(20)]
+        for events in streams:
+            await _next(events)
+        snapshot_queries = supabase.from_.call_count
+
+        safe_publish_status("o2", "ready", "r2")
+        for events in streams:
+            assert (await _next(events))[0] == "added"
+        assert supabase.from_.call_count == snapshot_queries + 1
+        for events in streams:
+            await events.aclose()
+
+    asyncio.run(run())
+
+
+def test_board_recomputed_only_after_driver_moves():
+    async def run():
+        supabase = _mock_db([_order("o1", "r1", START[0] + 0.01)])
+        events = _open(supabase)
+        await _next(events)
+
+        # ~0.07 mi: below the refresh threshold
+        driver_locations.update("driver1", START[0] + 0.001, START[1])
+        assert (await _next(events))[0] == "keepalive"
+        assert supabase.from_.call_count == 1
+
+        # ~0.7 mi: a fresh snapshot from the new position
+        driver_locations.update("driver1", START[0] + 0.01, START[1])
+        kind, board = await _next(events)
+        assert kind == "snapshot"
+        assert board[0]["straight_line_distance_miles"] == pytest.approx(0.0, abs=0.01)
+        assert supabase.from_.call_count == 2
+        await events.aclose()
+
+    asyncio.run(run())
+
+
+def test_publish_from_worker_thread_and_overflow_resync():
+    async def run():
+        supabase = _mock_db([])
+        events = _open(supabase)
+        await _next(events)
+
+        thread = threading.Thread(target=safe_publish_status, args=("o1", "assigned"))
+        thread.start()
+        thread.join()
+        assert (await _next(events))[0] == "keepalive"
+
+        sub = ready_board._subscribers[0]
+        for i in range(ready_board_settings.QUEUE_SIZE + 5):
+            ready_board.publish(f"x{i}", "cancelled")
+        await asyncio.sleep(0.01)
+        assert sub.overflowed
+        assert (await _next(events))[0] == "snapshot"
+        await events.aclose()
+
+    asyncio.run(run())
+
+
+def test_slow_lookups_do_not_block_the_event_loop():
+    def slow(rows):
+        def execute():
+            time.sleep(0.2)
+            return MagicMock(data=rows)
+        return execute
+
+    async def run():
+        supabase = _mock_db([])
+        ready_query = supabase.from_.return_value.select.return_value.eq.return_value
+        ready_query.is_.return_value.execute.side_effect = slow([_order("o1", "r1", START[0] + 0.01)])
+        ready_query.eq.return_value.is_.return_value.execute.side_effect = slow([_order("o2", "r2", START[0] + 0.02)])
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        events = _open(supabase)
+        assert (await _next(events))[0] == "snapshot"
+        assert ticks >= 5
+
+        ticks = 0
+        safe_publish_status("o2", "ready", "r2")
+        assert (await _next(events))[0] == "added"
+        assert ticks >= 5
+        task.cancel()
+        await events.aclose()
+
+    asyncio.run(run())
+
+
+def test_concurrent_order_row_requests_share_one_fetch():
+    board = ReadyBoard(row_ttl_seconds=5)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"id": "o1"}
+
+    rows = []
+    threads = [threading.Thread(target=lambda: rows.append(board.order_row("o1", fetch))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert rows == [{"id": "o1"}] * 8
+
+
+def test_order_row_is_shared_briefly():
+    board = ReadyBoard(row_ttl_seconds=5)
+    fetch = MagicMock(return_value={"id": "o1"})
+    assert board.order_row("o1", fetch, now=0) == {"id": "o1"}
+    board.order_row("o1", fetch, now=4)
+    assert fetch.call_count == 1
+    board.order_row("o1", fetch, now=6)
+    assert fetch.call_count == 2
+    # a status change invalidates the shared row
+    board.publish("o1", "assigned")
+    board.order_row("o1", fetch, now=7)
+    assert fetch.call_count == 3
+
+
+def test_failed_order_row_fetch_is_retried():
+    board = ReadyBoard(row_ttl_seconds=5)
+    fetch = MagicMock(side_effect=[RuntimeError("boom"), {"id": "o1"}])
+    with pytest.raises(RuntimeError):
+        board.order_row("o1", fetch, now=0)
+    assert board.order_row("o1", fetch, now=0) == {"id": "o1"}
+    # the row is cached before the fetch slot is released
+    assert "o1" in board._rows and "o1" not in board._fetching
+
+
+def test_status_transitions_publish_to_the_board():
+    order = {"id": "o1", "status": "preparing", "restaurant_id": "r1"}
+    mock_supabase = MagicMock()
+    mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [order]
+
+    with patch("app.routers.orders.get_db", return_value=mock_supabase), \
+            patch("app.routers.orders.safe_publish_status") as publish:
+        _transition_order("o1", "ready")
+        publish.assert_called_once_with("o1", "ready", "r1")
+
+        publish.reset_mock()
+        order["status"] = "pending"
+        _transition_order("o1", "accepted")
+        publish.assert_not_called()
+
+
+def test_stream_endpoint_is_event_stream():
+    route = next(r for r in delivery_routes.router.routes if r.path == "/deliveries/ready/stream")
+    assert "GET" in route.methods
+
+    async def run():
+        with patch("app.routers.delivery_routes.get_db", return_value=_mock_db([])):
+            response = await delivery_routes.stream_ready_orders(
+                delivery_routes.Location(latitude=START[0], longitude=START[1]), 5.0, 50, {"id": "driver1"}
+            )
+        assert response.media_type == "text/event-stream"
+        first = await asyncio.wait_for(response.body_iterator.__anext__(), 2)
+        assert _parse(first) == ("snapshot", [])
+        await response.body_iterator.aclose()
+
+    asyncio.run(run())
@@ -0,0 +1,126 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.restaurant_locations import RestaurantLocationIndex, restaurant_locations
+
+RALEIGH = (35.7796, -78.6382)
+
+
+def _order(order_id, restaurant_id, lat, lng):
+    return {
+        "id": order_id,
+        "user_id": "user1",
+        "restaurant_id": restaurant_id,
+        "status": "ready",
+        "restaurants": {"name": f"Restaurant {restaurant_id}", "latitude": lat, "longitude": lng, "address": "1 St"},
+        "customer": {"name": "Customer"},
+        "delivery_address": "2 Ave",
+    }
+
+
+def _base_query(mock_supabase):
+    return mock_supabase.from_.return_value.select.return_value.eq.return_value.is_.return_value
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def _load_index(rows):
+    mock_supabase = MagicMock()
+    mock_supabase.table.return_value.select.return_value.execute.return_value.data = rows
+    with patch("app.services.restaurant_locations.get_db", return_value=mock_supabase):
+        restaurant_locations.refresh(force=True)
+
+
+def test_index_narrows_query_to_nearby_restaurants(client):
+    _load_index([
+        {"id": "near", "latitude": 35.78, "longitude": -78.64},
+        {"id": "far", "latitude": 36.5, "longitude": -80.0},
+    ])
+    mock_supabase = MagicMock()
+    _base_query(mock_supabase).in_.return_value.execute.return_value.data = [_order("o1", "near", 35.78, -78.64)]
+    compute = AsyncMock(return_value=({"near": 1000.0}, {"near": 120.0}))
+
+    with patch("app.routers.delivery_routes.get_db", return_value=mock_supabase), \
+            patch("app.routers.delivery_routes._compute_distances_and_durations", compute):
+        response = client.get(f"/deliveries/ready?latitude={RALEIGH[0]}&longitude={RALEIGH[1]}&radius_miles=10")
+
+    assert response.status_code == 200
+    _base_query(mock_supabase).in_.assert_called_once_with("restaurant_id", ["near"])
+    assert [o["id"] for o in response.json()] == ["o1"]
+    assert response.json()[0]["distance_to_restaurant"] == 1000.0
+
+
+def test_nothing_nearby_skips_orders_query(client):
+    _load_index([{"id": "far", "latitude": 40.0, "longitude": -75.0}])
+
+    mock_supabase = MagicMock()
+    with patch("app.routers.delivery_routes.get_db", return_value=mock_supabase):
+        response = client.get(f"/deliveries/ready?latitude={RALEIGH[0]}&longitude={RALEIGH[1]}&radius_miles=5")
+
+    assert response.status_code == 200
+    assert response.json() == []
+    _base_query(mock_supabase).execute.assert_not_called()
+
+
+def test_radius_and_limit_bound_mapbox_destinations(client):
+    orders = [_order(f"o{i}", f"r{i}", RALEIGH[0] + i * 0.02, RALEIGH[1]) for i in range(40)]
+    orders.reverse()  # the database returns them in no particular order
+    mock_supabase = MagicMock()
+    _base_query(mock_supabase).execute.return_value.data = orders
+    compute = AsyncMock(return_value=({}, {}))
+
+    with patch("app.routers.delivery_routes.get_db", return_value=mock_supabase), \
+            patch("app.routers.delivery_routes._compute_distances_and_durations", compute):
+        response = client.get(f"/deliveries/ready?latitude={RALEIGH[0]}&longitude={RALEIGH[1]}&radius_miles=2&limit=5")
+
+    assert response.status_code == 200
+    data = response.json()
+    # 0.02 degrees of latitude is about 1.4 miles, so only r0 and r1 are in range
+    assert [o["id"] for o in data] == ["o0", "o1"]
+    assert data[1]["straight_line_distance_miles"] == pytest.approx(1.38, abs=0.05)
+    dests = compute.call_args.args[2]
+    assert [d["restaurant_id"] for d in dests] == ["r0", "r1"]
+
+    with patch("app.routers.delivery_routes.get_db", return_value=mock_supabase), \
+            patch("app.routers.delivery_routes._compute_distances_and_durations", compute):
+        response = client.get(f"/deliveries/ready?latitude={RALEIGH[0]}&longitude={RALEIGH[1]}&radius_miles=50&limit=5")
+    assert [o["id"] for o in response.json()] == ["o0", "o1", "o2", "o3", "o4"]
+    assert len(compute.call_args.args[2]) == 5
+
+
+@pytest.mark.parametrize("query", ["radius_miles=0", "radius_miles=-1", "limit=0", "limit=1000"])
+def test_invalid_radius_or_limit(client, query):
+    response = client.get(f"/deliveries/ready?latitude={RALEIGH[0]}&longitude={RALEIGH[1]}&{query}")
+    assert response.status_code == 422
+
+
+@patch("app.services.restaurant_locations.get_db")
+def test_location_index_loads_and_refreshes(mock_get_db):
+    mock_supabase = MagicMock()
+    mock_get_db.return_value = mock_supabase
+    mock_supabase.table.return_value.select.return_value.execute.return_value.data = [
+        {"id": "r1", "latitude": 35.78, "longitude": -78.64},
+        {"id": "r2", "latitude": None, "longitude": None},
+    ]
+    index = RestaurantLocationIndex(refresh_seconds=3600)
+
+    assert [rid for _, rid in index.within(*RALEIGH, 5)] == ["r1"]
+    assert len(index) == 1
+    index.within(*RALEIGH, 5)
+    assert mock_supabase.table.call_count == 1
+
+    mock_supabase.table.return_value.select.return_value.execute.side_effect = Exception("db down")
+    index.refresh(force=True)
+    assert index.get("r1") == (35.78, -78.64)
+
+
+def test_location_index_upsert_and_remove():
+    index = RestaurantLocationIndex()
+    index.upsert("r1", "35.78", "-78.64")
+    assert index.get("r1") == (35.78, -78.64)
+    index.upsert("r1", None, None)
+    assert index.get("r1") is None
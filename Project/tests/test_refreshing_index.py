@@ -0,0 +1,62 @@
+from unittest.mock import MagicMock, patch
+from app.services import refreshing_index
+from app.services.refreshing_index import RefreshingIndex
+
+
+class FakeIndex(RefreshingIndex):
+    name = "fake index"
+
+    def __init__(self, loads):
+        super().__init__(refresh_seconds=300)
+        self.loads = loads
+
+    def _load(self):
+        result = self.loads.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def _empty(self):
+        return MagicMock(name="empty")
+
+
+def _at(seconds):
+    return patch.object(refreshing_index.time, "monotonic", return_value=seconds)
+
+
+def test_failed_first_load_is_retried_after_backoff():
+    loaded = MagicMock(name="loaded")
+    holder = FakeIndex([RuntimeError("timeout"), loaded])
+    with _at(1000):
+        empty = holder.index()
+        # edits while the stand-in is served are left to the next build
+        holder.meal_changed({"id": "m1"})
+        empty.upsert_meal.assert_not_called()
+    with _at(1000 + refreshing_index.RETRY_SECONDS - 1):
+        assert holder.index() is not loaded
+    with _at(1000 + refreshing_index.RETRY_SECONDS):
+        assert holder.index() is loaded
+    holder.meal_changed({"id": "m1"})
+    loaded.upsert_meal.assert_called_once_with({"id": "m1"})
+
+
+def test_failed_refresh_keeps_the_last_index_and_retries():
+    first, second = MagicMock(name="first"), MagicMock(name="second")
+    holder = FakeIndex([first, RuntimeError("timeout"), second])
+    with _at(0):
+        assert holder.index() is first
+    with _at(300):
+        assert holder.index() is first
+    with _at(300 + refreshing_index.RETRY_SECONDS):
+        assert holder.index() is second
+
+
+def test_patch_hooks_never_raise():
+    index = MagicMock()
+    index.upsert_meal.side_effect = RuntimeError("boom")
+    index.remove_meal.side_effect = RuntimeError("boom")
+    holder = FakeIndex([])
+    holder.set_index(index)
+    holder.meal_changed({"id": "m1"})
+    holder.meal_removed("m1")
+    index.remove_meal.assert_called_once_with("m1")
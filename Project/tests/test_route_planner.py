@@ -0,0 +1,175 @@
+import itertools
+import random
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from app import main as main_app
+from app.routers import delivery_routes
+from app.services import route_planner
+from app.services.route_planner import (
+    StackCandidate,
+    _distance_matrix,
+    plan_route,
+    propose_stack,
+    route_cost,
+)
+
+START = (35.7796, -78.6382)
+
+
+def _random_orders(rng, n, spread=0.05):
+    return [
+        StackCandidate(
+            f"o{k}",
+            (START[0] + rng.uniform(-spread, spread), START[1] + rng.uniform(-spread, spread)),
+            (START[0] + rng.uniform(-spread, spread), START[1] + rng.uniform(-spread, spread)),
+        )
+        for k in range(n)
+    ]
+
+
+def _assert_precedence(plan):
+    seen = set()
+    for kind, oid in plan.stops:
+        if kind == "pickup":
+            seen.add(oid)
+        else:
+            assert oid in seen, f"{oid} dropped off before pickup"
+
+
+def _optimal_cost(orders, dist):
+    nodes = [n for k in range(len(orders)) for n in (2 * k + 1, 2 * k + 2)]
+    best = float("inf")
+    for perm in itertools.permutations(nodes):
+        pos = {n: i for i, n in enumerate(perm)}
+        if all(pos[2 * k + 1] < pos[2 * k + 2] for k in range(len(orders))):
+            best = min(best, route_cost(list(perm), dist))
+    return best
+
+
+def test_plan_route_respects_pickup_before_dropoff():
+    rng = random.Random(5)
+    for _ in range(50):
+        plan = plan_route(START, _random_orders(rng, 4))
+        _assert_precedence(plan)
+        assert len(plan.stops) == 8
+
+
+def test_plan_route_is_near_optimal_on_small_instances():
+    rng = random.Random(11)
+    ratios = []
+    for _ in range(30):
+        orders = _random_orders(rng, 3)
+        dist = _distance_matrix(START, orders)
+        plan = plan_route(START, orders, dist)
+        ratios.append(plan.miles / _optimal_cost(orders, dist))
+    assert max(ratios) < 1.25
+    assert sum(ratios) / len(ratios) < 1.05
+
+
+def test_propose_stack_groups_orders_from_the_same_restaurant():
+    restaurant = (35.78, -78.64)
+    candidates = [
+        StackCandidate("a", restaurant, (35.79, -78.65)),
+        StackCandidate("b", restaurant, (35.791, -78.651)),
+        StackCandidate("far", (35.95, -78.95), (36.0, -79.0)),
+    ]
+    plan = propose_stack(START, candidates, cap=3, max_extra_miles=1.0)
+
+    assert sorted(plan.order_ids) == ["a", "b"]
+    _assert_precedence(plan)
+
+
+def test_propose_stack_respects_cap():
+    restaurant = (35.78, -78.64)
+    candidates = [StackCandidate(f"o{k}", restaurant, (35.79, -78.65 + k * 0.0001)) for k in range(6)]
+
+    assert len(propose_stack(START, candidates, cap=1).order_ids) == 1
+    assert len(propose_stack(START, candidates, cap=4).order_ids) == 4
+    assert propose_stack(START, []) is None
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("n_candidates,cap", [(10, 3), (30, 5)])
+def test_stack_solve_latency(n_candidates, cap):
+    rng = random.Random(2)
+    timings = []
+    for _ in range(20):
+        candidates = _random_orders(rng, n_candidates, spread=0.02)
+        start_time = time.time()
+        plan = propose_stack(START, candidates, cap=cap, max_extra_miles=5.0)
+        timings.append(time.time() - start_time)
+        _assert_precedence(plan)
+    timings.sort()
+    print(f"\n{n_candidates} candidates, cap {cap}: median {timings[10] * 1000:.2f} ms, max {timings[-1] * 1000:.2f} ms")
+    assert timings[10] < 0.05
+
+
+@pytest.fixture
+def driver_client():
+    main_app.app.dependency_overrides[delivery_routes.current_user] = lambda: {"id": "driver1"}
+    yield TestClient(main_app.app)
+    main_app.app.dependency_overrides.clear()
+
+
+def _mock_db(active, ready):
+    mock_supabase = MagicMock()
+    mock_supabase.table.return_value.select.return_value.eq.return_value.in_.return_value.execute.return_value.data = active
+    ready_query = mock_supabase.from_.return_value.select.return_value.eq.return_value.is_.return_value
+    ready_query.execute.return_value.data = ready
+    return mock_supabase
+
+
+def _ready(order_id, restaurant_id, pickup, dropoff):
+    return {
+        "id": order_id, "restaurant_id": restaurant_id,
+        "restaurants": {"name": "R", "latitude": pickup[0], "longitude": pickup[1]},
+        "latitude": dropoff[0], "longitude": dropoff[1],
+    }
+
+
+def test_stack_endpoint_proposes_route(driver_client):
+    ready = [
+        _ready("o1", "r1", (35.78, -78.64), (35.79, -78.65)),
+        _ready("o2", "r1", (35.78, -78.64), (35.791, -78.65)),
+        _ready("o3", "r2", (35.781, -78.641), (None, None)),
+    ]
+    with patch.object(route_planner, "MAX_STACKED_ORDERS", 3), \
+            patch("app.routers.delivery_routes.get_db", return_value=_mock_db([], ready)):
+        response = driver_client.get(f"/deliveries/stack?latitude={START[0]}&longitude={START[1]}")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert sorted(data["order_ids"]) == ["o1", "o2"]
+    assert [s["type"] for s in data["stops"]].count("pickup") == 2
+    assert data["max_stacked_orders"] == 3
+
+
+def test_stack_endpoint_when_driver_is_full(driver_client):
+    with patch("app.routers.delivery_routes.get_db", return_value=_mock_db([{"id": "a1"}], [])):
+        response = driver_client.get(f"/deliveries/stack?latitude={START[0]}&longitude={START[1]}")
+    assert response.json()["order_ids"] == []
+
+
+def test_accept_allows_second_order_when_stacking_enabled(driver_client):
+    mock_supabase = _mock_db([{"id": "a1"}], [])
+    order = {"id": "o2", "status": "ready", "delivery_user_id": None}
+    mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [order]
+
+    with patch("app.routers.delivery_routes.get_db", return_value=mock_supabase):
+        response = driver_client.patch("/deliveries/o2/accept")
+        assert response.status_code == 400
+        assert "already have an active" in response.json()["detail"]
+
+        with patch.object(route_planner, "MAX_STACKED_ORDERS", 2):
+            response = driver_client.patch("/deliveries/o2/accept")
+            assert response.status_code == 200
+
+        mock_supabase.table.return_value.select.return_value.eq.return_value.in_.return_value.execute.return_value.data = [
+            {"id": "a1"}, {"id": "a2"}
+        ]
+        with patch.object(route_planner, "MAX_STACKED_ORDERS", 2):
+            response = driver_client.patch("/deliveries/o2/accept")
+            assert response.status_code == 400
+            assert "2 active delivery orders" in response.json()["detail"]
@@ -0,0 +1,101 @@
+import random
+import time
+import pytest
+from unittest.mock import patch
+from app.owner_meals import service
+from app.owner_meals.schemas import MealUpdate
+from app.services.surplus_feed import SurplusFeedIndex, surplus_feed
+
+NOW = 1_800_000_000.0
+HOUR = 3600
+
+
+def _at(hours_ago):
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(NOW - hours_ago * HOUR))
+
+
+MEALS = [
+    # deep discount, posted long ago
+    {"id": "m1", "restaurant_id": "r1", "name": "Noodles", "quantity": 3, "base_price": 12, "surplus_price": 3.0,
+     "created_at": _at(48)},
+    # sold out: never in the feed
+    {"id": "m2", "restaurant_id": "r1", "name": "Salad", "quantity": 0, "base_price": 9, "surplus_price": 1.0,
+     "created_at": _at(1)},
+    # fresh, shallow discount
+    {"id": "m3", "restaurant_id": "r2", "name": "Pizza", "quantity": 2, "base_price": 10, "surplus_price": 9.0,
+     "created_at": _at(0)},
+    # far away, deep discount, fresh
+    {"id": "m4", "restaurant_id": "r3", "name": "Bowl", "quantity": 5, "base_price": 14, "surplus_price": 4.0,
+     "created_at": _at(2)},
+]
+COORDS = {"r1": (35.78, -78.64), "r2": (35.79, -78.65), "r3": (36.0, -78.9)}
+
+
+@pytest.fixture(autouse=True)
+def locations():
+    with patch("app.services.surplus_feed.restaurant_locations.get", side_effect=COORDS.get):
+        yield
+
+
+@pytest.fixture
+def index():
+    return SurplusFeedIndex().build(MEALS, popularity={"m3": 30})
+
+
+def _ids(rows):
+    return [r["id"] for r in rows]
+
+
+def test_rank_anonymous_and_located(index):
+    # fresh and popular outranks a deeper but two-day-old discount
+    assert _ids(index.rank(now=NOW)) == ["m4", "m3", "m1"]
+    rows = index.rank(lat=35.78, lng=-78.64, now=NOW)
+    assert _ids(rows) == ["m1", "m3", "m4"]
+    assert rows[0]["distance_miles"] == 0.0 and rows[2]["distance_miles"] > 15
+    assert rows[0]["score"] > rows[1]["score"] > rows[2]["score"]
+    assert _ids(index.rank(now=NOW, limit=1, offset=1)) == ["m3"]
+
+
+def test_stock_and_price_changes_rescore(index):
+    index.upsert_meal({"id": "m2", "quantity": 4})
+    assert _ids(index.rank(now=NOW, limit=1)) == ["m2"]
+    index.upsert_meal({"id": "m4", "surplus_price": 14})
+    index.remove_meal("m2")
+    assert _ids(index.rank(now=NOW)) == ["m3", "m1", "m4"]
+    index.upsert_meal({"id": "m5", "restaurant_id": "r9", "quantity": 1, "base_price": 10, "surplus_price": 0,
+                       "created_at": _at(0)})
+    assert _ids(index.rank(now=NOW, limit=1)) == ["m5"]
+
+
+def test_pruned_scan_matches_full_ranking():
+    rng = random.Random(4)
+    meals = [
+        {"id": f"m{i}", "restaurant_id": rng.choice(list(COORDS)), "quantity": rng.randint(0, 30),
+         "base_price": 10, "surplus_price": round(rng.uniform(1, 10), 2), "created_at": _at(rng.uniform(0, 72))}
+        for i in range(5000)
+    ]
+    index = SurplusFeedIndex().build(meals, popularity={f"m{i}": rng.randint(0, 50) for i in range(0, 5000, 7)})
+    page = index.rank(lat=35.8, lng=-78.7, limit=20, offset=10, now=NOW)
+    full = index.rank(lat=35.8, lng=-78.7, limit=5000, now=NOW)
+    assert _ids(page) == _ids(full[10:30])
+    assert len(full) == len(index)
+
+
+def test_endpoint_and_owner_edits(index, client):
+    surplus_feed.set_index(index)
+    with patch("app.routers.meals.get_db") as meals_db, \
+            patch("app.services.surplus_feed.time.time", return_value=NOW):
+        response = client.get("/meals?sort=rank&lat=35.78&lng=-78.64&limit=2")
+    meals_db.assert_not_called()
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+    assert _ids(response.json()) == ["m1", "m3"]
+    assert client.get("/meals?sort=popular").status_code == 400
+
+    with patch("app.owner_meals.service.get_db") as mock_get_db:
+        table = mock_get_db.return_value.table.return_value
+        table.delete.return_value.eq.return_value.eq.return_value.execute.return_value.data = [{"id": "m1"}]
+        table.update.return_value.eq.return_value.eq.return_value.execute.return_value.data = [{**MEALS[0], "quantity": 0}]
+        service.update_meal("m1", "r1", MealUpdate(quantity=0))
+        service.delete_meal("m3", "r2")
+    assert _ids(surplus_feed.rank()) == ["m4"]
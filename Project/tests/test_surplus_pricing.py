@@ -0,0 +1,130 @@
+import time
+from datetime import datetime, timezone
+import numpy as np
+import pytest
+from unittest.mock import MagicMock, patch
+from app.services.surplus_pricing import (
+    SellRates, SurplusPricingEngine, compute_prices, hours_to_close, seconds_of_day,
+)
+
+# 18:00 UTC; the engine's default timezone is UTC
+NOW = datetime(2026, 10, 19, 18, 0, tzinfo=timezone.utc)
+RESTAURANTS = [
+    {"id": "r1", "closes_at": "20:00:00", "surplus_floor_ratio": None},
+    {"id": "r2", "closes_at": "23:30", "surplus_floor_ratio": 0.5},
+]
+MEALS = [
+    {"id": "m1", "restaurant_id": "r1", "name": "Soup", "base_price": 10, "quantity": 4, "surplus_price": 8.0},
+    {"id": "m2", "restaurant_id": "r1", "name": "Bread", "base_price": 4, "quantity": 1, "surplus_price": None},
+    {"id": "m3", "restaurant_id": "r2", "name": "Stew", "base_price": 12, "quantity": 2, "surplus_price": 9.6},
+    # not opted in
+    {"id": "m4", "restaurant_id": "r9", "name": "Pie", "base_price": 6, "quantity": 2, "surplus_price": 5.0},
+]
+
+
+def test_hours_to_close_wraps_to_tomorrow():
+    close = np.asarray([seconds_of_day("20:00"), seconds_of_day("17:00:00"), seconds_of_day("bogus")])
+    left = hours_to_close(close, NOW)
+    assert left[0] == 2.0 and left[1] == 23.0 and np.isnan(left[2])
+
+
+def test_prices_decay_towards_floor():
+    base = np.full(5, 10.0)
+    left = np.asarray([6.0, 4.0, 2.0, 0.5, 0.0])
+    prices = compute_prices(base, np.full(5, 3), left, np.full(5, np.nan), np.full(5, 0.3))
+    assert prices[0] == prices[1] == 8.0
+    assert list(prices) == sorted(prices, reverse=True)
+    assert prices[-1] == 3.0
+
+    # a meal selling out on its own is marked down less
+    selling = compute_prices(base[2:3], np.asarray([3]), left[2:3], np.asarray([5.0]), np.asarray([0.3]))
+    assert selling[0] > prices[2]
+
+
+def test_plan_is_dry_and_covers_opted_in_meals():
+    engine = SurplusPricingEngine()
+    changes, _ = engine.plan(RESTAURANTS, MEALS, NOW)
+    by_id = {c.meal_id: c for c in changes}
+    assert set(by_id) == {"m1", "m2"}
+    assert by_id["m1"].hours_to_close == 2.0 and by_id["m1"].new_price == 6.75
+    assert by_id["m2"].old_price is None
+    # m3 is 5.5h from close, already at the opening discount
+    assert len(engine.rates.ids) == 0
+
+
+def test_sell_rates_follow_stock():
+    rates = SellRates()
+    ids = np.asarray(["m1", "m2"])
+    rates.record(ids, np.asarray([10, 5]), rates.estimate(ids, np.asarray([10, 5]), 0.0), 0.0)
+    rate = rates.estimate(np.asarray(["m2", "m1", "m3"]), np.asarray([7, 6, 1]), 7200.0)
+    assert np.isnan(rate[0])       # restocked
+    assert rate[1] == 2.0          # 4 sold in 2h
+    assert np.isnan(rate[2])       # never seen
+
+
+def test_run_once_writes_one_call_per_restaurant():
+    engine = SurplusPricingEngine()
+    db = MagicMock()
+    db.rpc.return_value.execute.return_value.data = 2
+    with patch("app.services.surplus_pricing.get_db", return_value=db), \
+            patch.object(engine, "_restaurants", return_value=RESTAURANTS), \
+            patch.object(engine, "_meals", return_value=MEALS), \
+            patch("app.services.surplus_pricing.datetime") as clock, \
+            patch("app.services.menu_caches.menu_versions.invalidate") as invalidate:
+        clock.now.return_value = NOW
+        preview = engine.run_once(dry_run=True)
+        db.rpc.assert_not_called()
+        changes = engine.run_once()
+    assert changes == preview
+    db.rpc.assert_called_once_with("apply_surplus_prices", {
+        "p_restaurant_id": "r1", "p_meal_ids": ["m1", "m2"], "p_prices": [6.75, 2.7],
+    })
+    invalidate.assert_called_once_with("r1")
+    assert list(engine.rates.ids) == ["m1", "m2", "m3"]
+
+
+def _seeded(n_restaurants, n_meals, rng):
+    restaurants = [
+        {"id": f"r{i}", "closes_at": f"{rng.integers(18, 24):02d}:{rng.integers(0, 60):02d}", "surplus_floor_ratio": None}
+        for i in range(n_restaurants)
+    ]
+    meals = [
+        {"id": f"m{i}", "restaurant_id": f"r{i % n_restaurants}", "name": f"Meal {i}", "base_price": float(rng.uniform(4, 20)),
+         "quantity": int(rng.integers(1, 12)), "surplus_price": None}
+        for i in range(n_meals)
+    ]
+    return restaurants, meals
+
+
+def test_plan_prices_every_meal_between_floor_and_base():
+    restaurants, meals = _seeded(40, 2000, np.random.default_rng(7))
+    engine = SurplusPricingEngine()
+    changes, _ = engine.plan(restaurants, meals, NOW.replace(hour=21))
+
+    assert len(changes) == len(meals)
+    base = {m["id"]: m["base_price"] for m in meals}
+    for c in changes:
+        assert round(base[c.meal_id] * 0.3, 2) <= c.new_price <= base[c.meal_id]
+
+
+@pytest.mark.benchmark
+def test_surplus_pricing_benchmark_100k():
+    """Pricing time for 100,000 meals across 2,000 restaurants."""
+    rng = np.random.default_rng(7)
+    restaurants, meals = _seeded(2000, 100000, rng)
+    engine = SurplusPricingEngine()
+    changes, (ids, quantity, rate) = engine.plan(restaurants, meals, NOW)
+    engine.rates.record(ids, quantity, rate, NOW.timestamp())
+
+    start_time = time.time()
+    changes, _ = engine.plan(restaurants, meals, NOW.replace(hour=21))
+    plan_time = time.time() - start_time
+
+    base = np.asarray([m["base_price"] for m in meals])
+    start_time = time.time()
+    compute_prices(base, np.full(len(base), 5), rng.uniform(0, 6, len(base)), rng.uniform(0, 3, len(base)), np.full(len(base), 0.3))
+    kernel_time = time.time() - start_time
+
+    print(f"\n100k meals: plan {plan_time:.2f}s (pricing kernel {kernel_time * 1000:.1f}ms), {len(changes)} changes")
+    assert len(changes) == 100000
+    assert plan_time < 5.0